@@ -0,0 +1,13 @@
+-- Migration: Empreinte des arrêts d'une tournée
+-- Permet à l'optimisation par lot d'ignorer les tournées dont les arrêts
+-- n'ont pas changé depuis la dernière optimisation
+
+ALTER TABLE public.tournees
+ADD COLUMN IF NOT EXISTS empreinte_arrets VARCHAR(64);
+
+COMMENT ON COLUMN public.tournees.empreinte_arrets IS
+'Empreinte SHA-256 des arrêts et horaires lors de la dernière optimisation.';
+
+-- Chargement des tournées planifiées d'une date
+CREATE INDEX IF NOT EXISTS idx_tournees_date_statut
+ON public.tournees(date_tournee, statut);
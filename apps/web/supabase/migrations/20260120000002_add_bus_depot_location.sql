@@ -0,0 +1,9 @@
+-- Migration: Lieu de remisage des bus
+-- Utilisé par l'affectation automatique des bus aux tournées (haut-le-pied)
+
+ALTER TABLE public.bus
+ADD COLUMN IF NOT EXISTS depot_latitude DECIMAL(10, 8),
+ADD COLUMN IF NOT EXISTS depot_longitude DECIMAL(11, 8);
+
+COMMENT ON COLUMN public.bus.depot_latitude IS
+'Latitude du dépôt du bus. À défaut, la dernière position GPS est utilisée.';
@@ -0,0 +1,57 @@
+-- Migration: Index de recherche textuelle (trigrammes, sans accents)
+-- Utilisés par la recherche classée des véhicules, sites et passagers:
+-- les ILIKE '%terme%' parcouraient toute la table à chaque frappe.
+--
+-- Les champs sont comparés sous la forme public.search_normalize(champ)
+-- (minuscules, sans accents): « Hélène » et « helene » se retrouvent.
+-- - GIN gin_trgm_ops: similarité (%, <%) et sous-chaînes (LIKE '%terme%')
+-- - B-tree text_pattern_ops: préfixes (LIKE 'terme%'), y compris pour les
+--   termes d'un ou deux caractères qui n'ont pas de trigramme utile
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA extensions;
+
+-- unaccent() est STABLE (son dictionnaire peut changer): un index ne peut
+-- l'utiliser qu'à travers une fonction IMMUTABLE qui fixe le dictionnaire
+CREATE OR REPLACE FUNCTION public.search_normalize(value TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+STRICT
+PARALLEL SAFE
+AS $$
+  SELECT lower(kit.unaccent('kit.unaccent'::regdictionary, value))
+$$;
+
+COMMENT ON FUNCTION public.search_normalize(TEXT) IS
+'Forme normalisée (minuscules, sans accents) des champs de recherche. Utilisée par les index de recherche.';
+
+-- Un couple d'index par champ de recherche; les colonnes absentes (schémas
+-- antérieurs) sont ignorées
+DO $$
+DECLARE
+  champ RECORD;
+BEGIN
+  FOR champ IN
+    SELECT c.table_name, c.column_name
+    FROM information_schema.columns c
+    JOIN (VALUES
+      ('vehicles', 'name'), ('vehicles', 'registration'), ('vehicles', 'identifier'),
+      ('sites', 'name'), ('sites', 'code'), ('sites', 'address'), ('sites', 'city'),
+      ('passagers', 'nom'), ('passagers', 'prenom'), ('passagers', 'email'),
+      ('passagers', 'adresse_complete'), ('passagers', 'ville')
+    ) AS recherche (table_name, column_name)
+      ON recherche.table_name = c.table_name AND recherche.column_name = c.column_name
+    WHERE c.table_schema = 'public'
+  LOOP
+    EXECUTE format(
+      'CREATE INDEX IF NOT EXISTS %I ON public.%I USING gin (public.search_normalize(%I) extensions.gin_trgm_ops)',
+      'idx_' || champ.table_name || '_' || champ.column_name || '_trgm',
+      champ.table_name, champ.column_name
+    );
+    EXECUTE format(
+      'CREATE INDEX IF NOT EXISTS %I ON public.%I (public.search_normalize(%I) text_pattern_ops)',
+      'idx_' || champ.table_name || '_' || champ.column_name || '_prefix',
+      champ.table_name, champ.column_name
+    );
+  END LOOP;
+END $$;
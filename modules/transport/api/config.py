@@ -108,6 +108,15 @@ class Settings(BaseSettings):
             pass
         return "postgres"
 
+    # Pool de connexions partagé par les routes (api.database)
+    db_pool_min_size: int = Field(default=1, ge=0)
+    db_pool_max_size: int = Field(default=10, ge=1)
+    db_pool_timeout_seconds: float = Field(default=10.0, gt=0)
+    # Lignes lues par lot par les listes en streaming (api.streaming)
+    db_stream_batch_size: int = Field(default=500, ge=1)
+    # Lignes par bloc pour les imports CSV/XLSX (api.routes.imports)
+    import_chunk_size: int = Field(default=5000, ge=1)
+
     # API
     api_host: str = "0.0.0.0"
     api_port: int = 8000
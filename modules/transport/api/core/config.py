@@ -41,6 +41,19 @@ class Settings(BaseSettings):
     database_max_overflow: int = Field(default=10, ge=0, le=50)
     database_pool_timeout: int = Field(default=30, ge=10, le=120)
     database_echo: bool = Field(default=False, description="Log des requêtes SQL")
+    database_replica_url: Optional[str] = Field(
+        default=None,
+        validation_alias="DATABASE_REPLICA_URL",
+        description="URL d'un réplica en lecture seule (async); les lectures y sont envoyées si défini"
+    )
+    database_replica_max_lag_seconds: float = Field(
+        default=5.0, ge=0, le=300,
+        description="Retard de réplication au-delà duquel les lectures reviennent au primaire"
+    )
+    database_replica_check_interval_seconds: float = Field(
+        default=2.0, ge=0.1, le=60,
+        description="Intervalle entre deux mesures du retard du réplica"
+    )
 
     # ===================
     # API Server
@@ -103,6 +116,38 @@ class Settings(BaseSettings):
     max_route_distance_km: int = Field(default=100, ge=10, le=500)
     default_service_time_minutes: int = Field(default=2, ge=1, le=15)
     default_speed_kmh: float = Field(default=30.0, ge=10.0, le=120.0)
+    stop_merge_radius_meters: float = Field(
+        default=25.0, ge=0, le=500,
+        description="Rayon de fusion des arrêts co-localisés (0 = désactivé)"
+    )
+    replan_time_budget_seconds: float = Field(
+        default=1.5, ge=0.2, le=5.0,
+        description="Budget de re-planification d'une tournée en cours"
+    )
+    solver_max_concurrent: int = Field(
+        default=2, ge=1, le=32,
+        description="Résolutions OR-Tools exécutées simultanément"
+    )
+    solver_max_queue_depth: int = Field(
+        default=10, ge=0, le=500,
+        description="Demandes interactives en attente avant rejet (429)"
+    )
+    solver_max_batch_queue_depth: int = Field(
+        default=200, ge=0, le=10000,
+        description="Résolutions par lot en attente avant rejet"
+    )
+    batch_optimization_workers: int = Field(
+        default=2, ge=1, le=32,
+        description="Processus du pool d'optimisation par lot"
+    )
+    eta_change_threshold_seconds: float = Field(
+        default=60.0, ge=0, le=900,
+        description="Écart minimal avant de publier une nouvelle ETA"
+    )
+    eta_arrival_radius_meters: float = Field(
+        default=50.0, ge=5, le=500,
+        description="Distance sous laquelle un arrêt est considéré atteint"
+    )
 
     # ===================
     # Rate Limiting
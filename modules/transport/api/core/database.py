@@ -3,10 +3,13 @@ Gestion de la base de données avec SQLAlchemy async
 - Connection pooling
 - Context managers pour les sessions
 - Support multi-tenant
+- Réplica en lecture optionnel (routage automatique des SELECT)
 """
 
 import logging
+import time
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from typing import AsyncGenerator, Optional
 
 from sqlalchemy.ext.asyncio import (
@@ -15,16 +18,97 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
     async_sessionmaker,
 )
-from sqlalchemy.orm import declarative_base
-from sqlalchemy import text
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy import Select, event, text
 
 from .config import settings
+from .exceptions import DatabaseError
 
 logger = logging.getLogger(__name__)
 
 # Base pour les modèles SQLAlchemy
 Base = declarative_base()
 
+# La requête (tâche) en cours a validé des écritures: toutes ses sessions
+# lisent désormais sur le primaire, y compris celles déjà ouvertes (lecture
+# de ses propres écritures malgré le retard du réplica). Positionné au commit
+# (voir _flag_request_wrote), pas à la fermeture de la session.
+_request_wrote: ContextVar[bool] = ContextVar("request_wrote", default=False)
+
+# Retard de réplication (secondes) mesuré sur le réplica; 0 s'il a rejoué tout
+# le WAL reçu, même sans transaction récente sur le primaire
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() IS NOT DISTINCT FROM pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+def _is_read(clause) -> bool:
+    """
+    Instruction envoyable au réplica: SELECT sans FOR UPDATE, ou instruction
+    marquée execution_options(replica=True) (ex: EXPLAIN)
+    """
+    options = getattr(clause, "get_execution_options", None)
+    if options is None:
+        return False
+    if options().get("replica"):
+        return True
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    """
+    Session qui envoie les lectures au réplica et tout le reste au primaire
+
+    - info["replica"]: moteur (sync) du réplica, None pour tout lire sur le primaire
+    - Dès la première écriture (flush, INSERT/UPDATE/DELETE, SQL brut,
+      connexion explicite), la session reste sur le primaire: la suite de
+      la transaction lit ce qu'elle vient d'écrire
+    - info["primary"]: lectures sur le primaire sans écriture (use_primary)
+    - Une fois ces écritures validées, les autres sessions de la requête
+      lisent aussi sur le primaire (_request_wrote)
+    - info["read_only"]: toute écriture lève DatabaseError
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or not _is_read(clause):
+            if self.info.get("read_only"):
+                raise DatabaseError("Écriture dans une session en lecture seule", operation="read_session")
+            self.info["wrote"] = True
+
+        replica = self.info.get("replica")
+        if (
+            replica is None
+            or self.info.get("wrote")
+            or self.info.get("primary")
+            or _request_wrote.get()
+        ):
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        return replica
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _flag_request_wrote(session: Session) -> None:
+    """
+    Commit d'une session qui a écrit: la requête en cours lit ensuite sur le
+    primaire, dès le retour du commit (et non à la fermeture de la session,
+    qui suit la réponse pour une dépendance FastAPI)
+    """
+    if session.info.get("wrote"):
+        _request_wrote.set(True)
+
+
+def use_primary(session: AsyncSession) -> None:
+    """
+    Envoie les lectures suivantes de la session au primaire
+
+    À appeler avant une lecture qui prépare une écriture (validation,
+    lecture-modification-écriture): le réplica peut être en retard.
+    """
+    session.info["primary"] = True
+
 
 class Database:
     """
@@ -32,25 +116,43 @@ class Database:
     Thread-safe et optimisé pour les applications async
     """
 
-    def __init__(self, database_url: Optional[str] = None):
+    def __init__(
+        self,
+        database_url: Optional[str] = None,
+        replica_url: Optional[str] = None
+    ):
         self._url = database_url or settings.database_url
+        self._replica_url = replica_url or settings.database_replica_url
         self._engine: Optional[AsyncEngine] = None
+        self._replica_engine: Optional[AsyncEngine] = None
         self._session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+        self._replica_ok = False
+        self._replica_checked_at = float("-inf")
+
+    def _create_engine(self, url: str) -> AsyncEngine:
+        return create_async_engine(
+            url,
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout,
+            pool_pre_ping=True,  # Vérifie la connexion avant utilisation
+            echo=settings.database_echo,
+        )
 
     @property
     def engine(self) -> AsyncEngine:
         """Retourne le moteur SQLAlchemy (lazy initialization)"""
         if self._engine is None:
-            self._engine = create_async_engine(
-                self._url,
-                pool_size=settings.database_pool_size,
-                max_overflow=settings.database_max_overflow,
-                pool_timeout=settings.database_pool_timeout,
-                pool_pre_ping=True,  # Vérifie la connexion avant utilisation
-                echo=settings.database_echo,
-            )
+            self._engine = self._create_engine(self._url)
         return self._engine
 
+    @property
+    def replica_engine(self) -> Optional[AsyncEngine]:
+        """Moteur du réplica en lecture (None si non configuré)"""
+        if self._replica_engine is None and self._replica_url:
+            self._replica_engine = self._create_engine(self._replica_url)
+        return self._replica_engine
+
     @property
     def session_factory(self) -> async_sessionmaker[AsyncSession]:
         """Retourne la factory de sessions"""
@@ -58,22 +160,64 @@ class Database:
             self._session_factory = async_sessionmaker(
                 bind=self.engine,
                 class_=AsyncSession,
+                sync_session_class=RoutingSession,
                 expire_on_commit=False,
                 autoflush=False,
             )
         return self._session_factory
 
+    async def replica_available(self) -> bool:
+        """
+        Le réplica peut-il servir les lectures
+
+        Le retard de réplication est mesuré au plus une fois par
+        database_replica_check_interval_seconds; au-delà de
+        database_replica_max_lag_seconds, ou si le réplica ne répond pas,
+        les lectures restent sur le primaire jusqu'à la mesure suivante.
+        """
+        if self.replica_engine is None:
+            return False
+
+        now = time.monotonic()
+        if now - self._replica_checked_at < settings.database_replica_check_interval_seconds:
+            return self._replica_ok
+        # Les autres sessions gardent l'état courant pendant la mesure
+        self._replica_checked_at = now
+
+        try:
+            async with self.replica_engine.connect() as conn:
+                lag = float((await conn.execute(REPLICA_LAG_QUERY)).scalar() or 0)
+            available = lag <= settings.database_replica_max_lag_seconds
+            if not available:
+                logger.warning(f"Replica lagging by {lag:.1f}s, reading from primary")
+        except Exception as e:
+            logger.warning(f"Replica unavailable, reading from primary: {e}")
+            available = False
+
+        self._replica_ok = available
+        return available
+
+    async def _open_session(self, use_replica: bool) -> AsyncSession:
+        """Ouvre une session; ses lectures vont au réplica si possible"""
+        session = self.session_factory()
+        if use_replica and not _request_wrote.get() and await self.replica_available():
+            session.info["replica"] = self.replica_engine.sync_engine
+        return session
+
     @asynccontextmanager
     async def session(self) -> AsyncGenerator[AsyncSession, None]:
         """
         Context manager pour une session de base de données
         Gère automatiquement commit/rollback
 
+        Les SELECT vont au réplica s'il est configuré et à jour, jusqu'à la
+        première écriture de la session (voir RoutingSession).
+
         Usage:
             async with db.session() as session:
                 result = await session.execute(query)
         """
-        session = self.session_factory()
+        session = await self._open_session(use_replica=True)
         try:
             yield session
             await session.commit()
@@ -84,6 +228,28 @@ class Database:
         finally:
             await session.close()
 
+    @asynccontextmanager
+    async def read_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """
+        Session en lecture seule, servie par le réplica
+
+        Revient au primaire sans réplica, si le réplica est en retard, ou dès
+        que la requête en cours a validé des écritures, même après
+        l'ouverture de la session (lecture de ses propres écritures). Toute
+        écriture lève DatabaseError.
+
+        Usage:
+            async with db.read_session() as session:
+                result = await session.execute(query)
+        """
+        session = await self._open_session(use_replica=True)
+        session.info["read_only"] = True
+        try:
+            yield session
+        finally:
+            await session.rollback()
+            await session.close()
+
     @asynccontextmanager
     async def tenant_session(
         self, organization_id: str
@@ -98,7 +264,8 @@ class Database:
                 result = await session.execute(query)
         """
         async with self.session() as session:
-            # Définir le tenant pour les politiques RLS
+            # Définir le tenant pour les politiques RLS (sur la connexion du
+            # primaire: le SQL brut fixe aussi la session sur le primaire)
             await session.execute(
                 text(f"SET app.organization_id = '{organization_id}'")
             )
@@ -115,7 +282,10 @@ class Database:
             return False
 
     async def close(self) -> None:
-        """Ferme toutes les connexions du pool"""
+        """Ferme toutes les connexions du pool (primaire et réplica)"""
+        if self._replica_engine:
+            await self._replica_engine.dispose()
+            self._replica_engine = None
         if self._engine:
             await self._engine.dispose()
             self._engine = None
@@ -154,6 +324,21 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency injection d'une session en lecture seule (réplica)
+    Pour les routes qui ne font que lire (tableau de bord, carte, listes)
+
+    Usage dans les routes:
+        @router.get("/items")
+        async def get_items(db: AsyncSession = Depends(get_read_db)):
+            ...
+    """
+    database = get_database()
+    async with database.read_session() as session:
+        yield session
+
+
 async def get_tenant_db(organization_id: str) -> AsyncGenerator[AsyncSession, None]:
     """
     Dependency injection avec contexte multi-tenant
@@ -0,0 +1,257 @@
+"""
+Pool de connexions PostgreSQL partagé par les routes de l'API Transport
+- Connexions psycopg2 réutilisées (pas de poignée de main TCP/auth par requête)
+- Taille bornée, attente limitée quand toutes les connexions sont prises
+- Mesure du temps d'attente au checkout
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Deque, Dict, Optional, Set
+
+import numpy as np
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import ThreadedConnectionPool
+from fastapi import HTTPException
+
+from api.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Logger dédié aux métriques (même convention que api.metrics.optimization)
+metrics_logger = logging.getLogger("api.metrics.database")
+
+# Connexions empruntées pendant la requête en cours (voir connection_scope)
+_request_connections: ContextVar[Optional[Set["PooledConnection"]]] = ContextVar(
+    "request_connections", default=None
+)
+
+
+class PooledConnection:
+    """
+    Connexion empruntée au pool
+
+    Se comporte comme une connexion psycopg2; close() la rend au pool au
+    lieu de la fermer (transaction en cours annulée). Une connexion oubliée
+    par un handler (exception avant close()) est rendue à la fin de la
+    requête par connection_scope.
+    """
+
+    def __init__(self, pool: "ConnectionPool", conn, scoped: bool = True):
+        self._pool = pool
+        self._conn = conn
+        self._scope = _request_connections.get() if scoped else None
+        if self._scope is not None:
+            self._scope.add(self)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    def close(self) -> None:
+        """Rend la connexion au pool"""
+        conn, self._conn = self._conn, None
+        if self._scope is not None:
+            self._scope.discard(self)
+        if conn is not None:
+            self._pool.release(conn)
+
+    @property
+    def closed(self) -> bool:
+        return self._conn is None or bool(self._conn.closed)
+
+    def __enter__(self) -> "PooledConnection":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Pool borné de connexions psycopg2
+
+    Au plus max_size connexions sont ouvertes; au-delà, l'appelant attend
+    qu'une connexion se libère, jusqu'à timeout_seconds. Les routes
+    l'utilisent depuis des threads (handlers synchrones ou asyncio.to_thread),
+    jamais depuis la boucle d'événements.
+
+    Usage:
+        conn = get_db_connection()
+        try:
+            cur = conn.cursor()
+            ...
+        finally:
+            conn.close()  # Rend la connexion au pool
+    """
+
+    def __init__(
+        self,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        timeout_seconds: Optional[float] = None
+    ):
+        """
+        Args:
+            min_size: Connexions ouvertes à la création (défaut: configuration)
+            max_size: Connexions simultanées maximales (défaut: configuration)
+            timeout_seconds: Attente maximale d'une connexion (défaut: configuration)
+        """
+        self.min_size = min_size if min_size is not None else settings.db_pool_min_size
+        self.max_size = max_size or settings.db_pool_max_size
+        self.timeout_seconds = (
+            timeout_seconds if timeout_seconds is not None
+            else settings.db_pool_timeout_seconds
+        )
+
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadedConnectionPool] = None
+        self._in_use = 0
+
+        # Mesures
+        self._wait_times: Deque[float] = deque(maxlen=1000)
+        self._checkouts = 0
+        self._timeouts = 0
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        """Crée le pool à la première utilisation"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadedConnectionPool(
+                    self.min_size,
+                    self.max_size,
+                    host=settings.database_host,
+                    port=settings.database_port,
+                    dbname=settings.database_name,
+                    user=settings.database_user,
+                    password=settings.database_password
+                )
+            return self._pool
+
+    def acquire(self, scoped: bool = True) -> PooledConnection:
+        """
+        Emprunte une connexion
+
+        Args:
+            scoped: Rattacher la connexion à la requête en cours (rendue par
+                connection_scope); False pour une connexion qui survit au
+                handler, comme celle d'une réponse en streaming
+
+        Raises:
+            HTTPException: 503 si aucune connexion ne se libère à temps,
+                500 si la connexion à la base échoue
+        """
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout_seconds):
+            self._timeouts += 1
+            metrics_logger.warning(
+                "db_checkout_timeout waited_ms=%.1f in_use=%s",
+                (time.perf_counter() - started) * 1000, self._in_use,
+                extra={"metrics": {
+                    "event": "db_checkout_timeout",
+                    "in_use": self._in_use,
+                    "max_size": self.max_size
+                }}
+            )
+            raise HTTPException(
+                status_code=503,
+                detail="Base de données saturée, veuillez réessayer",
+                headers={"Retry-After": "1"}
+            )
+
+        try:
+            conn = self._get_pool().getconn()
+        except Exception as e:
+            self._slots.release()
+            raise HTTPException(status_code=500, detail=f"Erreur de connexion à la base de données: {str(e)}")
+
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_times.append(waited)
+        metrics_logger.debug(
+            "db_checkout waited_ms=%.1f in_use=%s",
+            waited * 1000, self._in_use,
+            extra={"metrics": {
+                "event": "db_checkout",
+                "wait_ms": round(waited * 1000, 1),
+                "in_use": self._in_use
+            }}
+        )
+        return PooledConnection(self, conn, scoped)
+
+    def release(self, conn) -> None:
+        """Rend une connexion au pool (annule la transaction en cours)"""
+        broken = bool(conn.closed)
+        if not broken and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        try:
+            self._get_pool().putconn(conn, close=broken)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """État du pool et temps d'attente au checkout (p50/p95)"""
+        with self._lock:
+            values = np.fromiter(self._wait_times, dtype=float) * 1000
+            in_use = self._in_use
+        return {
+            "max_size": self.max_size,
+            "in_use": in_use,
+            "checkouts": self._checkouts,
+            "timeouts": self._timeouts,
+            "checkout_wait": {
+                "samples": len(values),
+                "p50_ms": round(float(np.percentile(values, 50)), 1) if len(values) else None,
+                "p95_ms": round(float(np.percentile(values, 95)), 1) if len(values) else None,
+                "max_ms": round(float(values.max()), 1) if len(values) else None
+            }
+        }
+
+    def close(self) -> None:
+        """Ferme toutes les connexions du pool"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+
+
+# Pool partagé par toutes les routes
+pool = ConnectionPool()
+
+
+def get_db_connection() -> PooledConnection:
+    """Emprunte une connexion au pool partagé (close() la rend au pool)"""
+    return pool.acquire()
+
+
+async def connection_scope() -> AsyncGenerator[None, None]:
+    """
+    Dépendance de routeur: rend au pool les connexions restées ouvertes
+
+    Les handlers synchrones (threadpool) et les fonctions passées à
+    asyncio.to_thread héritent du contexte de la requête; les connexions
+    qu'ils empruntent sans les rendre sont rendues ici, hors de la boucle.
+
+    Usage:
+        router = APIRouter(dependencies=[Depends(connection_scope)])
+    """
+    connections: Set[PooledConnection] = set()
+    token = _request_connections.set(connections)
+    try:
+        yield
+    finally:
+        _request_connections.reset(token)
+        if connections:
+            logger.warning(f"{len(connections)} connexion(s) rendue(s) au pool en fin de requête")
+            await asyncio.to_thread(lambda: [conn.close() for conn in list(connections)])
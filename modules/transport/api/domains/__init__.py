@@ -7,6 +7,8 @@ from .base import BaseModel, BaseRepository, BaseService
 from .base.schemas import (
     PaginatedResponse,
     PaginationParams,
+    CursorPage,
+    CursorParams,
     BaseSchema,
     CreateSchema,
     UpdateSchema,
@@ -18,6 +20,8 @@ __all__ = [
     "BaseService",
     "PaginatedResponse",
     "PaginationParams",
+    "CursorPage",
+    "CursorParams",
     "BaseSchema",
     "CreateSchema",
     "UpdateSchema",
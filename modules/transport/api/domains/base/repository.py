@@ -3,29 +3,52 @@ Repository Pattern Générique
 Abstraction de la couche d'accès aux données avec support multi-tenant
 """
 
+import base64
+import json
 import logging
-from typing import TypeVar, Generic, Type, List, Optional, Dict, Any
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import TypeVar, Generic, Type, List, Optional, Dict, Any, Sequence, Tuple
 from uuid import UUID
 
-from sqlalchemy import select, update, delete, func, and_, or_
+from sqlalchemy import (
+    select, update, delete, func, and_, or_, any_, text, tuple_, bindparam, case, literal,
+    literal_column,
+    Column, Float, MetaData, Select, Table,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from api.core.exceptions import NotFoundError, DatabaseError
+from api.core.database import use_primary
+from api.core.exceptions import ConflictError, NotFoundError, DatabaseError, ValidationError
+from api.search import MIN_TRIGRAM_LENGTH, escape_like, normalize_term
 from .models import TenantBaseModel
-from .schemas import PaginationParams, PaginatedResponse
+from .schemas import PaginationParams, PaginatedResponse, CursorParams, CursorPage
 
 logger = logging.getLogger(__name__)
 
 # Type variables pour le générique
 ModelType = TypeVar("ModelType", bound=TenantBaseModel)
 
+# Nombre de lignes à partir duquel create_many passe par COPY
+COPY_THRESHOLD = 1000
+
+# Vrai pour une ligne insérée par un INSERT ... ON CONFLICT DO UPDATE, faux
+# pour une ligne existante mise à jour (xmax est alors l'id de la transaction)
+INSERTED = literal_column("(xmax = 0)").label("inserted")
+
 
 class BaseRepository(Generic[ModelType]):
     """
     Repository générique avec opérations CRUD de base
     Support multi-tenant intégré
 
+    Les méthodes de lecture sont servies par le réplica quand il est
+    configuré (voir api.core.database.RoutingSession); les écritures et les
+    lectures qui les suivent dans la session, par le primaire.
+
     Usage:
         class VehicleRepository(BaseRepository[Vehicle]):
             pass
@@ -34,11 +57,25 @@ class BaseRepository(Generic[ModelType]):
         vehicles = await repo.find_by_organization(org_id)
     """
 
+    # Champs de la recherche textuelle par défaut (indexés par la migration
+    # add_trigram_search_indexes)
+    searchable_fields: Tuple[str, ...] = ()
+
     def __init__(self, model: Type[ModelType], session: AsyncSession):
         self.model = model
         self.session = session
         self._model_name = model.__name__
 
+    def use_primary(self) -> None:
+        """
+        Lectures suivantes de la session sur le primaire
+
+        Les lectures (SELECT) vont au réplica s'il est configuré, jusqu'à la
+        première écriture de la session; à appeler avant une lecture qui
+        prépare une écriture, pour ne pas valider sur des données en retard.
+        """
+        use_primary(self.session)
+
     # ===================
     # Create
     # ===================
@@ -67,15 +104,62 @@ class BaseRepository(Generic[ModelType]):
                 operation="create"
             )
 
-    async def create_many(self, items: List[Dict[str, Any]]) -> List[ModelType]:
-        """Crée plusieurs entités en une seule transaction"""
+    async def create_many(
+        self,
+        items: List[Dict[str, Any]],
+        on_conflict: Optional[Sequence[str]] = None,
+        update_columns: Optional[Sequence[str]] = None
+    ) -> List[ModelType]:
+        """
+        Crée plusieurs entités en une seule transaction (voir create_or_update_many)
+
+        Returns:
+            Entités créées ou mises à jour, dans l'ordre des données
+        """
+        entities, _ = await self.create_or_update_many(items, on_conflict, update_columns)
+        return entities
+
+    async def create_or_update_many(
+        self,
+        items: List[Dict[str, Any]],
+        on_conflict: Optional[Sequence[str]] = None,
+        update_columns: Optional[Sequence[str]] = None
+    ) -> Tuple[List[ModelType], int]:
+        """
+        Crée plusieurs entités en une seule transaction
+
+        Un seul INSERT multi-lignes ... RETURNING renvoie les entités avec leurs
+        valeurs par défaut serveur (pas de SELECT par ligne); à partir de
+        COPY_THRESHOLD lignes, les données passent par COPY.
+
+        Avec on_conflict (colonnes d'une contrainte d'unicité, par exemple
+        ["registration"]), une ligne déjà présente dans l'organisation est
+        mise à jour au lieu de provoquer une erreur: réimporter les mêmes
+        données est sans effet.
+
+        Args:
+            items: Données des entités (organization_id inclus)
+            on_conflict: Colonnes de la contrainte d'unicité pour l'upsert
+            update_columns: Colonnes mises à jour en cas de conflit
+                (défaut: toutes les colonnes fournies hors clés)
+
+        Returns:
+            Entités créées ou mises à jour, dans l'ordre des données, et
+            nombre de lignes existantes mises à jour par l'upsert
+
+        Raises:
+            ConflictError: Clé déjà utilisée par une autre organisation
+        """
+        if not items:
+            return [], 0
+
         try:
-            entities = [self.model(**data) for data in items]
-            self.session.add_all(entities)
-            await self.session.flush()
-            for entity in entities:
-                await self.session.refresh(entity)
-            return entities
+            if len(items) >= COPY_THRESHOLD:
+                entities, updated = await self._copy_many(items, on_conflict, update_columns)
+            else:
+                entities, updated = await self._insert_many(items, on_conflict, update_columns)
+        except ConflictError:
+            raise
         except Exception as e:
             logger.error(f"Error creating multiple {self._model_name}: {e}")
             raise DatabaseError(
@@ -83,6 +167,197 @@ class BaseRepository(Generic[ModelType]):
                 operation="create_many"
             )
 
+        if len(entities) != len(items):
+            # Conflit avec une ligne d'une autre organisation: non mise à jour
+            raise ConflictError(
+                f"{len(items) - len(entities)} {self._model_name} en conflit avec une autre organisation",
+                resource=self._model_name.lower(),
+                details={"keys": list(on_conflict or [])}
+            )
+        logger.debug(
+            f"Created {len(entities) - updated} and updated {updated} {self._model_name} "
+            f"({'upsert' if on_conflict else 'insert'})"
+        )
+        return entities, updated
+
+    def _upsert(
+        self,
+        stmt,
+        columns: Sequence[str],
+        on_conflict: Sequence[str],
+        update_columns: Optional[Sequence[str]]
+    ):
+        """Ajoute ON CONFLICT ... DO UPDATE, limité aux lignes de la même organisation"""
+        protected = {"id", "organization_id", "created_at", *on_conflict}
+        updated = [c for c in (update_columns or columns) if c not in protected]
+        table = self.model.__table__
+        values = {c: stmt.excluded[c] for c in updated}
+        if "updated_at" in table.c:
+            values["updated_at"] = func.now()
+        if not values:
+            # DO UPDATE sans colonne est invalide: réécrire la clé pour obtenir RETURNING
+            values = {on_conflict[0]: stmt.excluded[on_conflict[0]]}
+        return stmt.on_conflict_do_update(
+            index_elements=list(on_conflict),
+            set_=values,
+            where=table.c.organization_id == stmt.excluded.organization_id
+        )
+
+    async def _insert_many(
+        self,
+        items: List[Dict[str, Any]],
+        on_conflict: Optional[Sequence[str]],
+        update_columns: Optional[Sequence[str]]
+    ) -> Tuple[List[ModelType], int]:
+        """INSERT multi-lignes ... RETURNING (un aller-retour par lot de paramètres)"""
+        rows = self._with_defaults(items)
+        columns = list(rows[0])
+        stmt = pg_insert(self.model)
+        if not on_conflict:
+            # Exécution "insertmanyvalues": SQLAlchemy regroupe les lignes en
+            # INSERT ... VALUES (...), (...) ... RETURNING
+            result = await self.session.execute(
+                stmt.returning(self.model, sort_by_parameter_order=True),
+                rows,
+                execution_options={"populate_existing": True}
+            )
+            return self._in_order(rows, result.scalars().all(), on_conflict), 0
+
+        stmt = self._upsert(stmt, columns, on_conflict, update_columns)
+        result = await self.session.execute(
+            stmt.returning(self.model, INSERTED, sort_by_parameter_order=True),
+            rows,
+            execution_options={"populate_existing": True}
+        )
+        returned = result.all()
+        updated = sum(1 for _, inserted in returned if not inserted)
+        return self._in_order(rows, [entity for entity, _ in returned], on_conflict), updated
+
+    async def _copy_many(
+        self,
+        items: List[Dict[str, Any]],
+        on_conflict: Optional[Sequence[str]],
+        update_columns: Optional[Sequence[str]]
+    ) -> Tuple[List[ModelType], int]:
+        """
+        COPY puis lecture des entités
+
+        Sans upsert, COPY directement dans la table; avec upsert, COPY dans
+        une table temporaire puis INSERT ... SELECT ... ON CONFLICT.
+        """
+        rows = self._with_defaults(items)
+        columns = list(rows[0])
+        table = self.model.__table__
+        connection = await self.session.connection()
+        dialect = connection.dialect
+        processors = [
+            table.c[c].type.dialect_impl(dialect).bind_processor(dialect)
+            for c in columns
+        ]
+        records = [
+            tuple(
+                processor(row[c]) if processor else row[c]
+                for c, processor in zip(columns, processors)
+            )
+            for row in rows
+        ]
+
+        raw = await connection.get_raw_connection()
+        driver = raw.driver_connection
+
+        if on_conflict:
+            staging = f"_copy_{table.name}"
+            await connection.execute(text(
+                f'CREATE TEMP TABLE IF NOT EXISTS "{staging}" '
+                f'(LIKE "{table.name}" INCLUDING DEFAULTS) ON COMMIT DELETE ROWS'
+            ))
+            await connection.execute(text(f'TRUNCATE "{staging}"'))
+            await driver.copy_records_to_table(staging, records=records, columns=columns)
+
+            source = Table(staging, MetaData(), *[Column(c) for c in columns])
+            stmt = pg_insert(table).from_select(
+                columns, select(*[source.c[c] for c in columns])
+            )
+            stmt = self._upsert(stmt, columns, on_conflict, update_columns)
+            result = await connection.execute(stmt.returning(table.c.id, INSERTED))
+            returned = result.all()
+            ids = [row.id for row in returned]
+            updated = sum(1 for row in returned if not row.inserted)
+        else:
+            await driver.copy_records_to_table(
+                table.name, schema_name=table.schema, records=records, columns=columns
+            )
+            ids = [row["id"] for row in rows]
+            updated = 0
+
+        result = await self.session.execute(
+            select(self.model)
+            .where(self.model.id == any_(bindparam("ids", ids, type_=ARRAY(PG_UUID(as_uuid=True)))))
+            .execution_options(populate_existing=True)
+        )
+        return self._in_order(rows, result.scalars().all(), on_conflict), updated
+
+    def _with_defaults(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Complète les lignes avec les valeurs par défaut côté Python (id,
+        booléens...) et les aligne sur les mêmes colonnes; les colonnes à
+        valeur par défaut serveur non fournies sont laissées à la base
+        """
+        table = self.model.__table__
+        given = {key for item in items for key in item if key in table.c}
+        defaults = {
+            column.key: column.default
+            for column in table.columns
+            if column.default is not None and column.key not in given
+            and not column.default.is_sequence and not column.default.is_clause_element
+        }
+        columns = [c.key for c in table.columns if c.key in given or c.key in defaults]
+
+        rows = []
+        for item in items:
+            row = {}
+            for name in columns:
+                if name in item:
+                    row[name] = item[name]
+                    continue
+                default = table.c[name].default
+                if default is None:
+                    row[name] = None
+                elif default.is_callable:
+                    row[name] = default.arg(None)
+                else:
+                    row[name] = default.arg
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    def _in_order(
+        rows: List[Dict[str, Any]],
+        entities: Sequence[ModelType],
+        on_conflict: Optional[Sequence[str]]
+    ) -> List[ModelType]:
+        """
+        Remet les entités dans l'ordre des données
+
+        En cas d'upsert, une ligne existante garde son id: la correspondance
+        se fait alors sur les colonnes de la contrainte (NULL ne provoquant
+        jamais de conflit, une ligne à clé NULL est retrouvée par son id).
+        """
+        keys = list(on_conflict or [])
+        by_id = {e.id: e for e in entities}
+        by_key = {tuple(getattr(e, k) for k in keys): e for e in entities} if keys else {}
+
+        ordered = []
+        for row in rows:
+            key = tuple(row.get(k) for k in keys)
+            if keys and None not in key:
+                entity = by_key.get(key)
+            else:
+                entity = by_id.get(row["id"])
+            if entity is not None:
+                ordered.append(entity)
+        return ordered
+
     # ===================
     # Read
     # ===================
@@ -153,6 +428,63 @@ class BaseRepository(Generic[ModelType]):
         result = await self.session.execute(query)
         return list(result.scalars().all())
 
+    def _base_query(
+        self,
+        organization_id: UUID,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Select:
+        """Requête des entités d'une organisation, filtres (champ=valeur) appliqués"""
+        query = select(self.model).where(
+            self.model.organization_id == organization_id
+        )
+
+        if filters:
+            for field, value in filters.items():
+                if hasattr(self.model, field) and value is not None:
+                    query = query.where(getattr(self.model, field) == value)
+        return query
+
+    async def _count_for(self, query: Select, mode: str) -> Tuple[Optional[int], bool]:
+        """
+        Total d'une requête selon le mode de comptage
+
+        - exact: COUNT(*) sur la requête
+        - estimated: nombre de lignes estimé par le planificateur (EXPLAIN),
+          sans parcourir la table
+        - none: pas de total
+
+        Returns:
+            Tuple (total ou None, total estimé)
+        """
+        if mode == "none":
+            return None, False
+
+        if mode == "estimated":
+            try:
+                sql = query.compile(
+                    dialect=self.session.bind.dialect,
+                    compile_kwargs={"literal_binds": True}
+                )
+                result = await self.session.execute(
+                    text(f"EXPLAIN (FORMAT JSON) {sql}").execution_options(replica=True)
+                )
+                plan = result.scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return int(plan[0]["Plan"]["Plan Rows"]), True
+            except Exception as e:
+                logger.warning(f"Row estimate failed for {self._model_name}, counting: {e}")
+
+        count_query = select(func.count()).select_from(query.order_by(None).subquery())
+        total_result = await self.session.execute(count_query)
+        return total_result.scalar() or 0, False
+
+    def _sort_column(self, sort_by: Optional[str]):
+        """Colonne de tri (défaut: created_at); seuls les attributs du modèle sont acceptés"""
+        if sort_by and hasattr(self.model, sort_by):
+            return getattr(self.model, sort_by)
+        return self.model.created_at
+
     async def find_paginated(
         self,
         organization_id: UUID,
@@ -162,29 +494,22 @@ class BaseRepository(Generic[ModelType]):
         """
         Récupère les entités avec pagination
 
+        Pagination par OFFSET: préférer find_by_cursor pour les pages
+        profondes ou les grandes organisations.
+
         Args:
             organization_id: UUID de l'organisation
-            pagination: Paramètres de pagination
+            pagination: Paramètres de pagination (dont le mode de comptage)
             filters: Filtres additionnels
 
         Returns:
             Réponse paginée
         """
         # Query de base
-        base_query = select(self.model).where(
-            self.model.organization_id == organization_id
-        )
-
-        # Appliquer les filtres
-        if filters:
-            for field, value in filters.items():
-                if hasattr(self.model, field) and value is not None:
-                    base_query = base_query.where(getattr(self.model, field) == value)
+        base_query = self._base_query(organization_id, filters)
 
         # Compter le total
-        count_query = select(func.count()).select_from(base_query.subquery())
-        total_result = await self.session.execute(count_query)
-        total = total_result.scalar() or 0
+        total, estimated = await self._count_for(base_query, pagination.count)
 
         # Appliquer le tri
         if pagination.sort_by and hasattr(self.model, pagination.sort_by):
@@ -205,7 +530,73 @@ class BaseRepository(Generic[ModelType]):
             items=items,
             total=total,
             page=pagination.page,
-            per_page=pagination.per_page
+            per_page=pagination.per_page,
+            total_is_estimate=estimated
+        )
+
+    async def find_by_cursor(
+        self,
+        organization_id: UUID,
+        params: CursorParams,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> CursorPage[ModelType]:
+        """
+        Récupère une page d'entités par curseur (pagination keyset)
+
+        Tri sur (colonne de tri, id): la page suivante reprend strictement
+        après le dernier élément renvoyé, quelle que soit sa profondeur (pas
+        d'OFFSET). Les valeurs NULL suivent l'ordre de PostgreSQL (en fin de
+        tri croissant, en tête de tri décroissant).
+
+        Args:
+            organization_id: UUID de l'organisation
+            params: Curseur, taille de page, tri et mode de comptage
+            filters: Filtres additionnels
+
+        Returns:
+            Page avec le curseur de la page suivante
+
+        Raises:
+            ValidationError: Curseur invalide ou émis pour un autre tri
+        """
+        sort_column = self._sort_column(params.sort_by)
+        sort_name = sort_column.key
+        descending = params.sort_order == "desc"
+
+        base_query = self._base_query(organization_id, filters)
+        total, estimated = await self._count_for(base_query, params.count)
+
+        query = base_query
+        if params.cursor:
+            value, last_id = _decode_cursor(params.cursor, sort_name, params.sort_order)
+            query = query.where(
+                _after(sort_column, self.model.id, value, last_id, descending)
+            )
+
+        if descending:
+            query = query.order_by(sort_column.desc(), self.model.id.desc())
+        else:
+            query = query.order_by(sort_column.asc(), self.model.id.asc())
+
+        result = await self.session.execute(query.limit(params.limit + 1))
+        items = list(result.scalars().all())
+
+        has_more = len(items) > params.limit
+        items = items[:params.limit]
+        next_cursor = None
+        if has_more:
+            last = items[-1]
+            next_cursor = _encode_cursor(
+                sort_name, params.sort_order, getattr(last, sort_name), last.id
+            )
+
+        return CursorPage(
+            items=items,
+            limit=params.limit,
+            next_cursor=next_cursor,
+            has_more=has_more,
+            total=total,
+            total_is_estimate=estimated
         )
 
     async def find_by_ids(
@@ -378,38 +769,222 @@ class BaseRepository(Generic[ModelType]):
     # Search
     # ===================
 
+    def _search_query(
+        self,
+        organization_id: UUID,
+        search_term: str,
+        search_fields: Optional[Sequence[str]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Select, Any, str]:
+        """
+        Requête de recherche classée sur les formes normalisées des champs
+
+        Chaque champ est comparé via search_normalize() (minuscules, sans
+        accents), l'expression des index de recherche: les préfixes passent
+        par les index text_pattern_ops, les sous-chaînes et fautes de frappe
+        par les index trigrammes (gin_trgm_ops). Un terme de moins de
+        MIN_TRIGRAM_LENGTH caractères n'est cherché qu'en préfixe.
+
+        Returns:
+            Tuple (requête sélectionnant l'entité et son score, score, terme normalisé)
+        """
+        term = normalize_term(search_term)
+        fields = search_fields or self.searchable_fields
+        columns = [
+            func.search_normalize(getattr(self.model, name))
+            for name in fields if hasattr(self.model, name)
+        ]
+        if not term or not columns:
+            rank = literal(0.0, Float)
+            return self._base_query(organization_id, filters).add_columns(rank), rank, term
+
+        prefix = escape_like(term) + "%"
+        conditions, scores = [], []
+        for column in columns:
+            conditions.append(column.like(prefix, escape="\\"))
+            if len(term) >= MIN_TRIGRAM_LENGTH:
+                conditions.append(column.like("%" + prefix, escape="\\"))
+                conditions.append(literal(term).op("<%")(column))
+            # Un préfixe passe devant toute correspondance approchée
+            scores.append(
+                case((column.like(prefix, escape="\\"), 1.0), else_=0.0)
+                + func.word_similarity(term, column)
+            )
+
+        rank = func.greatest(*scores, type_=Float)
+        query = self._base_query(organization_id, filters).where(or_(*conditions))
+        return query.add_columns(rank), rank, term
+
     async def search(
         self,
         organization_id: UUID,
         search_term: str,
-        search_fields: List[str],
+        search_fields: Optional[List[str]] = None,
         pagination: Optional[PaginationParams] = None
     ) -> List[ModelType]:
         """
-        Recherche textuelle sur plusieurs champs
+        Recherche textuelle sur plusieurs champs, classée par pertinence
 
         Args:
             organization_id: UUID de l'organisation
-            search_term: Terme de recherche
-            search_fields: Champs à rechercher
+            search_term: Terme de recherche (casse et accents ignorés)
+            search_fields: Champs à rechercher (défaut: searchable_fields)
             pagination: Paramètres de pagination optionnels
         """
-        conditions = [self.model.organization_id == organization_id]
+        query, rank, _ = self._search_query(organization_id, search_term, search_fields)
+        query = query.order_by(rank.desc(), self.model.id.desc())
+
+        if pagination:
+            query = query.offset(pagination.offset).limit(pagination.per_page)
 
-        # Construire la condition de recherche
-        search_conditions = []
-        for field_name in search_fields:
-            if hasattr(self.model, field_name):
-                field = getattr(self.model, field_name)
-                search_conditions.append(field.ilike(f"%{search_term}%"))
+        result = await self.session.execute(query)
+        return [row[0] for row in result.all()]
+
+    async def search_by_cursor(
+        self,
+        organization_id: UUID,
+        search_term: str,
+        params: CursorParams,
+        search_fields: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> CursorPage[ModelType]:
+        """
+        Recherche textuelle classée, paginée par curseur
 
-        if search_conditions:
-            conditions.append(or_(*search_conditions))
+        Les résultats sont triés par score décroissant puis id (sort_by et
+        sort_order sont ignorés); le curseur porte le score et l'id du
+        dernier résultat, et n'est valable que pour le même terme.
 
-        query = select(self.model).where(and_(*conditions))
+        Args:
+            organization_id: UUID de l'organisation
+            search_term: Terme de recherche (casse et accents ignorés)
+            params: Curseur, taille de page et mode de comptage
+            search_fields: Champs à rechercher (défaut: searchable_fields)
+            filters: Filtres additionnels
 
-        if pagination:
-            query = query.offset(pagination.offset).limit(pagination.per_page)
+        Returns:
+            Page de résultats avec le curseur de la page suivante
 
+        Raises:
+            ValidationError: Curseur invalide ou émis pour un autre terme
+        """
+        query, rank, term = self._search_query(
+            organization_id, search_term, search_fields, filters
+        )
+        cursor_key = f"search:{term}"
+        total, estimated = await self._count_for(query, params.count)
+
+        if params.cursor:
+            value, last_id = _decode_cursor(params.cursor, cursor_key, "desc")
+            query = query.where(_after(rank, self.model.id, value, last_id, True))
+
+        query = query.order_by(rank.desc(), self.model.id.desc()).limit(params.limit + 1)
         result = await self.session.execute(query)
-        return list(result.scalars().all())
+        rows = result.all()
+
+        has_more = len(rows) > params.limit
+        rows = rows[:params.limit]
+        next_cursor = None
+        if has_more:
+            last, last_rank = rows[-1]
+            next_cursor = _encode_cursor(cursor_key, "desc", last_rank, last.id)
+
+        return CursorPage(
+            items=[row[0] for row in rows],
+            limit=params.limit,
+            next_cursor=next_cursor,
+            has_more=has_more,
+            total=total,
+            total_is_estimate=estimated
+        )
+
+
+# ===================
+# Curseurs (pagination keyset)
+# ===================
+
+def _encode_value(value: Any) -> List[Any]:
+    """Valeur de tri -> [type, valeur JSON]"""
+    if value is None:
+        return ["null", None]
+    if isinstance(value, Enum):
+        value = value.value
+    if isinstance(value, datetime):
+        return ["datetime", value.isoformat()]
+    if isinstance(value, date):
+        return ["date", value.isoformat()]
+    if isinstance(value, UUID):
+        return ["uuid", str(value)]
+    if isinstance(value, Decimal):
+        return ["decimal", str(value)]
+    return ["json", value]
+
+
+def _decode_value(encoded: List[Any]) -> Any:
+    kind, value = encoded
+    if kind == "null":
+        return None
+    if kind == "datetime":
+        return datetime.fromisoformat(value)
+    if kind == "date":
+        return date.fromisoformat(value)
+    if kind == "uuid":
+        return UUID(value)
+    if kind == "decimal":
+        return Decimal(value)
+    return value
+
+
+def _encode_cursor(sort_by: str, sort_order: str, value: Any, last_id: UUID) -> str:
+    """Curseur opaque: tri, valeur de tri et id du dernier élément renvoyé"""
+    payload = json.dumps(
+        {"s": sort_by, "o": sort_order, "v": _encode_value(value), "id": str(last_id)},
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort_by: str, sort_order: str) -> Tuple[Any, UUID]:
+    """
+    Décode un curseur émis par _encode_cursor
+
+    Raises:
+        ValidationError: Curseur illisible ou émis pour un autre tri
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, last_id = _decode_value(payload["v"]), UUID(payload["id"])
+    except Exception:
+        raise ValidationError("Curseur de pagination invalide", field="cursor")
+
+    if payload.get("s") != sort_by or payload.get("o") != sort_order:
+        raise ValidationError(
+            "Le curseur a été émis pour un autre tri",
+            field="cursor",
+            details={"sort_by": payload.get("s"), "sort_order": payload.get("o")}
+        )
+    return value, last_id
+
+
+def _after(sort_column, id_column, value: Any, last_id: UUID, descending: bool):
+    """
+    Condition "strictement après (value, last_id)" dans l'ordre
+    (sort_column, id) ascendant ou descendant, NULL compris
+    """
+    if descending:
+        # NULLS FIRST: les NULL précèdent toutes les valeurs
+        if value is None:
+            return or_(
+                and_(sort_column.is_(None), id_column < last_id),
+                sort_column.is_not(None)
+            )
+        return tuple_(sort_column, id_column) < tuple_(value, last_id)
+
+    # NULLS LAST: les NULL suivent toutes les valeurs
+    if value is None:
+        return and_(sort_column.is_(None), id_column > last_id)
+    return or_(
+        tuple_(sort_column, id_column) > tuple_(value, last_id),
+        sort_column.is_(None)
+    )
@@ -55,6 +55,10 @@ class PaginationParams(BaseModel):
     per_page: int = Field(default=20, ge=1, le=100, description="Éléments par page")
     sort_by: Optional[str] = Field(default=None, description="Champ de tri")
     sort_order: str = Field(default="asc", pattern="^(asc|desc)$", description="Ordre de tri")
+    count: str = Field(
+        default="exact", pattern="^(exact|estimated|none)$",
+        description="Calcul du total: exact, estimé (statistiques du planificateur) ou aucun"
+    )
 
     @property
     def offset(self) -> int:
@@ -66,30 +70,59 @@ class PaginatedResponse(BaseSchema, Generic[T]):
     """Réponse paginée générique"""
 
     items: List[T]
-    total: int = Field(description="Nombre total d'éléments")
+    total: Optional[int] = Field(description="Nombre total d'éléments (None si non calculé)")
     page: int = Field(description="Page actuelle")
     per_page: int = Field(description="Éléments par page")
-    pages: int = Field(description="Nombre total de pages")
+    pages: Optional[int] = Field(description="Nombre total de pages")
+    total_is_estimate: bool = Field(default=False, description="Total estimé")
 
     @classmethod
     def create(
         cls,
         items: List[T],
-        total: int,
+        total: Optional[int],
         page: int,
-        per_page: int
+        per_page: int,
+        total_is_estimate: bool = False
     ) -> "PaginatedResponse[T]":
         """Factory method pour créer une réponse paginée"""
-        pages = (total + per_page - 1) // per_page if per_page > 0 else 0
+        pages = None
+        if total is not None:
+            pages = (total + per_page - 1) // per_page if per_page > 0 else 0
         return cls(
             items=items,
             total=total,
             page=page,
             per_page=per_page,
-            pages=pages
+            pages=pages,
+            total_is_estimate=total_is_estimate
         )
 
 
+class CursorParams(BaseModel):
+    """Paramètres de pagination par curseur (keyset)"""
+
+    cursor: Optional[str] = Field(default=None, description="Curseur opaque de la page suivante")
+    limit: int = Field(default=20, ge=1, le=100, description="Éléments par page")
+    sort_by: Optional[str] = Field(default=None, description="Champ de tri (défaut: created_at)")
+    sort_order: str = Field(default="desc", pattern="^(asc|desc)$", description="Ordre de tri")
+    count: str = Field(
+        default="none", pattern="^(exact|estimated|none)$",
+        description="Calcul du total: exact, estimé (statistiques du planificateur) ou aucun"
+    )
+
+
+class CursorPage(BaseSchema, Generic[T]):
+    """Page obtenue par curseur"""
+
+    items: List[T]
+    limit: int = Field(description="Éléments par page")
+    next_cursor: Optional[str] = Field(default=None, description="Curseur de la page suivante")
+    has_more: bool = Field(description="D'autres éléments suivent")
+    total: Optional[int] = Field(default=None, description="Nombre total d'éléments (None si non calculé)")
+    total_is_estimate: bool = Field(default=False, description="Total estimé")
+
+
 class BulkOperationResult(BaseSchema):
     """Résultat d'une opération en masse"""
 
@@ -4,12 +4,12 @@ Couche de logique métier entre les routes et le repository
 """
 
 import logging
-from typing import TypeVar, Generic, Type, List, Optional, Dict, Any
+from typing import TypeVar, Generic, Type, List, Optional, Dict, Any, Sequence, Tuple
 from uuid import UUID
 
 from .repository import BaseRepository
 from .models import TenantBaseModel
-from .schemas import PaginationParams, PaginatedResponse
+from .schemas import PaginationParams, PaginatedResponse, CursorParams, CursorPage
 
 logger = logging.getLogger(__name__)
 
@@ -56,7 +56,9 @@ class BaseService(Generic[ModelType, RepositoryType]):
         # Ajouter l'organization_id aux données
         create_data = {**data, "organization_id": organization_id}
 
-        # Validation métier avant création (hook pour les sous-classes)
+        # Validation métier avant création (hook pour les sous-classes),
+        # sur le primaire: le réplica peut ignorer une écriture récente
+        self.repository.use_primary()
         await self._validate_create(create_data)
 
         # Créer l'entité
@@ -103,6 +105,17 @@ class BaseService(Generic[ModelType, RepositoryType]):
             organization_id, pagination, filters
         )
 
+    async def get_page(
+        self,
+        organization_id: UUID,
+        params: CursorParams,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> CursorPage[ModelType]:
+        """Récupère une page d'entités par curseur (pagination keyset)"""
+        return await self.repository.find_by_cursor(
+            organization_id, params, filters
+        )
+
     async def update(
         self,
         id: UUID,
@@ -120,7 +133,8 @@ class BaseService(Generic[ModelType, RepositoryType]):
         Returns:
             Entité mise à jour
         """
-        # Récupérer l'entité existante
+        # Récupérer l'entité existante (sur le primaire, avant écriture)
+        self.repository.use_primary()
         existing = await self.repository.get_by_id_or_fail(id, organization_id)
 
         # Validation métier avant mise à jour
@@ -147,7 +161,8 @@ class BaseService(Generic[ModelType, RepositoryType]):
             id: UUID de l'entité
             organization_id: UUID de l'organisation
         """
-        # Récupérer l'entité pour validation
+        # Récupérer l'entité pour validation (sur le primaire, avant écriture)
+        self.repository.use_primary()
         entity = await self.repository.get_by_id_or_fail(id, organization_id)
 
         # Validation métier avant suppression
@@ -181,14 +196,26 @@ class BaseService(Generic[ModelType, RepositoryType]):
         self,
         organization_id: UUID,
         search_term: str,
-        search_fields: List[str],
+        search_fields: Optional[List[str]] = None,
         pagination: Optional[PaginationParams] = None
     ) -> List[ModelType]:
-        """Recherche textuelle"""
+        """Recherche textuelle classée par pertinence"""
         return await self.repository.search(
             organization_id, search_term, search_fields, pagination
         )
 
+    async def search_page(
+        self,
+        organization_id: UUID,
+        search_term: str,
+        params: CursorParams,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> CursorPage[ModelType]:
+        """Recherche textuelle classée, paginée par curseur"""
+        return await self.repository.search_by_cursor(
+            organization_id, search_term, params, filters=filters
+        )
+
     # ===================
     # Hooks pour personnalisation
     # ===================
@@ -200,6 +227,19 @@ class BaseService(Generic[ModelType, RepositoryType]):
         """
         pass
 
+    async def _validate_create_many(
+        self,
+        items: List[Dict[str, Any]],
+        on_conflict: Optional[Sequence[str]] = None
+    ) -> None:
+        """
+        Hook pour validation avant création multiple
+        Par défaut, _validate_create sur chaque élément; à surcharger pour
+        valider le lot en une requête ou tolérer les conflits d'un upsert
+        """
+        for data in items:
+            await self._validate_create(data)
+
     async def _validate_update(
         self,
         existing: ModelType,
@@ -244,23 +284,56 @@ class BaseService(Generic[ModelType, RepositoryType]):
     async def create_many(
         self,
         organization_id: UUID,
-        items: List[Dict[str, Any]]
+        items: List[Dict[str, Any]],
+        on_conflict: Optional[Sequence[str]] = None,
+        update_columns: Optional[Sequence[str]] = None
     ) -> List[ModelType]:
-        """Crée plusieurs entités"""
+        """
+        Crée plusieurs entités
+
+        Args:
+            organization_id: UUID de l'organisation
+            items: Données des entités
+            on_conflict: Colonnes d'unicité pour un upsert (réimport idempotent)
+            update_columns: Colonnes mises à jour en cas de conflit
+
+        Returns:
+            Entités créées ou mises à jour
+        """
+        entities, _ = await self.create_or_update_many(
+            organization_id, items, on_conflict=on_conflict, update_columns=update_columns
+        )
+        return entities
+
+    async def create_or_update_many(
+        self,
+        organization_id: UUID,
+        items: List[Dict[str, Any]],
+        on_conflict: Optional[Sequence[str]] = None,
+        update_columns: Optional[Sequence[str]] = None
+    ) -> Tuple[List[ModelType], int]:
+        """
+        Comme create_many, en distinguant créations et mises à jour
+
+        Returns:
+            Entités créées ou mises à jour, et nombre de mises à jour
+        """
         create_data = [
             {**item, "organization_id": organization_id}
             for item in items
         ]
 
-        for data in create_data:
-            await self._validate_create(data)
+        self.repository.use_primary()
+        await self._validate_create_many(create_data, on_conflict)
 
-        entities = await self.repository.create_many(create_data)
+        entities, updated = await self.repository.create_or_update_many(
+            create_data, on_conflict=on_conflict, update_columns=update_columns
+        )
 
         for entity in entities:
             await self._after_create(entity)
 
-        return entities
+        return entities, updated
 
     async def delete_many(
         self,
@@ -5,7 +5,7 @@ Modèles SQLAlchemy pour les sites/locations
 from enum import Enum
 from typing import Optional
 
-from sqlalchemy import Column, String, Float, Boolean, Text
+from sqlalchemy import Column, String, Float, Boolean, Text, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 
 from api.domains.base.models import TenantBaseModel
@@ -35,11 +35,15 @@ class Site(TenantBaseModel):
     """
 
     __tablename__ = "sites"
+    __table_args__ = (
+        # Code unique par organisation (cible des upserts d'import)
+        UniqueConstraint("organization_id", "code", name="sites_code_org_unique"),
+    )
 
     # Identification
     name = Column(String(255), nullable=False, index=True)
     site_type = Column(String(50), default=SiteType.OTHER.value, index=True)
-    code = Column(String(50), nullable=True, unique=True)
+    code = Column(String(50), nullable=True)
 
     # Adresse
     address = Column(Text, nullable=True)
@@ -15,6 +15,8 @@ from .models import Site, SiteType
 class SiteRepository(BaseRepository[Site]):
     """Repository spécialisé pour les sites"""
 
+    searchable_fields = ("name", "code", "address", "city")
+
     def __init__(self, session: AsyncSession):
         super().__init__(Site, session)
 
@@ -54,6 +56,20 @@ class SiteRepository(BaseRepository[Site]):
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
+    async def find_by_codes(
+        self,
+        codes: List[str],
+        organization_id: Optional[UUID] = None
+    ) -> List[Site]:
+        """Trouve les sites de plusieurs codes en une requête"""
+        if not codes:
+            return []
+        query = select(Site).where(Site.code.in_(codes))
+        if organization_id:
+            query = query.where(Site.organization_id == organization_id)
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
     async def find_in_area(
         self,
         organization_id: UUID,
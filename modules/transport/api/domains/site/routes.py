@@ -0,0 +1,152 @@
+"""
+Routes API pour les sites
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import pandas as pd
+from fastapi import APIRouter, Depends, File, Query, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.core.database import get_db, get_database
+from api.core.security import get_current_user, get_current_organization, CurrentUser
+from api.domains.base.schemas import CursorPage, CursorParams
+from api.services.geocoding.queue import get_geocoding_queue
+from api.services.importing import ImportReport, SITES, group_by_address, import_into_service, to_records
+
+from .repository import SiteRepository
+from .schemas import SiteListResponse
+from .service import SiteService
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/sites", tags=["Sites"])
+
+
+# ===================
+# Dependencies
+# ===================
+
+async def get_site_service(
+    db: AsyncSession = Depends(get_db)
+) -> SiteService:
+    """Injection de dépendance pour le service Site"""
+    repository = SiteRepository(db)
+    return SiteService(repository)
+
+
+# ===================
+# Import
+# ===================
+
+async def _create_geocoded_sites(
+    organization_id: UUID,
+    records: List[Dict[str, Any]],
+    coordinates: tuple
+) -> None:
+    """Crée les sites d'une adresse une fois celle-ci géocodée"""
+    async with get_database().session() as session:
+        service = SiteService(SiteRepository(session))
+        await service.create_many(
+            organization_id,
+            [{**record, "latitude": coordinates[0], "longitude": coordinates[1]} for record in records],
+            on_conflict=["organization_id", "code"]
+        )
+
+
+def _defer_geocoding(organization_id: UUID, loop: asyncio.AbstractEventLoop):
+    """
+    Retire d'un bloc les sites sans coordonnées (latitude obligatoire) et
+    met leur adresse en file de géocodage, une demande par adresse; les
+    sites sont créés à la réception des coordonnées
+    """
+    def defer(valid: pd.DataFrame, report: ImportReport) -> pd.DataFrame:
+        missing = valid["latitude"].isna() | valid["longitude"].isna()
+        if not missing.any():
+            return valid
+
+        no_address = missing & valid["address"].isna()
+        if no_address.any():
+            report.reject(list(valid.index[no_address]), "Coordonnées ou adresse obligatoires")
+
+        for key, lines in group_by_address(valid[missing & ~no_address], SITES).items():
+            rows = valid.loc[lines]
+            records = to_records(rows)
+            first = rows.iloc[0]
+            city = first["city"] or ""
+            queries = [f"{first['address']}, {city}, {first['country'] or 'France'}", f"{city}, France"]
+
+            def on_result(coordinates, records=records, key=key) -> None:
+                if coordinates is None:
+                    logger.warning(f"Geocoding failed for imported sites at '{key}' ({len(records)} site(s))")
+                    return
+                future = asyncio.run_coroutine_threadsafe(
+                    _create_geocoded_sites(organization_id, records, coordinates), loop
+                )
+                future.add_done_callback(
+                    lambda f: f.exception() and logger.error(f"Geocoded site import failed: {f.exception()}")
+                )
+
+            if get_geocoding_queue().submit(f"sites:{organization_id}:{key}", queries, on_result):
+                report.geocoding_queued += 1
+
+        return valid[~missing]
+
+    return defer
+
+
+@router.post("/import")
+async def import_sites(
+    file: UploadFile = File(..., description="Fichier .csv ou .xlsx"),
+    org_id: UUID = Depends(get_current_organization),
+    user: CurrentUser = Depends(get_current_user),
+    service: SiteService = Depends(get_site_service)
+) -> Dict[str, Any]:
+    """
+    Importe des sites depuis un fichier CSV ou XLSX
+
+    - Colonnes: name (nom), code, site_type, address, city, postal_code,
+      country, latitude, longitude, is_depot, opening_time, closing_time,
+      service_time_minutes, contact_name, contact_phone, contact_email
+    - Un site dont le code existe déjà dans l'organisation est mis à jour
+      (réimport idempotent)
+    - Sans coordonnées, l'adresse est géocodée en arrière-plan (une demande
+      par adresse) et le site créé ensuite
+    - Retourne le rapport d'import avec les erreurs par ligne
+    """
+    report = await import_into_service(
+        service, org_id, file.file, file.filename, SITES,
+        on_conflict=["organization_id", "code"],
+        defer=_defer_geocoding(org_id, asyncio.get_running_loop())
+    )
+    return report.to_dict()
+
+
+# ===================
+# Recherche
+# ===================
+
+@router.get("/search", response_model=CursorPage[SiteListResponse])
+async def search_sites(
+    q: str = Query(..., max_length=100, description="Terme recherché (nom, code, adresse, ville)"),
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante"),
+    limit: int = Query(20, ge=1, le=100, description="Résultats par page"),
+    site_type: Optional[str] = Query(None, description="Filtrer par type"),
+    org_id: UUID = Depends(get_current_organization),
+    user: CurrentUser = Depends(get_current_user),
+    service: SiteService = Depends(get_site_service)
+):
+    """
+    Recherche des sites par nom, code, adresse ou ville
+
+    - Casse et accents ignorés, fautes de frappe tolérées à partir de 3 caractères
+    - Résultats classés par pertinence (les préfixes d'abord)
+    - Page suivante: repasser **next_cursor** avec le même terme
+    """
+    filters = {"site_type": site_type} if site_type else None
+    return await service.search_page(
+        org_id, q, CursorParams(cursor=cursor, limit=limit), filters
+    )
@@ -3,7 +3,7 @@ Service pour les sites
 """
 
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Sequence
 from uuid import UUID
 
 from api.core.exceptions import ValidationError, ConflictError
@@ -41,6 +41,37 @@ class SiteService(BaseService[Site, SiteRepository]):
         if not (-180 <= data.get("longitude", 0) <= 180):
             raise ValidationError("Longitude invalide", field="longitude")
 
+    async def _validate_create_many(
+        self,
+        items: List[Dict[str, Any]],
+        on_conflict: Optional[Sequence[str]] = None
+    ) -> None:
+        """Validation avant création multiple (unicité des codes vérifiée en une requête)"""
+        for data in items:
+            if not (-90 <= data.get("latitude", 0) <= 90):
+                raise ValidationError("Latitude invalide", field="latitude")
+            if not (-180 <= data.get("longitude", 0) <= 180):
+                raise ValidationError("Longitude invalide", field="longitude")
+
+        codes = [data["code"] for data in items if data.get("code")]
+        if len(codes) != len(set(codes)):
+            raise ValidationError("Code de site en double dans les données", field="code")
+
+        # Un upsert sur le code met à jour les sites existants
+        if on_conflict and "code" in on_conflict:
+            return
+
+        existing = await self.repository.find_by_codes(
+            codes,
+            items[0].get("organization_id") if items else None
+        )
+        if existing:
+            raise ConflictError(
+                f"Un site avec le code '{existing[0].code}' existe déjà",
+                resource="site",
+                details={"codes": [site.code for site in existing]}
+            )
+
     async def _validate_update(
         self,
         existing: Site,
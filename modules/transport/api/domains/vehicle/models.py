@@ -5,11 +5,12 @@ Modèles SQLAlchemy pour les véhicules
 from enum import Enum
 from typing import Optional, List
 
-from sqlalchemy import Column, String, Integer, Float, Boolean, Enum as SQLEnum
+from sqlalchemy import Column, String, Integer, Float, Boolean, ForeignKey, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 
 from api.domains.base.models import TenantBaseModel
+from api.domains.site.models import Site
 
 
 class VehicleStatus(str, Enum):
@@ -41,6 +42,7 @@ class Vehicle(TenantBaseModel):
         capacity: Capacité (personnes ou poids selon le domaine)
         status: État actuel du véhicule
         current_latitude/longitude: Position GPS actuelle
+        depot_site_id: Site d'attache (dépôt de départ/retour)
         metadata: Données additionnelles spécifiques au domaine (JSONB)
     """
 
@@ -68,6 +70,15 @@ class Vehicle(TenantBaseModel):
     current_longitude = Column(Float, nullable=True)
     last_position_update = Column(String(50), nullable=True)
 
+    # Dépôt d'attache (chargé explicitement: voir VehicleRepository.find_available)
+    depot_site_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("sites.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True
+    )
+    depot = relationship(Site, lazy="raise")
+
     # Caractéristiques
     brand = Column(String(100), nullable=True)
     model = Column(String(100), nullable=True)
@@ -7,6 +7,7 @@ from uuid import UUID
 
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 from api.domains.base.repository import BaseRepository
 from .models import Vehicle, VehicleStatus
@@ -18,13 +19,16 @@ class VehicleRepository(BaseRepository[Vehicle]):
     Hérite de BaseRepository et ajoute des méthodes spécifiques
     """
 
+    searchable_fields = ("name", "registration")
+
     def __init__(self, session: AsyncSession):
         super().__init__(Vehicle, session)
 
     async def find_available(
         self,
         organization_id: UUID,
-        vehicle_type: Optional[str] = None
+        vehicle_type: Optional[str] = None,
+        with_depot: bool = False
     ) -> List[Vehicle]:
         """
         Trouve tous les véhicules disponibles
@@ -32,6 +36,8 @@ class VehicleRepository(BaseRepository[Vehicle]):
         Args:
             organization_id: UUID de l'organisation
             vehicle_type: Filtre optionnel par type
+            with_depot: Charger le dépôt d'attache dans la même requête
+                (LEFT JOIN sur sites)
 
         Returns:
             Liste des véhicules disponibles
@@ -45,6 +51,9 @@ class VehicleRepository(BaseRepository[Vehicle]):
         if vehicle_type:
             query = query.where(Vehicle.vehicle_type == vehicle_type)
 
+        if with_depot:
+            query = query.options(joinedload(Vehicle.depot))
+
         result = await self.session.execute(query)
         return list(result.scalars().all())
 
@@ -71,6 +80,32 @@ class VehicleRepository(BaseRepository[Vehicle]):
         result = await self.session.execute(query)
         return result.scalar_one_or_none()
 
+    async def find_by_registrations(
+        self,
+        registrations: List[str],
+        organization_id: Optional[UUID] = None
+    ) -> List[Vehicle]:
+        """
+        Trouve les véhicules de plusieurs immatriculations en une requête
+
+        Args:
+            registrations: Immatriculations recherchées
+            organization_id: Filtre optionnel par organisation
+
+        Returns:
+            Véhicules trouvés
+        """
+        if not registrations:
+            return []
+
+        query = select(Vehicle).where(Vehicle.registration.in_(registrations))
+
+        if organization_id:
+            query = query.where(Vehicle.organization_id == organization_id)
+
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
     async def find_with_location(
         self,
         organization_id: UUID
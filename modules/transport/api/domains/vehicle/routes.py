@@ -2,15 +2,16 @@
 Routes API pour les véhicules
 """
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, File, Query, UploadFile, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.core.database import get_db
 from api.core.security import get_current_user, get_current_organization, CurrentUser
-from api.domains.base.schemas import PaginationParams, SuccessResponse
+from api.domains.base.schemas import CursorPage, CursorParams, SuccessResponse
+from api.services.importing import VEHICLES, import_into_service
 
 from .schemas import (
     VehicleCreate,
@@ -19,6 +20,7 @@ from .schemas import (
     VehicleListResponse,
     VehicleLocationUpdate,
     VehicleSummary,
+    FleetRoutingRequest,
 )
 from .repository import VehicleRepository
 from .service import VehicleService
@@ -43,23 +45,30 @@ async def get_vehicle_service(
 # Routes
 # ===================
 
-@router.get("", response_model=List[VehicleListResponse])
+@router.get("", response_model=CursorPage[VehicleListResponse])
 async def list_vehicles(
     status: Optional[str] = Query(None, description="Filtrer par statut"),
     vehicle_type: Optional[str] = Query(None, description="Filtrer par type"),
     is_active: Optional[bool] = Query(None, description="Filtrer par état actif"),
-    page: int = Query(1, ge=1, description="Numéro de page"),
-    per_page: int = Query(20, ge=1, le=100, description="Éléments par page"),
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante"),
+    limit: int = Query(20, ge=1, le=100, description="Éléments par page"),
+    count: str = Query(
+        "none", pattern="^(exact|estimated|none)$",
+        description="Calcul du total: exact, estimé ou aucun"
+    ),
     org_id: UUID = Depends(get_current_organization),
     user: CurrentUser = Depends(get_current_user),
     service: VehicleService = Depends(get_vehicle_service)
 ):
     """
-    Liste tous les véhicules de l'organisation
+    Liste les véhicules de l'organisation, par curseur (du plus récent au
+    plus ancien)
 
     - **status**: Filtrer par statut (available, in_service, maintenance, out_of_service)
     - **vehicle_type**: Filtrer par type de véhicule
     - **is_active**: Filtrer par état actif
+    - **cursor**: Page suivante: repasser **next_cursor** avec les mêmes filtres
+    - **count**: Total non calculé par défaut (pas de COUNT à chaque page)
     """
     filters = {}
     if status:
@@ -69,10 +78,8 @@ async def list_vehicles(
     if is_active is not None:
         filters["is_active"] = is_active
 
-    pagination = PaginationParams(page=page, per_page=per_page)
-    result = await service.get_paginated(org_id, pagination, filters)
-
-    return result.items
+    params = CursorParams(cursor=cursor, limit=limit, count=count)
+    return await service.get_page(org_id, params, filters)
 
 
 @router.get("/summary", response_model=VehicleSummary)
@@ -97,6 +104,23 @@ async def list_available_vehicles(
     return vehicles
 
 
+@router.post("/plan-routes")
+async def plan_fleet_routes(
+    request: FleetRoutingRequest,
+    org_id: UUID = Depends(get_current_organization),
+    user: CurrentUser = Depends(get_current_user),
+    service: VehicleService = Depends(get_vehicle_service)
+):
+    """
+    Planifie les tournées de tous les véhicules disponibles
+
+    - **start_from**: depot (dépôt d'attache) ou gps (position actuelle)
+    - **end_at**: depot, school (coordonnées de l'école requises) ou open
+    - Tous les dépôts sont résolus ensemble (une seule optimisation)
+    """
+    return await service.plan_routes(org_id, request)
+
+
 @router.get("/with-location", response_model=List[VehicleListResponse])
 async def list_vehicles_with_location(
     org_id: UUID = Depends(get_current_organization),
@@ -108,6 +132,29 @@ async def list_vehicles_with_location(
     return vehicles
 
 
+@router.get("/search", response_model=CursorPage[VehicleListResponse])
+async def search_vehicles(
+    q: str = Query(..., max_length=100, description="Terme recherché (nom, immatriculation)"),
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante"),
+    limit: int = Query(20, ge=1, le=100, description="Résultats par page"),
+    is_active: Optional[bool] = Query(None, description="Filtrer par état actif"),
+    org_id: UUID = Depends(get_current_organization),
+    user: CurrentUser = Depends(get_current_user),
+    service: VehicleService = Depends(get_vehicle_service)
+):
+    """
+    Recherche des véhicules par nom ou immatriculation
+
+    - Casse et accents ignorés, fautes de frappe tolérées à partir de 3 caractères
+    - Résultats classés par pertinence (les préfixes d'abord)
+    - Page suivante: repasser **next_cursor** avec le même terme
+    """
+    filters = {"is_active": is_active} if is_active is not None else None
+    return await service.search_page(
+        org_id, q, CursorParams(cursor=cursor, limit=limit), filters
+    )
+
+
 @router.get("/{vehicle_id}", response_model=VehicleResponse)
 async def get_vehicle(
     vehicle_id: UUID,
@@ -130,6 +177,29 @@ async def create_vehicle(
     return await service.create(org_id, data.model_dump(exclude_unset=True))
 
 
+@router.post("/import")
+async def import_vehicles(
+    file: UploadFile = File(..., description="Fichier .csv ou .xlsx"),
+    org_id: UUID = Depends(get_current_organization),
+    user: CurrentUser = Depends(get_current_user),
+    service: VehicleService = Depends(get_vehicle_service)
+) -> Dict[str, Any]:
+    """
+    Importe des véhicules depuis un fichier CSV ou XLSX
+
+    - Colonnes: name (nom), registration (immatriculation), vehicle_type,
+      capacity, capacity_unit, status, brand, model, year, color
+    - Un véhicule dont l'immatriculation existe déjà est mis à jour
+      (réimport idempotent); seules les colonnes du fichier sont modifiées
+    - Retourne le rapport d'import avec les erreurs par ligne
+    """
+    report = await import_into_service(
+        service, org_id, file.file, file.filename, VEHICLES,
+        on_conflict=["registration"]
+    )
+    return report.to_dict()
+
+
 @router.put("/{vehicle_id}", response_model=VehicleResponse)
 async def update_vehicle(
     vehicle_id: UUID,
@@ -3,7 +3,7 @@ Schémas Pydantic pour les véhicules
 """
 
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from uuid import UUID
 
 from pydantic import Field
@@ -56,6 +56,9 @@ class VehicleCreate(VehicleBase, CreateSchema):
     current_latitude: Optional[float] = Field(default=None, ge=-90, le=90)
     current_longitude: Optional[float] = Field(default=None, ge=-180, le=180)
 
+    # Dépôt d'attache (site is_depot)
+    depot_site_id: Optional[UUID] = None
+
 
 class VehicleUpdate(UpdateSchema):
     """Schéma pour la mise à jour d'un véhicule (tous les champs optionnels)"""
@@ -73,6 +76,7 @@ class VehicleUpdate(UpdateSchema):
     color: Optional[str] = None
     equipment: Optional[List[str]] = None
     metadata: Optional[Dict[str, Any]] = None
+    depot_site_id: Optional[UUID] = None
 
 
 class VehicleLocationUpdate(BaseSchema):
@@ -97,6 +101,7 @@ class VehicleResponse(TenantEntitySchema):
     current_latitude: Optional[float]
     current_longitude: Optional[float]
     last_position_update: Optional[str]
+    depot_site_id: Optional[UUID] = None
     brand: Optional[str]
     model: Optional[str]
     year: Optional[int]
@@ -123,6 +128,39 @@ class VehicleListResponse(BaseSchema):
     current_longitude: Optional[float]
 
 
+class FleetRoutingStop(BaseSchema):
+    """Arrêt à desservir par la flotte"""
+
+    id: str
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    adresse: Optional[str] = None
+    demand: int = Field(default=1, ge=0)
+    opening_time: Optional[str] = Field(default=None, description="HH:MM")
+    closing_time: Optional[str] = Field(default=None, description="HH:MM")
+    service_time_minutes: Optional[float] = Field(default=None, ge=0)
+
+
+class FleetRoutingRequest(BaseSchema):
+    """Planification multi-dépôts des véhicules disponibles"""
+
+    stops: List[FleetRoutingStop] = Field(..., min_length=1)
+    start_from: Literal["depot", "gps"] = Field(
+        default="depot",
+        description="Départ du dépôt d'attache ou de la position GPS actuelle"
+    )
+    end_at: Literal["depot", "school", "open"] = Field(
+        default="depot",
+        description="Retour au dépôt, arrivée à l'école, ou route ouverte"
+    )
+    school_latitude: Optional[float] = Field(default=None, ge=-90, le=90)
+    school_longitude: Optional[float] = Field(default=None, ge=-180, le=180)
+    vehicle_type: Optional[str] = None
+    start_time: str = Field(default="07:00", description="HH:MM")
+    school_arrival_time: str = Field(default="08:30", description="HH:MM")
+    average_speed_kmh: float = Field(default=30.0, gt=0, le=130)
+
+
 class VehicleSummary(BaseSchema):
     """Résumé statistique des véhicules"""
 
@@ -3,14 +3,14 @@ Service pour les véhicules
 """
 
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Sequence
 from uuid import UUID
 
 from api.core.exceptions import ValidationError, ConflictError
 from api.domains.base.service import BaseService
 from .models import Vehicle, VehicleStatus
 from .repository import VehicleRepository
-from .schemas import VehicleSummary
+from .schemas import VehicleSummary, FleetRoutingRequest
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +49,41 @@ class VehicleService(BaseService[Vehicle, VehicleRepository]):
                 field="capacity"
             )
 
+    async def _validate_create_many(
+        self,
+        items: List[Dict[str, Any]],
+        on_conflict: Optional[Sequence[str]] = None
+    ) -> None:
+        """Validation avant création multiple (unicité vérifiée en une requête)"""
+        for data in items:
+            if data.get("capacity") and data["capacity"] < 1:
+                raise ValidationError(
+                    "La capacité doit être supérieure à 0",
+                    field="capacity"
+                )
+
+        registrations = [data["registration"] for data in items if data.get("registration")]
+        if len(registrations) != len(set(registrations)):
+            raise ValidationError(
+                "Immatriculation en double dans les données",
+                field="registration"
+            )
+
+        # Un upsert sur l'immatriculation met à jour les véhicules existants
+        if on_conflict and "registration" in on_conflict:
+            return
+
+        existing = await self.repository.find_by_registrations(
+            registrations,
+            items[0].get("organization_id") if items else None
+        )
+        if existing:
+            raise ConflictError(
+                f"Un véhicule avec l'immatriculation '{existing[0].registration}' existe déjà",
+                resource="vehicle",
+                details={"registrations": [v.registration for v in existing]}
+            )
+
     async def _validate_update(
         self,
         existing: Vehicle,
@@ -98,6 +133,91 @@ class VehicleService(BaseService[Vehicle, VehicleRepository]):
         """
         return await self.repository.find_available(organization_id, vehicle_type)
 
+    async def plan_routes(
+        self,
+        organization_id: UUID,
+        request: FleetRoutingRequest
+    ) -> Dict[str, Any]:
+        """
+        Planifie les tournées de tous les véhicules disponibles en une résolution
+
+        Les véhicules et leurs dépôts d'attache sont chargés en une requête.
+        Départ: dépôt d'attache ou position GPS (repli sur l'autre si absent).
+        Arrivée: dépôt, école ou route ouverte.
+
+        Args:
+            organization_id: UUID de l'organisation
+            request: Arrêts, modes de départ/arrivée et horaires
+
+        Returns:
+            Une route par véhicule et les véhicules ignorés (sans point de départ)
+
+        Raises:
+            RateLimitError: Trop de résolutions en attente
+        """
+        from api.services.optimization import optimize_fleet_routes
+        from api.services.optimization.scheduler import get_solver_scheduler
+
+        school = None
+        if request.school_latitude is not None and request.school_longitude is not None:
+            school = (request.school_latitude, request.school_longitude)
+        if request.end_at == "school" and school is None:
+            raise ValidationError(
+                "Les coordonnées de l'école sont requises pour end_at=school",
+                field="school_latitude"
+            )
+
+        vehicles = await self.repository.find_available(
+            organization_id, request.vehicle_type, with_depot=True
+        )
+
+        fleet, skipped = [], []
+        for vehicle in vehicles:
+            depot = vehicle.depot.coordinates if vehicle.depot else None
+            if request.start_from == "gps":
+                start = vehicle.location or depot
+            else:
+                start = depot or vehicle.location
+            if start is None:
+                skipped.append(str(vehicle.id))
+                continue
+
+            end = {
+                "depot": depot or start,
+                "school": school,
+                "open": None
+            }[request.end_at]
+            fleet.append({
+                "id": str(vehicle.id),
+                "start": start,
+                "end": end,
+                "capacity": vehicle.capacity
+            })
+
+        if not fleet:
+            raise ValidationError(
+                "Aucun véhicule disponible avec un dépôt ou une position GPS",
+                field="vehicles"
+            )
+
+        # Résolution CPU: hors de la boucle d'événements, sous contrôle d'admission
+        result = await get_solver_scheduler().run(
+            optimize_fleet_routes,
+            [stop.model_dump() for stop in request.stops],
+            fleet,
+            request.start_time,
+            request.school_arrival_time,
+            request.average_speed_kmh,
+            tenant=organization_id
+        )
+        result["skipped_vehicles"] = skipped
+
+        logger.info(
+            f"Planned {len(fleet)} vehicles for org {organization_id}: "
+            f"success={result.get('success')}"
+        )
+        return result
+
     async def get_with_location(
         self,
         organization_id: UUID
@@ -177,7 +297,8 @@ class VehicleService(BaseService[Vehicle, VehicleRepository]):
         Returns:
             Véhicule mis à jour
         """
-        # Vérifier que le véhicule existe
+        # Vérifier que le véhicule existe (sur le primaire, avant écriture)
+        self.repository.use_primary()
         await self.repository.get_by_id_or_fail(vehicle_id, organization_id)
 
         vehicle = await self.repository.update_location(
@@ -204,6 +325,8 @@ class VehicleService(BaseService[Vehicle, VehicleRepository]):
         Returns:
             Véhicule mis à jour
         """
+        # Lecture sur le primaire: le statut validé doit être le statut courant
+        self.repository.use_primary()
         vehicle = await self.repository.get_by_id_or_fail(vehicle_id, organization_id)
 
         # Validation des transitions de statut
@@ -261,6 +384,8 @@ class VehicleService(BaseService[Vehicle, VehicleRepository]):
         Returns:
             Véhicule mis à jour
         """
+        # Lecture sur le primaire: le statut validé doit être le statut courant
+        self.repository.use_primary()
         vehicle = await self.repository.get_by_id_or_fail(vehicle_id, organization_id)
 
         # Vérifier que le véhicule est disponible
@@ -295,6 +420,8 @@ class VehicleService(BaseService[Vehicle, VehicleRepository]):
         Returns:
             Véhicule mis à jour
         """
+        # Lecture sur le primaire: le statut validé doit être le statut courant
+        self.repository.use_primary()
         vehicle = await self.repository.get_by_id_or_fail(vehicle_id, organization_id)
 
         if vehicle.status != VehicleStatus.IN_SERVICE.value:
@@ -5,7 +5,8 @@ Planification et suivi intelligents du transport professionnel
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from api.config import settings
-from api.routes import health, summary, bus, tournees, passagers, ecoles, optimize
+from api.database import pool
+from api.routes import health, summary, bus, tournees, passagers, ecoles, optimize, imports
 
 # Création de l'application FastAPI
 app = FastAPI(
@@ -33,6 +34,7 @@ app.include_router(tournees.router, tags=["Tournees"])
 app.include_router(passagers.router, tags=["Passagers"])
 app.include_router(ecoles.router, tags=["Ecoles"])
 app.include_router(optimize.router, tags=["Optimization"])
+app.include_router(imports.router, tags=["Import"])
 
 
 @app.on_event("startup")
@@ -45,6 +47,7 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Événement à l'arrêt de l'application"""
+    pool.close()
     print("🛑 API Transport arrêtée")
 
 
@@ -19,7 +19,7 @@ from api.core.security import TenantMiddleware
 
 # Import des routes
 from api.domains.vehicle.routes import router as vehicle_router
-# from api.domains.site.routes import router as site_router
+from api.domains.site.routes import router as site_router
 # from api.domains.route.routes import router as route_router
 
 # Configuration du logging
@@ -49,6 +49,11 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
         logger.info("Database connection established")
     else:
         logger.error("Database connection failed!")
+    if db.replica_engine is not None:
+        if await db.replica_available():
+            logger.info("Read replica available")
+        else:
+            logger.warning("Read replica unavailable or lagging, reads use the primary")
 
     # TODO: Initialiser MQTT si activé
     if settings.mqtt_enabled:
@@ -119,9 +124,13 @@ app.add_middleware(
 async def transport_exception_handler(request: Request, exc: TransportException):
     """Handler pour les exceptions métier"""
     logger.warning(f"Transport exception: {exc.code} - {exc.message}")
+    headers = None
+    if "retry_after_seconds" in exc.details:
+        headers = {"Retry-After": str(exc.details["retry_after_seconds"])}
     return JSONResponse(
         status_code=exc.status_code,
-        content=exc.to_dict()
+        content=exc.to_dict(),
+        headers=headers
     )
 
 
@@ -195,6 +204,7 @@ async def health_check():
         "status": "healthy" if db_healthy else "degraded",
         "version": "2.0.0",
         "database": db_healthy,
+        "database_replica": await db.replica_available() if db.replica_engine is not None else None,
         "mqtt": settings.mqtt_enabled
     }
 
@@ -231,7 +241,7 @@ async def root():
 
 # Enregistrement des routers
 app.include_router(vehicle_router, prefix=API_V1, tags=["Vehicles"])
-# app.include_router(site_router, prefix=API_V1, tags=["Sites"])
+app.include_router(site_router, prefix=API_V1, tags=["Sites"])
 # app.include_router(route_router, prefix=API_V1, tags=["Routes"])
 
 
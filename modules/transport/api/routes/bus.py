@@ -1,13 +1,12 @@
 """
 Endpoints pour la gestion des bus
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from typing import List, Dict, Optional
 from pydantic import BaseModel
-import psycopg2
-from api.config import settings
+from api.database import get_db_connection, connection_scope
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(connection_scope)])
 
 
 class BusCreate(BaseModel):
@@ -18,6 +17,8 @@ class BusCreate(BaseModel):
     type_bus: Optional[str] = None
     statut: Optional[str] = "disponible"
     ecole_id: Optional[str] = None
+    depot_latitude: Optional[float] = None  # Lieu de remisage du bus
+    depot_longitude: Optional[float] = None
 
 
 class BusUpdate(BaseModel):
@@ -28,25 +29,12 @@ class BusUpdate(BaseModel):
     type_bus: Optional[str] = None
     statut: Optional[str] = None
     ecole_id: Optional[str] = None
-
-
-def get_db_connection():
-    """Créer une connexion à la base de données"""
-    try:
-        conn = psycopg2.connect(
-            host=settings.database_host,
-            port=settings.database_port,
-            dbname=settings.database_name,
-            user=settings.database_user,
-            password=settings.database_password
-        )
-        return conn
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur de connexion à la base de données: {str(e)}")
+    depot_latitude: Optional[float] = None
+    depot_longitude: Optional[float] = None
 
 
 @router.get("/api/bus", response_model=List[Dict])
-async def get_buses():
+def get_buses():
     """
     Récupère la liste de tous les bus
 
@@ -58,7 +46,8 @@ async def get_buses():
         cur = conn.cursor()
 
         cur.execute("""
-            SELECT id, numero_bus, immatriculation, capacite, type_bus, statut, ecole_id
+            SELECT id, numero_bus, immatriculation, capacite, type_bus, statut, ecole_id,
+                   depot_latitude, depot_longitude
             FROM public.bus
             ORDER BY numero_bus
         """)
@@ -72,7 +61,9 @@ async def get_buses():
                 "capacite": row[3],
                 "type_bus": row[4],
                 "statut": row[5],
-                "ecole_id": str(row[6]) if row[6] else None
+                "ecole_id": str(row[6]) if row[6] else None,
+                "depot_latitude": float(row[7]) if row[7] is not None else None,
+                "depot_longitude": float(row[8]) if row[8] is not None else None
             })
 
         cur.close()
@@ -84,7 +75,7 @@ async def get_buses():
 
 
 @router.get("/api/bus/{bus_id}", response_model=Dict)
-async def get_bus(bus_id: str):
+def get_bus(bus_id: str):
     """
     Récupère les détails d'un bus spécifique
 
@@ -99,7 +90,8 @@ async def get_bus(bus_id: str):
         cur = conn.cursor()
 
         cur.execute("""
-            SELECT id, numero_bus, immatriculation, capacite, type_bus, statut, ecole_id
+            SELECT id, numero_bus, immatriculation, capacite, type_bus, statut, ecole_id,
+                   depot_latitude, depot_longitude
             FROM public.bus
             WHERE id = %s
         """, (bus_id,))
@@ -116,7 +108,9 @@ async def get_bus(bus_id: str):
             "capacite": row[3],
             "type_bus": row[4],
             "statut": row[5],
-            "ecole_id": str(row[6]) if row[6] else None
+            "ecole_id": str(row[6]) if row[6] else None,
+            "depot_latitude": float(row[7]) if row[7] is not None else None,
+            "depot_longitude": float(row[8]) if row[8] is not None else None
         }
 
         cur.close()
@@ -130,7 +124,7 @@ async def get_bus(bus_id: str):
 
 
 @router.post("/api/bus", response_model=Dict)
-async def create_bus(bus: BusCreate):
+def create_bus(bus: BusCreate):
     """
     Crée un nouveau bus
 
@@ -146,13 +140,16 @@ async def create_bus(bus: BusCreate):
 
         cur.execute("""
             INSERT INTO public.bus (
-                numero_bus, immatriculation, capacite, type_bus, statut, ecole_id
+                numero_bus, immatriculation, capacite, type_bus, statut, ecole_id,
+                depot_latitude, depot_longitude
             )
-            VALUES (%s, %s, %s, %s, %s, %s)
-            RETURNING id, numero_bus, immatriculation, capacite, type_bus, statut, ecole_id
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            RETURNING id, numero_bus, immatriculation, capacite, type_bus, statut, ecole_id,
+                   depot_latitude, depot_longitude
         """, (
             bus.numero_bus, bus.immatriculation, bus.capacite,
-            bus.type_bus, bus.statut, bus.ecole_id
+            bus.type_bus, bus.statut, bus.ecole_id,
+            bus.depot_latitude, bus.depot_longitude
         ))
 
         row = cur.fetchone()
@@ -165,7 +162,9 @@ async def create_bus(bus: BusCreate):
             "capacite": row[3],
             "type_bus": row[4],
             "statut": row[5],
-            "ecole_id": str(row[6]) if row[6] else None
+            "ecole_id": str(row[6]) if row[6] else None,
+            "depot_latitude": float(row[7]) if row[7] is not None else None,
+            "depot_longitude": float(row[8]) if row[8] is not None else None
         }
 
         cur.close()
@@ -177,7 +176,7 @@ async def create_bus(bus: BusCreate):
 
 
 @router.put("/api/bus/{bus_id}", response_model=Dict)
-async def update_bus(bus_id: str, bus: BusUpdate):
+def update_bus(bus_id: str, bus: BusUpdate):
     """
     Met à jour un bus
 
@@ -213,6 +212,12 @@ async def update_bus(bus_id: str, bus: BusUpdate):
         if bus.ecole_id is not None:
             update_fields.append("ecole_id = %s")
             values.append(bus.ecole_id)
+        if bus.depot_latitude is not None:
+            update_fields.append("depot_latitude = %s")
+            values.append(bus.depot_latitude)
+        if bus.depot_longitude is not None:
+            update_fields.append("depot_longitude = %s")
+            values.append(bus.depot_longitude)
 
         if not update_fields:
             raise HTTPException(status_code=400, detail="Aucune donnée à mettre à jour")
@@ -223,7 +228,8 @@ async def update_bus(bus_id: str, bus: BusUpdate):
             UPDATE public.bus
             SET {', '.join(update_fields)}
             WHERE id = %s
-            RETURNING id, numero_bus, immatriculation, capacite, type_bus, statut, ecole_id
+            RETURNING id, numero_bus, immatriculation, capacite, type_bus, statut, ecole_id,
+                   depot_latitude, depot_longitude
         """
 
         cur.execute(query, values)
@@ -241,7 +247,9 @@ async def update_bus(bus_id: str, bus: BusUpdate):
             "capacite": row[3],
             "type_bus": row[4],
             "statut": row[5],
-            "ecole_id": str(row[6]) if row[6] else None
+            "ecole_id": str(row[6]) if row[6] else None,
+            "depot_latitude": float(row[7]) if row[7] is not None else None,
+            "depot_longitude": float(row[8]) if row[8] is not None else None
         }
 
         cur.close()
@@ -255,7 +263,7 @@ async def update_bus(bus_id: str, bus: BusUpdate):
 
 
 @router.delete("/api/bus/{bus_id}")
-async def delete_bus(bus_id: str):
+def delete_bus(bus_id: str):
     """
     Supprime un bus
 
@@ -1,13 +1,13 @@
 """
 Endpoints pour la gestion des écoles
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header
 from typing import List, Dict, Optional
 from pydantic import BaseModel
-import psycopg2
-from api.config import settings
+from api.database import get_db_connection, connection_scope
+from api.streaming import ndjson_demande, stream_rows
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(connection_scope)])
 
 
 class EcoleCreate(BaseModel):
@@ -34,53 +34,49 @@ class EcoleUpdate(BaseModel):
     nombre_etudiants: Optional[int] = None
 
 
-def get_db_connection():
-    """Créer une connexion à la base de données"""
-    try:
-        conn = psycopg2.connect(
-            host=settings.database_host,
-            port=settings.database_port,
-            dbname=settings.database_name,
-            user=settings.database_user,
-            password=settings.database_password
-        )
-        return conn
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur de connexion à la base de données: {str(e)}")
+def _format_ecole(row) -> Dict:
+    """Ligne de la liste des écoles -> dictionnaire"""
+    return {
+        "id": str(row[0]),
+        "nom": row[1],
+        "adresse": row[2],
+        "ville": row[3],
+        "code_postal": row[4],
+        "telephone": row[5],
+        "email": row[6],
+        "directeur": row[7],
+        "nombre_etudiants": row[8]
+    }
 
 
 @router.get("/api/ecoles", response_model=List[Dict])
-async def get_ecoles():
+def get_ecoles(stream: bool = False, accept: Optional[str] = Header(None)):
     """
     Récupère la liste de toutes les écoles
 
+    Args:
+        stream: Renvoyer une école par ligne (NDJSON) au fil de la lecture,
+            sans charger toute la liste (aussi avec Accept: application/x-ndjson)
+
     Returns:
         Liste des écoles
     """
+    query = """
+        SELECT id, nom, adresse, ville, code_postal, telephone,
+               email, directeur, nombre_etudiants
+        FROM public.ecoles
+        ORDER BY nom
+    """
+
+    if ndjson_demande(stream, accept):
+        return stream_rows(query, None, _format_ecole)
+
     try:
         conn = get_db_connection()
         cur = conn.cursor()
 
-        cur.execute("""
-            SELECT id, nom, adresse, ville, code_postal, telephone,
-                   email, directeur, nombre_etudiants
-            FROM public.ecoles
-            ORDER BY nom
-        """)
-
-        ecoles = []
-        for row in cur.fetchall():
-            ecoles.append({
-                "id": str(row[0]),
-                "nom": row[1],
-                "adresse": row[2],
-                "ville": row[3],
-                "code_postal": row[4],
-                "telephone": row[5],
-                "email": row[6],
-                "directeur": row[7],
-                "nombre_etudiants": row[8]
-            })
+        cur.execute(query)
+        ecoles = [_format_ecole(row) for row in cur.fetchall()]
 
         cur.close()
         conn.close()
@@ -91,7 +87,7 @@ async def get_ecoles():
 
 
 @router.post("/api/ecoles", response_model=Dict)
-async def create_ecole(ecole: EcoleCreate):
+def create_ecole(ecole: EcoleCreate):
     """
     Crée une nouvelle école
 
@@ -142,7 +138,7 @@ async def create_ecole(ecole: EcoleCreate):
 
 
 @router.put("/api/ecoles/{ecole_id}", response_model=Dict)
-async def update_ecole(ecole_id: str, ecole: EcoleUpdate):
+def update_ecole(ecole_id: str, ecole: EcoleUpdate):
     """
     Met à jour une école
 
@@ -229,7 +225,7 @@ async def update_ecole(ecole_id: str, ecole: EcoleUpdate):
 
 
 @router.delete("/api/ecoles/{ecole_id}")
-async def delete_ecole(ecole_id: str):
+def delete_ecole(ecole_id: str):
     """
     Supprime une école
 
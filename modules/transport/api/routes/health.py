@@ -7,12 +7,18 @@ from typing import Dict
 import psycopg2
 import paho.mqtt.client as mqtt
 from api.config import settings
+from api.database import pool
 
 router = APIRouter()
 
 
 def check_database_connection() -> tuple[bool, str]:
-    """Vérifie la connexion à la base de données"""
+    """
+    Vérifie la connexion à la base de données
+
+    Connexion dédiée à délai court, hors du pool partagé: un pool saturé
+    (instance occupée) ne doit pas faire passer la base pour indisponible
+    """
     try:
         conn = psycopg2.connect(
             host=settings.database_host,
@@ -20,12 +26,14 @@ def check_database_connection() -> tuple[bool, str]:
             dbname=settings.database_name,
             user=settings.database_user,
             password=settings.database_password,
-            connect_timeout=5
+            connect_timeout=2
         )
-        cur = conn.cursor()
-        cur.execute("SELECT 1")
-        cur.close()
-        conn.close()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+        finally:
+            conn.close()
         return True, "operational"
     except psycopg2.OperationalError as e:
         return False, f"connection_failed: {str(e)}"
@@ -33,6 +41,17 @@ def check_database_connection() -> tuple[bool, str]:
         return False, f"error: {str(e)}"
 
 
+def check_database_pool() -> tuple[bool, Dict]:
+    """
+    État du pool partagé, sans emprunter de connexion
+
+    Returns:
+        Tuple (pool saturé, statistiques du pool)
+    """
+    stats = pool.stats()
+    return stats["in_use"] >= stats["max_size"], stats
+
+
 def check_mqtt_connection() -> tuple[bool, str]:
     """Vérifie la connexion au broker MQTT"""
     try:
@@ -47,7 +66,7 @@ def check_mqtt_connection() -> tuple[bool, str]:
 
 
 @router.get("/health", response_model=Dict)
-async def health_check():
+def health_check():
     """
     Vérification de l'état de santé de l'API
 
@@ -55,6 +74,7 @@ async def health_check():
         Dict contenant le statut, la version et le timestamp
     """
     db_ok, db_status = check_database_connection()
+    pool_saturated, pool_stats = check_database_pool()
     mqtt_ok, mqtt_status = check_mqtt_connection()
 
     overall_status = "healthy" if (db_ok and mqtt_ok) else "degraded"
@@ -67,13 +87,15 @@ async def health_check():
         "components": {
             "api": "operational",
             "database": db_status,
+            "database_pool": "saturated" if pool_saturated else "operational",
             "mqtt": mqtt_status
-        }
+        },
+        "database_pool": pool_stats
     }
 
 
 @router.get("/health/ready", response_model=Dict)
-async def readiness_check():
+def readiness_check():
     """
     Vérification que l'API est prête à recevoir des requêtes
 
@@ -81,12 +103,15 @@ async def readiness_check():
         Dict indiquant si tous les services sont prêts
     """
     db_ok, _ = check_database_connection()
+    pool_saturated, _ = check_database_pool()
     mqtt_ok, _ = check_mqtt_connection()
 
+    # Un pool saturé signale une instance occupée, pas une base indisponible
     return {
         "ready": db_ok and mqtt_ok,
         "checks": {
             "database": db_ok,
+            "database_pool_saturated": pool_saturated,
             "mqtt": mqtt_ok
         }
     }
@@ -0,0 +1,224 @@
+"""
+Endpoints d'import en masse (CSV/XLSX)
+"""
+import io
+import logging
+from typing import Dict, List, Optional
+
+import pandas as pd
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+
+from api.config import settings
+from api.core.exceptions import TransportException
+from api.database import get_db_connection, connection_scope
+from api.services.geocoding.queue import get_geocoding_queue
+from api.services.importing import (
+    ImportReport, PASSAGERS, address_keys, iter_chunks, prepare_chunk
+)
+
+router = APIRouter(dependencies=[Depends(connection_scope)])
+
+logger = logging.getLogger(__name__)
+
+# Colonnes de la table de transit, dans l'ordre du COPY
+COLONNES_PASSAGERS = [
+    "nom", "prenom", "email", "telephone", "adresse_complete", "ville",
+    "code_postal", "latitude", "longitude", "date_naissance", "ecole_id"
+]
+
+# Champs mis à jour quand le passager existe déjà (même email, ou mêmes nom,
+# prénom et école sans email); les coordonnées existantes sont gardées si
+# l'adresse n'a pas changé
+MISE_A_JOUR_PASSAGERS = """
+    UPDATE public.passagers p
+    SET email = COALESCE(s.email, p.email),
+        telephone = COALESCE(s.telephone, p.telephone),
+        adresse_complete = s.adresse_complete,
+        ville = s.ville,
+        code_postal = COALESCE(s.code_postal, p.code_postal),
+        date_naissance = COALESCE(s.date_naissance, p.date_naissance),
+        ecole_id = COALESCE(s.ecole_id, p.ecole_id),
+        latitude = CASE
+            WHEN s.latitude IS NOT NULL THEN s.latitude
+            WHEN lower(p.adresse_complete) = lower(s.adresse_complete)
+                 AND lower(p.ville) IS NOT DISTINCT FROM lower(s.ville) THEN p.latitude
+        END,
+        longitude = CASE
+            WHEN s.longitude IS NOT NULL THEN s.longitude
+            WHEN lower(p.adresse_complete) = lower(s.adresse_complete)
+                 AND lower(p.ville) IS NOT DISTINCT FROM lower(s.ville) THEN p.longitude
+        END,
+        updated_at = now()
+    FROM _import_passagers s
+    WHERE {correspondance}
+    RETURNING s.ligne, p.id, p.latitude IS NULL OR p.longitude IS NULL
+"""
+
+PAR_EMAIL = "s.email IS NOT NULL AND lower(p.email) = lower(s.email)"
+PAR_NOM = """s.email IS NULL
+      AND lower(p.nom) = lower(s.nom)
+      AND lower(p.prenom) = lower(s.prenom)
+      AND p.ecole_id IS NOT DISTINCT FROM s.ecole_id"""
+
+
+def _charger_bloc(cur, bloc: pd.DataFrame) -> List[tuple]:
+    """
+    COPY d'un bloc validé dans la table de transit puis fusion dans public.passagers
+
+    La table de transit est propre à la session (connexion du pool) et
+    vidée à chaque commit.
+
+    Returns:
+        Lignes (ligne du fichier, id du passager, sans coordonnées, mis à jour)
+    """
+    cur.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS _import_passagers (
+            ligne INTEGER PRIMARY KEY,
+            id UUID NOT NULL DEFAULT gen_random_uuid(),
+            nom TEXT, prenom TEXT, email TEXT, telephone TEXT,
+            adresse_complete TEXT, ville TEXT, code_postal TEXT,
+            latitude NUMERIC, longitude NUMERIC,
+            date_naissance DATE, ecole_id UUID
+        ) ON COMMIT DELETE ROWS
+    """)
+    cur.execute("TRUNCATE _import_passagers")
+    buffer = io.StringIO()
+    bloc[COLONNES_PASSAGERS].to_csv(buffer, header=False, index=True)
+    buffer.seek(0)
+    cur.copy_expert(
+        f"COPY _import_passagers (ligne, {', '.join(COLONNES_PASSAGERS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+
+    resultats = []
+    for correspondance in (PAR_EMAIL, PAR_NOM):
+        cur.execute(MISE_A_JOUR_PASSAGERS.format(correspondance=correspondance))
+        resultats.extend((ligne, pid, sans_coords, True) for ligne, pid, sans_coords in cur.fetchall())
+
+    mises_a_jour = list({r[0] for r in resultats})
+    cur.execute(f"""
+        WITH creations AS (
+            INSERT INTO public.passagers (id, {', '.join(COLONNES_PASSAGERS)})
+            SELECT s.id, {', '.join('s.' + c for c in COLONNES_PASSAGERS)}
+            FROM _import_passagers s
+            WHERE s.ligne <> ALL(%s)
+            RETURNING id
+        )
+        SELECT s.ligne, s.id, s.latitude IS NULL OR s.longitude IS NULL
+        FROM _import_passagers s
+        JOIN creations c ON c.id = s.id
+    """, (mises_a_jour,))
+    resultats.extend((ligne, pid, sans_coords, False) for ligne, pid, sans_coords in cur.fetchall())
+    return resultats
+
+
+def _geocoder_passagers(cle: str, requetes: List[str], passager_ids: List[str]) -> bool:
+    """Met en file le géocodage d'une adresse partagée par plusieurs passagers"""
+    def on_result(coordonnees: Optional[tuple]) -> None:
+        if coordonnees is None:
+            logger.warning(f"Géocodage impossible: {requetes[0]} ({len(passager_ids)} passager(s))")
+            return
+        conn = get_db_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE public.passagers
+                SET latitude = %s, longitude = %s
+                WHERE id = ANY(%s::uuid[]) AND (latitude IS NULL OR longitude IS NULL)
+            """, (coordonnees[0], coordonnees[1], passager_ids))
+            conn.commit()
+            cur.close()
+        finally:
+            conn.close()
+
+    return get_geocoding_queue().submit(f"import:{cle}:{passager_ids[0]}", requetes, on_result)
+
+
+@router.post("/api/import/passagers", response_model=Dict)
+def importer_passagers(
+    fichier: UploadFile = File(...),
+    ecole_id: Optional[str] = Form(None)
+):
+    """
+    Importe des passagers depuis un fichier CSV ou XLSX
+
+    Le fichier est lu par blocs; chaque bloc est validé (colonnes entières),
+    dédoublonné, chargé par COPY dans une table de transit puis fusionné:
+    un passager déjà connu (même email, ou mêmes nom, prénom et école) est
+    mis à jour, les autres sont créés. Chaque bloc est validé dans sa propre
+    transaction: un bloc refusé par la base est annulé seul, les blocs
+    précédents restent enregistrés même si l'import s'interrompt. Les adresses sans
+    coordonnées sont géocodées en arrière-plan, une fois par adresse.
+
+    Colonnes reconnues (en-têtes insensibles à la casse et aux accents):
+    nom, prenom, email, telephone, adresse (adresse_complete), ville,
+    code_postal, latitude, longitude, date_naissance, ecole_id
+
+    Args:
+        fichier: Fichier .csv (séparateur , ; ou tabulation) ou .xlsx
+        ecole_id: École des passagers dont la colonne ecole_id est vide
+
+    Returns:
+        Rapport: lignes, importées, mises à jour, rejetées, doublons,
+        adresses en file de géocodage et erreurs par ligne
+    """
+    rapport = ImportReport(PASSAGERS.name)
+    cles_vues = set()
+    a_geocoder: Dict[str, Dict] = {}
+
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+
+        for bloc in iter_chunks(fichier.file, fichier.filename, settings.import_chunk_size):
+            valides = prepare_chunk(bloc, PASSAGERS, cles_vues, rapport)
+            if valides.empty:
+                continue
+            if ecole_id:
+                valides = valides.assign(ecole_id=valides["ecole_id"].fillna(ecole_id))
+
+            # Une transaction par bloc: connexion, lignes et verrous (compteurs
+            # du tableau de bord) ne sont pas gardés pendant tout le fichier
+            try:
+                resultats = _charger_bloc(cur, valides)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.warning(f"Bloc d'import rejeté (lignes {valides.index[0]}-{valides.index[-1]}): {e}")
+                rapport.reject(list(valides.index), f"Rejeté par la base de données: {str(e).splitlines()[0]}")
+                continue
+
+            rapport.updated += len({r[0] for r in resultats if r[3]})
+            rapport.imported += sum(1 for r in resultats if not r[3])
+
+            # Passagers sans coordonnées, regroupés par adresse
+            sans_coords = [(ligne, str(pid)) for ligne, pid, manquantes, _ in resultats if manquantes]
+            if sans_coords:
+                cles = address_keys(valides, PASSAGERS)
+                for ligne, pid in sans_coords:
+                    groupe = a_geocoder.setdefault(cles[ligne], {
+                        "requetes": [
+                            f"{valides.at[ligne, 'adresse_complete']}, {valides.at[ligne, 'ville']}, France",
+                            f"{valides.at[ligne, 'ville']}, France"
+                        ],
+                        "ids": []
+                    })
+                    groupe["ids"].append(pid)
+
+        cur.close()
+    except HTTPException:
+        raise
+    except TransportException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de l'import des passagers: {str(e)}")
+    finally:
+        conn.close()
+
+        # Après les commits: le rappel de géocodage met à jour des lignes
+        # visibles, y compris celles des blocs enregistrés avant une erreur
+        for cle, groupe in a_geocoder.items():
+            if _geocoder_passagers(cle, groupe["requetes"], groupe["ids"]):
+                rapport.geocoding_queued += 1
+
+    return rapport.to_dict()
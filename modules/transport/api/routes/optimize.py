@@ -3,10 +3,14 @@ Route d'optimisation générique
 Endpoint pour optimiser n'importe quelle liste de locations
 """
 
+import asyncio
+
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Tuple
 from ..services.optimization import RouteOptimizer
+from ..services.optimization.scheduler import get_solver_scheduler
+from ..services.optimization.estimation import estimate_route_length
 from datetime import datetime
 
 router = APIRouter(prefix="/api/optimize", tags=["Optimization"])
@@ -47,6 +51,24 @@ class OptimizeResponse(BaseModel):
     algorithm: str = "Google OR-Tools VRP/VRPTW"
 
 
+# Points acceptés par /estimate (calcul CPU exécuté hors de la boucle)
+MAX_ESTIMATE_POINTS = 10000
+
+
+class EstimatePoint(BaseModel):
+    latitude: float
+    longitude: float
+
+
+class EstimateRequest(BaseModel):
+    points: List[EstimatePoint] = Field(max_length=MAX_ESTIMATE_POINTS)
+    depot: Optional[EstimatePoint] = None
+    vehicle_capacity: Optional[int] = Field(default=None, ge=1)
+    average_speed_kmh: float = Field(default=30.0, gt=0)
+    service_time_minutes: float = Field(default=2.0, ge=0)
+    max_route_duration_minutes: Optional[float] = Field(default=None, gt=0)
+
+
 @router.post("/route", response_model=OptimizeResponse)
 async def optimize_route(request: OptimizeRequest):
     """
@@ -146,6 +168,28 @@ async def optimize_route(request: OptimizeRequest):
         )
 
 
+@router.post("/estimate")
+async def estimate_route(request: EstimateRequest):
+    """
+    Estime distance et nombre de véhicules sans lancer d'optimisation
+
+    - Borne basse: arbre couvrant minimal (et borne radiale avec capacité)
+    - Estimation: Beardwood-Halton-Hammersley / approximation de Daganzo
+    - Borne haute: double de l'arbre couvrant, découpage de tournée
+    - Distances à vol d'oiseau, en quelques millisecondes pour des milliers de points
+      (au plus MAX_ESTIMATE_POINTS, calcul exécuté dans un thread)
+    """
+    return await asyncio.to_thread(
+        estimate_route_length,
+        coordinates=[(p.latitude, p.longitude) for p in request.points],
+        depot=(request.depot.latitude, request.depot.longitude) if request.depot else None,
+        vehicle_capacity=request.vehicle_capacity,
+        average_speed_kmh=request.average_speed_kmh,
+        service_time_minutes=request.service_time_minutes,
+        max_route_duration_minutes=request.max_route_duration_minutes
+    )
+
+
 @router.get("/health")
 async def optimization_health():
     """Vérifier si le service d'optimisation est disponible"""
@@ -162,3 +206,9 @@ async def optimization_health():
             "status": "unhealthy",
             "error": str(e)
         }
+
+
+@router.get("/scheduler")
+async def solver_scheduler_stats():
+    """État de l'ordonnanceur du solveur: résolutions en cours, file, temps d'attente"""
+    return get_solver_scheduler().stats()
@@ -1,16 +1,40 @@
 """
 Endpoints pour la gestion des passagers (étudiants)
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 from typing import List, Dict, Optional
+from datetime import datetime
 from pydantic import BaseModel
-import psycopg2
-from api.config import settings
-from api.services.optimization import optimize_school_bus_route
+import asyncio
+import base64
+import json
+import logging
+from psycopg2.extras import execute_values
+from api.database import get_db_connection, connection_scope
+from api.streaming import ndjson_demande, stream_rows
+from api.search import MIN_TRIGRAM_LENGTH, escape_like, normalize_term
+from api.services.optimization import (
+    optimize_school_bus_route, select_pickup_points, assign_to_stops
+)
+from api.services.optimization.replanning import replan_remaining_route
+from api.services.optimization.eta import get_eta_engine
+from api.services.optimization.scheduler import get_solver_scheduler
+from api.services.optimization.batch import stop_order_rows, stop_set_fingerprint
+from api.services.optimization.allocation import allocate_passengers
+from api.services.geocoding.queue import get_geocoding_queue
+from api.core.exceptions import RateLimitError
 from geopy.geocoders import Nominatim
 import time
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(connection_scope)])
+
+logger = logging.getLogger(__name__)
+
+# Arrêts qui ne font plus partie de la suite d'une tournée en cours
+STATUTS_ARRET_TERMINES = ('effectue', 'annule')
+
+# Champs de la recherche de passagers (indexés par add_trigram_search_indexes)
+CHAMPS_RECHERCHE = ('nom', 'prenom', 'email', 'adresse_complete', 'ville')
 
 
 class PassagerCreate(BaseModel):
@@ -43,19 +67,14 @@ class PassagerUpdate(BaseModel):
     ecole_id: Optional[str] = None
 
 
-def get_db_connection():
-    """Créer une connexion à la base de données"""
-    try:
-        conn = psycopg2.connect(
-            host=settings.database_host,
-            port=settings.database_port,
-            dbname=settings.database_name,
-            user=settings.database_user,
-            password=settings.database_password
-        )
-        return conn
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur de connexion à la base de données: {str(e)}")
+def solveur_surcharge(error: RateLimitError) -> HTTPException:
+    """Convertit un rejet de l'ordonnanceur du solveur en réponse 429"""
+    retry_after = error.details.get("retry_after_seconds", 1)
+    return HTTPException(
+        status_code=429,
+        detail=error.message,
+        headers={"Retry-After": str(retry_after)}
+    )
 
 
 def geocode_address(adresse: str, ville: str) -> tuple:
@@ -87,56 +106,60 @@ def geocode_address(adresse: str, ville: str) -> tuple:
         return (None, None)
 
 
+def _format_passager(row) -> Dict:
+    """Ligne de la liste des passagers -> dictionnaire"""
+    return {
+        "id": str(row[0]),
+        "nom": row[1],
+        "prenom": row[2],
+        "email": row[3],
+        "telephone": row[4],
+        "adresse_complete": row[5],
+        "latitude": float(row[6]) if row[6] else None,
+        "longitude": float(row[7]) if row[7] else None,
+        "ville": row[8],
+        "ecole_id": str(row[9]) if row[9] else None,
+        "ecole_nom": row[10] if row[10] else None
+    }
+
+
 @router.get("/api/passagers", response_model=List[Dict])
-async def get_passagers(ecole_id: Optional[str] = None):
+def get_passagers(
+    ecole_id: Optional[str] = None,
+    stream: bool = False,
+    accept: Optional[str] = Header(None)
+):
     """
     Récupère la liste des passagers (étudiants)
 
     Args:
         ecole_id: Filtrer par école (optionnel)
+        stream: Renvoyer un passager par ligne (NDJSON) au fil de la lecture,
+            sans charger toute la liste (aussi avec Accept: application/x-ndjson)
 
     Returns:
         Liste des passagers
     """
+    query = """
+        SELECT p.id, p.nom, p.prenom, p.email, p.telephone,
+               p.adresse_complete, p.latitude, p.longitude, p.ville,
+               p.ecole_id, e.nom as ecole_nom
+        FROM public.passagers p
+        LEFT JOIN public.ecoles e ON p.ecole_id = e.id
+        {where}
+        ORDER BY p.nom, p.prenom
+    """.format(where="WHERE p.ecole_id = %s" if ecole_id else "")
+    params = (ecole_id,) if ecole_id else None
+
+    if ndjson_demande(stream, accept):
+        return stream_rows(query, params, _format_passager)
+
     try:
         conn = get_db_connection()
         cur = conn.cursor()
 
-        if ecole_id:
-            cur.execute("""
-                SELECT p.id, p.nom, p.prenom, p.email, p.telephone,
-                       p.adresse_complete, p.latitude, p.longitude, p.ville,
-                       p.ecole_id, e.nom as ecole_nom
-                FROM public.passagers p
-                LEFT JOIN public.ecoles e ON p.ecole_id = e.id
-                WHERE p.ecole_id = %s
-                ORDER BY p.nom, p.prenom
-            """, (ecole_id,))
-        else:
-            cur.execute("""
-                SELECT p.id, p.nom, p.prenom, p.email, p.telephone,
-                       p.adresse_complete, p.latitude, p.longitude, p.ville,
-                       p.ecole_id, e.nom as ecole_nom
-                FROM public.passagers p
-                LEFT JOIN public.ecoles e ON p.ecole_id = e.id
-                ORDER BY p.nom, p.prenom
-            """)
-
-        passagers = []
-        for row in cur.fetchall():
-            passagers.append({
-                "id": str(row[0]),
-                "nom": row[1],
-                "prenom": row[2],
-                "email": row[3],
-                "telephone": row[4],
-                "adresse_complete": row[5],
-                "latitude": float(row[6]) if row[6] else None,
-                "longitude": float(row[7]) if row[7] else None,
-                "ville": row[8],
-                "ecole_id": str(row[9]) if row[9] else None,
-                "ecole_nom": row[10] if row[10] else None
-            })
+        cur.execute(query, params)
+        passagers = [_format_passager(row) for row in cur.fetchall()]
 
         cur.close()
         conn.close()
@@ -146,8 +169,123 @@ async def get_passagers(ecole_id: Optional[str] = None):
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération des passagers: {str(e)}")
 
 
+def _requete_recherche(terme: str, ecole_id: Optional[str], apres: bool) -> str:
+    """
+    Recherche classée sur les formes normalisées des champs
+
+    Préfixes via les index text_pattern_ops; à partir de MIN_TRIGRAM_LENGTH
+    caractères, sous-chaînes et fautes de frappe via les index trigrammes.
+    Un préfixe passe devant toute correspondance approchée.
+    """
+    conditions, scores = [], []
+    for champ in CHAMPS_RECHERCHE:
+        colonne = f"public.search_normalize(p.{champ})"
+        conditions.append(f"{colonne} LIKE %(prefixe)s")
+        if len(terme) >= MIN_TRIGRAM_LENGTH:
+            conditions.append(f"{colonne} LIKE %(contient)s")
+            conditions.append(f"%(terme)s <%% {colonne}")
+        scores.append(
+            f"CASE WHEN {colonne} LIKE %(prefixe)s THEN 1.0 ELSE 0.0 END"
+            f" + word_similarity(%(terme)s, {colonne})"
+        )
+    score = f"greatest({', '.join(scores)})::float8"
+
+    filtres = [f"({' OR '.join(conditions)})"]
+    if ecole_id:
+        filtres.append("p.ecole_id = %(ecole_id)s")
+    if apres:
+        filtres.append(f"({score}, p.id) < (%(score)s, %(dernier_id)s::uuid)")
+
+    return f"""
+        SELECT p.id, p.nom, p.prenom, p.email, p.telephone,
+               p.adresse_complete, p.latitude, p.longitude, p.ville,
+               p.ecole_id, e.nom as ecole_nom, {score} AS score
+        FROM public.passagers p
+        LEFT JOIN public.ecoles e ON p.ecole_id = e.id
+        WHERE {' AND '.join(filtres)}
+        ORDER BY score DESC, p.id DESC
+        LIMIT %(limite)s
+    """
+
+
+def _curseur_recherche(terme: str, score: float, dernier_id: str) -> str:
+    """Curseur opaque: terme, score et id du dernier résultat renvoyé"""
+    payload = json.dumps({"t": terme, "s": score, "id": dernier_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _lire_curseur_recherche(curseur: str, terme: str) -> tuple:
+    """Décode un curseur de _curseur_recherche (400 si illisible ou autre terme)"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode((curseur + "=" * (-len(curseur) % 4)).encode()))
+        score, dernier_id = float(payload["s"]), str(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+    if payload.get("t") != terme:
+        raise HTTPException(status_code=400, detail="Le curseur a été émis pour un autre terme")
+    return score, dernier_id
+
+
+@router.get("/api/passagers/recherche", response_model=Dict)
+def rechercher_passagers(
+    q: str,
+    ecole_id: Optional[str] = None,
+    curseur: Optional[str] = None,
+    limite: int = Query(20, ge=1, le=100)
+):
+    """
+    Recherche des passagers par nom, prénom, email, adresse ou ville
+
+    Casse et accents ignorés, fautes de frappe tolérées à partir de 3
+    caractères; résultats classés par pertinence (les préfixes d'abord) et
+    paginés par curseur.
+
+    Args:
+        q: Terme recherché
+        ecole_id: Filtrer par école (optionnel)
+        curseur: Curseur de la page suivante (next_cursor de la page précédente)
+        limite: Résultats par page
+
+    Returns:
+        Dictionnaire avec les passagers, next_cursor et has_more
+    """
+    terme = normalize_term(q)
+    if not terme:
+        raise HTTPException(status_code=400, detail="Terme de recherche vide")
+
+    params = {
+        "terme": terme,
+        "prefixe": escape_like(terme) + "%",
+        "contient": "%" + escape_like(terme) + "%",
+        "ecole_id": ecole_id,
+        "limite": limite + 1
+    }
+    if curseur:
+        params["score"], params["dernier_id"] = _lire_curseur_recherche(curseur, terme)
+
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+
+        cur.execute(_requete_recherche(terme, ecole_id, bool(curseur)), params)
+        rows = cur.fetchall()
+
+        cur.close()
+        conn.close()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la recherche des passagers: {str(e)}")
+
+    has_more = len(rows) > limite
+    rows = rows[:limite]
+    return {
+        "passagers": [_format_passager(row) for row in rows],
+        "next_cursor": _curseur_recherche(terme, rows[-1][11], str(rows[-1][0])) if has_more else None,
+        "has_more": has_more
+    }
+
+
 @router.post("/api/passagers", response_model=Dict)
-async def create_passager(passager: PassagerCreate):
+def create_passager(passager: PassagerCreate):
     """
     Crée un nouveau passager
 
@@ -158,10 +296,8 @@ async def create_passager(passager: PassagerCreate):
         Passager créé avec son ID
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        # Géocoder l'adresse si latitude/longitude ne sont pas fournis
+        # Géocoder l'adresse si latitude/longitude ne sont pas fournis, avant
+        # d'emprunter une connexion: Nominatim peut prendre plusieurs secondes
         latitude = passager.latitude
         longitude = passager.longitude
 
@@ -172,6 +308,9 @@ async def create_passager(passager: PassagerCreate):
                 longitude = lon
                 time.sleep(1)  # Rate limiting pour Nominatim
 
+        conn = get_db_connection()
+        cur = conn.cursor()
+
         cur.execute("""
             INSERT INTO public.passagers (
                 nom, prenom, email, telephone, adresse_complete, ville,
@@ -214,7 +353,7 @@ async def create_passager(passager: PassagerCreate):
 
 
 @router.put("/api/passagers/{passager_id}", response_model=Dict)
-async def update_passager(passager_id: str, passager: PassagerUpdate):
+def update_passager(passager_id: str, passager: PassagerUpdate):
     """
     Met à jour un passager
 
@@ -313,7 +452,7 @@ async def update_passager(passager_id: str, passager: PassagerUpdate):
 
 
 @router.delete("/api/passagers/{passager_id}")
-async def delete_passager(passager_id: str):
+def delete_passager(passager_id: str):
     """
     Supprime un passager
 
@@ -345,7 +484,7 @@ async def delete_passager(passager_id: str):
 
 
 @router.get("/api/passagers/disponibles/{tournee_id}", response_model=List[Dict])
-async def get_passagers_disponibles(tournee_id: str):
+def get_passagers_disponibles(tournee_id: str):
     """
     Récupère les passagers non encore inscrits à une tournée
 
@@ -401,11 +540,75 @@ class AffectationPassagers(BaseModel):
     type_arret: str = "ramassage"  # ramassage ou depose
 
 
+def _affecter_apres_geocodage(tournee_id: str, passager_id: str, type_arret: str):
+    """
+    Rappel de la file de géocodage: enregistre les coordonnées du passager
+    puis crée son arrêt en fin de tournée (s'il n'y est pas déjà)
+    """
+    def on_result(coordonnees: Optional[tuple]) -> None:
+        if coordonnees is None:
+            logger.warning(f"Géocodage impossible pour le passager {passager_id}")
+            return
+
+        conn = get_db_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE public.passagers
+                SET latitude = %s, longitude = %s
+                WHERE id = %s AND (latitude IS NULL OR longitude IS NULL)
+            """, (coordonnees[0], coordonnees[1], passager_id))
+
+            # Verrou de la tournée: numérotation sans doublon
+            cur.execute("SELECT id FROM public.tournees WHERE id = %s FOR UPDATE", (tournee_id,))
+            if cur.fetchone():
+                cur.execute("""
+                    INSERT INTO public.arrets (
+                        tournee_id, passager_id, ordre_sequence, adresse,
+                        latitude, longitude, type_arret, statut, heure_prevue
+                    )
+                    SELECT %(tournee_id)s::uuid, p.id,
+                           (SELECT COALESCE(MAX(ordre_sequence), 0) + 1
+                            FROM public.arrets WHERE tournee_id = %(tournee_id)s),
+                           p.adresse_complete, p.latitude, p.longitude,
+                           %(type_arret)s, 'planifie', '08:00'::time
+                    FROM public.passagers p
+                    WHERE p.id = %(passager_id)s
+                      AND NOT EXISTS (
+                          SELECT 1 FROM public.arrets a
+                          WHERE a.tournee_id = %(tournee_id)s AND a.passager_id = p.id
+                      )
+                """, {"tournee_id": tournee_id, "passager_id": passager_id, "type_arret": type_arret})
+                cur.execute("""
+                    UPDATE public.tournees
+                    SET nombre_passagers = (
+                        SELECT COUNT(DISTINCT passager_id)
+                        FROM public.arrets
+                        WHERE tournee_id = %s AND passager_id IS NOT NULL
+                    )
+                    WHERE id = %s
+                """, (tournee_id, tournee_id))
+            conn.commit()
+            cur.close()
+        finally:
+            conn.close()
+        get_eta_engine().remove_route(tournee_id)
+
+    return on_result
+
+
 @router.post("/api/tournees/{tournee_id}/affecter-passagers")
-async def affecter_passagers(tournee_id: str, affectation: AffectationPassagers):
+def affecter_passagers(tournee_id: str, affectation: AffectationPassagers):
     """
     Affecte des passagers à une tournée et crée les arrêts
 
+    Opération ensembliste, en une transaction et un nombre constant de
+    requêtes: les passagers déjà géolocalisés reçoivent leur arrêt via un
+    seul INSERT ... SELECT (dans l'ordre de la demande, à la suite des
+    arrêts existants). Les passagers sans coordonnées sont confiés à la
+    file de géocodage; leur arrêt est créé dès que l'adresse est résolue.
+    Les passagers déjà présents dans la tournée sont ignorés.
+
     Args:
         tournee_id: ID de la tournée
         affectation: IDs des passagers à affecter
@@ -417,74 +620,77 @@ async def affecter_passagers(tournee_id: str, affectation: AffectationPassagers)
         conn = get_db_connection()
         cur = conn.cursor()
 
-        # Vérifier que la tournée existe
-        cur.execute("SELECT id FROM public.tournees WHERE id = %s", (tournee_id,))
+        # Vérifier que la tournée existe (verrou: numérotation sans doublon)
+        cur.execute("SELECT id FROM public.tournees WHERE id = %s FOR UPDATE", (tournee_id,))
         if not cur.fetchone():
+            cur.close()
+            conn.close()
             raise HTTPException(status_code=404, detail="Tournée non trouvée")
 
-        # Récupérer le dernier ordre de séquence
-        cur.execute("""
-            SELECT COALESCE(MAX(ordre_sequence), 0)
-            FROM public.arrets
-            WHERE tournee_id = %s
-        """, (tournee_id,))
-        dernier_ordre = cur.fetchone()[0]
-
-        arrets_crees = []
-        ordre = dernier_ordre + 1
-
-        for passager_id in affectation.passager_ids:
-            # Récupérer les infos du passager
-            cur.execute("""
-                SELECT nom, prenom, adresse_complete, latitude, longitude, ville
-                FROM public.passagers
-                WHERE id = %s
-            """, (passager_id,))
-
-            passager = cur.fetchone()
-            if not passager:
-                continue
-
-            nom, prenom, adresse, lat, lon, ville = passager
-
-            # Géocoder si pas de coordonnées
-            if lat is None or lon is None:
-                if adresse and ville:
-                    lat, lon = geocode_address(adresse, ville)
-                    # Mettre à jour le passager avec les coordonnées
-                    if lat and lon:
-                        cur.execute("""
-                            UPDATE public.passagers
-                            SET latitude = %s, longitude = %s
-                            WHERE id = %s
-                        """, (lat, lon, passager_id))
-                        time.sleep(1)  # Rate limiting
-
-            # Si toujours pas de coordonnées, sauter ce passager
-            if lat is None or lon is None:
-                continue
+        params = {
+            "tournee_id": tournee_id,
+            "passager_ids": affectation.passager_ids,
+            "type_arret": affectation.type_arret
+        }
 
-            # Créer l'arrêt
-            cur.execute("""
+        # Arrêts de tous les passagers géolocalisés, numérotés à la suite
+        cur.execute("""
+            WITH demande AS (
+                SELECT d.id, MIN(d.rang) AS rang
+                FROM unnest(%(passager_ids)s::uuid[]) WITH ORDINALITY AS d(id, rang)
+                GROUP BY d.id
+            ),
+            nouveaux AS (
                 INSERT INTO public.arrets (
                     tournee_id, passager_id, ordre_sequence, adresse,
                     latitude, longitude, type_arret, statut, heure_prevue
                 )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, 'planifie', '08:00')
-                RETURNING id
-            """, (
-                tournee_id, passager_id, ordre, adresse,
-                lat, lon, affectation.type_arret
-            ))
+                SELECT %(tournee_id)s::uuid, p.id,
+                       dernier.ordre + ROW_NUMBER() OVER (ORDER BY d.rang),
+                       p.adresse_complete, p.latitude, p.longitude,
+                       %(type_arret)s, 'planifie', '08:00'::time
+                FROM demande d
+                JOIN public.passagers p ON p.id = d.id
+                CROSS JOIN (
+                    SELECT COALESCE(MAX(ordre_sequence), 0) AS ordre
+                    FROM public.arrets
+                    WHERE tournee_id = %(tournee_id)s
+                ) dernier
+                WHERE p.latitude IS NOT NULL AND p.longitude IS NOT NULL
+                  AND NOT EXISTS (
+                      SELECT 1 FROM public.arrets a
+                      WHERE a.tournee_id = %(tournee_id)s AND a.passager_id = p.id
+                  )
+                RETURNING id, passager_id, ordre_sequence, adresse
+            )
+            SELECT n.id, n.passager_id, p.prenom, p.nom, n.adresse, n.ordre_sequence
+            FROM nouveaux n
+            JOIN public.passagers p ON p.id = n.passager_id
+            ORDER BY n.ordre_sequence
+        """, params)
+        arrets_crees = [
+            {
+                "id": str(row[0]),
+                "passager_id": str(row[1]),
+                "passager": f"{row[2]} {row[3]}",
+                "adresse": row[4],
+                "ordre": row[5]
+            }
+            for row in cur.fetchall()
+        ]
 
-            arret_id = cur.fetchone()[0]
-            arrets_crees.append({
-                "id": str(arret_id),
-                "passager": f"{prenom} {nom}",
-                "adresse": adresse,
-                "ordre": ordre
-            })
-            ordre += 1
+        # Passagers à géocoder (pas encore dans la tournée)
+        cur.execute("""
+            SELECT p.id, p.adresse_complete, p.ville
+            FROM public.passagers p
+            WHERE p.id = ANY(%(passager_ids)s::uuid[])
+              AND (p.latitude IS NULL OR p.longitude IS NULL)
+              AND NOT EXISTS (
+                  SELECT 1 FROM public.arrets a
+                  WHERE a.tournee_id = %(tournee_id)s AND a.passager_id = p.id
+              )
+        """, params)
+        a_geocoder = cur.fetchall()
 
         # Mettre à jour le nombre de passagers de la tournée
         cur.execute("""
@@ -500,10 +706,30 @@ async def affecter_passagers(tournee_id: str, affectation: AffectationPassagers)
         conn.commit()
         cur.close()
         conn.close()
+        if arrets_crees:
+            get_eta_engine().remove_route(tournee_id)
+
+        # Géocodage différé: l'arrêt sera créé dès que l'adresse est résolue
+        file_geocodage = get_geocoding_queue()
+        geocodage_en_attente = []
+        sans_adresse = []
+        for passager_id, adresse, ville in a_geocoder:
+            passager_id = str(passager_id)
+            if not (adresse and ville):
+                sans_adresse.append(passager_id)
+                continue
+            file_geocodage.submit(
+                f"{tournee_id}:{passager_id}",
+                [f"{adresse}, {ville}, France", f"{ville}, France"],
+                _affecter_apres_geocodage(tournee_id, passager_id, affectation.type_arret)
+            )
+            geocodage_en_attente.append(passager_id)
 
         return {
             "message": f"{len(arrets_crees)} passager(s) affecté(s) à la tournée",
-            "arrets_crees": arrets_crees
+            "arrets_crees": arrets_crees,
+            "geocodage_en_attente": geocodage_en_attente,
+            "sans_adresse": sans_adresse
         }
     except HTTPException:
         raise
@@ -511,8 +737,196 @@ async def affecter_passagers(tournee_id: str, affectation: AffectationPassagers)
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'affectation: {str(e)}")
 
 
+class RepartitionPassagers(BaseModel):
+    """Paramètres de la répartition automatique des passagers"""
+    ecole_id: str
+    date_tournee: str  # YYYY-MM-DD
+    tournee_ids: Optional[List[str]] = None  # Défaut: tournées des bus de l'école
+    type_arret: str = "ramassage"
+    appliquer: bool = True  # False = simple proposition, sans écriture
+
+
+@router.post("/api/passagers/repartition-automatique")
+def repartir_passagers(params: RepartitionPassagers):
+    """
+    Répartit les passagers non affectés d'une école entre les tournées du jour
+
+    Tournées candidates: tournées planifiées de la date, avec bus, dont le
+    bus est rattaché à l'école (ou la liste fournie). Les places restantes de chaque
+    bus sont respectées et les groupes sont géographiquement compacts
+    (k-moyennes sous contrainte de capacité, ancrées sur les arrêts déjà
+    présents). Les arrêts sont créés en une seule insertion, à la suite des
+    arrêts existants; l'itinéraire reste à optimiser. Les tournées candidates
+    et les passagers à affecter sont verrouillés jusqu'à l'écriture: deux
+    répartitions simultanées ne peuvent ni attribuer les mêmes places ni
+    affecter deux fois le même passager. Un bus sans capacité renseignée
+    ne reçoit aucun passager.
+
+    Args:
+        params: École, date, tournées candidates et mode
+
+    Returns:
+        Nombre de passagers affectés par tournée et passagers restés sans place
+    """
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+
+        # Verrouiller les tournées candidates (ordre fixe, sans interblocage)
+        # avant de lire leur occupation: une répartition concurrente attend
+        # ici la fin de cette transaction puis lit les places restantes à jour
+        cur.execute("""
+            SELECT t.id
+            FROM public.tournees t
+            JOIN public.bus b ON b.id = t.bus_id
+            WHERE t.date_tournee = %(date)s
+              AND t.statut = 'planifiee'
+              AND (
+                  (%(tournee_ids)s::uuid[] IS NULL AND b.ecole_id = %(ecole_id)s::uuid)
+                  OR t.id = ANY(%(tournee_ids)s::uuid[])
+              )
+            ORDER BY t.id
+            FOR UPDATE OF t, b
+        """, {
+            "date": params.date_tournee,
+            "ecole_id": params.ecole_id,
+            "tournee_ids": params.tournee_ids
+        })
+        candidates = [row[0] for row in cur.fetchall()]
+
+        cur.execute("""
+            SELECT t.id, COALESCE(b.capacite, 0),
+                   COUNT(DISTINCT a.passager_id),
+                   AVG(a.latitude), AVG(a.longitude), COUNT(a.latitude),
+                   COALESCE(MAX(a.ordre_sequence), 0)
+            FROM public.tournees t
+            JOIN public.bus b ON b.id = t.bus_id
+            LEFT JOIN public.arrets a ON a.tournee_id = t.id
+            WHERE t.id = ANY(%s::uuid[])
+            GROUP BY t.id, b.capacite
+        """, ([str(tournee_id) for tournee_id in candidates],))
+        tournees = [
+            {
+                "id": str(row[0]),
+                "capacity": int(row[1]) - int(row[2]),
+                "anchor": (float(row[3]), float(row[4])) if row[3] is not None else None,
+                "anchor_weight": int(row[5]),
+                "last_order": int(row[6])
+            }
+            for row in cur.fetchall()
+        ]
+        if not tournees:
+            cur.close()
+            conn.close()
+            raise HTTPException(status_code=404, detail="Aucune tournée planifiée pour cette école à cette date")
+
+        # Passagers de l'école sans arrêt dans une tournée du jour, verrouillés
+        # jusqu'à l'écriture; ceux qu'une autre répartition est en train
+        # d'affecter (autres tournées) sont laissés à celle-ci
+        sans_arret = """
+            NOT EXISTS (
+                SELECT 1
+                FROM public.arrets a
+                JOIN public.tournees t ON t.id = a.tournee_id
+                WHERE a.passager_id = p.id
+                  AND t.date_tournee = %(date)s
+                  AND t.statut <> 'annulee'
+            )
+        """
+        cur.execute(f"""
+            SELECT p.id
+            FROM public.passagers p
+            WHERE p.ecole_id = %(ecole_id)s::uuid
+              AND {sans_arret}
+            ORDER BY p.id
+            FOR UPDATE OF p SKIP LOCKED
+        """, {"ecole_id": params.ecole_id, "date": params.date_tournee})
+        verrouilles = [str(row[0]) for row in cur.fetchall()]
+
+        # Relecture une fois les verrous pris: un passager affecté par une
+        # répartition terminée entre-temps n'est plus candidat
+        cur.execute(f"""
+            SELECT p.id, p.latitude, p.longitude, p.adresse_complete
+            FROM public.passagers p
+            WHERE p.id = ANY(%(ids)s::uuid[])
+              AND {sans_arret}
+        """, {"ids": verrouilles, "date": params.date_tournee})
+        rows = cur.fetchall()
+        geolocalises = [row for row in rows if row[1] is not None and row[2] is not None]
+        non_geolocalises = [str(row[0]) for row in rows if row[1] is None or row[2] is None]
+
+        result = allocate_passengers(
+            [(float(row[1]), float(row[2])) for row in geolocalises],
+            tournees
+        )
+
+        # Arrêts à créer, numérotés à la suite des arrêts de chaque tournée
+        prochain_ordre = {t["id"]: t["last_order"] for t in tournees}
+        nouveaux_arrets = []
+        for row, k in zip(geolocalises, result["assignment"]):
+            if k < 0:
+                continue
+            tournee_id = tournees[k]["id"]
+            prochain_ordre[tournee_id] += 1
+            nouveaux_arrets.append((
+                tournee_id, str(row[0]), prochain_ordre[tournee_id], row[3],
+                float(row[1]), float(row[2]), params.type_arret
+            ))
+
+        if params.appliquer and nouveaux_arrets:
+            execute_values(cur, """
+                INSERT INTO public.arrets (
+                    tournee_id, passager_id, ordre_sequence, adresse,
+                    latitude, longitude, type_arret, statut, heure_prevue
+                )
+                VALUES %s
+            """, nouveaux_arrets,
+                template="(%s::uuid, %s::uuid, %s, %s, %s, %s, %s, 'planifie', '08:00')",
+                page_size=len(nouveaux_arrets))
+
+            cur.execute("""
+                UPDATE public.tournees t
+                SET nombre_passagers = n.total
+                FROM (
+                    SELECT tournee_id, COUNT(DISTINCT passager_id) AS total
+                    FROM public.arrets
+                    WHERE tournee_id = ANY(%s::uuid[]) AND passager_id IS NOT NULL
+                    GROUP BY tournee_id
+                ) n
+                WHERE t.id = n.tournee_id
+            """, (sorted({arret[0] for arret in nouveaux_arrets}),))
+            conn.commit()
+
+            # Les arrêts des tournées modifiées ont changé
+            for tournee_id in {arret[0] for arret in nouveaux_arrets}:
+                get_eta_engine().remove_route(tournee_id)
+
+        cur.close()
+        conn.close()
+
+        return {
+            "success": True,
+            "applique": params.appliquer,
+            "passagers_affectes": len(nouveaux_arrets),
+            "tournees": [
+                {
+                    "tournee_id": tournee["id"],
+                    "places_restantes_avant": tournee["capacity"],
+                    "passagers_ajoutes": result["load"][k]
+                }
+                for k, tournee in enumerate(tournees)
+            ],
+            "sans_place": [str(geolocalises[i][0]) for i in result["unassigned"]],
+            "non_geolocalises": non_geolocalises
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la répartition des passagers: {str(e)}")
+
+
 @router.delete("/api/tournees/{tournee_id}/retirer-passager/{passager_id}")
-async def retirer_passager(tournee_id: str, passager_id: str):
+def retirer_passager(tournee_id: str, passager_id: str):
     """
     Retire un passager d'une tournée
 
@@ -572,142 +986,433 @@ async def retirer_passager(tournee_id: str, passager_id: str):
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
 
 
-@router.post("/api/tournees/{tournee_id}/optimiser-itineraire")
-async def optimiser_itineraire(tournee_id: str):
+class ConsolidationArrets(BaseModel):
+    """Paramètres de consolidation des arrêts d'une tournée"""
+    distance_marche_max_m: float = 300.0
+    appliquer: bool = True  # False = simple proposition, sans écriture
+
+
+@router.post("/api/tournees/{tournee_id}/consolider-arrets")
+def consolider_arrets(tournee_id: str, params: ConsolidationArrets):
     """
-    Optimise l'itinéraire de la tournée (ordre des arrêts)
-    Utilise l'algorithme VRP/VRPTW de Google OR-Tools avec calcul d'ETA
+    Remplace les arrêts porte-à-porte par des points de ramassage partagés
+
+    Choisit un minimum de points tels que chaque passager soit à moins de
+    distance_marche_max_m de son point, puis rapproche chaque point de ses
+    passagers (p-médiane). Les arrêts de la tournée sont mis à jour avec les
+    coordonnées du point partagé (un arrêt par passager est conservé).
 
     Args:
         tournee_id: ID de la tournée
+        params: Distance de marche maximale et mode d'application
 
     Returns:
-        Itinéraire optimisé avec ETA pour chaque arrêt
+        Points de ramassage retenus et affectation des passagers
     """
+    if params.distance_marche_max_m <= 0:
+        raise HTTPException(status_code=400, detail="La distance de marche doit être positive")
+
     try:
         conn = get_db_connection()
         cur = conn.cursor()
 
-        # Récupérer la tournée avec son heure de départ
+        # Partir des domiciles pour qu'une nouvelle consolidation ne dérive pas
         cur.execute("""
-            SELECT t.heure_depart, t.heure_arrivee_estimee
-            FROM public.tournees t
-            WHERE t.id = %s
+            SELECT a.id,
+                   COALESCE(p.latitude, a.latitude),
+                   COALESCE(p.longitude, a.longitude),
+                   COALESCE(p.adresse_complete, a.adresse)
+            FROM public.arrets a
+            JOIN public.passagers p ON a.passager_id = p.id
+            WHERE a.tournee_id = %s
+              AND COALESCE(p.latitude, a.latitude) IS NOT NULL
+              AND COALESCE(p.longitude, a.longitude) IS NOT NULL
+            ORDER BY a.ordre_sequence
         """, (tournee_id,))
+        arrets = cur.fetchall()
 
-        tournee_info = cur.fetchone()
-        if not tournee_info:
-            raise HTTPException(status_code=404, detail="Tournée non trouvée")
+        if not arrets:
+            cur.close()
+            conn.close()
+            return {
+                "success": False,
+                "message": "Aucun arrêt de passager géolocalisé dans cette tournée",
+                "points_ramassage": []
+            }
+
+        coordinates = [(float(row[1]), float(row[2])) for row in arrets]
+        selection = select_pickup_points(coordinates, params.distance_marche_max_m)
+
+        points = []
+        for k, (candidate, (lat, lon)) in enumerate(
+            zip(selection["candidate_indices"], selection["stops"])
+        ):
+            members = [i for i, s in enumerate(selection["assignment"]) if s == k]
+            points.append({
+                "numero": k + 1,
+                "latitude": lat,
+                "longitude": lon,
+                "adresse": f"Point de ramassage {k + 1} - {arrets[candidate][3]}",
+                "nombre_passagers": len(members),
+                "marche_max_m": max(selection["walk_meters"][i] for i in members)
+            })
+
+        if params.appliquer:
+            values = [
+                (
+                    str(row[0]),
+                    points[selection["assignment"][i]]["latitude"],
+                    points[selection["assignment"][i]]["longitude"],
+                    points[selection["assignment"][i]]["adresse"]
+                )
+                for i, row in enumerate(arrets)
+                if selection["assignment"][i] >= 0
+            ]
+            execute_values(cur, """
+                UPDATE public.arrets a
+                SET latitude = v.latitude,
+                    longitude = v.longitude,
+                    adresse = v.adresse
+                FROM (VALUES %s) AS v(id, latitude, longitude, adresse)
+                WHERE a.id = v.id::uuid
+            """, values)
+            conn.commit()
+
+        cur.close()
+        conn.close()
+
+        return {
+            "success": True,
+            "message": (
+                f"{len(arrets)} arrêt(s) regroupé(s) en {len(points)} point(s) de ramassage"
+            ),
+            "applique": params.appliquer,
+            "points_ramassage": points,
+            "passagers_non_couverts": [str(arrets[i][0]) for i in selection["uncovered"]]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la consolidation: {str(e)}")
+
+
+class PointRamassage(BaseModel):
+    """Point de ramassage candidat"""
+    latitude: float
+    longitude: float
+    adresse: Optional[str] = None
+    capacite: Optional[int] = None  # Défaut: illimitée
 
-        # Convertir time objects en strings
-        heure_depart_obj = tournee_info[0]
-        heure_arrivee_obj = tournee_info[1]
 
-        if heure_depart_obj:
-            if isinstance(heure_depart_obj, str):
-                heure_depart = heure_depart_obj
-            else:
-                heure_depart = heure_depart_obj.strftime('%H:%M')
+class AffectationPointsRamassage(BaseModel):
+    """Redéfinition des points de ramassage"""
+    points: List[PointRamassage]
+    ecole_id: Optional[str] = None  # Défaut: tous les passagers
+    distance_marche_max_m: float = 400.0
+    appliquer: bool = True  # False = simple proposition, sans écriture
+
+
+@router.post("/api/passagers/affecter-points-ramassage")
+def affecter_points_ramassage(params: AffectationPointsRamassage):
+    """
+    Réaffecte tous les passagers aux nouveaux points de ramassage
+
+    Chaque passager géolocalisé reçoit le point le plus proche à distance de
+    marche ayant encore de la place (voir assign_to_stops). Les arrêts des
+    tournées planifiées sont mis à jour en une seule requête avec les
+    coordonnées et l'adresse du point retenu.
+
+    Args:
+        params: Points candidats, école, distance de marche, mode
+
+    Returns:
+        Synthèse de l'affectation: passagers affectés, hors distance ou
+        refusés faute de place, charge et marche par point
+    """
+    if not params.points:
+        raise HTTPException(status_code=400, detail="Au moins un point de ramassage est requis")
+
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+
+        cur.execute("""
+            SELECT p.id, p.latitude, p.longitude
+            FROM public.passagers p
+            WHERE p.latitude IS NOT NULL AND p.longitude IS NOT NULL
+              AND (%(ecole_id)s::uuid IS NULL OR p.ecole_id = %(ecole_id)s::uuid)
+        """, {"ecole_id": params.ecole_id})
+        rows = cur.fetchall()
+        passager_ids = [str(row[0]) for row in rows]
+
+        result = assign_to_stops(
+            [(float(row[1]), float(row[2])) for row in rows],
+            [(point.latitude, point.longitude) for point in params.points],
+            params.distance_marche_max_m,
+            capacities=[point.capacite for point in params.points]
+        )
+
+        adresses = [
+            point.adresse or f"Point de ramassage {k + 1}"
+            for k, point in enumerate(params.points)
+        ]
+        affectes = [
+            (passager_ids[i], k)
+            for i, k in enumerate(result["assignment"]) if k >= 0
+        ]
+
+        arrets_modifies = 0
+        if params.appliquer and affectes:
+            values = [
+                (passager_id, params.points[k].latitude, params.points[k].longitude, adresses[k])
+                for passager_id, k in affectes
+            ]
+            execute_values(cur, """
+                UPDATE public.arrets a
+                SET latitude = v.latitude,
+                    longitude = v.longitude,
+                    adresse = v.adresse
+                FROM (VALUES %s) AS v(passager_id, latitude, longitude, adresse)
+                WHERE a.passager_id = v.passager_id::uuid
+                  AND a.heure_reelle IS NULL
+                  AND a.tournee_id IN (
+                      SELECT t.id FROM public.tournees t WHERE t.statut = 'planifiee'
+                  )
+            """, values, page_size=len(values))
+            arrets_modifies = cur.rowcount
+            conn.commit()
+
+        cur.close()
+        conn.close()
+
+        marches = [w for w in result["walk_meters"] if w is not None]
+        return {
+            "success": True,
+            "applique": params.appliquer,
+            "passagers": len(passager_ids),
+            "passagers_affectes": len(affectes),
+            "arrets_modifies": arrets_modifies,
+            "hors_distance": [passager_ids[i] for i in result["out_of_range"]],
+            "capacite_atteinte": [passager_ids[i] for i in result["over_capacity"]],
+            "marche_moyenne_m": round(sum(marches) / len(marches), 1) if marches else None,
+            "marche_max_m": max(marches) if marches else None,
+            "points": [
+                {
+                    "adresse": adresses[k],
+                    "latitude": point.latitude,
+                    "longitude": point.longitude,
+                    "capacite": point.capacite,
+                    "passagers": result["load"][k]
+                }
+                for k, point in enumerate(params.points)
+            ]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de l'affectation aux points de ramassage: {str(e)}")
+
+
+def _charger_itineraire(tournee_id: str) -> tuple:
+    """
+    Charge les horaires et les arrêts géolocalisés d'une tournée
+
+    Returns:
+        Tuple (heure_depart, heure_arrivee, arrêts dans l'ordre actuel,
+        nombre total d'arrêts de la tournée, capacité du bus ou None)
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+
+    # Récupérer la tournée avec son heure de départ
+    cur.execute("""
+        SELECT t.heure_depart, t.heure_arrivee_estimee,
+               (SELECT COUNT(*) FROM public.arrets a WHERE a.tournee_id = t.id),
+               b.capacite
+        FROM public.tournees t
+        LEFT JOIN public.bus b ON t.bus_id = b.id
+        WHERE t.id = %s
+    """, (tournee_id,))
+
+    tournee_info = cur.fetchone()
+    if not tournee_info:
+        cur.close()
+        conn.close()
+        raise HTTPException(status_code=404, detail="Tournée non trouvée")
+
+    # Convertir time objects en strings
+    heure_depart_obj = tournee_info[0]
+    heure_arrivee_obj = tournee_info[1]
+
+    if heure_depart_obj:
+        if isinstance(heure_depart_obj, str):
+            heure_depart = heure_depart_obj
         else:
-            heure_depart = "07:00"
+            heure_depart = heure_depart_obj.strftime('%H:%M')
+    else:
+        heure_depart = "07:00"
 
-        if heure_arrivee_obj:
-            if isinstance(heure_arrivee_obj, str):
-                heure_arrivee = heure_arrivee_obj
-            else:
-                heure_arrivee = heure_arrivee_obj.strftime('%H:%M')
+    if heure_arrivee_obj:
+        if isinstance(heure_arrivee_obj, str):
+            heure_arrivee = heure_arrivee_obj
         else:
-            heure_arrivee = "08:30"
+            heure_arrivee = heure_arrivee_obj.strftime('%H:%M')
+    else:
+        heure_arrivee = "08:30"
+
+    # Récupérer tous les arrêts avec leurs coordonnées
+    cur.execute("""
+        SELECT a.id, a.latitude, a.longitude, a.adresse,
+               a.fenetre_temps_debut, a.fenetre_temps_fin
+        FROM public.arrets a
+        WHERE a.tournee_id = %s AND a.latitude IS NOT NULL AND a.longitude IS NOT NULL
+        ORDER BY a.ordre_sequence
+    """, (tournee_id,))
+
+    stops = [
+        {
+            "id": str(row[0]),
+            "latitude": float(row[1]),
+            "longitude": float(row[2]),
+            "adresse": row[3],
+            "opening_time": row[4],
+            "closing_time": row[5]
+        }
+        for row in cur.fetchall()
+    ]
+    cur.close()
+    conn.close()
+    return heure_depart, heure_arrivee, stops, tournee_info[2], tournee_info[3]
+
+
+def _enregistrer_itineraire(
+    tournee_id: str,
+    route: List[Dict],
+    stats: Dict,
+    empreinte: str,
+    nombre_arrets: int
+) -> int:
+    """
+    Écrit l'ordre et les ETA des arrêts, puis les statistiques de la tournée
 
-        # Récupérer tous les arrêts avec leurs coordonnées
-        cur.execute("""
-            SELECT a.id, a.latitude, a.longitude, a.adresse
-            FROM public.arrets a
-            WHERE a.tournee_id = %s AND a.latitude IS NOT NULL AND a.longitude IS NOT NULL
-            ORDER BY a.ordre_sequence
-        """, (tournee_id,))
+    Une seule requête UPDATE ... FROM (VALUES ...) pour tous les arrêts;
+    seules les lignes dont l'ordre ou l'heure prévue change sont écrites
+    (moins de verrous sur arrets pendant que les chauffeurs la lisent).
 
-        arrets = cur.fetchall()
+    Returns:
+        Nombre d'arrêts modifiés
+    """
+    valeurs = stop_order_rows(route)
 
-        if len(arrets) < 2:
-            cur.close()
-            conn.close()
+    conn = get_db_connection()
+    cur = conn.cursor()
+
+    modifies = 0
+    if valeurs:
+        execute_values(cur, """
+            UPDATE public.arrets a
+            SET ordre_sequence = v.ordre,
+                heure_prevue = v.heure::time
+            FROM (VALUES %s) AS v(id, ordre, heure)
+            WHERE a.id = v.id::uuid
+              AND (a.ordre_sequence IS DISTINCT FROM v.ordre
+                   OR a.heure_prevue IS DISTINCT FROM v.heure::time)
+        """, valeurs, page_size=len(valeurs))
+        modifies = cur.rowcount
+
+    # Mettre à jour toutes les statistiques en une seule requête
+    cur.execute("""
+        UPDATE public.tournees
+        SET distance_km = %s,
+            nombre_arrets = %s,
+            empreinte_arrets = %s,
+            progression_pourcent = 0
+        WHERE id = %s
+    """, (stats['total_distance_km'], nombre_arrets, empreinte, tournee_id))
+
+    conn.commit()
+    cur.close()
+    conn.close()
+    return modifies
+
+
+@router.post("/api/tournees/{tournee_id}/optimiser-itineraire")
+async def optimiser_itineraire(
+    tournee_id: str,
+    diagnostics: bool = False,
+    x_organization_id: Optional[str] = Header(None, alias="X-Organization-ID")
+):
+    """
+    Optimise l'itinéraire de la tournée (ordre des arrêts)
+    Utilise l'algorithme VRP/VRPTW de Google OR-Tools avec calcul d'ETA
+
+    Args:
+        tournee_id: ID de la tournée
+        diagnostics: Inclure les mesures du solveur (temps par phase,
+            solutions trouvées, trajectoire de l'objectif, raison d'arrêt)
+        x_organization_id: Organisation (partage équitable du solveur)
+
+    Returns:
+        Itinéraire optimisé avec ETA pour chaque arrêt
+    """
+    try:
+        # Lecture et écriture dans des threads: aucune connexion n'est
+        # gardée pendant la résolution
+        heure_depart, heure_arrivee, stops, nombre_arrets, capacite = await asyncio.to_thread(
+            _charger_itineraire, tournee_id
+        )
+
+        if len(stops) < 2:
             return {
                 "message": "Pas assez d'arrêts pour optimiser (minimum 2 requis)",
                 "arrets_optimises": [],
                 "success": False
             }
 
-        # Préparer les données pour l'optimisation
-        stops = [
-            {
-                "id": str(row[0]),
-                "latitude": float(row[1]),
-                "longitude": float(row[2]),
-                "adresse": row[3]
-            }
-            for row in arrets
-        ]
-
         # Utiliser le premier arrêt comme dépôt (point de départ)
         depot_location = (stops[0]['latitude'], stops[0]['longitude'])
 
-        # Optimiser avec VRP/VRPTW
-        result = optimize_school_bus_route(
-            stops=stops,
-            depot_location=depot_location,
-            start_time=heure_depart,
-            school_arrival_time=heure_arrivee,
-            average_speed_kmh=30.0
-        )
+        # Optimiser avec VRP/VRPTW (hors de la boucle d'événements, sous
+        # contrôle d'admission)
+        try:
+            result = await get_solver_scheduler().run(
+                optimize_school_bus_route,
+                stops=stops,
+                depot_location=depot_location,
+                start_time=heure_depart,
+                school_arrival_time=heure_arrivee,
+                average_speed_kmh=30.0,
+                vehicle_capacity=capacite,
+                tenant=x_organization_id
+            )
+        except RateLimitError as e:
+            raise solveur_surcharge(e)
 
         if not result['success']:
-            cur.close()
-            conn.close()
-            return {
+            response = {
                 "message": result.get('message', 'Erreur lors de l\'optimisation'),
-                "success": False
+                "success": False,
+                "diagnosis": result.get('diagnosis', [])
             }
+            if diagnostics:
+                response["diagnostics"] = result.get('diagnostics')
+            return response
 
-        # Mettre à jour l'ordre et les ETA dans la base de données
         route = result['route']
-        for i, stop_info in enumerate(route):
-            if stop_info.get('stop_id'):
-                cur.execute("""
-                    UPDATE public.arrets
-                    SET ordre_sequence = %s,
-                        heure_prevue = %s
-                    WHERE id = %s
-                """, (i + 1, stop_info['arrival_time'], stop_info['stop_id']))
-
-        # Mettre à jour les statistiques de la tournée
         stats = result['statistics']
+        arrets_modifies = await asyncio.to_thread(
+            _enregistrer_itineraire, tournee_id, route, stats,
+            stop_set_fingerprint(stops, heure_depart, heure_arrivee), nombre_arrets
+        )
+        if arrets_modifies:
+            # Ordre modifié: le moteur d'ETA rechargera la tournée au prochain point GPS
+            get_eta_engine().remove_route(tournee_id)
 
-        # Mettre à jour toutes les statistiques en une seule requête
-        cur.execute("""
-            UPDATE public.tournees
-            SET distance_km = %s,
-                nombre_arrets = (
-                    SELECT COUNT(*)
-                    FROM public.arrets
-                    WHERE tournee_id = %s
-                ),
-                progression_pourcent = 0
-            WHERE id = %s
-        """, (
-            stats['total_distance_km'],
-            tournee_id,
-            tournee_id
-        ))
-
-        conn.commit()
-        cur.close()
-        conn.close()
-
-        return {
+        response = {
             "success": True,
             "message": f"Itinéraire optimisé avec succès (VRP/VRPTW)",
             "algorithm": "Google OR-Tools VRP/VRPTW",
+            "arrets_modifies": arrets_modifies,
             "arrets_optimises": [
                 {
                     "ordre": i + 1,
@@ -720,7 +1425,326 @@ async def optimiser_itineraire(tournee_id: str):
             ],
             "statistics": stats
         }
+        if diagnostics:
+            response["diagnostics"] = result.get('diagnostics')
+        return response
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'optimisation: {str(e)}")
+
+
+class ReplanificationTournee(BaseModel):
+    """Paramètres de re-planification d'une tournée en cours"""
+    latitude: Optional[float] = None  # Défaut: dernière position GPS
+    longitude: Optional[float] = None
+    ecole_latitude: Optional[float] = None  # Défaut: route ouverte
+    ecole_longitude: Optional[float] = None
+
+
+def _charger_replanification(tournee_id: str, params: ReplanificationTournee) -> tuple:
+    """
+    Charge l'état d'une tournée en cours pour la re-planification
+
+    Returns:
+        Tuple (heure_arrivee, position actuelle, nombre d'arrêts terminés,
+        arrêts restants dans l'ordre actuel)
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+
+    cur.execute("""
+        SELECT t.heure_arrivee_estimee
+        FROM public.tournees t
+        WHERE t.id = %s
+    """, (tournee_id,))
+    tournee_info = cur.fetchone()
+    if not tournee_info:
+        cur.close()
+        conn.close()
+        raise HTTPException(status_code=404, detail="Tournée non trouvée")
+    heure_arrivee = tournee_info[0].strftime('%H:%M') if tournee_info[0] else None
+
+    # Position actuelle: fournie, sinon dernier point GPS de la tournée
+    if params.latitude is not None and params.longitude is not None:
+        position = (params.latitude, params.longitude)
+    else:
+        cur.execute("""
+            SELECT latitude, longitude
+            FROM public.positions_gps
+            WHERE tournee_id = %s
+            ORDER BY timestamp_gps DESC
+            LIMIT 1
+        """, (tournee_id,))
+        row = cur.fetchone()
+        if not row:
+            cur.close()
+            conn.close()
+            raise HTTPException(
+                status_code=400,
+                detail="Aucune position GPS connue pour cette tournée"
+            )
+        position = (float(row[0]), float(row[1]))
+
+    cur.execute("""
+        SELECT COUNT(*)
+        FROM public.arrets
+        WHERE tournee_id = %s
+          AND (heure_reelle IS NOT NULL OR statut IN %s)
+    """, (tournee_id, STATUTS_ARRET_TERMINES))
+    nombre_termines = cur.fetchone()[0]
+
+    cur.execute("""
+        SELECT a.id, a.latitude, a.longitude, a.adresse,
+               a.fenetre_temps_debut, a.fenetre_temps_fin
+        FROM public.arrets a
+        WHERE a.tournee_id = %s
+          AND a.heure_reelle IS NULL
+          AND a.statut NOT IN %s
+        ORDER BY a.ordre_sequence
+    """, (tournee_id, STATUTS_ARRET_TERMINES))
+    restants = [
+        {
+            "id": str(row[0]),
+            "latitude": float(row[1]),
+            "longitude": float(row[2]),
+            "adresse": row[3],
+            "opening_time": row[4],
+            "closing_time": row[5]
+        }
+        for row in cur.fetchall()
+    ]
+    cur.close()
+    conn.close()
+    return heure_arrivee, position, nombre_termines, restants
+
+
+def _enregistrer_replanification(
+    tournee_id: str,
+    route: List[Dict],
+    nombre_termines: int,
+    retard: bool
+) -> None:
+    """Écrit le nouvel ordre et les ETA des arrêts restants, puis l'événement"""
+    if not route:
+        return
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+
+    execute_values(cur, """
+        UPDATE public.arrets a
+        SET ordre_sequence = v.ordre,
+            heure_prevue = v.heure::time
+        FROM (VALUES %s) AS v(id, ordre, heure)
+        WHERE a.id = v.id::uuid
+          AND (a.ordre_sequence IS DISTINCT FROM v.ordre
+               OR a.heure_prevue IS DISTINCT FROM v.heure::time)
+    """, stop_order_rows(route, nombre_termines))
+
+    etas = [
+        {"arret_id": stop_id, "ordre": ordre, "eta": heure}
+        for stop_id, ordre, heure in stop_order_rows(route, nombre_termines)
+    ]
+    cur.execute("""
+        INSERT INTO public.evenements
+            (tournee_id, type_evenement, titre, message, niveau_priorite)
+        VALUES (%s, 'eta_mise_a_jour', %s, %s, %s)
+    """, (
+        tournee_id,
+        "Retard: ETA recalculées" if retard else "ETA mises à jour",
+        json.dumps(etas),
+        'warning' if retard else 'info'
+    ))
+
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+@router.post("/api/tournees/{tournee_id}/replanifier")
+async def replanifier_tournee(
+    tournee_id: str,
+    params: Optional[ReplanificationTournee] = None,
+    x_organization_id: Optional[str] = Header(None, alias="X-Organization-ID")
+):
+    """
+    Re-planifie la fin d'une tournée en cours (retard, annulation)
+
+    Part de la dernière position du bus, ignore les arrêts déjà desservis ou
+    annulés, et ré-optimise uniquement les arrêts restants en partant de
+    l'ordre actuel (budget de quelques secondes). Les nouvelles ETA sont
+    enregistrées et publiées via un événement "eta_mise_a_jour".
+
+    Args:
+        tournee_id: ID de la tournée
+        params: Position actuelle et école (optionnels)
+        x_organization_id: Organisation (partage équitable du solveur)
+
+    Returns:
+        Arrêts restants avec leur nouvel ordre et leurs ETA
+    """
+    params = params or ReplanificationTournee()
+
+    try:
+        heure_arrivee, position, nombre_termines, restants = await asyncio.to_thread(
+            _charger_replanification, tournee_id, params
+        )
+
+        ecole = None
+        if params.ecole_latitude is not None and params.ecole_longitude is not None:
+            ecole = (params.ecole_latitude, params.ecole_longitude)
+
+        # Résolution hors de la boucle d'événements, sous contrôle d'admission
+        try:
+            result = await get_solver_scheduler().run(
+                replan_remaining_route,
+                position,
+                restants,
+                school_location=ecole,
+                school_arrival_time=heure_arrivee,
+                tenant=x_organization_id
+            )
+        except RateLimitError as e:
+            raise solveur_surcharge(e)
+        route = result['route']
+
+        await asyncio.to_thread(
+            _enregistrer_replanification, tournee_id, route, nombre_termines, result['late']
+        )
+        get_eta_engine().remove_route(tournee_id)
+
+        return {
+            "success": True,
+            "replanifie": result['replanned'],
+            "retard": result['late'],
+            "message": result.get('message'),
+            "arrets_restants": [
+                {
+                    "id": stop['stop_id'],
+                    "ordre": nombre_termines + i + 1,
+                    "adresse": stop.get('adresse', ''),
+                    "eta": stop['arrival_time'],
+                    "distance_cumulee_km": stop['cumulative_distance_km'],
+                    "temps_cumule_min": stop['cumulative_time_minutes']
+                }
+                for i, stop in enumerate(route)
+            ],
+            "statistics": result.get('statistics'),
+            "diagnosis": result.get('diagnosis', [])
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la re-planification: {str(e)}")
+
+
+class PositionTournee(BaseModel):
+    """Position GPS d'un bus en tournée"""
+    tournee_id: str
+    latitude: float
+    longitude: float
+    bus_id: Optional[str] = None
+    vitesse_kmh: Optional[float] = None
+    timestamp_gps: Optional[datetime] = None
+
+
+@router.post("/api/tournees/positions")
+def enregistrer_positions(positions: List[PositionTournee]):
+    """
+    Enregistre un lot de positions GPS et rafraîchit les ETA
+
+    Les ETA de toutes les tournées concernées sont recalculées en une seule
+    passe par le moteur d'ETA (sommes préfixes des trajets restants); seules
+    celles qui ont changé au-delà du seuil configuré sont écrites dans
+    arrets.heure_prevue et renvoyées.
+
+    Args:
+        positions: Positions reçues dans l'ordre chronologique
+            (plusieurs tournées possibles)
+
+    Returns:
+        Nombre de positions enregistrées et ETA modifiées
+    """
+    if not positions:
+        return {"success": True, "positions_enregistrees": 0, "eta_modifiees": []}
+
+    engine = get_eta_engine()
+
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+
+        execute_values(cur, """
+            INSERT INTO public.positions_gps
+                (tournee_id, bus_id, latitude, longitude, vitesse_kmh, timestamp_gps)
+            VALUES %s
+        """, [
+            (p.tournee_id, p.bus_id, p.latitude, p.longitude, p.vitesse_kmh,
+             p.timestamp_gps or datetime.now())
+            for p in positions
+        ], template="(%s::uuid, %s::uuid, %s, %s, %s, %s)")
+
+        # Dernière position de chaque tournée (lot reçu dans l'ordre chronologique)
+        latest = {p.tournee_id: p for p in positions}
+
+        # Charger en une requête les arrêts restants des tournées inconnues du moteur
+        a_charger = [tournee_id for tournee_id in latest if not engine.has_route(tournee_id)]
+        if a_charger:
+            cur.execute("""
+                SELECT a.tournee_id, a.id, a.latitude, a.longitude
+                FROM public.arrets a
+                JOIN public.tournees t ON t.id = a.tournee_id
+                WHERE a.tournee_id = ANY(%s::uuid[])
+                  AND t.statut = 'en_cours'
+                  AND a.heure_reelle IS NULL
+                  AND a.statut NOT IN %s
+                ORDER BY a.tournee_id, a.ordre_sequence
+            """, (a_charger, STATUTS_ARRET_TERMINES))
+            restants: Dict[str, List[Dict]] = {}
+            for row in cur.fetchall():
+                restants.setdefault(str(row[0]), []).append({
+                    "id": str(row[1]),
+                    "latitude": float(row[2]),
+                    "longitude": float(row[3])
+                })
+            for tournee_id, arrets in restants.items():
+                engine.load_route(tournee_id, arrets)
+
+        changes = engine.update(
+            {tournee_id: (p.latitude, p.longitude) for tournee_id, p in latest.items()},
+            now=datetime.now()
+        )
+
+        if changes:
+            execute_values(cur, """
+                UPDATE public.arrets a
+                SET heure_prevue = v.heure::time
+                FROM (VALUES %s) AS v(id, heure)
+                WHERE a.id = v.id::uuid
+            """, [
+                (change['stop_id'], change['eta'].strftime('%H:%M:%S'))
+                for change in changes
+            ])
+
+        conn.commit()
+        cur.close()
+        conn.close()
+
+        return {
+            "success": True,
+            "positions_enregistrees": len(positions),
+            "eta_modifiees": [
+                {
+                    "tournee_id": change['route_id'],
+                    "arret_id": change['stop_id'],
+                    "eta": change['eta'].strftime('%H:%M:%S'),
+                    "ecart_secondes": change['delta_seconds']
+                }
+                for change in changes
+            ]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de l'enregistrement des positions: {str(e)}")
@@ -1,32 +1,66 @@
 """
 Endpoint de résumé pour le tableau de bord
 """
-from fastapi import APIRouter, HTTPException
-from typing import Dict, List
+from fastapi import APIRouter, Depends, Header
+from typing import Dict, List, Optional
 from datetime import datetime, date
-import psycopg2
-from api.config import settings
+from api.database import get_db_connection, connection_scope
+from api.streaming import ndjson_demande, stream_rows
+from api.core.exceptions import DatabaseError
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(connection_scope)])
 
 
-def get_db_connection():
-    """Créer une connexion à la base de données"""
-    try:
-        conn = psycopg2.connect(
-            host=settings.database_host,
-            port=settings.database_port,
-            dbname=settings.database_name,
-            user=settings.database_user,
-            password=settings.database_password
-        )
-        return conn
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur de connexion à la base de données: {str(e)}")
+# Présence de dashboard_compteurs, vérifiée une fois: seule une absence est
+# revérifiée (migration appliquée sans redémarrer l'API)
+_compteurs_disponibles = False
+
+
+def _lire_compteurs(cur, jour: date) -> Dict[str, Dict[str, float]]:
+    """
+    Lit les compteurs du tableau de bord, toutes organisations confondues
+
+    Args:
+        cur: Curseur de la connexion
+        jour: Jour des compteurs journaliers
+
+    Returns:
+        {"etat": compteurs d'état et cumuls, "jour": compteurs du jour}
+
+    Raises:
+        DatabaseError: Table dashboard_compteurs absente (migration
+            create_dashboard_counters / migration_postgres.sql non appliquée)
+    """
+    global _compteurs_disponibles
+    if not _compteurs_disponibles:
+        cur.execute("SELECT to_regclass('public.dashboard_compteurs') IS NOT NULL")
+        if not cur.fetchone()[0]:
+            raise DatabaseError(
+                "Table dashboard_compteurs absente: appliquer la migration "
+                "create_dashboard_counters (ou migration_postgres.sql)",
+                operation="summary"
+            )
+        _compteurs_disponibles = True
+
+    cur.execute("""
+        SELECT jour = %s, indicateur, SUM(valeur)
+        FROM public.dashboard_compteurs
+        WHERE jour IN ('-infinity', %s)
+        GROUP BY jour, indicateur
+    """, (jour, jour))
+    compteurs = {"etat": {}, "jour": {}}
+    for du_jour, indicateur, valeur in cur.fetchall():
+        compteurs["jour" if du_jour else "etat"][indicateur] = float(valeur or 0)
+    return compteurs
+
+
+def _moyenne(somme: Optional[float], nombre: Optional[float]) -> float:
+    """Moyenne arrondie à 0,1 (0 sans valeur)"""
+    return round(somme / nombre, 1) if somme and nombre else 0
 
 
 @router.get("/summary", response_model=Dict)
-async def get_summary():
+def get_summary():
     """
     Retourne un résumé des données pour le tableau de bord admin
 
@@ -39,30 +73,12 @@ async def get_summary():
 
         today = date.today()
 
-        # Statistiques des tournées
-        cur.execute("""
-            SELECT
-                COUNT(*) FILTER (WHERE statut = 'en_cours') as tournees_actives,
-                COUNT(*) FILTER (WHERE statut = 'planifiee') as tournees_planifiees,
-                COUNT(*) FILTER (WHERE statut = 'terminee' AND COALESCE(date, date_tournee) = %s) as tournees_terminees_aujourdhui
-            FROM public.tournees
-        """, (today,))
-        tournee_stats = cur.fetchone()
-
-        # Statistiques des passagers
-        cur.execute("SELECT COUNT(*) FROM public.passagers")
-        total_passagers = cur.fetchone()[0] or 0
-
-        # Statistiques des bus
-        cur.execute("""
-            SELECT
-                COUNT(*) as total_bus,
-                COUNT(*) FILTER (WHERE statut = 'en_service') as bus_en_service,
-                COUNT(*) FILTER (WHERE statut = 'disponible') as bus_disponibles,
-                COUNT(*) FILTER (WHERE statut = 'maintenance') as bus_maintenance
-            FROM public.bus
-        """)
-        bus_stats = cur.fetchone()
+        # Compteurs maintenus par triggers (migration create_dashboard_counters,
+        # migration_postgres.sql): état courant et cumuls sous '-infinity',
+        # tournées terminées par jour
+        compteurs = _lire_compteurs(cur, today)
+        etat = compteurs["etat"]
+        terminees = etat.get("terminees", 0)
 
         # Tournées du jour
         cur.execute("""
@@ -85,19 +101,6 @@ async def get_summary():
                 "bus": row[5] or "N/A"
             })
 
-        # Performances (moyennes sur les tournées terminées)
-        cur.execute("""
-            SELECT
-                AVG(CASE WHEN heure_arrivee_reelle <= heure_arrivee_estimee THEN 100 ELSE 0 END) as taux_ponctualite,
-                AVG(COALESCE(distance_km, distance_totale_km, 0)) as distance_moyenne,
-                AVG(EXTRACT(EPOCH FROM (heure_arrivee_reelle - heure_depart))/60) as duree_moyenne,
-                AVG(CASE WHEN nombre_passagers > 0 THEN (nombre_passagers * 100.0 / NULLIF(capacite_max, 0)) ELSE 0 END) as taux_occupation
-            FROM public.tournees t
-            LEFT JOIN public.bus b ON t.bus_id = b.id
-            WHERE t.statut = 'terminee'
-        """)
-        perf_stats = cur.fetchone()
-
         # Alertes (tournées en retard ou problèmes)
         cur.execute("""
             SELECT t.id, COALESCE(t.nom, t.nom_tournee) as nom, 'retard' as type_alerte,
@@ -123,22 +126,22 @@ async def get_summary():
         return {
             "timestamp": datetime.utcnow().isoformat(),
             "statistiques": {
-                "tournees_actives": tournee_stats[0] or 0,
-                "tournees_planifiees": tournee_stats[1] or 0,
-                "tournees_terminees_aujourdhui": tournee_stats[2] or 0,
-                "total_passagers": total_passagers,
-                "total_bus": bus_stats[0] or 0,
-                "bus_en_service": bus_stats[1] or 0,
-                "bus_disponibles": bus_stats[2] or 0,
-                "bus_maintenance": bus_stats[3] or 0
+                "tournees_actives": int(etat.get("tournees:en_cours", 0)),
+                "tournees_planifiees": int(etat.get("tournees:planifiee", 0)),
+                "tournees_terminees_aujourdhui": int(compteurs["jour"].get("terminees", 0)),
+                "total_passagers": int(etat.get("passagers", 0)),
+                "total_bus": int(etat.get("bus", 0)),
+                "bus_en_service": int(etat.get("bus:en_service", 0)),
+                "bus_disponibles": int(etat.get("bus:disponible", 0)),
+                "bus_maintenance": int(etat.get("bus:maintenance", 0))
             },
             "alertes": alertes,
             "tournees_du_jour": tournees_jour,
             "performances": {
-                "taux_ponctualite": round(perf_stats[0] or 0, 1),
-                "distance_moyenne_km": round(perf_stats[1] or 0, 1),
-                "duree_moyenne_minutes": round(perf_stats[2] or 0, 1),
-                "taux_occupation": round(perf_stats[3] or 0, 1)
+                "taux_ponctualite": _moyenne(etat.get("ponctualite"), terminees),
+                "distance_moyenne_km": _moyenne(etat.get("distance_km"), terminees),
+                "duree_moyenne_minutes": _moyenne(etat.get("duree_minutes"), etat.get("duree_nombre")),
+                "taux_occupation": _moyenne(etat.get("occupation"), etat.get("occupation_nombre"))
             }
         }
 
@@ -169,63 +172,75 @@ async def get_summary():
         }
 
 
+def _format_tournee_resume(row) -> Dict:
+    """Ligne du résumé des tournées -> dictionnaire"""
+    return {
+        "id": str(row[0]),
+        "nom": row[1],
+        "date": str(row[2]),
+        "heure_depart": str(row[3]),
+        "heure_arrivee_estimee": str(row[4]),
+        "statut": row[5],
+        "nombre_passagers": row[6],
+        "distance_km": float(row[7]) if row[7] else 0,
+        "bus": {
+            "id": str(row[8]) if row[8] else "",
+            "numero": row[9] if row[9] else "N/A",
+            "immatriculation": row[10] if row[10] else "N/A"
+        },
+        "nombre_arrets": row[11],
+        "progression_pourcent": row[12]
+    }
+
+
+# Toutes les tournées avec leurs informations de bus
+REQUETE_TOURNEES = """
+    SELECT t.id,
+           COALESCE(t.nom, t.nom_tournee) as nom,
+           COALESCE(t.date, t.date_tournee) as date,
+           t.heure_depart,
+           t.heure_arrivee_estimee,
+           t.statut,
+           t.nombre_passagers,
+           COALESCE(t.distance_km, t.distance_totale_km, 0) as distance_km,
+           b.id as bus_id,
+           b.numero_bus,
+           b.immatriculation,
+           COALESCE(t.nombre_arrets, COUNT(a.id), 0) as nombre_arrets,
+           COALESCE(t.progression_pourcent, 0) as progression_pourcent
+    FROM public.tournees t
+    LEFT JOIN public.bus b ON t.bus_id = b.id
+    LEFT JOIN public.arrets a ON t.id = a.tournee_id
+    GROUP BY t.id, t.nom, t.nom_tournee, t.date, t.date_tournee,
+             t.heure_depart, t.heure_arrivee_estimee, t.statut,
+             t.nombre_passagers, t.distance_km, t.distance_totale_km,
+             t.nombre_arrets, t.progression_pourcent,
+             b.id, b.numero_bus, b.immatriculation
+    ORDER BY COALESCE(t.date, t.date_tournee) DESC, t.heure_depart ASC
+"""
+
+
 @router.get("/summary/tournees", response_model=Dict)
-async def get_tournees_summary():
+def get_tournees_summary(stream: bool = False, accept: Optional[str] = Header(None)):
     """
     Retourne un résumé détaillé des tournées
 
+    Args:
+        stream: Renvoyer une tournée par ligne (NDJSON) au fil de la lecture,
+            sans total ni enveloppe (aussi avec Accept: application/x-ndjson)
+
     Returns:
         Dict contenant la liste des tournées avec leurs détails
     """
+    if ndjson_demande(stream, accept):
+        return stream_rows(REQUETE_TOURNEES, None, _format_tournee_resume)
+
     try:
         conn = get_db_connection()
         cur = conn.cursor()
 
-        # Récupérer toutes les tournées avec leurs informations de bus
-        cur.execute("""
-            SELECT t.id,
-                   COALESCE(t.nom, t.nom_tournee) as nom,
-                   COALESCE(t.date, t.date_tournee) as date,
-                   t.heure_depart,
-                   t.heure_arrivee_estimee,
-                   t.statut,
-                   t.nombre_passagers,
-                   COALESCE(t.distance_km, t.distance_totale_km, 0) as distance_km,
-                   b.id as bus_id,
-                   b.numero_bus,
-                   b.immatriculation,
-                   COALESCE(t.nombre_arrets, COUNT(a.id), 0) as nombre_arrets,
-                   COALESCE(t.progression_pourcent, 0) as progression_pourcent
-            FROM public.tournees t
-            LEFT JOIN public.bus b ON t.bus_id = b.id
-            LEFT JOIN public.arrets a ON t.id = a.tournee_id
-            GROUP BY t.id, t.nom, t.nom_tournee, t.date, t.date_tournee,
-                     t.heure_depart, t.heure_arrivee_estimee, t.statut,
-                     t.nombre_passagers, t.distance_km, t.distance_totale_km,
-                     t.nombre_arrets, t.progression_pourcent,
-                     b.id, b.numero_bus, b.immatriculation
-            ORDER BY COALESCE(t.date, t.date_tournee) DESC, t.heure_depart ASC
-        """)
-
-        tournees = []
-        for row in cur.fetchall():
-            tournees.append({
-                "id": str(row[0]),
-                "nom": row[1],
-                "date": str(row[2]),
-                "heure_depart": str(row[3]),
-                "heure_arrivee_estimee": str(row[4]),
-                "statut": row[5],
-                "nombre_passagers": row[6],
-                "distance_km": float(row[7]) if row[7] else 0,
-                "bus": {
-                    "id": str(row[8]) if row[8] else "",
-                    "numero": row[9] if row[9] else "N/A",
-                    "immatriculation": row[10] if row[10] else "N/A"
-                },
-                "nombre_arrets": row[11],
-                "progression_pourcent": row[12]
-            })
+        cur.execute(REQUETE_TOURNEES)
+        tournees = [_format_tournee_resume(row) for row in cur.fetchall()]
 
         cur.close()
         conn.close()
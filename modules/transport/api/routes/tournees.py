@@ -1,14 +1,22 @@
 """
 Endpoints pour la gestion des tournées
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Header
 from typing import List, Dict, Optional
 from datetime import datetime, date
 from pydantic import BaseModel
-import psycopg2
-from api.config import settings
+import asyncio
+from psycopg2.extras import execute_values
+from api.database import get_db_connection, connection_scope
+from api.streaming import ndjson_demande, stream_rows
+from api.services.optimization.batch import (
+    BatchOptimizationJob, create_job, get_job, optimize_tournees, stop_order_rows,
+    stop_set_fingerprint
+)
+from api.services.optimization.eta import get_eta_engine
+from api.services.optimization.assignment import assign_buses
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(connection_scope)])
 
 
 class TourneeCreate(BaseModel):
@@ -33,23 +41,8 @@ class TourneeUpdate(BaseModel):
     nombre_passagers: Optional[int] = None
 
 
-def get_db_connection():
-    """Créer une connexion à la base de données"""
-    try:
-        conn = psycopg2.connect(
-            host=settings.database_host,
-            port=settings.database_port,
-            dbname=settings.database_name,
-            user=settings.database_user,
-            password=settings.database_password
-        )
-        return conn
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur de connexion à la base de données: {str(e)}")
-
-
 @router.post("/api/tournees", response_model=Dict)
-async def create_tournee(tournee: TourneeCreate):
+def create_tournee(tournee: TourneeCreate):
     """
     Crée une nouvelle tournée
 
@@ -104,43 +97,54 @@ async def create_tournee(tournee: TourneeCreate):
         raise HTTPException(status_code=500, detail=f"Erreur lors de la création de la tournée: {str(e)}")
 
 
+def _format_tournee(row) -> Dict:
+    """Ligne de la liste des tournées -> dictionnaire"""
+    return {
+        "id": str(row[0]),
+        "nom_tournee": row[1],
+        "bus_id": str(row[2]),
+        "date_tournee": str(row[3]),
+        "heure_depart": str(row[4]),
+        "heure_arrivee_estimee": str(row[5]),
+        "statut": row[6],
+        "nombre_passagers": row[7],
+        "bus": {
+            "numero_bus": row[8],
+            "immatriculation": row[9]
+        }
+    }
+
+
 @router.get("/api/tournees", response_model=List[Dict])
-async def get_tournees():
+def get_tournees(stream: bool = False, accept: Optional[str] = Header(None)):
     """
     Récupère la liste de toutes les tournées
 
+    Args:
+        stream: Renvoyer une tournée par ligne (NDJSON) au fil de la lecture,
+            sans charger toute la liste (aussi avec Accept: application/x-ndjson)
+
     Returns:
         Liste des tournées
     """
+    query = """
+        SELECT t.id, t.nom_tournee, t.bus_id, t.date_tournee, t.heure_depart,
+               t.heure_arrivee_estimee, t.statut, t.nombre_passagers,
+               b.numero_bus, b.immatriculation
+        FROM public.tournees t
+        LEFT JOIN public.bus b ON t.bus_id = b.id
+        ORDER BY t.date_tournee DESC, t.heure_depart ASC
+    """
+
+    if ndjson_demande(stream, accept):
+        return stream_rows(query, None, _format_tournee)
+
     try:
         conn = get_db_connection()
         cur = conn.cursor()
 
-        cur.execute("""
-            SELECT t.id, t.nom_tournee, t.bus_id, t.date_tournee, t.heure_depart,
-                   t.heure_arrivee_estimee, t.statut, t.nombre_passagers,
-                   b.numero_bus, b.immatriculation
-            FROM public.tournees t
-            LEFT JOIN public.bus b ON t.bus_id = b.id
-            ORDER BY t.date_tournee DESC, t.heure_depart ASC
-        """)
-
-        tournees = []
-        for row in cur.fetchall():
-            tournees.append({
-                "id": str(row[0]),
-                "nom_tournee": row[1],
-                "bus_id": str(row[2]),
-                "date_tournee": str(row[3]),
-                "heure_depart": str(row[4]),
-                "heure_arrivee_estimee": str(row[5]),
-                "statut": row[6],
-                "nombre_passagers": row[7],
-                "bus": {
-                    "numero_bus": row[8],
-                    "immatriculation": row[9]
-                }
-            })
+        cur.execute(query)
+        tournees = [_format_tournee(row) for row in cur.fetchall()]
 
         cur.close()
         conn.close()
@@ -151,7 +155,7 @@ async def get_tournees():
 
 
 @router.get("/api/tournees/{tournee_id}", response_model=Dict)
-async def get_tournee(tournee_id: str):
+def get_tournee(tournee_id: str):
     """
     Récupère les détails d'une tournée spécifique avec ses arrêts
 
@@ -237,7 +241,7 @@ async def get_tournee(tournee_id: str):
 
 
 @router.put("/api/tournees/{tournee_id}", response_model=Dict)
-async def update_tournee(tournee_id: str, tournee: TourneeUpdate):
+def update_tournee(tournee_id: str, tournee: TourneeUpdate):
     """
     Met à jour une tournée existante
 
@@ -322,7 +326,7 @@ async def update_tournee(tournee_id: str, tournee: TourneeUpdate):
 
 
 @router.delete("/api/tournees/{tournee_id}")
-async def delete_tournee(tournee_id: str):
+def delete_tournee(tournee_id: str):
     """
     Supprime une tournée
 
@@ -351,3 +355,372 @@ async def delete_tournee(tournee_id: str):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la suppression de la tournée: {str(e)}")
+
+
+class OptimisationJournee(BaseModel):
+    """Paramètres de l'optimisation par lot d'une journée"""
+    date_tournee: str  # YYYY-MM-DD
+    force: bool = False  # Ré-optimiser même les tournées inchangées
+
+
+def _format_heure(valeur, defaut: str) -> str:
+    """Heure TIME (ou chaîne) au format HH:MM"""
+    if not valeur:
+        return defaut
+    return valeur if isinstance(valeur, str) else valeur.strftime('%H:%M')
+
+
+def _charger_tournees_du_jour(date_tournee: str) -> List[Dict]:
+    """
+    Charge en une requête les tournées planifiées d'une date et leurs arrêts
+
+    Returns:
+        Tournées [{tournee_id, start_time, school_arrival_time, stops,
+        vehicle_capacity, fingerprint, previous_fingerprint}]
+    """
+    # Exécuté en tâche de fond, hors connection_scope: la connexion est
+    # rendue au pool même en cas d'erreur
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT t.id, t.heure_depart, t.heure_arrivee_estimee, t.empreinte_arrets,
+                   a.id, a.latitude, a.longitude, a.adresse,
+                   a.fenetre_temps_debut, a.fenetre_temps_fin,
+                   b.capacite
+            FROM public.tournees t
+            LEFT JOIN public.bus b ON t.bus_id = b.id
+            LEFT JOIN public.arrets a
+                   ON a.tournee_id = t.id
+                  AND a.latitude IS NOT NULL AND a.longitude IS NOT NULL
+            WHERE t.date_tournee = %s
+              AND t.statut = 'planifiee'
+            ORDER BY t.id, a.ordre_sequence
+        """, (date_tournee,))
+        rows = cur.fetchall()
+        cur.close()
+
+    tournees: Dict[str, Dict] = {}
+    for row in rows:
+        tournee_id = str(row[0])
+        tournee = tournees.get(tournee_id)
+        if tournee is None:
+            tournee = tournees[tournee_id] = {
+                "tournee_id": tournee_id,
+                "start_time": _format_heure(row[1], "07:00"),
+                "school_arrival_time": _format_heure(row[2], "08:30"),
+                "previous_fingerprint": row[3],
+                "vehicle_capacity": row[10],
+                "stops": []
+            }
+        if row[4] is not None:
+            tournee["stops"].append({
+                "id": str(row[4]),
+                "latitude": float(row[5]),
+                "longitude": float(row[6]),
+                "adresse": row[7],
+                "opening_time": row[8],
+                "closing_time": row[9]
+            })
+
+    for tournee in tournees.values():
+        tournee["fingerprint"] = stop_set_fingerprint(
+            tournee["stops"], tournee["start_time"], tournee["school_arrival_time"]
+        )
+    return list(tournees.values())
+
+
+def _enregistrer_resultats(resultats: List[Dict]) -> None:
+    """Écrit en deux requêtes l'ordre et les ETA de toutes les tournées optimisées"""
+    # Tâche de fond (voir _charger_tournees_du_jour): connexion rendue au
+    # pool, transaction annulée, même si une écriture échoue
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+
+        execute_values(cur, """
+            UPDATE public.arrets a
+            SET ordre_sequence = v.ordre,
+                heure_prevue = v.heure::time
+            FROM (VALUES %s) AS v(id, ordre, heure)
+            WHERE a.id = v.id::uuid
+              AND (a.ordre_sequence IS DISTINCT FROM v.ordre
+                   OR a.heure_prevue IS DISTINCT FROM v.heure::time)
+        """, [
+            row
+            for resultat in resultats
+            for row in stop_order_rows(resultat['route'])
+        ], page_size=1000)
+
+        execute_values(cur, """
+            UPDATE public.tournees t
+            SET distance_km = v.distance,
+                nombre_arrets = v.nombre,
+                empreinte_arrets = v.empreinte,
+                progression_pourcent = 0
+            FROM (VALUES %s) AS v(id, distance, nombre, empreinte)
+            WHERE t.id = v.id::uuid
+        """, [
+            (
+                resultat['tournee_id'],
+                resultat['statistics']['total_distance_km'],
+                len(stop_order_rows(resultat['route'])),
+                resultat['fingerprint']
+            )
+            for resultat in resultats
+        ])
+
+        conn.commit()
+        cur.close()
+
+
+async def _executer_optimisation_journee(
+    job: BatchOptimizationJob,
+    organisation_id: Optional[str]
+) -> None:
+    """Optimise les tournées de la journée et met à jour la progression du travail"""
+    job.status = "running"
+    try:
+        tournees = await asyncio.to_thread(_charger_tournees_du_jour, job.date_tournee)
+        job.total = len(tournees)
+
+        a_optimiser = []
+        for tournee in tournees:
+            if len(tournee["stops"]) < 2:
+                job.record(tournee["tournee_id"], "skipped", reason="Moins de 2 arrêts")
+            elif not job.force and tournee["fingerprint"] == tournee["previous_fingerprint"]:
+                job.record(tournee["tournee_id"], "skipped", reason="Arrêts inchangés")
+            else:
+                a_optimiser.append(tournee)
+
+        resultats = []
+
+        def on_result(outcome: Dict) -> None:
+            if outcome["success"]:
+                resultats.append(outcome)
+                job.record(
+                    outcome["tournee_id"], "optimized",
+                    distance_km=outcome["statistics"].get("total_distance_km"),
+                    duree_minutes=outcome["statistics"].get("total_time_minutes"),
+                    nombre_arrets=len(stop_order_rows(outcome["route"]))
+                )
+            else:
+                job.record(
+                    outcome["tournee_id"], "failed",
+                    message=outcome.get("message"),
+                    diagnosis=outcome.get("diagnosis", [])
+                )
+
+        await optimize_tournees(a_optimiser, on_result, tenant=organisation_id)
+
+        if resultats:
+            await asyncio.to_thread(_enregistrer_resultats, resultats)
+            engine = get_eta_engine()
+            for resultat in resultats:
+                engine.remove_route(resultat["tournee_id"])
+
+        job.status = "completed"
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(getattr(e, "detail", e))
+    finally:
+        job.finished_at = datetime.now()
+
+
+@router.post("/api/tournees/optimiser-journee", status_code=202)
+async def optimiser_journee(
+    params: OptimisationJournee,
+    background_tasks: BackgroundTasks,
+    x_organization_id: Optional[str] = Header(None, alias="X-Organization-ID")
+):
+    """
+    Optimise en arrière-plan toutes les tournées planifiées d'une date
+
+    Les tournées et leurs arrêts sont chargés en une requête; les tournées
+    dont l'ensemble d'arrêts et les horaires n'ont pas changé depuis la
+    dernière optimisation sont ignorées (sauf force=true). Les résolutions
+    sont réparties sur un pool de processus, puis l'ordre et les ETA sont
+    écrits en une seule fois.
+
+    Args:
+        params: Date des tournées et option force
+        x_organization_id: Organisation (partage équitable du solveur)
+
+    Returns:
+        Identifiant du travail, à suivre via GET /api/tournees/optimisations/{job_id}
+    """
+    try:
+        date.fromisoformat(params.date_tournee)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Date invalide (format attendu: YYYY-MM-DD)")
+
+    job = create_job(params.date_tournee, params.force)
+    background_tasks.add_task(_executer_optimisation_journee, job, x_organization_id)
+    return job.to_dict()
+
+
+@router.get("/api/tournees/optimisations/{job_id}")
+async def get_optimisation_journee(job_id: str):
+    """
+    Progression et résultat par tournée d'une optimisation par lot
+
+    Args:
+        job_id: Identifiant renvoyé par POST /api/tournees/optimiser-journee
+
+    Returns:
+        Avancement (total, done, progress_percent) et statut de chaque tournée
+    """
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Optimisation non trouvée")
+    return job.to_dict()
+
+
+class AffectationBus(BaseModel):
+    """Paramètres de l'affectation automatique des bus"""
+    date_tournee: str  # YYYY-MM-DD
+    reaffecter: bool = False  # Inclure les tournées qui ont déjà un bus
+    appliquer: bool = True  # False = simple proposition, sans écriture
+    cout_place_vide_km: float = 0.2  # Pénalité par place inutilisée
+
+
+def _minutes(valeur) -> Optional[int]:
+    """Heure TIME en minutes depuis minuit"""
+    return valeur.hour * 60 + valeur.minute if valeur is not None else None
+
+
+@router.post("/api/tournees/affecter-bus")
+def affecter_bus(params: AffectationBus):
+    """
+    Affecte les bus disponibles aux tournées planifiées d'une date
+
+    Couplage de coût minimal entre bus (statut "disponible") et tournées:
+    haut-le-pied du dépôt du bus (ou de sa dernière position GPS) au premier
+    arrêt, plus une pénalité par place vide. Les couples de capacité
+    insuffisante ou dont le bus est déjà pris sur le créneau sont exclus.
+    Chaque bus reçoit au plus une des tournées affectées.
+
+    Args:
+        params: Date, mode (proposition ou application) et pondération
+
+    Returns:
+        Affectations retenues, tournées sans bus et coût total
+    """
+    try:
+        date.fromisoformat(params.date_tournee)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Date invalide (format attendu: YYYY-MM-DD)")
+
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+
+        cur.execute("""
+            SELECT t.id, t.heure_depart,
+                   COALESCE(
+                       t.heure_arrivee_estimee,
+                       t.heure_depart + make_interval(mins => COALESCE(t.duree_estimee_minutes, 90))
+                   ),
+                   GREATEST(COALESCE(t.nombre_passagers, 0), COUNT(DISTINCT a.passager_id)),
+                   premier.latitude, premier.longitude
+            FROM public.tournees t
+            LEFT JOIN public.arrets a ON a.tournee_id = t.id
+            LEFT JOIN LATERAL (
+                SELECT p.latitude, p.longitude
+                FROM public.arrets p
+                WHERE p.tournee_id = t.id AND p.latitude IS NOT NULL
+                ORDER BY p.ordre_sequence
+                LIMIT 1
+            ) premier ON true
+            WHERE t.date_tournee = %s
+              AND t.statut = 'planifiee'
+              AND (%s OR t.bus_id IS NULL)
+            GROUP BY t.id, premier.latitude, premier.longitude
+        """, (params.date_tournee, params.reaffecter))
+        tournees = [
+            {
+                "id": str(row[0]),
+                "start_minutes": _minutes(row[1]),
+                "end_minutes": _minutes(row[2]),
+                "demand": int(row[3]),
+                "first_stop": (float(row[4]), float(row[5])) if row[4] is not None else None
+            }
+            for row in cur.fetchall()
+        ]
+
+        cur.execute("""
+            SELECT b.id, b.numero_bus, b.capacite,
+                   COALESCE(b.depot_latitude, g.latitude),
+                   COALESCE(b.depot_longitude, g.longitude)
+            FROM public.bus b
+            LEFT JOIN LATERAL (
+                SELECT p.latitude, p.longitude
+                FROM public.positions_gps p
+                WHERE p.bus_id = b.id
+                ORDER BY p.timestamp_gps DESC
+                LIMIT 1
+            ) g ON true
+            WHERE b.statut = 'disponible'
+        """)
+        buses = [
+            {
+                "id": str(row[0]),
+                "numero_bus": row[1],
+                "capacite": row[2],
+                "depot": (float(row[3]), float(row[4])) if row[3] is not None else None
+            }
+            for row in cur.fetchall()
+        ]
+        bus_index = {bus["id"]: i for i, bus in enumerate(buses)}
+
+        # Créneaux déjà pris par les tournées du jour qui gardent leur bus
+        cur.execute("""
+            SELECT t.bus_id, t.heure_depart,
+                   COALESCE(
+                       t.heure_arrivee_estimee,
+                       t.heure_depart + make_interval(mins => COALESCE(t.duree_estimee_minutes, 90))
+                   )
+            FROM public.tournees t
+            WHERE t.date_tournee = %s
+              AND t.bus_id IS NOT NULL
+              AND t.statut <> 'annulee'
+              AND NOT (t.id = ANY(%s::uuid[]))
+        """, (params.date_tournee, [t["id"] for t in tournees]))
+        busy = [
+            (bus_index[str(row[0])], _minutes(row[1]), _minutes(row[2]))
+            for row in cur.fetchall()
+            if str(row[0]) in bus_index
+        ]
+
+        result = assign_buses(
+            buses, tournees,
+            empty_seat_cost_km=params.cout_place_vide_km,
+            busy=busy
+        )
+
+        if params.appliquer and result["assignments"]:
+            execute_values(cur, """
+                UPDATE public.tournees t
+                SET bus_id = v.bus_id::uuid
+                FROM (VALUES %s) AS v(id, bus_id)
+                WHERE t.id = v.id::uuid
+            """, [(a["tournee_id"], a["bus_id"]) for a in result["assignments"]])
+            conn.commit()
+
+        cur.close()
+        conn.close()
+
+        numeros = {bus["id"]: bus["numero_bus"] for bus in buses}
+        for affectation in result["assignments"]:
+            affectation["numero_bus"] = numeros[affectation["bus_id"]]
+
+        return {
+            "success": True,
+            "applique": params.appliquer,
+            "affectations": result["assignments"],
+            "non_affectees": result["unassigned"],
+            "cout_total": result["total_cost"],
+            "haut_le_pied_total_km": result["total_deadhead_km"]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de l'affectation des bus: {str(e)}")
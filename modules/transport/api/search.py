@@ -0,0 +1,24 @@
+"""
+Recherche textuelle: normalisation des termes
+Les termes sont comparés à public.search_normalize(champ) (minuscules, sans
+accents), l'expression des index trigrammes et préfixes de la migration
+add_trigram_search_indexes
+"""
+import unicodedata
+from typing import Optional
+
+# Longueur minimale d'un terme pour la recherche par trigrammes; en deçà,
+# recherche par préfixe seulement (pas de trigramme utile)
+MIN_TRIGRAM_LENGTH = 3
+
+
+def normalize_term(term: Optional[str]) -> str:
+    """Équivalent Python de search_normalize(): minuscules, sans accents, espaces réduits"""
+    decomposed = unicodedata.normalize("NFKD", (term or "").strip())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.lower().replace("œ", "oe").replace("æ", "ae").split())
+
+
+def escape_like(term: str) -> str:
+    """Échappe les caractères spéciaux de LIKE (caractère d'échappement: \\)"""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
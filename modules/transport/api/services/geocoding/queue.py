@@ -0,0 +1,135 @@
+"""
+File de géocodage en arrière-plan
+Un seul thread consomme les demandes en respectant la limite de débit de
+Nominatim (1 requête par seconde), sans bloquer les requêtes HTTP
+"""
+
+import logging
+import queue
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, List, Optional, Set, Tuple
+
+from geopy.geocoders import Nominatim
+
+logger = logging.getLogger(__name__)
+
+# Politique d'utilisation de Nominatim: au plus une requête par seconde
+MIN_INTERVAL_SECONDS = 1.0
+
+Coordinates = Tuple[float, float]
+
+
+class GeocodingQueue:
+    """
+    Géocodage différé, à débit limité
+
+    Chaque demande porte une liste de requêtes essayées dans l'ordre (par
+    exemple adresse complète puis ville seule) et un rappel appelé, dans le
+    thread de la file, avec les coordonnées trouvées ou None. Une demande
+    dont la clé est déjà en attente est ignorée.
+
+    Usage:
+        get_geocoding_queue().submit(
+            passager_id,
+            [f"{adresse}, {ville}, France", f"{ville}, France"],
+            lambda coords: enregistrer(passager_id, coords)
+        )
+    """
+
+    def __init__(
+        self,
+        geocoder: Optional[Callable[[str], Optional[Coordinates]]] = None,
+        min_interval_seconds: float = MIN_INTERVAL_SECONDS
+    ):
+        """
+        Args:
+            geocoder: Fonction requête -> (lat, lon) ou None (défaut: Nominatim)
+            min_interval_seconds: Intervalle minimal entre deux requêtes
+        """
+        self._geocoder = geocoder or self._nominatim
+        self._geolocator = None
+        self.min_interval_seconds = min_interval_seconds
+        self._queue: "queue.Queue[Tuple[str, List[str], Callable]]" = queue.Queue()
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._last_request = 0.0
+
+    def submit(
+        self,
+        key: str,
+        queries: List[str],
+        on_result: Callable[[Optional[Coordinates]], None]
+    ) -> bool:
+        """
+        Ajoute une demande à la file
+
+        Args:
+            key: Identifiant de la demande (dédoublonnage)
+            queries: Requêtes à essayer dans l'ordre
+            on_result: Rappel avec (lat, lon) ou None
+
+        Returns:
+            False si une demande de même clé est déjà en attente
+        """
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="geocoding-queue", daemon=True
+                )
+                self._worker.start()
+        self._queue.put((key, queries, on_result))
+        return True
+
+    def pending(self) -> int:
+        """Nombre de demandes en attente ou en cours"""
+        with self._lock:
+            return len(self._pending)
+
+    def _run(self) -> None:
+        while True:
+            key, queries, on_result = self._queue.get()
+            try:
+                coordinates = None
+                for query in queries:
+                    coordinates = self._rate_limited(query)
+                    if coordinates is not None:
+                        break
+                on_result(coordinates)
+            except Exception:
+                logger.exception(f"Geocoding job failed: {key}")
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                self._queue.task_done()
+
+    def _rate_limited(self, query: str) -> Optional[Coordinates]:
+        """Exécute une requête en respectant l'intervalle minimal"""
+        wait = self._last_request + self.min_interval_seconds - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            return self._geocoder(query)
+        finally:
+            self._last_request = time.monotonic()
+
+    def _nominatim(self, query: str) -> Optional[Coordinates]:
+        if self._geolocator is None:
+            self._geolocator = Nominatim(user_agent="transport-api/1.0", timeout=10)
+        try:
+            location = self._geolocator.geocode(query)
+        except Exception as e:
+            logger.error(f"Geocoding error for {query}: {e}")
+            return None
+        return (location.latitude, location.longitude) if location else None
+
+
+@lru_cache()
+def get_geocoding_queue() -> GeocodingQueue:
+    """File de géocodage partagée par le processus"""
+    return GeocodingQueue()
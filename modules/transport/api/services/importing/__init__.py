@@ -0,0 +1,34 @@
+"""
+Import de fichiers CSV/XLSX (passagers, sites, véhicules)
+Lecture par blocs, validation vectorisée, rapport d'erreurs par ligne
+"""
+
+from .reader import iter_chunks
+from .domain import import_into_service
+from .pipeline import (
+    DEFAULT_CHUNK_SIZE,
+    ImportReport,
+    ImportSpec,
+    PASSAGERS,
+    SITES,
+    VEHICLES,
+    address_keys,
+    group_by_address,
+    prepare_chunk,
+    to_records,
+)
+
+__all__ = [
+    "DEFAULT_CHUNK_SIZE",
+    "ImportReport",
+    "ImportSpec",
+    "PASSAGERS",
+    "SITES",
+    "VEHICLES",
+    "address_keys",
+    "group_by_address",
+    "import_into_service",
+    "iter_chunks",
+    "prepare_chunk",
+    "to_records",
+]
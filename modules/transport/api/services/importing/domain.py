@@ -0,0 +1,86 @@
+"""
+Import dans les domaines (BaseService): véhicules, sites
+"""
+
+import asyncio
+import logging
+from typing import BinaryIO, Callable, Optional, Sequence
+from uuid import UUID
+
+import pandas as pd
+
+from api.core.exceptions import TransportException
+from .pipeline import DEFAULT_CHUNK_SIZE, ImportReport, ImportSpec, prepare_chunk, to_records
+from .reader import iter_chunks
+
+logger = logging.getLogger(__name__)
+
+
+async def import_into_service(
+    service,
+    organization_id: UUID,
+    file: BinaryIO,
+    filename: str,
+    spec: ImportSpec,
+    on_conflict: Optional[Sequence[str]] = None,
+    defer: Optional[Callable[[pd.DataFrame, ImportReport], pd.DataFrame]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> ImportReport:
+    """
+    Importe un fichier CSV/XLSX via service.create_or_update_many, bloc par bloc
+
+    Lecture et validation dans un thread (pas de blocage de la boucle);
+    chaque bloc est créé en un INSERT multi-lignes ou un COPY (voir
+    BaseRepository.create_many) dans un savepoint: un bloc refusé est
+    annulé seul et ses lignes sont reportées en erreur.
+
+    Args:
+        service: Service du domaine (BaseService)
+        organization_id: UUID de l'organisation
+        file: Fichier binaire
+        filename: Nom du fichier (format)
+        spec: Cible de l'import
+        on_conflict: Colonnes d'unicité pour l'upsert (réimport idempotent);
+            seules les colonnes présentes dans le fichier sont mises à jour,
+            et les lignes existantes sont comptées comme mises à jour
+        defer: Retire d'un bloc les lignes à traiter plus tard (par exemple
+            après géocodage) et renvoie les autres
+        chunk_size: Lignes par bloc
+
+    Returns:
+        Rapport d'import
+    """
+    report = ImportReport(spec.name)
+    seen_keys = set()
+    chunks = iter_chunks(file, filename, chunk_size)
+
+    def next_block() -> Optional[pd.DataFrame]:
+        chunk = next(chunks, None)
+        return None if chunk is None else prepare_chunk(chunk, spec, seen_keys, report)
+
+    session = service.repository.session
+    while True:
+        valid = await asyncio.to_thread(next_block)
+        if valid is None:
+            break
+        if defer is not None and not valid.empty:
+            valid = defer(valid, report)
+        if valid.empty:
+            continue
+
+        try:
+            async with session.begin_nested():
+                entities, updated = await service.create_or_update_many(
+                    organization_id,
+                    to_records(valid),
+                    on_conflict=on_conflict,
+                    update_columns=sorted(report.columns) if on_conflict else None
+                )
+        except TransportException as e:
+            logger.warning(f"Import block rejected ({spec.name}, lines {valid.index[0]}-{valid.index[-1]}): {e.message}")
+            report.reject(list(valid.index), e.message)
+            continue
+        report.imported += len(entities) - updated
+        report.updated += updated
+
+    return report
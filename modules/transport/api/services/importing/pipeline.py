@@ -0,0 +1,432 @@
+"""
+Validation vectorisée des blocs d'import
+Chaque règle s'applique à une colonne entière (pandas); seules les lignes en
+erreur sont parcourues pour construire le rapport
+"""
+
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+
+# Lignes lues par bloc
+DEFAULT_CHUNK_SIZE = 5000
+
+# Erreurs détaillées conservées dans le rapport (le décompte reste exact au-delà)
+MAX_REPORTED_ERRORS = 10000
+
+EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+UUID_PATTERN = r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+TIME_PATTERN = r"^([01]?[0-9]|2[0-3]):[0-5][0-9]$"
+FRENCH_DATE_PATTERN = r"^\d{1,2}[/.-]\d{1,2}[/.-]\d{4}$"
+
+TRUE_VALUES = {"1", "true", "vrai", "oui", "yes", "x", "o", "y"}
+FALSE_VALUES = {"0", "false", "faux", "non", "no", "n"}
+
+
+def normalize_label(value: Any) -> str:
+    """Minuscules, sans accents ni ponctuation, espaces réduits à '_'"""
+    text = unicodedata.normalize("NFKD", str(value)).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")
+
+
+def normalize_text(series: pd.Series) -> pd.Series:
+    """Version vectorisée de la normalisation utilisée pour les clés (adresses, noms)"""
+    return (
+        series.fillna("")
+        .str.normalize("NFKD")
+        .str.encode("ascii", "ignore")
+        .str.decode("ascii")
+        .str.lower()
+        .str.replace(r"[^a-z0-9]+", " ", regex=True)
+        .str.strip()
+    )
+
+
+class ImportSpec:
+    """
+    Description d'une cible d'import
+
+    Usage:
+        VEHICLES = ImportSpec(
+            "vehicles",
+            columns={"name": ("nom",), "registration": ("immatriculation",)},
+            required=("name",),
+            key=("registration",)
+        )
+    """
+
+    def __init__(
+        self,
+        name: str,
+        columns: Dict[str, Sequence[str]],
+        required: Sequence[str] = (),
+        floats: Sequence[str] = (),
+        integers: Sequence[str] = (),
+        booleans: Sequence[str] = (),
+        dates: Sequence[str] = (),
+        patterns: Optional[Dict[str, Tuple[str, str]]] = None,
+        bounds: Optional[Dict[str, Tuple[float, float]]] = None,
+        choices: Optional[Dict[str, Sequence[str]]] = None,
+        key: Sequence[str] = (),
+        fallback_key: Sequence[str] = (),
+        address: Sequence[str] = (),
+        coordinates: Optional[Tuple[str, str]] = None
+    ):
+        """
+        Args:
+            name: Nom de la cible (rapport)
+            columns: Colonne cible -> en-têtes acceptés (comparés normalisés)
+            required: Colonnes obligatoires
+            floats/integers/booleans/dates: Colonnes converties
+            patterns: Colonne -> (expression régulière, message)
+            bounds: Colonne numérique -> (min, max)
+            choices: Colonne -> valeurs autorisées
+            key: Colonnes identifiant une ligne (doublons dans le fichier)
+            fallback_key: Clé utilisée quand une colonne de key est vide
+            address: Colonnes formant l'adresse (dédoublonnage du géocodage)
+            coordinates: Colonnes (latitude, longitude)
+        """
+        self.name = name
+        self.columns = list(columns)
+        self.aliases = {
+            normalize_label(alias): column
+            for column, names in columns.items()
+            for alias in (column, *names)
+        }
+        self.required = tuple(required)
+        self.floats = tuple(floats)
+        self.integers = tuple(integers)
+        self.booleans = tuple(booleans)
+        self.dates = tuple(dates)
+        self.patterns = patterns or {}
+        self.bounds = bounds or {}
+        self.choices = choices or {}
+        self.key = tuple(key)
+        self.fallback_key = tuple(fallback_key)
+        self.address = tuple(address)
+        self.coordinates = coordinates
+
+
+class ImportReport:
+    """Bilan d'un import, avec une entrée par ligne rejetée"""
+
+    def __init__(self, target: str):
+        self.target = target
+        self.rows = 0
+        self.imported = 0
+        self.updated = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.geocoding_queued = 0
+        self.columns: Set[str] = set()  # Colonnes cibles présentes dans le fichier
+        self.errors: List[Dict[str, Any]] = []
+
+    def add_errors(self, errors: List[Dict[str, Any]]) -> None:
+        """Ajoute des erreurs (plusieurs erreurs possibles pour une même ligne)"""
+        room = MAX_REPORTED_ERRORS - len(self.errors)
+        if room > 0:
+            self.errors.extend(errors[:room])
+
+    def reject(self, lines: Sequence[int], message: str) -> None:
+        """Rejette des lignes entières (par exemple un bloc refusé par la base)"""
+        self.rejected += len(lines)
+        self.add_errors([
+            {"ligne": int(line), "colonne": None, "valeur": None, "message": message}
+            for line in lines
+        ])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "cible": self.target,
+            "lignes": self.rows,
+            "importees": self.imported,
+            "mises_a_jour": self.updated,
+            "rejetees": self.rejected,
+            "doublons": self.duplicates,
+            "geocodage_en_file": self.geocoding_queued,
+            "erreurs": self.errors,
+            "erreurs_tronquees": len(self.errors) >= MAX_REPORTED_ERRORS
+        }
+
+
+def _errors(df: pd.DataFrame, mask: pd.Series, column: Optional[str], message: str) -> List[Dict[str, Any]]:
+    """Entrées du rapport pour les lignes de mask (seules les lignes fautives sont parcourues)"""
+    values = df.loc[mask, column] if column else pd.Series(None, index=df.index[mask])
+    return [
+        {
+            "ligne": int(line),
+            "colonne": column,
+            "valeur": None if pd.isna(value) else str(value),
+            "message": message
+        }
+        for line, value in values.items()
+    ]
+
+
+def row_keys(df: pd.DataFrame, spec: ImportSpec) -> pd.Series:
+    """Clé de dédoublonnage de chaque ligne (clé principale, sinon clé de repli)"""
+    def joined(columns: Sequence[str]) -> pd.Series:
+        parts = [normalize_text(df[c]) for c in columns]
+        key = parts[0]
+        for part in parts[1:]:
+            key = key + "|" + part
+        return key
+
+    key = joined(spec.key)
+    if spec.fallback_key:
+        incomplete = df[list(spec.key)].isna().any(axis=1)
+        key = key.where(~incomplete, "~" + joined(spec.fallback_key))
+    return key
+
+
+def address_keys(df: pd.DataFrame, spec: ImportSpec) -> pd.Series:
+    """Adresse normalisée de chaque ligne: une seule demande de géocodage par adresse"""
+    key = normalize_text(df[spec.address[0]])
+    for column in spec.address[1:]:
+        key = key + ", " + normalize_text(df[column])
+    return key
+
+
+def prepare_chunk(
+    chunk: pd.DataFrame,
+    spec: ImportSpec,
+    seen_keys: Set[str],
+    report: ImportReport
+) -> pd.DataFrame:
+    """
+    Valide un bloc et renvoie ses lignes valides, converties
+
+    Les en-têtes sont reconnus sous leurs différents noms (normalisés);
+    les colonnes inconnues sont ignorées. Une ligne en erreur est rejetée
+    entière, avec une entrée par règle violée dans le rapport. Une ligne
+    dont la clé a déjà été vue (dans ce bloc ou un bloc précédent) est un
+    doublon: seule la première occurrence est importée.
+
+    Args:
+        chunk: Bloc lu par iter_chunks (index = numéro de ligne)
+        spec: Cible de l'import
+        seen_keys: Clés déjà importées (mis à jour)
+        report: Rapport (mis à jour)
+
+    Returns:
+        Lignes valides (colonnes de spec.columns, NaN/None pour les vides)
+    """
+    renamed = {}
+    for header in chunk.columns:
+        column = spec.aliases.get(normalize_label(header))
+        if column and column not in renamed.values():
+            renamed[header] = column
+    df = chunk[list(renamed)].rename(columns=renamed)
+    report.columns.update(renamed.values())
+    for column in spec.columns:
+        if column not in df:
+            df[column] = None
+    df = df[spec.columns].astype(object)
+
+    # Chaînes nettoyées, vides -> NA; lignes entièrement vides ignorées
+    df = df.apply(lambda s: s.where(s.isna(), s.astype(str).str.strip()))
+    df = df.replace("", None)
+    df = df[df.notna().any(axis=1)]
+    report.rows += len(df)
+    if df.empty:
+        return df
+
+    invalid = pd.Series(False, index=df.index)
+    errors: List[Dict[str, Any]] = []
+
+    def flag(mask: pd.Series, column: Optional[str], message: str) -> None:
+        nonlocal invalid
+        if mask.any():
+            errors.extend(_errors(df, mask, column, message))
+            invalid |= mask
+
+    for column in spec.required:
+        flag(df[column].isna(), column, "Valeur obligatoire")
+
+    for column in spec.floats + spec.integers:
+        values = pd.to_numeric(df[column].str.replace(",", ".", regex=False), errors="coerce")
+        flag(df[column].notna() & values.isna(), column, "Nombre invalide")
+        if column in spec.integers:
+            flag(values.notna() & (values % 1 != 0), column, "Nombre entier attendu")
+        if column in spec.bounds:
+            low, high = spec.bounds[column]
+            flag(values.notna() & ((values < low) | (values > high)), column, f"Valeur hors de [{low}, {high}]")
+        # Les valeurs non entières sont déjà rejetées: l'arrondi ne change rien aux lignes gardées
+        df[column] = values.round().astype("Int64") if column in spec.integers else values
+
+    for column in spec.booleans:
+        lowered = df[column].str.lower()
+        known = lowered.isin(TRUE_VALUES | FALSE_VALUES)
+        flag(df[column].notna() & ~known, column, "Booléen invalide (oui/non)")
+        df[column] = lowered.map(lambda v: v in TRUE_VALUES if isinstance(v, str) else None)
+
+    for column in spec.dates:
+        # ISO (AAAA-MM-JJ) ou JJ/MM/AAAA (séparateurs / . -), chacun avec son
+        # format: une date ISO invalide (2012-13-01) n'est jamais relue jour/mois
+        values = pd.to_datetime(df[column], errors="coerce", format="ISO8601")
+        french = values.isna() & df[column].str.match(FRENCH_DATE_PATTERN, na=False)
+        if french.any():
+            values[french] = pd.to_datetime(
+                df.loc[french, column].str.replace(r"[.-]", "/", regex=True),
+                errors="coerce", format="%d/%m/%Y"
+            )
+        flag(df[column].notna() & values.isna(), column, "Date invalide")
+        df[column] = values.dt.strftime("%Y-%m-%d").where(values.notna(), None)
+
+    for column, (pattern, message) in spec.patterns.items():
+        flag(df[column].notna() & ~df[column].str.match(pattern, na=False), column, message)
+
+    for column, allowed in spec.choices.items():
+        lowered = df[column].str.lower()
+        flag(df[column].notna() & ~lowered.isin(allowed), column, f"Valeur parmi: {', '.join(allowed)}")
+        df[column] = lowered
+
+    if spec.coordinates:
+        latitude, longitude = spec.coordinates
+        flag(df[latitude].isna() != df[longitude].isna(), latitude, "Latitude et longitude vont ensemble")
+
+    # Doublons (premier exemplaire gardé), parmi les lignes valides uniquement
+    if spec.key:
+        keys = row_keys(df, spec)
+        duplicate = ~invalid & (keys.duplicated() | keys.isin(seen_keys))
+        if duplicate.any():
+            # Doublons exclus de l'import mais pas comptés comme erreurs
+            report.duplicates += int(duplicate.sum())
+            report.add_errors(_errors(df, duplicate, None, "Doublon d'une ligne précédente (ignorée)"))
+        seen_keys.update(keys[~invalid & ~duplicate])
+        invalid_or_duplicate = invalid | duplicate
+    else:
+        invalid_or_duplicate = invalid
+
+    if errors:
+        errors.sort(key=lambda e: e["ligne"])
+        report.add_errors(errors)
+        report.rejected += int(invalid.sum())
+
+    return df[~invalid_or_duplicate]
+
+
+def to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Lignes valides -> dictionnaires (types Python natifs)
+
+    Les valeurs vides sont omises: la valeur par défaut de la colonne
+    s'applique à la création.
+    """
+    return [
+        {column: value for column, value in row.items() if not pd.isna(value)}
+        for row in df.astype(object).to_dict("records")
+    ]
+
+
+def group_by_address(df: pd.DataFrame, spec: ImportSpec) -> Dict[str, List[Any]]:
+    """
+    Lignes sans coordonnées regroupées par adresse normalisée
+
+    Returns:
+        Adresse normalisée -> numéros de ligne
+    """
+    latitude, longitude = spec.coordinates
+    missing = df[df[latitude].isna() | df[longitude].isna()]
+    missing = missing[missing[spec.address[0]].notna()]
+    if missing.empty:
+        return {}
+    keys = address_keys(missing, spec)
+    return {key: list(lines) for key, lines in keys.groupby(keys).groups.items()}
+
+
+# ===================
+# Cibles
+# ===================
+
+PASSAGERS = ImportSpec(
+    "passagers",
+    columns={
+        "nom": ("last_name", "nom_famille"),
+        "prenom": ("first_name", "prénom"),
+        "email": ("mail", "courriel", "e_mail"),
+        "telephone": ("tel", "téléphone", "phone", "portable"),
+        "adresse_complete": ("adresse", "address", "rue"),
+        "ville": ("commune", "city"),
+        "code_postal": ("cp", "postal_code", "code postal"),
+        "latitude": ("lat",),
+        "longitude": ("lon", "lng", "long"),
+        "date_naissance": ("naissance", "date de naissance", "birth_date"),
+        "ecole_id": ("ecole", "id_ecole"),
+    },
+    required=("nom", "prenom", "adresse_complete", "ville"),
+    floats=("latitude", "longitude"),
+    dates=("date_naissance",),
+    patterns={
+        "email": (EMAIL_PATTERN, "Email invalide"),
+        "ecole_id": (UUID_PATTERN, "Identifiant d'école invalide"),
+    },
+    bounds={"latitude": (-90, 90), "longitude": (-180, 180)},
+    key=("email",),
+    fallback_key=("nom", "prenom", "ecole_id"),
+    address=("adresse_complete", "ville"),
+    coordinates=("latitude", "longitude"),
+)
+
+SITES = ImportSpec(
+    "sites",
+    columns={
+        "name": ("nom",),
+        "site_type": ("type", "type_site"),
+        "code": ("code_site", "reference"),
+        "address": ("adresse",),
+        "city": ("ville", "commune"),
+        "postal_code": ("code_postal", "cp"),
+        "country": ("pays",),
+        "latitude": ("lat",),
+        "longitude": ("lon", "lng", "long"),
+        "is_depot": ("depot",),
+        "opening_time": ("ouverture", "heure_ouverture"),
+        "closing_time": ("fermeture", "heure_fermeture"),
+        "service_time_minutes": ("temps_arret", "duree_arret"),
+        "contact_name": ("contact", "nom_contact"),
+        "contact_phone": ("telephone", "tel"),
+        "contact_email": ("email", "courriel"),
+    },
+    required=("name",),
+    floats=("latitude", "longitude", "service_time_minutes"),
+    booleans=("is_depot",),
+    patterns={
+        "opening_time": (TIME_PATTERN, "Heure invalide (HH:MM)"),
+        "closing_time": (TIME_PATTERN, "Heure invalide (HH:MM)"),
+        "contact_email": (EMAIL_PATTERN, "Email invalide"),
+    },
+    bounds={"latitude": (-90, 90), "longitude": (-180, 180), "service_time_minutes": (0, 1440)},
+    choices={"site_type": ("depot", "pickup", "delivery", "warehouse", "school", "hospital", "stop", "other")},
+    key=("code",),
+    fallback_key=("name", "address", "city"),
+    address=("address", "city"),
+    coordinates=("latitude", "longitude"),
+)
+
+VEHICLES = ImportSpec(
+    "vehicles",
+    columns={
+        "name": ("nom",),
+        "vehicle_type": ("type", "type_vehicule"),
+        "registration": ("immatriculation", "plaque"),
+        "capacity": ("capacite", "places"),
+        "capacity_unit": ("unite", "unite_capacite"),
+        "status": ("statut", "etat"),
+        "brand": ("marque",),
+        "model": ("modele",),
+        "year": ("annee",),
+        "color": ("couleur",),
+    },
+    required=("name",),
+    integers=("capacity", "year"),
+    bounds={"capacity": (1, 10000), "year": (1900, 2100)},
+    choices={
+        "vehicle_type": ("bus", "van", "truck", "car", "ambulance", "other"),
+        "status": ("available", "in_service", "maintenance", "out_of_service"),
+    },
+    key=("registration",),
+    fallback_key=("name",),
+)
@@ -0,0 +1,112 @@
+"""
+Lecture par blocs des fichiers d'import (CSV, XLSX)
+Le fichier n'est jamais chargé en entier: chaque bloc est un DataFrame de
+chaînes, indexé par son numéro de ligne dans le fichier
+"""
+
+import codecs
+import csv
+from typing import BinaryIO, Iterator
+
+import pandas as pd
+
+from api.core.exceptions import ValidationError
+
+# Séparateurs acceptés pour les CSV (le point-virgule est courant en France)
+CSV_SEPARATORS = ",;\t|"
+
+# Octets lus pour détecter l'encodage et le séparateur
+SNIFF_BYTES = 64 * 1024
+
+
+def _sniff_csv(file: BinaryIO):
+    """Détecte l'encodage (UTF-8 ou Latin-1) et le séparateur d'un CSV"""
+    sample = file.read(SNIFF_BYTES)
+    file.seek(0)
+
+    encoding = "utf-8-sig"
+    try:
+        # Décodage incrémental: un caractère coupé en fin d'échantillon n'est pas une erreur
+        text = codecs.getincrementaldecoder("utf-8-sig")().decode(sample, final=False)
+    except UnicodeDecodeError:
+        encoding = "latin-1"
+        text = sample.decode("latin-1")
+
+    first_lines = "\n".join(text.splitlines()[:20])
+    try:
+        separator = csv.Sniffer().sniff(first_lines, delimiters=CSV_SEPARATORS).delimiter
+    except csv.Error:
+        separator = ","
+    return encoding, separator
+
+
+def _csv_chunks(file: BinaryIO, chunk_size: int) -> Iterator[pd.DataFrame]:
+    encoding, separator = _sniff_csv(file)
+    reader = pd.read_csv(
+        file,
+        sep=separator,
+        encoding=encoding,
+        dtype=str,
+        keep_default_na=False,
+        skip_blank_lines=False,
+        chunksize=chunk_size
+    )
+    for chunk in reader:
+        # Index pandas continu entre les blocs: ligne 1 = en-têtes
+        chunk.index = chunk.index + 2
+        yield chunk
+
+
+def _xlsx_chunks(file: BinaryIO, chunk_size: int) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) if name is not None else "" for name in header]
+
+        buffer, first_line = [], 2
+        for row in rows:
+            buffer.append([None if value is None else str(value) for value in row[:len(columns)]])
+            if len(buffer) == chunk_size:
+                yield pd.DataFrame(
+                    buffer, columns=columns, index=range(first_line, first_line + len(buffer))
+                )
+                first_line += len(buffer)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(
+                buffer, columns=columns, index=range(first_line, first_line + len(buffer))
+            )
+    finally:
+        workbook.close()
+
+
+def iter_chunks(file: BinaryIO, filename: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Lit un fichier d'import par blocs de chunk_size lignes
+
+    Args:
+        file: Fichier binaire (UploadFile.file)
+        filename: Nom du fichier (l'extension choisit le format)
+        chunk_size: Lignes par bloc
+
+    Returns:
+        Itérateur de DataFrames (valeurs str ou None, index = numéro de ligne)
+
+    Raises:
+        ValidationError: Format non supporté
+    """
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    if extension in ("csv", "txt"):
+        return _csv_chunks(file, chunk_size)
+    if extension in ("xlsx", "xlsm"):
+        return _xlsx_chunks(file, chunk_size)
+    raise ValidationError(
+        f"Format de fichier non supporté: {filename}",
+        field="fichier",
+        details={"formats": ["csv", "xlsx"]}
+    )
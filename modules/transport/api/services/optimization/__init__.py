@@ -2,12 +2,35 @@
 Optimization service - Route optimization with VRP/VRPTW
 """
 
-from typing import List, Dict, Tuple
-from datetime import datetime
+import time as timer
+from typing import List, Dict, Tuple, Optional, Any
+from datetime import datetime, time
+
+from api.core.config import settings
 
 from .optimizer import RouteOptimizer
 from .strategies import OptimizationStrategy, VRPStrategy, VRPTWStrategy
 from .distance import haversine_distance, create_distance_matrix
+from .aggregation import group_colocated, merge_node_attributes, expand_route
+from .stop_selection import select_pickup_points, assign_to_stops
+
+
+def _seconds_since(value: Any, start: datetime) -> Optional[int]:
+    """
+    Convertit une heure (HH:MM, HH:MM:SS ou time) en secondes depuis start
+
+    Returns:
+        Nombre de secondes (peut être négatif) ou None si non renseigné
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        parts = [int(p) for p in value.split(':')]
+        value = time(*parts)
+    moment = start.replace(
+        hour=value.hour, minute=value.minute, second=value.second
+    )
+    return int((moment - start).total_seconds())
 
 
 def optimize_school_bus_route(
@@ -15,33 +38,120 @@ def optimize_school_bus_route(
     depot_location: Tuple[float, float],
     start_time: str = "07:00",
     school_arrival_time: str = "08:30",
-    average_speed_kmh: float = 30.0
+    average_speed_kmh: float = 30.0,
+    school_location: Optional[Tuple[float, float]] = None,
+    service_time_minutes: Optional[float] = None,
+    merge_radius_meters: Optional[float] = None,
+    vehicle_capacity: Optional[int] = None
 ) -> Dict:
     """
     Fonction principale pour optimiser une tournée de bus scolaire
 
     Args:
         stops: Liste des arrêts avec coordonnées [{id, latitude, longitude, adresse}]
+            Champs optionnels: opening_time, closing_time (HH:MM),
+            service_time_minutes, demand (défaut: 1)
         depot_location: Coordonnées du dépôt/garage (lat, lon)
         start_time: Heure de départ du dépôt (format HH:MM)
         school_arrival_time: Heure d'arrivée souhaitée à l'école (format HH:MM)
         average_speed_kmh: Vitesse moyenne du bus
+        school_location: Coordonnées de l'école; si fourni, la route se termine
+            à l'école au lieu de revenir au dépôt
+        service_time_minutes: Temps d'arrêt par défaut (défaut: configuration)
+        merge_radius_meters: Rayon de fusion des arrêts co-localisés
+            (défaut: configuration, 0 = désactivé)
+        vehicle_capacity: Capacité du bus; sans capacité connue, les
+            demandes ne sont pas transmises au solveur
 
     Returns:
-        Itinéraire optimisé avec ETA pour chaque arrêt
+        Itinéraire optimisé avec ETA pour chaque arrêt, ou diagnostic si
+        les contraintes horaires sont impossibles
     """
-    # Préparer les données
-    locations = [depot_location]  # Le dépôt est toujours le premier point
-    stop_ids = [None]  # ID du dépôt
-
-    for stop in stops:
-        locations.append((stop['latitude'], stop['longitude']))
-        stop_ids.append(stop.get('id'))
+    default_service = (
+        service_time_minutes
+        if service_time_minutes is not None
+        else settings.default_service_time_minutes
+    )
+    radius = (
+        merge_radius_meters
+        if merge_radius_meters is not None
+        else settings.stop_merge_radius_meters
+    )
 
     # Convertir les heures en datetime
     today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
     start_hour, start_minute = map(int, start_time.split(':'))
     start_datetime = today.replace(hour=start_hour, minute=start_minute)
+    deadline = _seconds_since(school_arrival_time, start_datetime)
+
+    # Attributs par arrêt
+    coordinates = []
+    stop_windows = []
+    stop_services = []
+    stop_demands = []
+
+    for stop in stops:
+        coordinates.append((stop['latitude'], stop['longitude']))
+
+        opening = _seconds_since(stop.get('opening_time'), start_datetime)
+        closing = _seconds_since(stop.get('closing_time'), start_datetime)
+        stop_windows.append((
+            max(opening or 0, 0),
+            closing if closing is not None else deadline
+        ))
+
+        service = stop.get('service_time_minutes')
+        stop_services.append(int((service if service is not None else default_service) * 60))
+        stop_demands.append(int(stop.get('demand', 1)))
+
+    # Contrôle immédiat: inutile de lancer la recherche si le bus est trop petit
+    if vehicle_capacity and sum(stop_demands) > vehicle_capacity:
+        return {
+            "success": False,
+            "message": (
+                f"Capacité insuffisante: {sum(stop_demands)} passager(s) "
+                f"pour {vehicle_capacity} place(s)"
+            ),
+            "diagnosis": []
+        }
+
+    # Fusion des arrêts co-localisés en un seul nœud solveur
+    aggregation_start = timer.perf_counter()
+    groups = group_colocated(coordinates, radius, labels=stop_windows)
+    merged = merge_node_attributes(
+        groups, coordinates, stop_demands, stop_services, stop_windows
+    )
+
+    aggregation_ms = round((timer.perf_counter() - aggregation_start) * 1000, 1)
+
+    # Le dépôt est toujours le premier point (index d'origine 0, arrêts 1..n)
+    locations = [depot_location] + merged["locations"]
+    time_windows = [(0, deadline)] + merged["time_windows"]
+    service_times = [0] + merged["service_times"]
+    demands = [0] + merged["demands"]
+    node_members = {
+        node + 1: [i + 1 for i in members]
+        for node, members in enumerate(groups)
+    }
+
+    constraints = {
+        "depot_index": 0,
+        "start_time": start_datetime,
+        "time_windows": time_windows,
+        "service_times": service_times,
+        "route_deadline": deadline
+    }
+    if vehicle_capacity:
+        constraints["demands"] = demands
+        constraints["vehicle_capacity"] = vehicle_capacity
+
+    if school_location:
+        locations.append(school_location)
+        time_windows.append((0, deadline))
+        service_times.append(0)
+        demands.append(0)
+        constraints["end_index"] = len(locations) - 1
+        node_members[len(locations) - 1] = [len(stops) + 1]
 
     # Créer l'optimiseur avec VRPTW pour avoir les temps
     optimizer = RouteOptimizer(
@@ -50,23 +160,167 @@ def optimize_school_bus_route(
     )
 
     # Optimiser
-    result = optimizer.optimize(
-        locations,
-        {"depot_index": 0, "start_time": start_datetime}
-    )
+    result = optimizer.optimize(locations, constraints)
+
+    if result.get('diagnostics'):
+        result['diagnostics']['phases_ms'] = {
+            "aggregation": aggregation_ms, **result['diagnostics']['phases_ms']
+        }
 
     if result.get('success'):
-        # Enrichir les résultats avec les IDs des arrêts
-        for stop_data in result.get('route', []):
-            stop_idx = stop_data.get('index', 0)
-            if stop_idx < len(stop_ids):
-                stop_data['stop_id'] = stop_ids[stop_idx]
-                if stop_idx > 0 and stop_idx - 1 < len(stops):
-                    stop_data['adresse'] = stops[stop_idx - 1].get('adresse', '')
+        # Ré-éclater les nœuds fusionnés: un arrêt par passager, ETA partagée
+        route = expand_route(result['route'], node_members)
+        for stop_data in route:
+            stop_idx = stop_data['index']
+            stop_data['stop_id'] = None
+            if 0 < stop_idx <= len(stops):
+                stop = stops[stop_idx - 1]
+                stop_data['stop_id'] = stop.get('id')
+                stop_data['adresse'] = stop.get('adresse', '')
+                stop_data['latitude'] = stop['latitude']
+                stop_data['longitude'] = stop['longitude']
+        result['route'] = route
+        result['statistics']['merged_nodes'] = len(stops) - len(groups)
+    else:
+        # Rattacher les diagnostics aux arrêts d'origine
+        for item in result.get('diagnosis', []):
+            members = node_members.get(item['index'], [])
+            item['stop_ids'] = [
+                stops[i - 1].get('id') for i in members if 0 < i <= len(stops)
+            ]
 
     return result
 
 
+def optimize_fleet_routes(
+    stops: List[Dict],
+    vehicles: List[Dict],
+    start_time: str = "07:00",
+    school_arrival_time: str = "08:30",
+    average_speed_kmh: float = 30.0,
+    service_time_minutes: Optional[float] = None
+) -> Dict:
+    """
+    Optimise les tournées de toute une flotte en une seule résolution
+
+    Chaque véhicule a son propre point de départ (dépôt d'attache ou position
+    GPS) et son propre point d'arrivée (dépôt, école, ou aucun pour une
+    route ouverte). Remplace la résolution séquentielle dépôt par dépôt.
+
+    Args:
+        stops: Arrêts [{id, latitude, longitude}], champs optionnels comme
+            pour optimize_school_bus_route (opening_time, closing_time,
+            service_time_minutes, demand)
+        vehicles: Véhicules [{id, start: (lat, lon), end: (lat, lon) ou None,
+            capacity}]
+        start_time: Heure de départ (format HH:MM)
+        school_arrival_time: Heure limite d'arrivée (format HH:MM)
+        average_speed_kmh: Vitesse moyenne
+        service_time_minutes: Temps d'arrêt par défaut (défaut: configuration)
+
+    Returns:
+        Une route par véhicule avec ETA, ou diagnostic si infaisable
+    """
+    if not vehicles:
+        return {"success": False, "message": "Aucun véhicule disponible"}
+
+    default_service = (
+        service_time_minutes
+        if service_time_minutes is not None
+        else settings.default_service_time_minutes
+    )
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start_hour, start_minute = map(int, start_time.split(':'))
+    start_datetime = today.replace(hour=start_hour, minute=start_minute)
+    deadline = _seconds_since(school_arrival_time, start_datetime)
+
+    # Points de départ/arrivée d'abord, partagés entre véhicules d'un même dépôt
+    locations: List[Tuple[float, float]] = []
+    endpoint_nodes: Dict[Tuple[float, float], int] = {}
+
+    def endpoint(point: Tuple[float, float]) -> int:
+        key = (round(point[0], 6), round(point[1], 6))
+        if key not in endpoint_nodes:
+            endpoint_nodes[key] = len(locations)
+            locations.append(tuple(point))
+        return endpoint_nodes[key]
+
+    starts = [endpoint(v["start"]) for v in vehicles]
+    ends = [endpoint(v["end"]) if v.get("end") else None for v in vehicles]
+    first_stop = len(locations)
+
+    time_windows = [(0, deadline)] * first_stop
+    service_times = [0] * first_stop
+    demands = [0] * first_stop
+
+    for stop in stops:
+        locations.append((stop['latitude'], stop['longitude']))
+        opening = _seconds_since(stop.get('opening_time'), start_datetime)
+        closing = _seconds_since(stop.get('closing_time'), start_datetime)
+        time_windows.append((
+            max(opening or 0, 0),
+            closing if closing is not None else deadline
+        ))
+        service = stop.get('service_time_minutes')
+        service_times.append(int((service if service is not None else default_service) * 60))
+        demands.append(int(stop.get('demand', 1)))
+
+    constraints = {
+        "depot_index": starts[0],
+        "vehicle_starts": starts,
+        "vehicle_ends": ends,
+        "vehicle_capacities": [
+            v.get("capacity") or settings.max_vehicle_capacity for v in vehicles
+        ],
+        "start_time": start_datetime,
+        "time_windows": time_windows,
+        "service_times": service_times,
+        "route_deadline": deadline,
+        "demands": demands
+    }
+
+    optimizer = RouteOptimizer(
+        speed_kmh=average_speed_kmh,
+        strategy=VRPTWStrategy(
+            timeout_seconds=settings.optimization_timeout_seconds,
+            num_vehicles=len(vehicles),
+            speed_kmh=average_speed_kmh
+        )
+    )
+    result = optimizer.optimize(locations, constraints)
+
+    def stop_for(index: int) -> Optional[Dict]:
+        return stops[index - first_stop] if index >= first_stop else None
+
+    if not result.get('success'):
+        for item in result.get('diagnosis', []):
+            stop = stop_for(item['index'])
+            item['stop_ids'] = [stop.get('id')] if stop else []
+        return result
+
+    routes = []
+    for vehicle_route in result.get('routes') or [{"vehicle": 0, **result}]:
+        vehicle = vehicles[vehicle_route['vehicle']]
+        for stop_data in vehicle_route['route']:
+            stop = stop_for(stop_data['index'])
+            stop_data['stop_id'] = stop.get('id') if stop else None
+            if stop:
+                stop_data['adresse'] = stop.get('adresse', '')
+        routes.append({
+            "vehicle_id": vehicle.get('id'),
+            "route": vehicle_route['route'],
+            "statistics": vehicle_route['statistics']
+        })
+
+    return {
+        "success": True,
+        "routes": routes,
+        "statistics": result['statistics'],
+        "diagnostics": result.get('diagnostics')
+    }
+
+
 __all__ = [
     "RouteOptimizer",
     "OptimizationStrategy",
@@ -75,4 +329,7 @@ __all__ = [
     "haversine_distance",
     "create_distance_matrix",
     "optimize_school_bus_route",
+    "optimize_fleet_routes",
+    "select_pickup_points",
+    "assign_to_stops",
 ]
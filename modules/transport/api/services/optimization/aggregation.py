@@ -0,0 +1,127 @@
+"""
+Agrégation des arrêts co-localisés avant la résolution
+Plusieurs passagers à la même adresse (ou à quelques mètres) deviennent
+un seul nœud solveur, puis sont ré-éclatés après l'optimisation
+"""
+
+from typing import List, Dict, Any, Tuple, Optional, Hashable
+
+from scipy.spatial import cKDTree
+
+from .distance import project_to_meters
+
+
+def group_colocated(
+    coordinates: List[Tuple[float, float]],
+    radius_meters: float,
+    labels: Optional[List[Hashable]] = None
+) -> List[List[int]]:
+    """
+    Regroupe les points situés à moins de radius_meters d'un point meneur
+
+    Regroupement glouton: chaque point non encore affecté devient meneur et
+    absorbe les points libres dans son rayon. Contrairement à une fermeture
+    transitive, un groupe ne peut pas s'étendre le long d'une rue entière.
+
+    Args:
+        coordinates: Liste de coordonnées (latitude, longitude)
+        radius_meters: Rayon de regroupement en mètres (0 = aucun regroupement)
+        labels: Étiquette par point; seuls les points de même étiquette
+            sont fusionnés (ex: même fenêtre temporelle)
+
+    Returns:
+        Liste de groupes (indices dans coordinates), dans l'ordre d'entrée
+    """
+    if not coordinates:
+        return []
+    if radius_meters <= 0 or len(coordinates) == 1:
+        return [[i] for i in range(len(coordinates))]
+
+    points = project_to_meters(coordinates)
+    tree = cKDTree(points)
+    neighbors = tree.query_ball_point(points, r=radius_meters)
+
+    assigned = [False] * len(coordinates)
+    groups = []
+    for leader, candidates in enumerate(neighbors):
+        if assigned[leader]:
+            continue
+        members = sorted(
+            i for i in candidates
+            if not assigned[i] and (labels is None or labels[i] == labels[leader])
+        )
+        for i in members:
+            assigned[i] = True
+        groups.append(members)
+
+    return groups
+
+
+def merge_node_attributes(
+    groups: List[List[int]],
+    coordinates: List[Tuple[float, float]],
+    demands: List[int],
+    service_times: List[int],
+    time_windows: Optional[List[Tuple[int, int]]] = None
+) -> Dict[str, List[Any]]:
+    """
+    Calcule les attributs des nœuds fusionnés
+
+    - Position: barycentre des membres
+    - Demande et temps de service: sommes
+    - Fenêtre temporelle: intersection (peut être vide, la pré-vérification
+      horaire le signalera)
+
+    Returns:
+        Dictionnaire {locations, demands, service_times, time_windows}
+    """
+    merged = {"locations": [], "demands": [], "service_times": [], "time_windows": []}
+
+    for members in groups:
+        lat = sum(coordinates[i][0] for i in members) / len(members)
+        lon = sum(coordinates[i][1] for i in members) / len(members)
+        merged["locations"].append((lat, lon))
+        merged["demands"].append(sum(demands[i] for i in members))
+        merged["service_times"].append(sum(service_times[i] for i in members))
+        if time_windows:
+            merged["time_windows"].append((
+                max(time_windows[i][0] for i in members),
+                min(time_windows[i][1] for i in members)
+            ))
+
+    if not time_windows:
+        merged["time_windows"] = None
+    return merged
+
+
+def expand_route(
+    route: List[Dict[str, Any]],
+    node_members: Dict[int, List[int]]
+) -> List[Dict[str, Any]]:
+    """
+    Ré-éclate une route calculée sur des nœuds fusionnés
+
+    Chaque membre d'un nœud fusionné reçoit sa propre entrée avec l'ETA
+    partagée du nœud. Les nœuds absents de node_members (dépôt, école)
+    sont conservés tels quels.
+
+    Args:
+        route: Route retournée par une stratégie (clé "index" = nœud solveur)
+        node_members: Nœud solveur -> indices d'origine de ses membres
+
+    Returns:
+        Route avec une entrée par point d'origine ("index" = index d'origine)
+    """
+    expanded = []
+    for stop in route:
+        members = node_members.get(stop["index"])
+        if members is None:
+            expanded.append(stop)
+            continue
+        for original_index in members:
+            expanded.append({
+                **stop,
+                "index": original_index,
+                "group_size": len(members)
+            })
+    return expanded
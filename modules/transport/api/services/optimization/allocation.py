@@ -0,0 +1,158 @@
+"""
+Répartition des passagers entre tournées
+K-moyennes sous contrainte de capacité sur les coordonnées des domiciles
+"""
+
+from typing import List, Tuple, Dict, Any
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .distance import project_to_meters
+from .stop_selection import deferred_acceptance
+
+# Centres candidats par passager lors de l'affectation sous capacité
+NEAREST_CENTERS = 16
+
+
+def _seed_centers(points: np.ndarray, k: int, fixed: np.ndarray, rng) -> np.ndarray:
+    """
+    Initialisation k-means++ des centres non fixés
+
+    Les centres déjà connus (tournées ayant des arrêts) sont conservés; les
+    autres sont tirés avec une probabilité proportionnelle au carré de la
+    distance au centre le plus proche.
+    """
+    centers = [np.asarray(c, dtype=float) for c in fixed]
+    if not centers:
+        centers.append(points[rng.integers(len(points))])
+    d2 = ((points[:, None, :] - np.array(centers)[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+
+    while len(centers) < k:
+        total = d2.sum()
+        index = rng.choice(len(points), p=d2 / total) if total > 0 else rng.integers(len(points))
+        centers.append(points[index])
+        d2 = np.minimum(d2, ((points - points[index]) ** 2).sum(axis=1))
+    return np.array(centers[:k], dtype=float)
+
+
+def _capacitated_assign(points: np.ndarray, centers: np.ndarray, capacity: np.ndarray) -> np.ndarray:
+    """
+    Affecte chaque point au centre le plus proche ayant de la place
+
+    Les candidats sont limités aux NEAREST_CENTERS centres les plus proches
+    (k-d tree); les points restés sans place sont ensuite répartis entre
+    les centres non pleins, tous candidats.
+    """
+    n, k = len(points), len(centers)
+    nearest = min(NEAREST_CENTERS, k)
+    distances, indices = cKDTree(centers).query(points, k=nearest)
+    held, _, _ = deferred_acceptance(
+        np.repeat(np.arange(n), nearest),
+        indices.reshape(n, nearest).ravel(),
+        distances.reshape(n, nearest).ravel(),
+        n, capacity
+    )
+
+    left = np.flatnonzero(held < 0)
+    remaining = capacity - np.bincount(held[held >= 0], minlength=k)
+    open_centers = np.flatnonzero(remaining > 0)
+    if len(left) and len(open_centers) and nearest < k:
+        far = np.sqrt(
+            ((points[left][:, None, :] - centers[open_centers][None, :, :]) ** 2).sum(axis=2)
+        )
+        second, _, _ = deferred_acceptance(
+            np.repeat(np.arange(len(left)), len(open_centers)),
+            np.tile(np.arange(len(open_centers)), len(left)),
+            far.ravel(),
+            len(left), remaining[open_centers]
+        )
+        placed = second >= 0
+        held[left[placed]] = open_centers[second[placed]]
+    return held
+
+
+def allocate_passengers(
+    coordinates: List[Tuple[float, float]],
+    tournees: List[Dict],
+    max_iterations: int = 25,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Répartit des passagers entre tournées en groupes géographiquement compacts
+
+    K-moyennes sous contrainte de capacité: à chaque itération, chaque
+    passager est affecté au centre le plus proche qui a encore de la place
+    (acceptation différée, voir deferred_acceptance), puis chaque centre est
+    recalculé comme le barycentre de ses passagers et des arrêts existants
+    de la tournée. Arrêt quand l'affectation ne change plus.
+
+    Args:
+        coordinates: Coordonnées des passagers à répartir (latitude, longitude)
+        tournees: Tournées [{id, capacity: places restantes,
+            anchor: barycentre des arrêts existants (lat, lon) ou None,
+            anchor_weight: nombre d'arrêts existants}]
+        max_iterations: Nombre maximal d'itérations
+        seed: Graine de l'initialisation k-means++
+
+    Returns:
+        Dictionnaire avec:
+            - assignment: Index de tournée par passager (-1 si plus de place)
+            - load: Passagers ajoutés par tournée
+            - unassigned: Passagers sans place
+            - iterations: Itérations effectuées
+    """
+    n, k = len(coordinates), len(tournees)
+    capacity = np.array([max(int(t.get('capacity') or 0), 0) for t in tournees], dtype=np.int64)
+    usable = np.flatnonzero(capacity > 0)
+    if n == 0 or len(usable) == 0:
+        return {
+            "assignment": [-1] * n,
+            "load": [0] * k,
+            "unassigned": list(range(n)),
+            "iterations": 0
+        }
+
+    reference_latitude = float(np.mean([c[0] for c in coordinates]))
+    points = project_to_meters(coordinates, reference_latitude)
+
+    anchored = [i for i in usable if tournees[i].get('anchor') is not None]
+    free_slots = [i for i in usable if tournees[i].get('anchor') is None]
+    anchors = project_to_meters(
+        [tournees[i]['anchor'] for i in anchored], reference_latitude
+    )
+    anchor_weight = np.zeros(k)
+    anchor_xy = np.zeros((k, 2))
+    for position, i in enumerate(anchored):
+        anchor_weight[i] = tournees[i].get('anchor_weight') or 1
+        anchor_xy[i] = anchors[position]
+
+    # Ordre des centres: tournées ancrées d'abord, puis les autres
+    order = np.array(anchored + free_slots, dtype=np.int64)
+    centers = _seed_centers(points, len(order), anchors, np.random.default_rng(seed))
+
+    assignment = np.full(n, -1, dtype=np.int64)
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        held = _capacitated_assign(points, centers, capacity[order])
+        if np.array_equal(held, assignment):
+            break
+        assignment = held
+
+        # Barycentres pondérés (passagers + arrêts existants de la tournée)
+        assigned = assignment >= 0
+        counts = np.bincount(assignment[assigned], minlength=len(order)).astype(float)
+        sums = np.zeros((len(order), 2))
+        np.add.at(sums, assignment[assigned], points[assigned])
+        weights = counts + anchor_weight[order]
+        sums += anchor_xy[order] * anchor_weight[order][:, None]
+        moved = weights > 0
+        centers[moved] = sums[moved] / weights[moved][:, None]
+
+    result = np.where(assignment >= 0, order[np.maximum(assignment, 0)], -1)
+    return {
+        "assignment": result.tolist(),
+        "load": np.bincount(result[result >= 0], minlength=k).tolist(),
+        "unassigned": np.flatnonzero(result < 0).tolist(),
+        "iterations": iterations
+    }
@@ -0,0 +1,134 @@
+"""
+Affectation des bus aux tournées
+Couplage de coût minimal (algorithme hongrois) sur une matrice bus x tournées
+"""
+
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from .distance import EARTH_RADIUS_KM
+
+# Coût d'un couple interdit: fini pour que linear_sum_assignment reste
+# applicable même quand une tournée n'a aucun bus compatible
+INFEASIBLE_COST = 1e9
+
+
+def _pairwise_haversine(origins: np.ndarray, destinations: np.ndarray) -> np.ndarray:
+    """Distances (km) entre chaque origine et chaque destination, tableau (n, m)"""
+    a = np.radians(origins)[:, None, :]
+    b = np.radians(destinations)[None, :, :]
+    h = (
+        np.sin((b[..., 0] - a[..., 0]) / 2) ** 2
+        + np.cos(a[..., 0]) * np.cos(b[..., 0]) * np.sin((b[..., 1] - a[..., 1]) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def assign_buses(
+    buses: List[Dict],
+    tournees: List[Dict],
+    empty_seat_cost_km: float = 0.2,
+    busy: Optional[List[Tuple[int, int, int]]] = None
+) -> Dict[str, Any]:
+    """
+    Affecte au plus un bus à chaque tournée en minimisant le coût total
+
+    Coût d'un couple (bus, tournée):
+    - haut-le-pied: distance du dépôt du bus au premier arrêt;
+    - ajustement de capacité: empty_seat_cost_km par place inutilisée;
+    - interdit si la capacité est insuffisante ou si le bus est déjà occupé
+      sur le créneau de la tournée.
+
+    Args:
+        buses: Bus [{id, capacite, depot: (lat, lon) ou None}]
+        tournees: Tournées [{id, demand, first_stop: (lat, lon) ou None,
+            start_minutes, end_minutes}]
+        empty_seat_cost_km: Coût d'une place vide, en km équivalents
+        busy: Créneaux déjà occupés [(index du bus, début, fin)] en minutes
+
+    Returns:
+        Dictionnaire avec:
+            - assignments: [{tournee_id, bus_id, deadhead_km, empty_seats, cost}]
+            - unassigned: [{tournee_id, reason}]
+            - total_cost, total_deadhead_km
+    """
+    if not tournees:
+        return {"assignments": [], "unassigned": [], "total_cost": 0.0, "total_deadhead_km": 0.0}
+    if not buses:
+        return {
+            "assignments": [],
+            "unassigned": [
+                {"tournee_id": t['id'], "reason": "Aucun bus disponible"} for t in tournees
+            ],
+            "total_cost": 0.0,
+            "total_deadhead_km": 0.0
+        }
+
+    capacity = np.array([b['capacite'] for b in buses], dtype=float)
+    demand = np.array([t.get('demand') or 0 for t in tournees], dtype=float)
+    start = np.array([t.get('start_minutes', 0) for t in tournees], dtype=float)
+    end = np.array([t.get('end_minutes', 24 * 60) for t in tournees], dtype=float)
+
+    # Haut-le-pied: un bus sans dépôt connu reçoit la moyenne des autres bus
+    # pour la tournée (ni favorisé ni pénalisé); 0 si aucun point n'est connu
+    depot_known = np.array([b.get('depot') is not None for b in buses])
+    stop_known = np.array([t.get('first_stop') is not None for t in tournees])
+    depots = np.array([b.get('depot') or (0.0, 0.0) for b in buses], dtype=float)
+    first_stops = np.array([t.get('first_stop') or (0.0, 0.0) for t in tournees], dtype=float)
+    deadhead = _pairwise_haversine(depots, first_stops)
+    known = depot_known[:, None] & stop_known[None, :]
+    known_count = known.sum(axis=0)
+    column_mean = np.divide(
+        np.where(known, deadhead, 0.0).sum(axis=0), known_count,
+        out=np.zeros(len(tournees)), where=known_count > 0
+    )
+    deadhead = np.where(known, deadhead, column_mean[None, :])
+
+    empty_seats = capacity[:, None] - demand[None, :]
+    too_small = empty_seats < 0
+
+    # Créneaux déjà occupés: chevauchement avec la tournée
+    overlapping = np.zeros_like(too_small)
+    for bus_index, busy_start, busy_end in busy or []:
+        overlapping[bus_index] |= (start < busy_end) & (busy_start < end)
+
+    cost = deadhead + empty_seat_cost_km * np.maximum(empty_seats, 0)
+    forbidden = too_small | overlapping
+    cost[forbidden] = INFEASIBLE_COST
+
+    rows, cols = linear_sum_assignment(cost)
+
+    assignments = []
+    assigned = set()
+    for b, t in zip(rows.tolist(), cols.tolist()):
+        if forbidden[b, t]:
+            continue
+        assigned.add(t)
+        assignments.append({
+            "tournee_id": tournees[t]['id'],
+            "bus_id": buses[b]['id'],
+            "deadhead_km": round(float(deadhead[b, t]), 2),
+            "empty_seats": int(empty_seats[b, t]),
+            "cost": round(float(cost[b, t]), 2)
+        })
+
+    unassigned = []
+    for t, tournee in enumerate(tournees):
+        if t in assigned:
+            continue
+        if too_small[:, t].all():
+            reason = f"Aucun bus de capacité suffisante ({int(demand[t])} places)"
+        elif forbidden[:, t].all():
+            reason = "Aucun bus compatible libre sur ce créneau"
+        else:
+            reason = "Pas assez de bus disponibles"
+        unassigned.append({"tournee_id": tournee['id'], "reason": reason})
+
+    return {
+        "assignments": assignments,
+        "unassigned": unassigned,
+        "total_cost": round(sum(a["cost"] for a in assignments), 2),
+        "total_deadhead_km": round(sum(a["deadhead_km"] for a in assignments), 2)
+    }
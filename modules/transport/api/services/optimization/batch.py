@@ -0,0 +1,233 @@
+"""
+Optimisation par lot des tournées d'une journée
+Empreinte des arrêts, résolutions réparties sur un pool de processus et
+suivi de progression
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable
+
+from api.core.config import settings
+
+from . import optimize_school_bus_route
+from .scheduler import get_solver_scheduler, SolverPriority
+
+logger = logging.getLogger(__name__)
+
+# Nombre de travaux conservés pour consultation de la progression
+MAX_TRACKED_JOBS = 50
+
+
+def stop_set_fingerprint(
+    stops: List[Dict],
+    start_time: Optional[str] = None,
+    school_arrival_time: Optional[str] = None
+) -> str:
+    """
+    Empreinte d'un ensemble d'arrêts et des horaires de la tournée
+
+    Indépendante de l'ordre des arrêts (l'optimisation le modifie): seuls
+    comptent l'ensemble des arrêts, leurs coordonnées, leurs fenêtres
+    horaires et les heures de départ et d'arrivée.
+
+    Args:
+        stops: Arrêts [{id, latitude, longitude, opening_time, closing_time}]
+        start_time: Heure de départ (HH:MM)
+        school_arrival_time: Heure d'arrivée (HH:MM)
+
+    Returns:
+        Empreinte SHA-256 hexadécimale (64 caractères)
+    """
+    entries = sorted(
+        (
+            str(stop['id']),
+            round(float(stop['latitude']), 6),
+            round(float(stop['longitude']), 6),
+            str(stop.get('opening_time') or ''),
+            str(stop.get('closing_time') or '')
+        )
+        for stop in stops
+    )
+    payload = json.dumps([start_time, school_arrival_time, entries])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def stop_order_rows(route: List[Dict], offset: int = 0) -> List[tuple]:
+    """
+    Ordre de passage des arrêts d'une route optimisée
+
+    Numérotation commune à toutes les écritures de ordre_sequence: seuls
+    les arrêts (entrées avec stop_id) sont numérotés, à partir de offset + 1;
+    le point de départ n'a pas de numéro.
+
+    Args:
+        route: Route optimisée [{stop_id, arrival_time, ...}]
+        offset: Arrêts déjà effectués (re-planification en cours de tournée)
+
+    Returns:
+        Lignes (stop_id, ordre, heure d'arrivée)
+    """
+    stops = [stop for stop in route if stop.get('stop_id')]
+    return [
+        (stop['stop_id'], offset + i + 1, stop['arrival_time'])
+        for i, stop in enumerate(stops)
+    ]
+
+
+def solve_tournee(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Optimise une tournée (exécuté dans un processus du pool)
+
+    Args:
+        job: {tournee_id, stops, start_time, school_arrival_time,
+            vehicle_capacity, fingerprint}
+
+    Returns:
+        Résultat compact et sérialisable: ordre et ETA par arrêt, statistiques
+    """
+    stops = job['stops']
+    result = optimize_school_bus_route(
+        stops=stops,
+        # Comme optimiser-itineraire: départ depuis le premier arrêt actuel
+        depot_location=(stops[0]['latitude'], stops[0]['longitude']),
+        start_time=job['start_time'],
+        school_arrival_time=job['school_arrival_time'],
+        average_speed_kmh=settings.default_speed_kmh,
+        vehicle_capacity=job.get('vehicle_capacity')
+    )
+
+    outcome = {
+        "tournee_id": job['tournee_id'],
+        "fingerprint": job['fingerprint'],
+        "success": bool(result.get('success'))
+    }
+    if not outcome["success"]:
+        outcome["message"] = result.get('message', "Échec de l'optimisation")
+        outcome["diagnosis"] = result.get('diagnosis', [])
+        return outcome
+
+    outcome["route"] = [
+        {"stop_id": stop['stop_id'], "arrival_time": stop['arrival_time']}
+        for stop in result['route'] if stop.get('stop_id')
+    ]
+    outcome["statistics"] = result['statistics']
+    return outcome
+
+
+class BatchOptimizationJob:
+    """
+    Suivi d'une optimisation par lot
+
+    Les compteurs sont mis à jour à chaque tournée terminée; to_dict()
+    fournit la progression et le résultat par tournée.
+    """
+
+    def __init__(self, date_tournee: str, force: bool = False):
+        self.id = str(uuid.uuid4())
+        self.date_tournee = date_tournee
+        self.force = force
+        self.status = "pending"
+        self.total = 0
+        self.outcomes: Dict[str, Dict[str, Any]] = {}
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+
+    def record(self, tournee_id: str, status: str, **details) -> None:
+        """Enregistre le résultat d'une tournée (optimized, skipped, failed)"""
+        self.outcomes[tournee_id] = {"status": status, **details}
+
+    def to_dict(self) -> Dict[str, Any]:
+        counts = {"optimized": 0, "skipped": 0, "failed": 0}
+        for outcome in self.outcomes.values():
+            counts[outcome["status"]] = counts.get(outcome["status"], 0) + 1
+        done = len(self.outcomes)
+        return {
+            "job_id": self.id,
+            "date_tournee": self.date_tournee,
+            "status": self.status,
+            "total": self.total,
+            "done": done,
+            "progress_percent": round(done / self.total * 100, 1) if self.total else 100.0,
+            **counts,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "tournees": self.outcomes
+        }
+
+
+_jobs: Dict[str, BatchOptimizationJob] = {}
+
+
+def create_job(date_tournee: str, force: bool = False) -> BatchOptimizationJob:
+    """Crée un travail suivi (les plus anciens sont oubliés au-delà de MAX_TRACKED_JOBS)"""
+    job = BatchOptimizationJob(date_tournee, force)
+    _jobs[job.id] = job
+    while len(_jobs) > MAX_TRACKED_JOBS:
+        del _jobs[next(iter(_jobs))]
+    return job
+
+
+def get_job(job_id: str) -> Optional[BatchOptimizationJob]:
+    """Travail suivi par identifiant"""
+    return _jobs.get(job_id)
+
+
+async def optimize_tournees(
+    jobs: List[Dict[str, Any]],
+    on_result: Callable[[Dict[str, Any]], None],
+    max_workers: Optional[int] = None,
+    tenant: Optional[str] = None
+) -> None:
+    """
+    Répartit les résolutions sur un pool de processus
+
+    Chaque résolution passe par l'ordonnanceur du solveur en priorité
+    "lot": les demandes interactives restent prioritaires et le nombre de
+    résolutions simultanées reste borné. Au plus max_workers tournées sont
+    en file à la fois, pour ne pas saturer la file de l'ordonnanceur.
+
+    Args:
+        jobs: Tournées à optimiser (voir solve_tournee)
+        on_result: Appelé dans la boucle d'événements pour chaque résultat
+        max_workers: Processus du pool (défaut: configuration)
+        tenant: Organisation (partage équitable du solveur)
+    """
+    workers = max_workers or settings.batch_optimization_workers
+    scheduler = get_solver_scheduler()
+    pending = list(reversed(jobs))
+
+    # Création et arrêt du pool (qui attend les résolutions en cours) hors de
+    # la boucle d'événements
+    pool = await asyncio.to_thread(ProcessPoolExecutor, max_workers=workers)
+
+    def solve_in_pool(job):
+        return pool.submit(solve_tournee, job).result()
+
+    async def worker():
+        while pending:
+            job = pending.pop()
+            try:
+                outcome = await scheduler.run(
+                    solve_in_pool, job, tenant=tenant, priority=SolverPriority.BATCH
+                )
+            except Exception as e:
+                logger.exception(f"Batch optimization failed for {job['tournee_id']}")
+                outcome = {
+                    "tournee_id": job['tournee_id'],
+                    "success": False,
+                    "message": str(e)
+                }
+            on_result(outcome)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(min(workers, len(jobs)) or 1)))
+    finally:
+        await asyncio.to_thread(pool.shutdown, wait=True)
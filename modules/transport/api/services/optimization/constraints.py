@@ -0,0 +1,204 @@
+"""
+Pré-traitement des contraintes avant la recherche OR-Tools
+Élagage des arcs impossibles et détection des points inatteignables
+"""
+
+from typing import List, Tuple, Optional, Union, Sequence, Dict, Any
+
+import numpy as np
+
+ServiceTimes = Union[int, Sequence[int]]
+
+
+def _service_array(service_time: ServiceTimes, n: int) -> np.ndarray:
+    """Temps de service par point (scalaire ou liste) sous forme de vecteur"""
+    return np.broadcast_to(np.asarray(service_time, dtype=np.int64), (n,))
+
+
+def find_unreachable_nodes(
+    distance_matrix: List[List[int]],
+    depot: int,
+    max_distance: Optional[int] = None,
+    time_matrix: Optional[List[List[int]]] = None,
+    service_time: ServiceTimes = 0,
+    max_duration: Optional[int] = None,
+    end: Optional[int] = None
+) -> List[int]:
+    """
+    Trouve les points qui ne peuvent appartenir à aucune route valide
+
+    Un point est inatteignable si le trajet direct dépôt -> point -> arrivée
+    dépasse déjà la limite de distance ou de durée.
+
+    Args:
+        distance_matrix: Matrice de distances (mètres)
+        depot: Index du dépôt
+        max_distance: Distance max d'une route (mètres)
+        time_matrix: Matrice de temps (secondes)
+        service_time: Temps de service (secondes), global ou par point
+        max_duration: Durée max d'une route (secondes)
+        end: Index du point d'arrivée (défaut: dépôt)
+
+    Returns:
+        Liste des indices inatteignables
+    """
+    end = depot if end is None else end
+    dist = np.asarray(distance_matrix, dtype=np.int64)
+    n = len(dist)
+    mask = np.zeros(n, dtype=bool)
+
+    if max_distance is not None:
+        mask |= dist[depot, :] + dist[:, end] > max_distance
+
+    if time_matrix is not None and max_duration is not None:
+        times = np.asarray(time_matrix, dtype=np.int64)
+        service = _service_array(service_time, n)
+        mask |= times[depot, :] + service[depot] + times[:, end] + service > max_duration
+
+    mask[depot] = False
+    mask[end] = False
+    return [int(i) for i in np.flatnonzero(mask)]
+
+
+def find_infeasible_arcs(
+    distance_matrix: List[List[int]],
+    depot: int,
+    max_distance: Optional[int] = None,
+    time_matrix: Optional[List[List[int]]] = None,
+    service_time: ServiceTimes = 0,
+    max_duration: Optional[int] = None,
+    time_windows: Optional[List[Tuple[int, int]]] = None,
+    end: Optional[int] = None
+) -> List[Tuple[int, int]]:
+    """
+    Trouve les arcs (i -> j) qui ne peuvent appartenir à aucune route valide
+
+    Un arc est élagué si:
+    - dépôt -> i -> j -> arrivée dépasse la distance max
+    - dépôt -> i -> j -> arrivée dépasse la durée max
+    - l'arrivée au plus tôt en j via i dépasse la fin de sa fenêtre
+
+    Les arcs partant du dépôt ou menant à l'arrivée ne sont jamais élagués.
+
+    Args:
+        distance_matrix: Matrice de distances (mètres)
+        depot: Index du dépôt
+        max_distance: Distance max d'une route (mètres)
+        time_matrix: Matrice de temps (secondes)
+        service_time: Temps de service (secondes), global ou par point
+        max_duration: Durée max d'une route (secondes)
+        time_windows: Fenêtres temporelles [(début, fin), ...] en secondes
+        end: Index du point d'arrivée (défaut: dépôt)
+
+    Returns:
+        Liste des arcs (from_node, to_node) à supprimer
+    """
+    end = depot if end is None else end
+    dist = np.asarray(distance_matrix, dtype=np.int64)
+    n = len(dist)
+    mask = np.zeros((n, n), dtype=bool)
+
+    if max_distance is not None:
+        loop = dist[depot, :, None] + dist + dist[None, :, end]
+        mask |= loop > max_distance
+
+    if time_matrix is not None:
+        times = np.asarray(time_matrix, dtype=np.int64)
+        service = _service_array(service_time, n)
+        # Temps au plus tôt pour arriver en i depuis le dépôt
+        reach = times[depot, :] + service[depot]
+
+        if max_duration is not None:
+            loop = (
+                reach[:, None] + service[:, None] + times
+                + service[None, :] + times[None, :, end]
+            )
+            mask |= loop > max_duration
+
+        if time_windows:
+            starts = np.array([tw[0] for tw in time_windows], dtype=np.int64)
+            ends = np.array([tw[1] for tw in time_windows], dtype=np.int64)
+            earliest = np.maximum(starts, reach)
+            arrival = earliest[:, None] + service[:, None] + times
+            mask |= arrival > ends[None, :]
+
+    np.fill_diagonal(mask, False)
+    for node in {depot, end}:
+        mask[node, :] = False
+        mask[:, node] = False
+
+    rows, cols = np.nonzero(mask)
+    return [(int(i), int(j)) for i, j in zip(rows, cols)]
+
+
+def check_time_windows(
+    time_matrix: List[List[int]],
+    depot: int,
+    time_windows: Optional[List[Tuple[int, int]]] = None,
+    service_time: ServiceTimes = 0,
+    deadline: Optional[int] = None,
+    end: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Vérification rapide (linéaire) des fenêtres temporelles avant la recherche
+
+    Chaque point est testé seul, en trajet direct dépôt -> point -> arrivée.
+    Si même ce trajet est impossible, aucune route ne peut le desservir.
+
+    Args:
+        time_matrix: Matrice de temps (secondes)
+        depot: Index du dépôt
+        time_windows: Fenêtres temporelles [(début, fin), ...] en secondes
+        service_time: Temps de service (secondes), global ou par point
+        deadline: Heure limite d'arrivée (secondes depuis le départ)
+        end: Index du point d'arrivée (défaut: dépôt)
+
+    Returns:
+        Liste de diagnostics {index, reason, message} (vide si tout est faisable)
+    """
+    end = depot if end is None else end
+    times = np.asarray(time_matrix, dtype=np.int64)
+    n = len(times)
+    service = _service_array(service_time, n)
+
+    if time_windows:
+        starts = np.array([tw[0] for tw in time_windows], dtype=np.int64)
+        ends = np.array([tw[1] for tw in time_windows], dtype=np.int64)
+    else:
+        starts = np.zeros(n, dtype=np.int64)
+        ends = np.full(n, np.iinfo(np.int64).max)
+
+    reach = times[depot, :] + service[depot]
+    earliest = np.maximum(starts, reach)
+    finish = earliest + service + times[:, end]
+
+    diagnosis = []
+    for i in range(n):
+        if i in (depot, end):
+            continue
+        if starts[i] > ends[i]:
+            diagnosis.append({
+                "index": i,
+                "reason": "invalid_window",
+                "message": "Fenêtre temporelle invalide (ouverture après fermeture)"
+            })
+        elif reach[i] > ends[i]:
+            diagnosis.append({
+                "index": i,
+                "reason": "window_closed",
+                "message": (
+                    f"Arrivée au plus tôt à +{reach[i] // 60} min, "
+                    f"après la fermeture à +{ends[i] // 60} min"
+                )
+            })
+        elif deadline is not None and finish[i] > deadline:
+            diagnosis.append({
+                "index": i,
+                "reason": "deadline",
+                "message": (
+                    f"Arrivée à destination au plus tôt à +{finish[i] // 60} min, "
+                    f"après l'heure limite +{deadline // 60} min"
+                )
+            })
+
+    return diagnosis
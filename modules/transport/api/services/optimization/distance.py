@@ -3,7 +3,9 @@ Fonctions de calcul de distance
 """
 
 import math
-from typing import List, Tuple
+from typing import List, Tuple, Optional
+
+import numpy as np
 
 # Rayon de la Terre en kilomètres
 EARTH_RADIUS_KM = 6371.0
@@ -40,6 +42,25 @@ def haversine_distance(
     return EARTH_RADIUS_KM * c
 
 
+def haversine_vector(origins: np.ndarray, destinations: np.ndarray) -> np.ndarray:
+    """
+    Distance de Haversine paire à paire entre deux tableaux de points
+
+    Args:
+        origins: Tableau (n, 2) de (latitude, longitude)
+        destinations: Tableau (n, 2) de (latitude, longitude)
+
+    Returns:
+        Tableau (n,) de distances en kilomètres
+    """
+    a = np.radians(np.asarray(origins, dtype=float).reshape(-1, 2))
+    b = np.radians(np.asarray(destinations, dtype=float).reshape(-1, 2))
+    dlat = b[:, 0] - a[:, 0]
+    dlon = b[:, 1] - a[:, 1]
+    h = np.sin(dlat / 2) ** 2 + np.cos(a[:, 0]) * np.cos(b[:, 0]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
 def euclidean_distance(
     coord1: Tuple[float, float],
     coord2: Tuple[float, float]
@@ -60,6 +81,38 @@ def euclidean_distance(
     return math.sqrt((lat2 - lat1) ** 2 + (lon2 - lon1) ** 2)
 
 
+def project_to_meters(
+    coordinates: List[Tuple[float, float]],
+    reference_latitude: Optional[float] = None
+) -> np.ndarray:
+    """
+    Projette des coordonnées GPS sur un plan local en mètres
+
+    Projection équirectangulaire centrée sur la latitude moyenne,
+    suffisamment précise à l'échelle d'une ville pour les recherches
+    de voisinage (index spatial, rayons de marche)
+
+    Args:
+        coordinates: Liste de coordonnées (latitude, longitude)
+        reference_latitude: Latitude de référence en degrés (défaut: moyenne);
+            à fixer pour projeter plusieurs ensembles sur le même plan
+
+    Returns:
+        Tableau (n, 2) de positions (x, y) en mètres
+    """
+    coords = np.radians(np.asarray(coordinates, dtype=float).reshape(-1, 2))
+    if len(coords) == 0:
+        return np.zeros((0, 2))
+
+    if reference_latitude is None:
+        ref_lat = coords[:, 0].mean()
+    else:
+        ref_lat = math.radians(reference_latitude)
+    x = coords[:, 1] * math.cos(ref_lat) * EARTH_RADIUS_KM * 1000
+    y = coords[:, 0] * EARTH_RADIUS_KM * 1000
+    return np.column_stack((x, y))
+
+
 def calculate_travel_time(
     distance_km: float,
     speed_kmh: float = 30.0
@@ -0,0 +1,205 @@
+"""
+Estimation rapide de la longueur des tournées
+Arbre couvrant minimal et formule de Beardwood-Halton-Hammersley, sans solveur
+"""
+
+import math
+from typing import List, Tuple, Dict, Any, Optional
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components, minimum_spanning_tree
+from scipy.spatial import ConvexHull, QhullError, cKDTree
+
+from .distance import project_to_meters
+
+# Constantes asymptotiques pour des points uniformes dans le plan:
+# tournée optimale ~ BHH_CONSTANT * sqrt(n * A), arbre couvrant ~ MST_CONSTANT * sqrt(n * A)
+BHH_CONSTANT = 0.7124
+MST_CONSTANT = 0.6331
+
+# Nombre de points sous lequel l'estimation par l'aire est trop bruitée
+MIN_POINTS_FOR_AREA = 30
+
+# Voisins par point dans le graphe des k plus proches voisins
+NEAREST_NEIGHBORS = 10
+
+
+def _spanning_tree_length(points: np.ndarray) -> float:
+    """
+    Longueur (m) de l'arbre couvrant minimal euclidien
+
+    Calculé sur le graphe des k plus proches voisins; si ce graphe n'est
+    pas connexe, chaque composante est reliée à son point extérieur le plus
+    proche (étapes de Borůvka) jusqu'à connexité.
+    """
+    points = np.unique(points, axis=0)  # Les doublons ne coûtent rien
+    n = len(points)
+    if n < 2:
+        return 0.0
+
+    k = min(NEAREST_NEIGHBORS, n - 1)
+    tree = cKDTree(points)
+    distances, indices = tree.query(points, k=k + 1)
+    rows = [np.repeat(np.arange(n), k)]
+    cols = [indices[:, 1:].ravel()]
+    weights = [distances[:, 1:].ravel()]
+
+    while True:
+        graph = coo_matrix(
+            (np.concatenate(weights), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(n, n)
+        ).tocsr()
+        count, labels = connected_components(graph, directed=False)
+        if count == 1:
+            return float(minimum_spanning_tree(graph).sum())
+
+        for component in range(count):
+            inside = np.flatnonzero(labels == component)
+            outside = np.flatnonzero(labels != component)
+            gaps, nearest = cKDTree(points[outside]).query(points[inside])
+            best = int(np.argmin(gaps))
+            rows.append(np.array([inside[best]]))
+            cols.append(np.array([outside[nearest[best]]]))
+            weights.append(np.array([gaps[best]]))
+
+
+def _hull_area(points: np.ndarray) -> float:
+    """Aire (m²) de l'enveloppe convexe, 0 si les points sont alignés"""
+    if len(points) < 3:
+        return 0.0
+    try:
+        return float(ConvexHull(points).volume)
+    except QhullError:
+        return 0.0
+
+
+def estimate_route_length(
+    coordinates: List[Tuple[float, float]],
+    depot: Optional[Tuple[float, float]] = None,
+    vehicle_capacity: Optional[int] = None,
+    average_speed_kmh: float = 30.0,
+    service_time_minutes: float = 2.0,
+    max_route_duration_minutes: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Estime la distance et le nombre de véhicules nécessaires, sans optimiser
+
+    Distances à vol d'oiseau (plan local en mètres):
+    - une tournée unique passant par tous les points (et le dépôt) mesure
+      au moins l'arbre couvrant minimal (MST) et au plus 2 x MST;
+    - estimation: le plus grand de MST x BHH_CONSTANT / MST_CONSTANT et
+      BHH_CONSTANT * sqrt(n * A), A étant l'aire de l'enveloppe convexe
+      (formule de Beardwood-Halton-Hammersley, à partir de
+      MIN_POINTS_FOR_AREA points);
+    - avec une capacité Q, m = ceil(n / Q) véhicules: borne basse radiale
+      2 * somme(r_i) / Q, borne haute du découpage de la tournée
+      2 * somme(r_i) / Q + (1 - 1/Q) x borne haute de la tournée, et
+      estimation 2 * m * r_moyen + tournée (approximation de Daganzo).
+
+    Args:
+        coordinates: Points à desservir (latitude, longitude)
+        depot: Point de départ/arrivée (école); défaut: barycentre des points
+        vehicle_capacity: Places par véhicule (None = une seule tournée)
+        average_speed_kmh: Vitesse moyenne pour la durée estimée
+        service_time_minutes: Temps d'arrêt par point
+        max_route_duration_minutes: Durée maximale d'une tournée; augmente
+            le nombre de véhicules si nécessaire
+
+    Returns:
+        Dictionnaire avec:
+            - points, area_km2, mst_km
+            - tour: {lower_km, estimate_km, upper_km}
+            - fleet (si capacité): {vehicles, lower_km, estimate_km, upper_km}
+            - duration_minutes: {lower, estimate, upper}, cumulée sur tous
+              les véhicules (trajet + arrêts)
+    """
+    n = len(coordinates)
+    if n == 0:
+        empty = {"lower_km": 0.0, "estimate_km": 0.0, "upper_km": 0.0}
+        return {
+            "points": 0,
+            "area_km2": 0.0,
+            "mst_km": 0.0,
+            "tour": empty,
+            "fleet": {"vehicles": 0, **empty} if vehicle_capacity else None,
+            "duration_minutes": {"lower": 0.0, "estimate": 0.0, "upper": 0.0}
+        }
+
+    reference_latitude = float(np.mean([c[0] for c in coordinates]))
+    points = project_to_meters(coordinates, reference_latitude)
+    depot_xy = (
+        project_to_meters([depot], reference_latitude)[0]
+        if depot is not None else points.mean(axis=0)
+    )
+    with_depot = np.vstack((points, depot_xy))
+
+    mst = _spanning_tree_length(with_depot)
+    area = _hull_area(with_depot)
+
+    # Tournée unique
+    tour_lower, tour_upper = mst, 2 * mst
+    # BHH sous-estime quand les effets de bord dominent (peu de points):
+    # on garde le plus grand des deux estimateurs
+    tour_estimate = mst * BHH_CONSTANT / MST_CONSTANT
+    if n >= MIN_POINTS_FOR_AREA and area > 0:
+        tour_estimate = max(tour_estimate, BHH_CONSTANT * math.sqrt((n + 1) * area))
+    tour_estimate = min(max(tour_estimate, tour_lower), tour_upper)
+
+    lower, estimate, upper = tour_lower, tour_estimate, tour_upper
+    vehicles = 1
+    fleet = None
+    if vehicle_capacity:
+        radial = np.sqrt(((points - depot_xy) ** 2).sum(axis=1))
+        radial_sum, radial_mean = float(radial.sum()), float(radial.mean())
+        q = float(vehicle_capacity)
+        vehicles = math.ceil(n / q)
+        radial_bound = 2 * radial_sum / q
+
+        def fleet_estimate(count: int) -> float:
+            # Un seul véhicule: la tournée unique, qui passe déjà par le dépôt;
+            # au-delà, un aller-retour au dépôt par véhicule en plus
+            return tour_estimate if count == 1 else 2 * count * radial_mean + tour_estimate
+
+        estimate = fleet_estimate(vehicles)
+        if max_route_duration_minutes:
+            # Véhicules supplémentaires si les tournées seraient trop longues
+            minutes = estimate / 1000 / average_speed_kmh * 60 + n * service_time_minutes
+            vehicles = max(vehicles, math.ceil(minutes / max_route_duration_minutes))
+            estimate = fleet_estimate(vehicles)
+
+        if vehicles == 1:
+            lower, estimate, upper = tour_lower, tour_estimate, tour_upper
+        else:
+            # Borne haute calculée avec la charge effective par véhicule
+            load = min(q, float(math.ceil(n / vehicles)))
+            lower = max(tour_lower, radial_bound)
+            upper = max(2 * radial_sum / load + (1 - 1 / load) * tour_upper, lower)
+            estimate = min(max(estimate, lower), upper)
+
+        fleet = {
+            "vehicles": vehicles,
+            "lower_km": round(lower / 1000, 2),
+            "estimate_km": round(estimate / 1000, 2),
+            "upper_km": round(upper / 1000, 2)
+        }
+
+    def minutes(meters: float) -> float:
+        return round(meters / 1000 / average_speed_kmh * 60 + n * service_time_minutes, 1)
+
+    return {
+        "points": n,
+        "area_km2": round(area / 1e6, 3),
+        "mst_km": round(mst / 1000, 2),
+        "tour": {
+            "lower_km": round(tour_lower / 1000, 2),
+            "estimate_km": round(tour_estimate / 1000, 2),
+            "upper_km": round(tour_upper / 1000, 2)
+        },
+        "fleet": fleet,
+        "duration_minutes": {
+            "lower": minutes(lower),
+            "estimate": minutes(estimate),
+            "upper": minutes(upper)
+        }
+    }
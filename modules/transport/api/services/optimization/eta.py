@@ -0,0 +1,288 @@
+"""
+Moteur d'ETA en temps réel
+Recalcul vectorisé des heures d'arrivée de toutes les tournées actives
+"""
+
+import threading
+from datetime import datetime
+from functools import lru_cache, wraps
+from typing import List, Dict, Tuple, Optional, Any, Hashable
+
+import numpy as np
+
+from api.core.config import settings
+
+from .distance import haversine_vector
+
+
+def _synchronized(method):
+    """Sérialise les appels: le moteur est partagé par les threads des routes"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class ETAEngine:
+    """
+    Recalcule les ETA des arrêts restants de toutes les tournées en une passe
+
+    Chaque tournée chargée est stockée comme un tableau de sommes préfixes:
+    prefix[k] = durée (trajet + service) du premier arrêt restant jusqu'à
+    l'arrêt k. À chaque position GPS, seul le trajet position -> prochain
+    arrêt est recalculé; l'ETA de l'arrêt k vaut alors
+    now + trajet + prefix[k] - prefix[prochain].
+
+    Les tableaux de toutes les tournées sont concaténés (une ligne par
+    arrêt, offsets par tournée) pour traiter toutes les positions reçues
+    en quelques opérations numpy. Seules les ETA qui s'écartent de plus de
+    threshold_seconds de la dernière valeur émise sont renvoyées.
+
+    Usage:
+        engine = ETAEngine()
+        engine.load_route("t1", [{"id": "a1", "latitude": ..., "longitude": ...}])
+        changes = engine.update({"t1": (48.85, 2.35)})
+    """
+
+    def __init__(
+        self,
+        speed_kmh: Optional[float] = None,
+        service_time_seconds: Optional[int] = None,
+        threshold_seconds: Optional[float] = None,
+        arrival_radius_meters: Optional[float] = None
+    ):
+        """
+        Args:
+            speed_kmh: Vitesse moyenne (défaut: configuration)
+            service_time_seconds: Temps d'arrêt par défaut (défaut: configuration)
+            threshold_seconds: Écart minimal pour émettre une ETA (défaut: configuration)
+            arrival_radius_meters: Distance sous laquelle un arrêt est
+                considéré atteint (défaut: configuration)
+        """
+        self.speed_kmh = speed_kmh or settings.default_speed_kmh
+        self.service_time_seconds = (
+            service_time_seconds
+            if service_time_seconds is not None
+            else settings.default_service_time_minutes * 60
+        )
+        self.threshold_seconds = (
+            threshold_seconds
+            if threshold_seconds is not None
+            else settings.eta_change_threshold_seconds
+        )
+        self.arrival_radius_km = (
+            arrival_radius_meters
+            if arrival_radius_meters is not None
+            else settings.eta_arrival_radius_meters
+        ) / 1000
+
+        self._lock = threading.RLock()
+
+        # Tournées chargées: route_id -> arrays propres à la tournée
+        self._routes: Dict[Hashable, Dict[str, Any]] = {}
+        self._dirty = False
+        self._build()
+
+    # ------------------------------------------------------------------
+    # Chargement
+    # ------------------------------------------------------------------
+
+    @_synchronized
+    def load_route(
+        self,
+        route_id: Hashable,
+        stops: List[Dict],
+        service_times: Optional[List[int]] = None
+    ) -> None:
+        """
+        Charge (ou remplace) les arrêts restants d'une tournée
+
+        Args:
+            route_id: Identifiant de la tournée
+            stops: Arrêts restants dans l'ordre [{id, latitude, longitude}]
+            service_times: Temps d'arrêt par arrêt en secondes (défaut: moteur)
+        """
+        if not stops:
+            self.remove_route(route_id)
+            return
+
+        self._sync()
+        coords = np.array(
+            [(stop['latitude'], stop['longitude']) for stop in stops], dtype=float
+        ).reshape(-1, 2)
+        services = (
+            np.asarray(service_times, dtype=float)
+            if service_times is not None
+            else np.full(len(stops), float(self.service_time_seconds))
+        )
+
+        legs = haversine_vector(coords[:-1], coords[1:]) / self.speed_kmh * 3600
+        prefix = np.zeros(len(stops))
+        if len(stops) > 1:
+            prefix[1:] = np.cumsum(legs + services[:-1])
+
+        self._routes[route_id] = {
+            "stop_ids": [stop['id'] for stop in stops],
+            "coords": coords,
+            "prefix": prefix,
+            "next": 0,
+            "emitted": np.full(len(stops), np.nan)
+        }
+        self._dirty = True
+
+    @_synchronized
+    def remove_route(self, route_id: Hashable) -> None:
+        """Retire une tournée (terminée ou re-planifiée)"""
+        self._sync()
+        if self._routes.pop(route_id, None) is not None:
+            self._dirty = True
+
+    def has_route(self, route_id: Hashable) -> bool:
+        """Indique si la tournée est chargée"""
+        return route_id in self._routes
+
+    @property
+    def route_ids(self) -> List[Hashable]:
+        """Tournées chargées"""
+        return list(self._routes)
+
+    # ------------------------------------------------------------------
+    # Recalcul
+    # ------------------------------------------------------------------
+
+    @_synchronized
+    def update(
+        self,
+        positions: Dict[Hashable, Tuple[float, float]],
+        now: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Recalcule les ETA des tournées dont la position a changé
+
+        Un arrêt dont le véhicule passe à moins du rayon d'arrivée est
+        considéré desservi: le prochain arrêt avance.
+
+        Args:
+            positions: Position actuelle par tournée {route_id: (lat, lon)};
+                les tournées non chargées sont ignorées
+            now: Instant de la mesure (défaut: maintenant)
+
+        Returns:
+            ETA modifiées [{route_id, stop_id, eta, delta_seconds}];
+            delta_seconds vaut None pour une première émission
+        """
+        if self._dirty:
+            self._build()
+
+        now = now or datetime.now()
+        known = [route_id for route_id in positions if route_id in self._index]
+        if not known:
+            return []
+
+        routes = np.array([self._index[route_id] for route_id in known], dtype=int)
+        points = np.array([positions[route_id] for route_id in known], dtype=float)
+        sizes = self._offsets[routes + 1] - self._offsets[routes]
+
+        # Avancer le prochain arrêt tant que le véhicule est dans le rayon
+        # d'arrivée (un passage par arrêt franchi depuis la dernière mesure)
+        while True:
+            pending = self._next[routes] < sizes
+            target = self._offsets[routes] + np.minimum(self._next[routes], sizes - 1)
+            arrived = pending & (
+                haversine_vector(points, self._coords[target]) <= self.arrival_radius_km
+            )
+            if not arrived.any():
+                break
+            self._next[routes[arrived]] += 1
+
+        pending = self._next[routes] < sizes
+        routes, points = routes[pending], points[pending]
+        if len(routes) == 0:
+            return []
+
+        next_rows = self._offsets[routes] + self._next[routes]
+        travel = haversine_vector(points, self._coords[next_rows]) / self.speed_kmh * 3600
+
+        # Lignes (arrêts) concernées: tournées mises à jour, à partir du prochain arrêt
+        slot = np.full(len(self._offsets) - 1, -1)
+        slot[routes] = np.arange(len(routes))
+        row_slot = slot[self._route_of]
+        rows = np.flatnonzero(
+            (row_slot >= 0) & (self._local >= self._next[self._route_of])
+        )
+        row_slot = row_slot[rows]
+
+        base = now.timestamp() + travel - self._prefix[next_rows]
+        etas = base[row_slot] + self._prefix[rows]
+
+        previous = self._emitted[rows]
+        changed = np.isnan(previous) | (np.abs(etas - previous) > self.threshold_seconds)
+        rows, etas, previous = rows[changed], etas[changed], previous[changed]
+        self._emitted[rows] = etas
+
+        return [
+            {
+                "route_id": self._ids[route],
+                "stop_id": self._stop_ids[row],
+                "eta": datetime.fromtimestamp(eta, tz=now.tzinfo),
+                "delta_seconds": None if np.isnan(prior) else round(eta - prior)
+            }
+            for row, route, eta, prior in zip(
+                rows.tolist(), self._route_of[rows].tolist(), etas.tolist(), previous.tolist()
+            )
+        ]
+
+    @_synchronized
+    def remaining_stop_ids(self, route_id: Hashable) -> List[Any]:
+        """Arrêts pas encore atteints d'une tournée"""
+        self._sync()
+        route = self._routes.get(route_id)
+        return route["stop_ids"][route["next"]:] if route else []
+
+    # ------------------------------------------------------------------
+    # Stockage concaténé
+    # ------------------------------------------------------------------
+
+    def _sync(self) -> None:
+        """Reporte la progression des tableaux concaténés dans chaque tournée"""
+        if self._dirty:
+            return
+        for position, route_id in enumerate(self._ids):
+            start, end = self._offsets[position], self._offsets[position + 1]
+            route = self._routes[route_id]
+            route["next"] = int(self._next[position])
+            route["emitted"] = self._emitted[start:end].copy()
+
+    def _build(self) -> None:
+        """Reconstruit les tableaux concaténés de toutes les tournées"""
+        self._ids = list(self._routes)
+        self._index = {route_id: i for i, route_id in enumerate(self._ids)}
+        routes = [self._routes[route_id] for route_id in self._ids]
+        sizes = np.array([len(route["prefix"]) for route in routes], dtype=int)
+
+        self._offsets = np.concatenate(([0], np.cumsum(sizes))).astype(int)
+        self._route_of = np.repeat(np.arange(len(routes)), sizes)
+        self._local = np.arange(int(sizes.sum())) - np.repeat(self._offsets[:-1], sizes)
+        self._next = np.array([route["next"] for route in routes], dtype=int)
+        self._coords = (
+            np.concatenate([route["coords"] for route in routes])
+            if routes else np.zeros((0, 2))
+        )
+        self._prefix = (
+            np.concatenate([route["prefix"] for route in routes])
+            if routes else np.zeros(0)
+        )
+        self._emitted = (
+            np.concatenate([route["emitted"] for route in routes])
+            if routes else np.zeros(0)
+        )
+        self._stop_ids = [stop_id for route in routes for stop_id in route["stop_ids"]]
+        self._dirty = False
+
+
+@lru_cache()
+def get_eta_engine() -> ETAEngine:
+    """Moteur d'ETA partagé par le processus"""
+    return ETAEngine()
+
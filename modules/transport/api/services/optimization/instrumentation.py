@@ -0,0 +1,144 @@
+"""
+Instrumentation du solveur
+Temps par phase, solutions trouvées, trajectoire de l'objectif et raison d'arrêt
+"""
+
+import logging
+import time
+from typing import Dict, Any, List, Optional
+
+from ortools.constraint_solver import routing_enums_pb2
+
+# Logger dédié: les métriques peuvent être routées vers un collecteur
+# (JSON, Loki, ...) indépendamment des logs applicatifs
+metrics_logger = logging.getLogger("api.metrics.optimization")
+
+_STATUS = routing_enums_pb2.RoutingSearchStatus
+
+# Statut OR-Tools -> raison d'arrêt lisible
+TERMINATION_REASONS = {
+    _STATUS.ROUTING_NOT_SOLVED: "not_solved",
+    _STATUS.ROUTING_SUCCESS: "solved",
+    _STATUS.ROUTING_PARTIAL_SUCCESS_LOCAL_OPTIMUM_NOT_REACHED: "time_limit",
+    _STATUS.ROUTING_FAIL: "no_solution",
+    _STATUS.ROUTING_FAIL_TIMEOUT: "time_limit_no_solution",
+    _STATUS.ROUTING_INVALID: "invalid_model",
+    _STATUS.ROUTING_INFEASIBLE: "infeasible",
+    _STATUS.ROUTING_OPTIMAL: "optimal",
+}
+
+
+class SolverDiagnostics:
+    """
+    Collecte les mesures d'une résolution
+
+    Usage:
+        diagnostics = SolverDiagnostics()
+        matrix = create_distance_matrix(locations)
+        diagnostics.lap("matrix")
+        ...
+        diagnostics.watch_search(routing)
+        solution = routing.SolveWithParameters(params)
+        diagnostics.lap("search")
+        diagnostics.finish(routing)
+        result["diagnostics"] = diagnostics.to_dict()
+    """
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._last_lap = self._origin
+        self.phases: Dict[str, float] = {}
+        self.solutions_found = 0
+        self.trajectory: List[Dict[str, float]] = []
+        self.termination_reason: Optional[str] = None
+
+    def lap(self, name: str) -> None:
+        """Clôt la phase en cours: durée écoulée depuis la phase précédente"""
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0.0) + now - self._last_lap
+        self._last_lap = now
+
+    def watch_search(self, routing) -> None:
+        """
+        Enregistre les solutions trouvées pendant la recherche
+
+        Toutes les solutions sont comptées; seules les améliorations de
+        l'objectif sont conservées dans la trajectoire.
+        """
+        def on_solution():
+            self.solutions_found += 1
+            objective = routing.CostVar().Value()
+            if not self.trajectory or objective < self.trajectory[-1]["objective"]:
+                self.trajectory.append({
+                    "elapsed_seconds": round(time.perf_counter() - self._origin, 3),
+                    "objective": objective
+                })
+
+        routing.AddAtSolutionCallback(on_solution)
+
+    def finish(
+        self,
+        routing=None,
+        reason: Optional[str] = None,
+        time_limit_seconds: Optional[float] = None
+    ) -> None:
+        """
+        Fixe la raison d'arrêt (statut du solveur ou raison explicite)
+
+        Avec une métaheuristique (GLS), OR-Tools renvoie ROUTING_SUCCESS même
+        quand la recherche s'arrête sur la limite de temps: la durée de la
+        phase "search" permet alors de distinguer ce cas.
+        """
+        if reason is not None:
+            self.termination_reason = reason
+            return
+        if routing is None:
+            return
+
+        status = routing.status()
+        self.termination_reason = TERMINATION_REASONS.get(status, "unknown")
+        if (
+            status == _STATUS.ROUTING_SUCCESS
+            and time_limit_seconds
+            and self.phases.get("search", 0.0) >= 0.99 * time_limit_seconds
+        ):
+            self.termination_reason = "time_limit"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Bloc diagnostics sérialisable"""
+        return {
+            "phases_ms": {
+                name: round(seconds * 1000, 1) for name, seconds in self.phases.items()
+            },
+            "total_ms": round((time.perf_counter() - self._origin) * 1000, 1),
+            "solutions_found": self.solutions_found,
+            "best_objective": self.trajectory[-1]["objective"] if self.trajectory else None,
+            "objective_trajectory": self.trajectory,
+            "termination_reason": self.termination_reason
+        }
+
+
+def emit_metrics(strategy: str, locations_count: int, diagnostics: Dict[str, Any]) -> None:
+    """
+    Émet les diagnostics d'une résolution comme métriques
+
+    Un enregistrement par résolution sur le logger api.metrics.optimization,
+    avec les valeurs dans l'attribut `metrics` pour les formateurs structurés.
+    """
+    metrics = {
+        "strategy": strategy,
+        "locations": locations_count,
+        "total_ms": diagnostics.get("total_ms"),
+        "solutions_found": diagnostics.get("solutions_found"),
+        "best_objective": diagnostics.get("best_objective"),
+        "termination_reason": diagnostics.get("termination_reason"),
+        **{
+            f"phase_{name}_ms": value
+            for name, value in diagnostics.get("phases_ms", {}).items()
+        }
+    }
+    metrics_logger.info(
+        "optimization %s",
+        " ".join(f"{key}={value}" for key, value in metrics.items()),
+        extra={"metrics": metrics}
+    )
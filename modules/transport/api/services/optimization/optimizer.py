@@ -4,14 +4,18 @@ Utilise le pattern Strategy pour choisir l'algorithme
 """
 
 import logging
+import time
 from typing import List, Dict, Any, Tuple, Optional
 from datetime import datetime
 
+import numpy as np
+
 from api.core.config import settings
 from api.core.exceptions import OptimizationError, ValidationError
 
 from .strategies import OptimizationStrategy, VRPStrategy, VRPTWStrategy
-from .distance import haversine_distance, create_distance_matrix
+from .distance import haversine_distance, haversine_vector, create_distance_matrix
+from .instrumentation import emit_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -38,19 +42,33 @@ class RouteOptimizer:
         strategy: Optional[OptimizationStrategy] = None,
         timeout_seconds: Optional[int] = None,
         speed_kmh: Optional[float] = None,
-        service_time_minutes: Optional[int] = None
+        service_time_minutes: Optional[int] = None,
+        max_distance_km: Optional[float] = None,
+        max_duration_minutes: Optional[float] = None,
+        vehicle_capacity: Optional[int] = None
     ):
         self.timeout = timeout_seconds or settings.optimization_timeout_seconds
         self.speed_kmh = speed_kmh or settings.default_speed_kmh
         self.service_time = (service_time_minutes or settings.default_service_time_minutes) * 60
 
+        # Limites appliquées par le solveur (surchargeables par les contraintes)
+        self.max_distance_km = max_distance_km or settings.max_route_distance_km
+        self.max_duration_minutes = max_duration_minutes or settings.max_route_duration_minutes
+        # Capacité injectée seulement si fixée explicitement: sinon la
+        # stratégie se rabat sur sum(demands)
+        self.vehicle_capacity = vehicle_capacity
+
         self._strategy = strategy
 
     @property
     def strategy(self) -> OptimizationStrategy:
         """Retourne la stratégie (lazy initialization)"""
         if self._strategy is None:
-            self._strategy = VRPStrategy(timeout_seconds=self.timeout)
+            self._strategy = VRPStrategy(
+                timeout_seconds=self.timeout,
+                speed_kmh=self.speed_kmh,
+                service_time_seconds=self.service_time
+            )
         return self._strategy
 
     @strategy.setter
@@ -74,14 +92,29 @@ class RouteOptimizer:
                 - demands: Demandes par point (pour CVRP)
                 - max_distance: Distance max en km
                 - max_duration: Durée max en minutes
+                - vehicle_capacity: Capacité du véhicule (avec demands)
+
+            Les limites de distance et de durée absentes prennent les valeurs
+            de l'optimiseur (max_route_distance_km, max_route_duration_minutes).
+            Sans vehicle_capacity (ni ici ni à la construction), la capacité
+            vaut sum(demands).
 
         Returns:
             Dictionnaire avec:
                 - success: Booléen
                 - route: Liste ordonnée des points
                 - statistics: Statistiques de la route
+                - diagnostics: Temps par phase, solutions trouvées,
+                  trajectoire de l'objectif et raison d'arrêt
         """
-        constraints = constraints or {}
+        validation_start = time.perf_counter()
+        defaults = {
+            "max_distance": self.max_distance_km,
+            "max_duration": self.max_duration_minutes
+        }
+        if self.vehicle_capacity is not None:
+            defaults["vehicle_capacity"] = self.vehicle_capacity
+        constraints = {**defaults, **(constraints or {})}
 
         # Validation des entrées
         self._validate_locations(locations)
@@ -90,12 +123,21 @@ class RouteOptimizer:
         # Sélectionner automatiquement la stratégie si pas définie
         if self._strategy is None:
             self._strategy = self._select_strategy(constraints)
+        validation_ms = round((time.perf_counter() - validation_start) * 1000, 1)
 
         logger.info(f"Optimizing route with {len(locations)} locations using {type(self._strategy).__name__}")
 
         try:
             result = self.strategy.solve(locations, constraints)
 
+            diagnostics = result.get("diagnostics")
+            if diagnostics is not None:
+                diagnostics["phases_ms"] = {
+                    "validation": validation_ms, **diagnostics["phases_ms"]
+                }
+                diagnostics["total_ms"] = round(diagnostics["total_ms"] + validation_ms, 1)
+                emit_metrics(type(self.strategy).__name__, len(locations), diagnostics)
+
             if result.get("success"):
                 logger.info(f"Optimization successful: {result['statistics']}")
             else:
@@ -178,18 +220,14 @@ class RouteOptimizer:
         """
         from datetime import timedelta
 
-        etas = [start_time]
-        cumulative_time = 0
-
-        for i in range(len(route) - 1):
-            distance = haversine_distance(route[i], route[i + 1])
-            travel_time = (distance / self.speed_kmh) * 3600  # En secondes
-            cumulative_time += travel_time + self.service_time
+        if len(route) < 2:
+            return [start_time] * len(route)
 
-            eta = start_time + timedelta(seconds=cumulative_time)
-            etas.append(eta)
+        points = np.asarray(route, dtype=float)
+        travel_times = haversine_vector(points[:-1], points[1:]) / self.speed_kmh * 3600
+        cumulative = np.concatenate(([0.0], np.cumsum(travel_times + self.service_time)))
 
-        return etas
+        return [start_time + timedelta(seconds=seconds) for seconds in cumulative.tolist()]
 
     def estimate_route_metrics(
         self,
@@ -238,12 +276,12 @@ class RouteOptimizer:
 
     def _validate_constraints(self, constraints: Dict[str, Any]) -> None:
         """Valide les contraintes"""
-        if "max_distance" in constraints:
+        if constraints.get("max_distance") is not None:
             max_dist = constraints["max_distance"]
             if max_dist <= 0:
                 raise ValidationError("max_distance doit être positif")
 
-        if "max_duration" in constraints:
+        if constraints.get("max_duration") is not None:
             max_dur = constraints["max_duration"]
             if max_dur <= 0:
                 raise ValidationError("max_duration doit être positif")
@@ -253,6 +291,10 @@ class RouteOptimizer:
             if depot < 0:
                 raise ValidationError("depot_index doit être positif ou nul")
 
+        if constraints.get("vehicle_capacity") is not None:
+            if constraints["vehicle_capacity"] <= 0:
+                raise ValidationError("vehicle_capacity doit être positif")
+
     def _select_strategy(self, constraints: Dict[str, Any]) -> OptimizationStrategy:
         """Sélectionne automatiquement la meilleure stratégie"""
         has_time_windows = "time_windows" in constraints and constraints["time_windows"]
@@ -265,7 +307,11 @@ class RouteOptimizer:
                 speed_kmh=self.speed_kmh
             )
 
-        return VRPStrategy(timeout_seconds=self.timeout)
+        return VRPStrategy(
+            timeout_seconds=self.timeout,
+            speed_kmh=self.speed_kmh,
+            service_time_seconds=self.service_time
+        )
 
 
 # Fonction utilitaire pour usage rapide
@@ -0,0 +1,189 @@
+"""
+Re-planification dynamique d'une tournée en cours
+Seule la suite de la tournée (arrêts non desservis) est ré-optimisée depuis
+la position actuelle du véhicule, à chaud et avec un budget de temps court
+"""
+
+from datetime import datetime, timedelta
+from typing import List, Dict, Tuple, Optional, Any
+
+from api.core.config import settings
+
+from .optimizer import RouteOptimizer
+from .strategies import VRPTWStrategy
+from .distance import haversine_distance
+
+
+def _seconds_until(value: Any, now: datetime) -> Optional[int]:
+    """Heure (HH:MM, HH:MM:SS ou time) en secondes depuis now (None si absente)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.strptime(value, "%H:%M:%S" if value.count(":") == 2 else "%H:%M").time()
+    moment = now.replace(hour=value.hour, minute=value.minute, second=value.second, microsecond=0)
+    return int((moment - now).total_seconds())
+
+
+def _sequence_etas(
+    position: Tuple[float, float],
+    stops: List[Dict],
+    now: datetime,
+    speed_kmh: float,
+    service_seconds: List[int]
+) -> List[Dict[str, Any]]:
+    """ETA le long de la séquence actuelle, sans ré-ordonnancement"""
+    route = []
+    previous, elapsed, distance = position, 0.0, 0.0
+    for stop, service in zip(stops, service_seconds):
+        leg = haversine_distance(previous, (stop['latitude'], stop['longitude']))
+        distance += leg
+        elapsed += leg / speed_kmh * 3600
+        route.append({
+            "stop_id": stop.get('id'),
+            "adresse": stop.get('adresse', ''),
+            "latitude": stop['latitude'],
+            "longitude": stop['longitude'],
+            "arrival_time": (now + timedelta(seconds=elapsed)).strftime('%H:%M:%S'),
+            "cumulative_distance_km": round(distance, 2),
+            "cumulative_time_minutes": round(elapsed / 60, 1)
+        })
+        elapsed += service
+        previous = (stop['latitude'], stop['longitude'])
+    return route
+
+
+def replan_remaining_route(
+    current_position: Tuple[float, float],
+    remaining_stops: List[Dict],
+    now: Optional[datetime] = None,
+    school_location: Optional[Tuple[float, float]] = None,
+    school_arrival_time: Optional[str] = None,
+    average_speed_kmh: float = 30.0,
+    service_time_minutes: Optional[float] = None,
+    time_budget_seconds: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Ré-optimise la fin d'une tournée depuis la position actuelle du véhicule
+
+    La séquence restante actuelle sert de solution initiale: la recherche
+    part d'une route valide et l'améliore dans le budget de temps. Si les
+    contraintes horaires ne sont plus tenables (retard), l'ordre actuel est
+    conservé et les ETA sont recalculées avec le drapeau "late".
+
+    Args:
+        current_position: Dernière position GPS (lat, lon)
+        remaining_stops: Arrêts non desservis, dans l'ordre prévu
+            [{id, latitude, longitude}] (+ opening_time, closing_time,
+            service_time_minutes, demand optionnels)
+        now: Heure de référence (défaut: maintenant)
+        school_location: Arrivée à l'école (défaut: route ouverte)
+        school_arrival_time: Heure limite d'arrivée (HH:MM)
+        average_speed_kmh: Vitesse moyenne
+        service_time_minutes: Temps d'arrêt par défaut (défaut: configuration)
+        time_budget_seconds: Budget de recherche (défaut: configuration)
+
+    Returns:
+        Route restante avec ETA par arrêt
+    """
+    now = now or datetime.now()
+    budget = time_budget_seconds or settings.replan_time_budget_seconds
+    default_service = (
+        service_time_minutes
+        if service_time_minutes is not None
+        else settings.default_service_time_minutes
+    )
+    service_seconds = [
+        int((s.get('service_time_minutes') if s.get('service_time_minutes') is not None
+             else default_service) * 60)
+        for s in remaining_stops
+    ]
+
+    if not remaining_stops:
+        return {"success": True, "route": [], "replanned": False, "late": False}
+
+    # Un seul arrêt restant: rien à ré-ordonner
+    if len(remaining_stops) == 1 and school_location is None:
+        return {
+            "success": True,
+            "route": _sequence_etas(
+                current_position, remaining_stops, now, average_speed_kmh, service_seconds
+            ),
+            "replanned": False,
+            "late": False
+        }
+
+    deadline = _seconds_until(school_arrival_time, now)
+    locations = [current_position] + [
+        (s['latitude'], s['longitude']) for s in remaining_stops
+    ]
+    time_windows = [(0, deadline if deadline is not None else 86400)]
+    for stop in remaining_stops:
+        opening = _seconds_until(stop.get('opening_time'), now)
+        closing = _seconds_until(stop.get('closing_time'), now)
+        time_windows.append((
+            max(opening or 0, 0),
+            closing if closing is not None else time_windows[0][1]
+        ))
+
+    constraints = {
+        "depot_index": 0,
+        "start_time": now,
+        "time_windows": time_windows,
+        "service_times": [0] + service_seconds,
+        "demands": [0] + [int(s.get('demand', 1)) for s in remaining_stops],
+        "initial_routes": [list(range(1, len(remaining_stops) + 1))],
+        # Limites de route déjà engagées: seule l'heure limite compte ici
+        "max_distance": None,
+        "max_duration": None
+    }
+    if deadline is not None:
+        constraints["route_deadline"] = max(deadline, 0)
+    if school_location:
+        locations.append(school_location)
+        time_windows.append(time_windows[0])
+        constraints["service_times"].append(0)
+        constraints["demands"].append(0)
+        constraints["vehicle_ends"] = [len(locations) - 1]
+    else:
+        constraints["vehicle_ends"] = [None]
+
+    optimizer = RouteOptimizer(
+        speed_kmh=average_speed_kmh,
+        strategy=VRPTWStrategy(
+            timeout_seconds=budget,
+            speed_kmh=average_speed_kmh
+        )
+    )
+    result = optimizer.optimize(locations, constraints)
+
+    if not result.get('success'):
+        # Retard: conserver l'ordre prévu et annoncer les ETA réelles
+        return {
+            "success": True,
+            "route": _sequence_etas(
+                current_position, remaining_stops, now, average_speed_kmh, service_seconds
+            ),
+            "replanned": False,
+            "late": True,
+            "message": result.get('message'),
+            "diagnosis": result.get('diagnosis', []),
+            "diagnostics": result.get('diagnostics')
+        }
+
+    route = []
+    for stop_data in result['route']:
+        index = stop_data['index']
+        if 0 < index <= len(remaining_stops):
+            stop = remaining_stops[index - 1]
+            stop_data['stop_id'] = stop.get('id')
+            stop_data['adresse'] = stop.get('adresse', '')
+            route.append(stop_data)
+
+    return {
+        "success": True,
+        "route": route,
+        "replanned": [s['stop_id'] for s in route] != [s.get('id') for s in remaining_stops],
+        "late": False,
+        "statistics": result['statistics'],
+        "diagnostics": result.get('diagnostics')
+    }
@@ -0,0 +1,329 @@
+"""
+Ordonnanceur des résolutions OR-Tools
+Limite de concurrence, priorités, partage équitable entre organisations
+et rejet anticipé quand la file est trop longue
+"""
+
+import asyncio
+import contextvars
+import functools
+import math
+import time
+from collections import deque
+from enum import IntEnum
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, Optional
+
+import numpy as np
+
+from api.core.config import settings
+from api.core.exceptions import RateLimitError
+
+from .instrumentation import metrics_logger
+
+# Organisation utilisée quand l'appelant n'en fournit pas
+DEFAULT_TENANT = "default"
+
+
+class SolverPriority(IntEnum):
+    """Priorité d'une résolution (la plus petite valeur passe en premier)"""
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+class _Waiter:
+    """Demande en attente d'un créneau de résolution"""
+
+    __slots__ = ("tenant", "priority", "future", "enqueued_at")
+
+    def __init__(self, tenant: str, priority: SolverPriority, future: asyncio.Future):
+        self.tenant = tenant
+        self.priority = priority
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class SolverScheduler:
+    """
+    Contrôle d'admission des résolutions
+
+    Au plus max_concurrent résolutions s'exécutent en même temps (dans des
+    threads, hors de la boucle d'événements). Les demandes suivantes sont
+    mises en file:
+    - les demandes interactives passent avant les traitements par lot;
+    - à priorité égale, le créneau libéré va à l'organisation qui a le moins
+      de résolutions en cours, puis à celle servie le moins récemment
+      (tourniquet), puis à la demande la plus ancienne;
+    - au-delà de la profondeur maximale de la file, la demande est rejetée
+      immédiatement (RateLimitError avec un délai Retry-After estimé).
+
+    Usage:
+        scheduler = get_solver_scheduler()
+        result = await scheduler.run(
+            optimize_school_bus_route, stops, depot, tenant=org_id
+        )
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        max_queue_depth: Optional[int] = None,
+        max_batch_queue_depth: Optional[int] = None
+    ):
+        """
+        Args:
+            max_concurrent: Résolutions simultanées (défaut: configuration)
+            max_queue_depth: File maximale des demandes interactives (défaut: configuration)
+            max_batch_queue_depth: File maximale des traitements par lot (défaut: configuration)
+        """
+        self.max_concurrent = max_concurrent or settings.solver_max_concurrent
+        self.max_queue_depth = {
+            SolverPriority.INTERACTIVE: (
+                max_queue_depth if max_queue_depth is not None
+                else settings.solver_max_queue_depth
+            ),
+            SolverPriority.BATCH: (
+                max_batch_queue_depth if max_batch_queue_depth is not None
+                else settings.solver_max_batch_queue_depth
+            ),
+        }
+
+        self._waiting: Dict[SolverPriority, Dict[str, Deque[_Waiter]]] = {
+            priority: {} for priority in SolverPriority
+        }
+        self._running = 0
+        self._running_by_tenant: Dict[str, int] = {}
+        self._last_served: Dict[str, float] = {}
+
+        # Mesures
+        self._queue_times: Dict[SolverPriority, Deque[float]] = {
+            priority: deque(maxlen=1000) for priority in SolverPriority
+        }
+        self._solve_seconds: Optional[float] = None
+        self._completed = 0
+        self._rejected = 0
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    async def run(
+        self,
+        func: Callable[..., Any],
+        *args,
+        tenant: Optional[str] = None,
+        priority: SolverPriority = SolverPriority.INTERACTIVE,
+        **kwargs
+    ) -> Any:
+        """
+        Exécute une résolution dès qu'un créneau est disponible
+
+        Args:
+            func: Fonction de résolution (synchrone, exécutée dans un thread)
+            *args, **kwargs: Arguments de func
+            tenant: Organisation à l'origine de la demande
+            priority: Priorité de la demande
+
+        Returns:
+            Résultat de func
+
+        Raises:
+            RateLimitError: File d'attente pleine pour cette priorité
+        """
+        tenant = str(tenant) if tenant else DEFAULT_TENANT
+        await self._acquire(tenant, priority)
+
+        # Comme asyncio.to_thread, mais le créneau n'est rendu qu'à la fin du
+        # thread: l'annulation de l'appelant n'interrompt pas la résolution
+        started = time.perf_counter()
+        context = contextvars.copy_context()
+        try:
+            solve = asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(context.run, func, *args, **kwargs)
+            )
+        except BaseException:
+            self._release(tenant, None)
+            raise
+
+        def on_done(future: asyncio.Future) -> None:
+            if not future.cancelled():
+                future.exception()  # Résultat abandonné si l'appelant est annulé
+            self._release(tenant, time.perf_counter() - started)
+
+        solve.add_done_callback(on_done)
+        return await asyncio.shield(solve)
+
+    def retry_after_seconds(self) -> int:
+        """Délai estimé avant qu'un créneau se libère pour une nouvelle demande"""
+        average = self._solve_seconds or settings.optimization_timeout_seconds
+        queued = sum(self._queued_count(priority) for priority in SolverPriority)
+        return max(1, math.ceil(average * (queued + self._running) / self.max_concurrent))
+
+    def stats(self) -> Dict[str, Any]:
+        """État de la file et temps d'attente (p50/p95 sur les dernières demandes)"""
+        queue_times = {}
+        for priority, samples in self._queue_times.items():
+            values = np.fromiter(samples, dtype=float) * 1000
+            queue_times[priority.name.lower()] = {
+                "samples": len(values),
+                "p50_ms": round(float(np.percentile(values, 50)), 1) if len(values) else None,
+                "p95_ms": round(float(np.percentile(values, 95)), 1) if len(values) else None,
+                "max_ms": round(float(values.max()), 1) if len(values) else None
+            }
+
+        queued_by_tenant: Dict[str, int] = {}
+        for tenants in self._waiting.values():
+            for tenant, waiters in tenants.items():
+                queued_by_tenant[tenant] = queued_by_tenant.get(tenant, 0) + len(waiters)
+
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self._running,
+            "running_by_tenant": dict(self._running_by_tenant),
+            "queued": {
+                priority.name.lower(): self._queued_count(priority)
+                for priority in SolverPriority
+            },
+            "queued_by_tenant": queued_by_tenant,
+            "queue_time": queue_times,
+            "average_solve_seconds": (
+                round(self._solve_seconds, 3) if self._solve_seconds is not None else None
+            ),
+            "completed": self._completed,
+            "rejected": self._rejected
+        }
+
+    # ------------------------------------------------------------------
+    # Admission
+    # ------------------------------------------------------------------
+
+    async def _acquire(self, tenant: str, priority: SolverPriority) -> None:
+        """Attend un créneau (ou rejette si la file est pleine)"""
+        if self._running < self.max_concurrent and not self._has_waiters(priority):
+            self._grant(tenant)
+            self._record_wait(tenant, priority, 0.0)
+            return
+
+        if self._queued_count(priority) >= self.max_queue_depth[priority]:
+            self._rejected += 1
+            retry_after = self.retry_after_seconds()
+            metrics_logger.warning(
+                "solver_rejected tenant=%s priority=%s retry_after=%s",
+                tenant, priority.name.lower(), retry_after,
+                extra={"metrics": {
+                    "event": "solver_rejected",
+                    "tenant": tenant,
+                    "priority": priority.name.lower(),
+                    "retry_after_seconds": retry_after,
+                    **{f"queued_{p.name.lower()}": self._queued_count(p) for p in SolverPriority}
+                }}
+            )
+            raise RateLimitError(
+                message="Trop d'optimisations en cours, veuillez réessayer plus tard",
+                retry_after=retry_after,
+                details={"queued": self._queued_count(priority)}
+            )
+
+        waiter = _Waiter(tenant, priority, asyncio.get_running_loop().create_future())
+        self._waiting[priority].setdefault(tenant, deque()).append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Créneau accordé au moment de l'annulation: le rendre
+                self._release(tenant, None)
+            else:
+                self._discard(waiter)
+            raise
+
+        self._record_wait(tenant, priority, time.perf_counter() - waiter.enqueued_at)
+
+    def _release(self, tenant: str, solve_seconds: Optional[float]) -> None:
+        """Libère un créneau et le donne à la prochaine demande éligible"""
+        self._running -= 1
+        remaining = self._running_by_tenant.get(tenant, 1) - 1
+        if remaining > 0:
+            self._running_by_tenant[tenant] = remaining
+        else:
+            self._running_by_tenant.pop(tenant, None)
+
+        if solve_seconds is not None:
+            self._completed += 1
+            # Moyenne mobile exponentielle, pour l'estimation de Retry-After
+            self._solve_seconds = (
+                solve_seconds if self._solve_seconds is None
+                else 0.8 * self._solve_seconds + 0.2 * solve_seconds
+            )
+
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Accorde les créneaux libres aux demandes en attente"""
+        while self._running < self.max_concurrent:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            if waiter.future.done():
+                continue  # Annulée pendant l'attente
+            self._grant(waiter.tenant)
+            waiter.future.set_result(None)
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        """Retire de la file la prochaine demande à servir"""
+        for priority in SolverPriority:
+            tenants = self._waiting[priority]
+            if not tenants:
+                continue
+            tenant = min(
+                tenants,
+                key=lambda t: (
+                    self._running_by_tenant.get(t, 0),
+                    self._last_served.get(t, 0.0),
+                    tenants[t][0].enqueued_at
+                )
+            )
+            waiter = tenants[tenant].popleft()
+            if not tenants[tenant]:
+                del tenants[tenant]
+            return waiter
+        return None
+
+    def _grant(self, tenant: str) -> None:
+        self._running += 1
+        self._running_by_tenant[tenant] = self._running_by_tenant.get(tenant, 0) + 1
+        self._last_served[tenant] = time.perf_counter()
+
+    def _discard(self, waiter: _Waiter) -> None:
+        """Retire une demande annulée de la file"""
+        waiters = self._waiting[waiter.priority].get(waiter.tenant)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del self._waiting[waiter.priority][waiter.tenant]
+
+    def _has_waiters(self, priority: SolverPriority) -> bool:
+        """Demandes en attente de priorité égale ou supérieure"""
+        return any(self._waiting[p] for p in SolverPriority if p <= priority)
+
+    def _queued_count(self, priority: SolverPriority) -> int:
+        return sum(len(waiters) for waiters in self._waiting[priority].values())
+
+    def _record_wait(self, tenant: str, priority: SolverPriority, seconds: float) -> None:
+        self._queue_times[priority].append(seconds)
+        metrics_logger.info(
+            "solver_admitted tenant=%s priority=%s queue_ms=%.1f running=%s",
+            tenant, priority.name.lower(), seconds * 1000, self._running,
+            extra={"metrics": {
+                "event": "solver_admitted",
+                "tenant": tenant,
+                "priority": priority.name.lower(),
+                "queue_ms": round(seconds * 1000, 1),
+                "running": self._running
+            }}
+        )
+
+
+@lru_cache()
+def get_solver_scheduler() -> SolverScheduler:
+    """Ordonnanceur partagé par le processus"""
+    return SolverScheduler()
@@ -0,0 +1,296 @@
+"""
+Sélection de points de ramassage partagés
+Remplace le porte-à-porte par un petit nombre d'arrêts, chacun à distance
+de marche maximale de tous les passagers qui lui sont affectés
+"""
+
+from typing import List, Tuple, Dict, Any, Optional
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.spatial import cKDTree
+
+from .distance import project_to_meters
+
+
+def _coverage_matrix(
+    candidates: np.ndarray,
+    passengers: np.ndarray,
+    max_walk_meters: float
+) -> csr_matrix:
+    """
+    Matrice creuse (candidats x passagers) des distances de marche
+
+    Seules les paires à moins de max_walk_meters sont stockées. Les distances
+    sont décalées d'un epsilon pour que les paires à distance nulle
+    (candidat = domicile) restent distinguables des absences de couverture.
+    """
+    pairs = cKDTree(candidates).sparse_distance_matrix(
+        cKDTree(passengers), max_walk_meters, output_type="coo_matrix"
+    )
+    return csr_matrix(
+        (pairs.data + 1e-6, (pairs.row, pairs.col)),
+        shape=(len(candidates), len(passengers))
+    )
+
+
+def _greedy_set_cover(coverage: csr_matrix) -> List[int]:
+    """
+    Couverture gloutonne: choisit à chaque tour le candidat couvrant le plus
+    de passagers non encore couverts (approximation en ln(n) de l'optimum)
+    """
+    covers = (coverage > 0).astype(np.int32).tocsr()
+    uncovered = np.ones(covers.shape[1], dtype=np.int32)
+    selected = []
+
+    while uncovered.any():
+        gains = covers @ uncovered
+        best = int(np.argmax(gains))
+        if gains[best] == 0:
+            break
+        selected.append(best)
+        uncovered[covers[best].indices] = 0
+
+    return selected
+
+
+def _assign(coverage: csr_matrix, selected: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Affecte chaque passager à l'arrêt sélectionné le plus proche"""
+    sub = coverage[selected].toarray()
+    sub[sub == 0] = np.inf
+    nearest = np.argmin(sub, axis=0)
+    walk = sub[nearest, np.arange(sub.shape[1])]
+    return nearest, walk
+
+
+def select_pickup_points(
+    coordinates: List[Tuple[float, float]],
+    max_walk_meters: float,
+    candidates: Optional[List[Tuple[float, float]]] = None,
+    refine_iterations: int = 5
+) -> Dict[str, Any]:
+    """
+    Choisit des points de ramassage partagés
+
+    1. Couverture d'ensemble gloutonne: nombre minimal (approché) d'arrêts
+       tel que chaque passager ait un arrêt à moins de max_walk_meters
+    2. Raffinement p-médiane: chaque arrêt est déplacé vers le candidat qui
+       minimise la marche totale de ses passagers, sans perdre la couverture
+
+    Args:
+        coordinates: Coordonnées des passagers (latitude, longitude)
+        max_walk_meters: Distance de marche maximale
+        candidates: Emplacements candidats (défaut: domiciles des passagers)
+        refine_iterations: Nombre d'itérations du raffinement p-médiane
+
+    Returns:
+        Dictionnaire avec:
+            - stops: Coordonnées des arrêts retenus
+            - candidate_indices: Index du candidat retenu pour chaque arrêt
+            - assignment: Index d'arrêt par passager (-1 si non couvert)
+            - walk_meters: Distance de marche par passager
+            - uncovered: Indices des passagers sans arrêt possible
+    """
+    if not coordinates:
+        return {
+            "stops": [],
+            "candidate_indices": [],
+            "assignment": [],
+            "walk_meters": [],
+            "uncovered": []
+        }
+
+    candidates = candidates or coordinates
+    reference_latitude = float(np.mean([c[0] for c in coordinates]))
+    passengers_xy = project_to_meters(coordinates, reference_latitude)
+    candidates_xy = project_to_meters(candidates, reference_latitude)
+
+    coverage = _coverage_matrix(candidates_xy, passengers_xy, max_walk_meters)
+    selected = _greedy_set_cover(coverage)
+    covered = np.asarray((coverage > 0).sum(axis=0)).ravel() > 0
+
+    if not selected:
+        n = len(coordinates)
+        return {
+            "stops": [],
+            "candidate_indices": [],
+            "assignment": [-1] * n,
+            "walk_meters": [None] * n,
+            "uncovered": list(range(n))
+        }
+
+    coverage_t = coverage.T.tocsr()[covered].T.tocsr()
+    nearest, walk = _assign(coverage_t, selected)
+
+    # Raffinement p-médiane (relocalisation de type Cooper)
+    for _ in range(refine_iterations):
+        moved = False
+        for k in range(len(selected)):
+            members = np.flatnonzero(nearest == k)
+            if len(members) == 0:
+                continue
+            # Candidats couvrant tous les membres du groupe
+            sub = coverage_t[:, members].toarray()
+            feasible = np.flatnonzero((sub > 0).all(axis=1))
+            if len(feasible) == 0:
+                continue
+            costs = sub[feasible].sum(axis=1)
+            best = int(feasible[np.argmin(costs)])
+            if best != selected[k] and best not in selected:
+                current = coverage_t[selected[k], members].toarray().sum()
+                if costs.min() < current - 1e-9:
+                    selected[k] = best
+                    moved = True
+        nearest, walk = _assign(coverage_t, selected)
+        if not moved:
+            break
+
+    # Supprimer les arrêts devenus vides et renuméroter
+    used = sorted(set(int(k) for k in nearest))
+    remap = {old: new for new, old in enumerate(used)}
+    stops = [candidates[selected[k]] for k in used]
+
+    assignment = np.full(len(coordinates), -1, dtype=int)
+    walk_meters: List[Optional[float]] = [None] * len(coordinates)
+    for position, passenger in enumerate(np.flatnonzero(covered)):
+        assignment[passenger] = remap[int(nearest[position])]
+        walk_meters[passenger] = round(float(walk[position]), 1)
+
+    return {
+        "stops": [tuple(s) for s in stops],
+        "candidate_indices": [int(selected[k]) for k in used],
+        "assignment": assignment.tolist(),
+        "walk_meters": walk_meters,
+        "uncovered": [int(i) for i in np.flatnonzero(~covered)]
+    }
+
+
+def deferred_acceptance(
+    rows: np.ndarray,
+    cols: np.ndarray,
+    costs: np.ndarray,
+    n: int,
+    capacity: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Affectation stable sous capacité par acceptation différée vectorisée
+
+    À chaque tour, les éléments libres proposent leur meilleure destination
+    restante; chaque destination garde les moins coûteux (titulaires
+    compris) dans la limite de sa capacité, les autres passent à leur choix
+    suivant.
+
+    Args:
+        rows: Élément de chaque paire admissible
+        cols: Destination de chaque paire admissible
+        costs: Coût de chaque paire
+        n: Nombre d'éléments
+        capacity: Capacité par destination
+
+    Returns:
+        (destination par élément ou -1, coût retenu, nombre de paires par élément)
+    """
+    order = np.lexsort((costs, rows))
+    rows, cols, costs = rows[order], cols[order], costs[order]
+    counts = np.bincount(rows, minlength=n)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    held = np.full(n, -1, dtype=np.int64)
+    held_cost = np.zeros(n)
+    tried = np.zeros(n, dtype=np.int64)
+    free = np.flatnonzero(counts > 0)
+
+    while len(free):
+        positions = starts[free] + tried[free]
+        proposal, proposal_cost = cols[positions], costs[positions]
+
+        # Candidats de chaque destination sollicitée: titulaires + propositions
+        holders = np.flatnonzero(np.isin(held, np.unique(proposal)))
+        pool = np.concatenate((holders, free))
+        pool_target = np.concatenate((held[holders], proposal))
+        pool_cost = np.concatenate((held_cost[holders], proposal_cost))
+
+        order = np.lexsort((pool_cost, pool_target))
+        pool, pool_target, pool_cost = pool[order], pool_target[order], pool_cost[order]
+        group_start = np.flatnonzero(np.r_[True, pool_target[1:] != pool_target[:-1]])
+        rank = np.arange(len(pool)) - np.repeat(group_start, np.diff(np.r_[group_start, len(pool)]))
+        keep = rank < capacity[pool_target]
+
+        held[pool[keep]] = pool_target[keep]
+        held_cost[pool[keep]] = pool_cost[keep]
+        rejected = pool[~keep]
+        held[rejected] = -1
+
+        # Titulaires évincés et proposants refusés passent au choix suivant
+        tried[rejected] += 1
+        free = rejected[tried[rejected] < counts[rejected]]
+
+    return held, held_cost, counts
+
+
+def assign_to_stops(
+    coordinates: List[Tuple[float, float]],
+    stops: List[Tuple[float, float]],
+    max_walk_meters: float,
+    capacities: Optional[List[Optional[int]]] = None
+) -> Dict[str, Any]:
+    """
+    Affecte chaque passager à l'arrêt le plus proche à distance de marche,
+    dans la limite de la capacité de chaque arrêt
+
+    Les paires (passager, arrêt) à moins de max_walk_meters sont obtenues
+    par index spatial (k-d tree), triées par distance pour chaque passager,
+    puis les conflits de capacité sont résolus par acceptation différée
+    (voir deferred_acceptance): le résultat est stable, aucun passager ne
+    préférerait un arrêt qui lui préfère quelqu'un de plus loin.
+
+    Args:
+        coordinates: Coordonnées des passagers (latitude, longitude)
+        stops: Coordonnées des arrêts
+        max_walk_meters: Distance de marche maximale
+        capacities: Places par arrêt (None = illimité)
+
+    Returns:
+        Dictionnaire avec:
+            - assignment: Index d'arrêt par passager (-1 si non affecté)
+            - walk_meters: Distance de marche par passager (None si non affecté)
+            - out_of_range: Passagers sans arrêt à distance de marche
+            - over_capacity: Passagers dont tous les arrêts proches sont pleins
+            - load: Nombre de passagers par arrêt
+    """
+    n, m = len(coordinates), len(stops)
+    if n == 0 or m == 0:
+        return {
+            "assignment": [-1] * n,
+            "walk_meters": [None] * n,
+            "out_of_range": list(range(n)),
+            "over_capacity": [],
+            "load": [0] * m
+        }
+
+    reference_latitude = float(np.mean([c[0] for c in coordinates]))
+    passengers_xy = project_to_meters(coordinates, reference_latitude)
+    stops_xy = project_to_meters(stops, reference_latitude)
+
+    capacity = np.array(
+        [n if c is None else c for c in (capacities or [None] * m)], dtype=np.int64
+    )
+
+    # Paires (passager, arrêt) à distance de marche
+    pairs = cKDTree(passengers_xy).sparse_distance_matrix(
+        cKDTree(stops_xy), max_walk_meters, output_type="coo_matrix"
+    )
+
+    held, held_dist, counts = deferred_acceptance(
+        pairs.row, pairs.col, pairs.data, n, capacity
+    )
+
+    assigned = held >= 0
+    walk = np.round(held_dist, 1)
+    return {
+        "assignment": held.tolist(),
+        "walk_meters": [float(w) if a else None for w, a in zip(walk.tolist(), assigned)],
+        "out_of_range": np.flatnonzero(counts == 0).tolist(),
+        "over_capacity": np.flatnonzero(~assigned & (counts > 0)).tolist(),
+        "load": np.bincount(held[assigned], minlength=m).tolist()
+    }
@@ -11,10 +11,25 @@ from ortools.constraint_solver import routing_enums_pb2
 from ortools.constraint_solver import pywrapcp
 
 from .distance import create_distance_matrix, create_time_matrix
+from .constraints import (
+    find_infeasible_arcs,
+    find_unreachable_nodes,
+    check_time_windows,
+)
+from .instrumentation import SolverDiagnostics
 
 
 class OptimizationStrategy(ABC):
-    """Interface pour les stratégies d'optimisation"""
+    """
+    Interface pour les stratégies d'optimisation
+
+    Les matrices peuvent être fournies dans les contraintes
+    (distance_matrix en mètres, time_matrix en secondes) au lieu d'être
+    calculées depuis les coordonnées, ex: instances euclidiennes de référence.
+    """
+
+    # Fenêtres temporelles, heure limite et point d'arrivée pris en compte
+    supports_time_windows = False
 
     @abstractmethod
     def solve(
@@ -34,20 +49,177 @@ class OptimizationStrategy(ABC):
         """
         pass
 
+    @staticmethod
+    def _given_matrix(constraints: Dict[str, Any], key: str) -> Optional[List[List[int]]]:
+        """
+        Matrice fournie dans les contraintes (listes ou tableau numpy), en
+        listes d'entiers Python pour les callbacks OR-Tools; None si absente
+        """
+        matrix = constraints.get(key)
+        if matrix is None:
+            return None
+        return [[int(value) for value in row] for row in matrix]
+
+    def _route_limits(
+        self,
+        constraints: Dict[str, Any]
+    ) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Convertit les limites de route en unités solveur
+
+        Returns:
+            Tuple (distance max en mètres, durée max en secondes)
+        """
+        max_distance = constraints.get("max_distance")
+        max_duration = constraints.get("max_duration")
+        return (
+            int(max_distance * 1000) if max_distance else None,
+            int(max_duration * 60) if max_duration else None
+        )
+
+    def _add_limit_dimensions(
+        self,
+        manager,
+        routing,
+        distance_cb_index: int,
+        constraints: Dict[str, Any],
+        num_vehicles: int
+    ) -> None:
+        """
+        Ajoute les bornes de distance et de capacité au modèle
+
+        - Distance: dimension bornée par max_distance
+        - Capacité: dimension bornée par vehicle_capacity ou, par véhicule,
+          vehicle_capacities (si demands)
+        """
+        max_distance, _ = self._route_limits(constraints)
+
+        if max_distance is not None:
+            routing.AddDimension(
+                distance_cb_index,
+                0,  # Pas de slack
+                max_distance,
+                True,  # Départ à zéro
+                'Distance'
+            )
+
+        demands = constraints.get("demands")
+        if demands:
+            def demand_callback(from_idx):
+                return demands[manager.IndexToNode(from_idx)]
+
+            demand_cb_index = routing.RegisterUnaryTransitCallback(demand_callback)
+            capacity = int(constraints.get("vehicle_capacity") or sum(demands))
+            capacities = constraints.get("vehicle_capacities") or [capacity] * num_vehicles
+            routing.AddDimensionWithVehicleCapacity(
+                demand_cb_index,
+                0,
+                [int(c) for c in capacities],
+                True,
+                'Capacity'
+            )
+
+    def _prune_arcs(
+        self,
+        manager,
+        routing,
+        arcs: List[Tuple[int, int]]
+    ) -> None:
+        """Retire du domaine de NextVar les arcs qui ne peuvent pas être valides"""
+        for from_node, to_node in arcs:
+            routing.NextVar(manager.NodeToIndex(from_node)).RemoveValue(
+                manager.NodeToIndex(to_node)
+            )
+
+    def _search_parameters(self):
+        """
+        Paramètres de recherche communs (PATH_CHEAPEST_ARC + GLS)
+
+        timeout_seconds peut être fractionnaire (ex: 1.5 s pour une
+        re-planification en cours de tournée).
+        """
+        search_params = pywrapcp.DefaultRoutingSearchParameters()
+        search_params.first_solution_strategy = (
+            routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+        )
+        search_params.local_search_metaheuristic = (
+            routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+        )
+        search_params.time_limit.FromMilliseconds(int(self.timeout_seconds * 1000))
+        return search_params
+
+    def _combine_routes(self, routes: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Résultat multi-véhicules: une route par véhicule et statistiques globales
+
+        "route" reste la route du premier véhicule pour les appelants mono-véhicule.
+        Les statistiques de temps ne sont présentes que si les routes en ont.
+        """
+        # Véhicule utilisé: au moins un point desservi hors départ et arrivée
+        used = [r for r in routes if r["statistics"]["served_stops"] >= 1]
+        statistics = {
+            "total_distance_km": round(
+                sum(r["statistics"]["total_distance_km"] for r in routes), 2
+            ),
+            "number_of_stops": sum(r["statistics"]["number_of_stops"] for r in routes),
+            "vehicles_used": len(used)
+        }
+        if all("total_time_minutes" in r["statistics"] for r in routes):
+            statistics["total_time_minutes"] = round(
+                sum(r["statistics"]["total_time_minutes"] for r in used), 1
+            )
+            statistics["end_time"] = max(
+                (r["statistics"]["end_time"] for r in used), default=None
+            )
+        return {
+            "success": True,
+            "route": routes[0]["route"],
+            "routes": [
+                {"vehicle": vehicle_id, **r} for vehicle_id, r in enumerate(routes)
+            ],
+            "statistics": statistics
+        }
+
+    def _unreachable_result(
+        self,
+        unreachable: List[int],
+        diagnostics: SolverDiagnostics
+    ) -> Dict[str, Any]:
+        """Résultat d'échec immédiat quand un point dépasse les limites"""
+        diagnostics.finish(reason="unreachable_nodes")
+        return {
+            "success": False,
+            "message": (
+                f"{len(unreachable)} point(s) hors des limites de distance/durée "
+                "même en aller-retour direct depuis le dépôt"
+            ),
+            "unreachable_nodes": unreachable,
+            "diagnostics": diagnostics.to_dict()
+        }
+
 
 class VRPStrategy(OptimizationStrategy):
     """
     Vehicle Routing Problem (VRP) - Minimise la distance totale
-    Sans contraintes temporelles
+    Sans fenêtres temporelles; max_duration borne la durée de chaque route
+    (trajets à speed_kmh, ou time_matrix, plus service_times, par défaut
+    service_time_seconds à chaque arrêt hors dépôt)
+
+    Avec plusieurs véhicules, le résultat contient "routes" (une route par
+    véhicule); tous les points sont desservis.
     """
 
     def __init__(
         self,
         timeout_seconds: int = 30,
-        num_vehicles: int = 1
+        num_vehicles: int = 1,
+        speed_kmh: float = 30.0,
+        service_time_seconds: int = 0
     ):
         self.timeout_seconds = timeout_seconds
         self.num_vehicles = num_vehicles
+        self.speed_kmh = speed_kmh
+        self.service_time_seconds = service_time_seconds
 
     def solve(
         self,
@@ -60,8 +232,35 @@ class VRPStrategy(OptimizationStrategy):
                 "message": "Au moins 2 points sont nécessaires"
             }
 
+        diagnostics = SolverDiagnostics()
         depot = constraints.get("depot_index", 0)
-        distance_matrix = create_distance_matrix(locations)
+        distance_matrix = self._given_matrix(constraints, "distance_matrix")
+        if distance_matrix is None:
+            distance_matrix = create_distance_matrix(locations)
+        max_distance, max_duration = self._route_limits(constraints)
+        time_matrix, service_times = None, 0
+        if max_duration is not None:
+            time_matrix = self._given_matrix(constraints, "time_matrix")
+            if time_matrix is None:
+                time_matrix = create_time_matrix(distance_matrix, self.speed_kmh)
+            service_times = constraints.get("service_times")
+            if service_times is None:
+                service_times = [
+                    0 if node == depot else self.service_time_seconds
+                    for node in range(len(locations))
+                ]
+            elif not isinstance(service_times, (int, float)):
+                service_times = [int(t) for t in service_times]
+        diagnostics.lap("matrix")
+
+        # Points impossibles à desservir: inutile de lancer la recherche
+        unreachable = find_unreachable_nodes(
+            distance_matrix, depot, max_distance,
+            time_matrix, service_times, max_duration
+        )
+        diagnostics.lap("precheck")
+        if unreachable:
+            return self._unreachable_result(unreachable, diagnostics)
 
         # Créer le gestionnaire d'index
         manager = pywrapcp.RoutingIndexManager(
@@ -82,28 +281,66 @@ class VRPStrategy(OptimizationStrategy):
         transit_cb_index = routing.RegisterTransitCallback(distance_callback)
         routing.SetArcCostEvaluatorOfAllVehicles(transit_cb_index)
 
-        # Paramètres de recherche
-        search_params = pywrapcp.DefaultRoutingSearchParameters()
-        search_params.first_solution_strategy = (
-            routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+        # Durée max de chaque route (trajets et temps de service)
+        if max_duration is not None:
+            def time_callback(from_idx, to_idx):
+                from_node = manager.IndexToNode(from_idx)
+                to_node = manager.IndexToNode(to_idx)
+                service = (
+                    service_times[from_node] if isinstance(service_times, list)
+                    else service_times
+                )
+                return time_matrix[from_node][to_node] + service
+
+            routing.AddDimension(
+                routing.RegisterTransitCallback(time_callback),
+                0,  # Pas d'attente sans fenêtres temporelles
+                max_duration,
+                True,
+                'Time'
+            )
+
+        # Limites de route et élagage des arcs impossibles
+        self._add_limit_dimensions(
+            manager, routing, transit_cb_index, constraints, self.num_vehicles
         )
-        search_params.local_search_metaheuristic = (
-            routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+        pruned_arcs = find_infeasible_arcs(
+            distance_matrix, depot, max_distance,
+            time_matrix, service_times, max_duration
         )
-        search_params.time_limit.seconds = self.timeout_seconds
+        self._prune_arcs(manager, routing, pruned_arcs)
+
+        # Paramètres de recherche
+        search_params = self._search_parameters()
+        diagnostics.lap("model")
 
         # Résoudre
+        diagnostics.watch_search(routing)
         solution = routing.SolveWithParameters(search_params)
+        diagnostics.lap("search")
+        diagnostics.finish(routing, time_limit_seconds=self.timeout_seconds)
 
         if not solution:
             return {
                 "success": False,
-                "message": "Aucune solution trouvée"
+                "message": "Aucune solution trouvée",
+                "diagnostics": diagnostics.to_dict()
             }
 
-        return self._extract_solution(
-            manager, routing, solution, locations, distance_matrix, constraints
-        )
+        routes = [
+            self._extract_solution(
+                manager, routing, solution, locations, distance_matrix, constraints,
+                vehicle_id=vehicle_id
+            )
+            for vehicle_id in range(self.num_vehicles)
+        ]
+        result = routes[0]
+        if self.num_vehicles > 1:
+            result = self._combine_routes(routes)
+        result["statistics"]["pruned_arcs"] = len(pruned_arcs)
+        diagnostics.lap("extract")
+        result["diagnostics"] = diagnostics.to_dict()
+        return result
 
     def _extract_solution(
         self,
@@ -112,14 +349,18 @@ class VRPStrategy(OptimizationStrategy):
         solution,
         locations,
         distance_matrix,
-        constraints
+        constraints,
+        vehicle_id: int = 0
     ) -> Dict[str, Any]:
         route = []
-        index = routing.Start(0)
+        index = routing.Start(vehicle_id)
         total_distance = 0
+        served = 0
 
         while not routing.IsEnd(index):
             node = manager.IndexToNode(index)
+            if not routing.IsStart(index):
+                served += 1
             route.append({
                 "index": node,
                 "latitude": locations[node][0],
@@ -146,7 +387,8 @@ class VRPStrategy(OptimizationStrategy):
             "route": route,
             "statistics": {
                 "total_distance_km": round(total_distance / 1000, 2),
-                "number_of_stops": len(route) - 1
+                "number_of_stops": len(route) - 1,
+                "served_stops": served
             }
         }
 
@@ -155,8 +397,25 @@ class VRPTWStrategy(OptimizationStrategy):
     """
     Vehicle Routing Problem with Time Windows (VRPTW)
     Optimise avec contraintes temporelles
+
+    Contraintes supportées (temps en secondes depuis start_time):
+        - time_windows: Fenêtre (début, fin) par point
+        - service_times: Temps de service par point
+        - route_deadline: Heure limite d'arrivée au point final
+        - end_index: Point d'arrivée (ex: école), défaut = dépôt
+        - vehicle_starts: Point de départ par véhicule (dépôt, position GPS)
+        - vehicle_ends: Point d'arrivée par véhicule (None = route ouverte,
+          terminée au dernier arrêt)
+        - vehicle_capacities: Capacité par véhicule (avec demands)
+        - initial_routes: Séquence de départ par véhicule (nœuds hors
+          départ/arrivée) pour un démarrage à chaud
+
+    Avec vehicle_starts, le nombre de véhicules est len(vehicle_starts) et le
+    résultat contient "routes" (une route par véhicule).
     """
 
+    supports_time_windows = True
+
     def __init__(
         self,
         timeout_seconds: int = 30,
@@ -181,17 +440,90 @@ class VRPTWStrategy(OptimizationStrategy):
             }
 
         depot = constraints.get("depot_index", 0)
+        end = constraints.get("end_index", depot)
         time_windows = constraints.get("time_windows")
+        deadline = constraints.get("route_deadline")
         start_time = constraints.get("start_time", datetime.now())
+        service_times = constraints.get("service_times")
+        service_times = (
+            [self.service_time_seconds] * len(locations) if service_times is None
+            else [int(t) for t in service_times]
+        )
 
-        distance_matrix = create_distance_matrix(locations)
-        time_matrix = create_time_matrix(distance_matrix, self.speed_kmh)
+        # Départ et arrivée par véhicule (dépôts, positions GPS, école)
+        starts = list(constraints.get("vehicle_starts") or [depot] * self.num_vehicles)
+        ends = list(constraints.get("vehicle_ends") or [end] * len(starts))
+        num_vehicles = len(starts)
+
+        diagnostics = SolverDiagnostics()
+        distance_matrix = self._given_matrix(constraints, "distance_matrix")
+        if distance_matrix is None:
+            distance_matrix = create_distance_matrix(locations)
+        time_matrix = self._given_matrix(constraints, "time_matrix")
+        if time_matrix is None:
+            time_matrix = create_time_matrix(distance_matrix, self.speed_kmh)
+
+        # Routes ouvertes: arrivée fictive atteignable sans coût depuis tout point
+        open_end = None
+        if None in ends:
+            open_end = len(locations)
+            locations = list(locations) + [locations[starts[0]]]
+            distance_matrix = [row + [0] for row in distance_matrix] + [[0] * (open_end + 1)]
+            time_matrix = [row + [0] for row in time_matrix] + [[0] * (open_end + 1)]
+            service_times.append(0)
+            if time_windows:
+                time_windows = list(time_windows) + [(0, deadline or 86400)]
+            if constraints.get("demands"):
+                constraints = {**constraints, "demands": list(constraints["demands"]) + [0]}
+            ends = [open_end if e is None else e for e in ends]
+
+        endpoints = set(starts) | set(ends)
+        pairs = sorted(set(zip(starts, ends)))
+        max_distance, max_duration = self._route_limits(constraints)
+        diagnostics.lap("matrix")
+
+        # Pré-vérification linéaire: un arrêt n'est signalé que si aucun
+        # couple (départ, arrivée) de la flotte ne peut le desservir
+        checks = [
+            check_time_windows(time_matrix, s, time_windows, service_times, deadline, e)
+            for s, e in pairs
+        ]
+        failing = set.intersection(*({item["index"] for item in check} for check in checks))
+        diagnosis = [
+            item for item in checks[0]
+            if item["index"] in failing and item["index"] not in endpoints
+        ]
+        if diagnosis:
+            diagnostics.lap("precheck")
+            diagnostics.finish(reason="time_window_precheck")
+            return {
+                "success": False,
+                "message": (
+                    f"{len(diagnosis)} arrêt(s) impossible(s) à desservir "
+                    "dans les contraintes horaires"
+                ),
+                "diagnosis": diagnosis,
+                "diagnostics": diagnostics.to_dict()
+            }
 
-        # Créer le gestionnaire
+        # Points impossibles à desservir: inutile de lancer la recherche
+        unreachable = set.intersection(*(
+            set(find_unreachable_nodes(
+                distance_matrix, s, max_distance,
+                time_matrix, service_times, max_duration, e
+            ))
+            for s, e in pairs
+        )) - endpoints
+        diagnostics.lap("precheck")
+        if unreachable:
+            return self._unreachable_result(sorted(unreachable), diagnostics)
+
+        # Créer le gestionnaire (départ et arrivée propres à chaque véhicule)
         manager = pywrapcp.RoutingIndexManager(
             len(locations),
-            self.num_vehicles,
-            depot
+            num_vehicles,
+            starts,
+            ends
         )
 
         routing = pywrapcp.RoutingModel(manager)
@@ -205,11 +537,11 @@ class VRPTWStrategy(OptimizationStrategy):
         transit_cb_index = routing.RegisterTransitCallback(distance_callback)
         routing.SetArcCostEvaluatorOfAllVehicles(transit_cb_index)
 
-        # Callback de temps (incluant temps de service)
+        # Callback de temps (incluant temps de service au point de départ de l'arc)
         def time_callback(from_idx, to_idx):
             from_node = manager.IndexToNode(from_idx)
             to_node = manager.IndexToNode(to_idx)
-            return time_matrix[from_node][to_node] + self.service_time_seconds
+            return time_matrix[from_node][to_node] + service_times[from_node]
 
         time_cb_index = routing.RegisterTransitCallback(time_callback)
 
@@ -224,36 +556,85 @@ class VRPTWStrategy(OptimizationStrategy):
         )
         time_dimension = routing.GetDimensionOrDie('Time')
 
+        for vehicle_id in range(num_vehicles):
+            # Durée max de la route (du départ à l'arrivée)
+            if max_duration is not None:
+                time_dimension.SetSpanUpperBoundForVehicle(max_duration, vehicle_id)
+            # Heure limite d'arrivée (ex: sonnerie de l'école)
+            if deadline is not None:
+                time_dimension.CumulVar(routing.End(vehicle_id)).SetMax(deadline)
+            routing.AddVariableMinimizedByFinalizer(
+                time_dimension.CumulVar(routing.Start(vehicle_id))
+            )
+            routing.AddVariableMinimizedByFinalizer(
+                time_dimension.CumulVar(routing.End(vehicle_id))
+            )
+
         # Appliquer les fenêtres temporelles
         if time_windows:
             for i, tw in enumerate(time_windows):
-                if i == depot:
+                if i in endpoints:
                     continue
                 index = manager.NodeToIndex(i)
                 time_dimension.CumulVar(index).SetRange(tw[0], tw[1])
 
-        # Paramètres de recherche
-        search_params = pywrapcp.DefaultRoutingSearchParameters()
-        search_params.first_solution_strategy = (
-            routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
-        )
-        search_params.local_search_metaheuristic = (
-            routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+        # Limites de route et élagage des arcs impossibles pour toute la flotte
+        self._add_limit_dimensions(
+            manager, routing, transit_cb_index, constraints, num_vehicles
         )
-        search_params.time_limit.seconds = self.timeout_seconds
+        pruned_arcs = sorted(set.intersection(*(
+            set(find_infeasible_arcs(
+                distance_matrix, s, max_distance,
+                time_matrix, service_times, max_duration, time_windows, e
+            ))
+            for s, e in pairs
+        )))
+        pruned_arcs = [
+            (i, j) for i, j in pruned_arcs if i not in endpoints and j not in endpoints
+        ]
+        self._prune_arcs(manager, routing, pruned_arcs)
 
-        solution = routing.SolveWithParameters(search_params)
+        # Paramètres de recherche
+        search_params = self._search_parameters()
+
+        # Démarrage à chaud depuis une séquence existante (si elle est valide)
+        initial = None
+        if constraints.get("initial_routes"):
+            routing.CloseModelWithParameters(search_params)
+            initial = routing.ReadAssignmentFromRoutes(constraints["initial_routes"], True)
+        diagnostics.lap("model")
+
+        diagnostics.watch_search(routing)
+        if initial is not None:
+            solution = routing.SolveFromAssignmentWithParameters(initial, search_params)
+        else:
+            solution = routing.SolveWithParameters(search_params)
+        diagnostics.lap("search")
+        diagnostics.finish(routing, time_limit_seconds=self.timeout_seconds)
 
         if not solution:
             return {
                 "success": False,
-                "message": "Aucune solution trouvée avec les contraintes temporelles"
+                "message": "Aucune solution trouvée avec les contraintes temporelles",
+                "diagnostics": diagnostics.to_dict()
             }
 
-        return self._extract_solution_with_time(
-            manager, routing, solution, locations,
-            distance_matrix, time_matrix, start_time
-        )
+        routes = [
+            self._extract_solution_with_time(
+                manager, routing, solution, locations,
+                distance_matrix, time_matrix, start_time,
+                vehicle_id=vehicle_id, hidden_node=open_end
+            )
+            for vehicle_id in range(num_vehicles)
+        ]
+        result = routes[0]
+        if num_vehicles > 1:
+            result = self._combine_routes(routes)
+        result["statistics"]["pruned_arcs"] = len(pruned_arcs)
+        result["statistics"]["warm_start"] = initial is not None
+        diagnostics.lap("extract")
+        result["diagnostics"] = diagnostics.to_dict()
+        return result
 
     def _extract_solution_with_time(
         self,
@@ -263,58 +644,57 @@ class VRPTWStrategy(OptimizationStrategy):
         locations,
         distance_matrix,
         time_matrix,
-        start_time: datetime
+        start_time: datetime,
+        vehicle_id: int = 0,
+        hidden_node: Optional[int] = None
     ) -> Dict[str, Any]:
         route = []
-        index = routing.Start(0)
-        cumulative_time = 0
+        index = routing.Start(vehicle_id)
         cumulative_distance = 0
 
         time_dimension = routing.GetDimensionOrDie('Time')
+        # Le départ peut être décalé si la première fenêtre ouvre plus tard
+        departure = solution.Min(time_dimension.CumulVar(index))
+        end_cumul = departure
+        served = 0
 
-        while not routing.IsEnd(index):
+        while True:
             node = manager.IndexToNode(index)
-            time_var = time_dimension.CumulVar(index)
-            arrival_time = start_time + timedelta(seconds=cumulative_time)
-
-            route.append({
-                "index": node,
-                "latitude": locations[node][0],
-                "longitude": locations[node][1],
-                "arrival_time": arrival_time.strftime('%H:%M:%S'),
-                "cumulative_distance_km": round(cumulative_distance / 1000, 2),
-                "cumulative_time_minutes": round(cumulative_time / 60, 1)
-            })
+            cumul = solution.Min(time_dimension.CumulVar(index))
+            arrival_time = start_time + timedelta(seconds=cumul)
+
+            # L'arrivée fictive d'une route ouverte n'est pas un arrêt réel
+            if node != hidden_node:
+                end_cumul = cumul
+                if not routing.IsStart(index) and not routing.IsEnd(index):
+                    served += 1
+                route.append({
+                    "index": node,
+                    "latitude": locations[node][0],
+                    "longitude": locations[node][1],
+                    "arrival_time": arrival_time.strftime('%H:%M:%S'),
+                    "cumulative_distance_km": round(cumulative_distance / 1000, 2),
+                    "cumulative_time_minutes": round((cumul - departure) / 60, 1)
+                })
+
+            if routing.IsEnd(index):
+                break
 
-            prev_index = index
             index = solution.Value(routing.NextVar(index))
+            cumulative_distance += distance_matrix[node][manager.IndexToNode(index)]
 
-            if not routing.IsEnd(index):
-                next_node = manager.IndexToNode(index)
-                cumulative_distance += distance_matrix[node][next_node]
-                cumulative_time += time_matrix[node][next_node] + self.service_time_seconds
-
-        # Point final
-        final_node = manager.IndexToNode(index)
-        final_arrival = start_time + timedelta(seconds=cumulative_time)
-        route.append({
-            "index": final_node,
-            "latitude": locations[final_node][0],
-            "longitude": locations[final_node][1],
-            "arrival_time": final_arrival.strftime('%H:%M:%S'),
-            "cumulative_distance_km": round(cumulative_distance / 1000, 2),
-            "cumulative_time_minutes": round(cumulative_time / 60, 1)
-        })
+        total_time = end_cumul - departure
 
         return {
             "success": True,
             "route": route,
             "statistics": {
                 "total_distance_km": round(cumulative_distance / 1000, 2),
-                "total_time_minutes": round(cumulative_time / 60, 1),
+                "total_time_minutes": round(total_time / 60, 1),
                 "number_of_stops": len(route) - 1,
-                "start_time": start_time.strftime('%H:%M:%S'),
-                "end_time": final_arrival.strftime('%H:%M:%S')
+                "served_stops": served,
+                "start_time": (start_time + timedelta(seconds=departure)).strftime('%H:%M:%S'),
+                "end_time": (start_time + timedelta(seconds=end_cumul)).strftime('%H:%M:%S')
             }
         }
 
@@ -338,10 +718,12 @@ class CapacitatedVRPStrategy(VRPStrategy):
         locations: List[Tuple[float, float]],
         constraints: Dict[str, Any]
     ) -> Dict[str, Any]:
-        demands = constraints.get("demands", [1] * len(locations))
+        demands = list(constraints.get("demands") or [1] * len(locations))
         demands[constraints.get("depot_index", 0)] = 0  # Pas de demande au dépôt
 
-        # Hériter de la solution de base et ajouter la contrainte de capacité
-        # ... (implémentation complète à ajouter si nécessaire)
-
-        return super().solve(locations, constraints)
+        # La dimension de capacité est ajoutée par la stratégie de base
+        return super().solve(locations, {
+            **constraints,
+            "demands": demands,
+            "vehicle_capacity": self.vehicle_capacity
+        })
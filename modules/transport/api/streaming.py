@@ -0,0 +1,114 @@
+"""
+Listes en streaming (NDJSON) pour les routes de l'API Transport
+- Curseur côté serveur: les lignes sont lues par lots, jamais toutes en mémoire
+- Une ligne JSON par élément, envoyée dès que son lot est lu
+"""
+import asyncio
+import itertools
+import json
+import logging
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence
+
+from fastapi import HTTPException
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from api.config import settings
+from api.database import PooledConnection, pool
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Noms des curseurs côté serveur (uniques par connexion suffit, uniques tout court ici)
+_cursor_ids = itertools.count(1)
+
+
+def ndjson_demande(stream: bool, accept: Optional[str]) -> bool:
+    """Le client demande-t-il une liste en streaming (?stream=true ou Accept NDJSON)"""
+    return stream or bool(accept and NDJSON_MEDIA_TYPE in accept)
+
+
+class RowStream(StreamingResponse):
+    """
+    Réponse NDJSON alimentée par un curseur côté serveur
+
+    La connexion est empruntée hors de la portée de la requête (elle doit
+    survivre au handler) et rendue au pool à la fin de l'envoi, y compris
+    si le client se déconnecte.
+    """
+
+    def __init__(
+        self,
+        conn: PooledConnection,
+        cursor,
+        format_row: Callable[[Sequence[Any]], Dict[str, Any]],
+        batch_size: int
+    ):
+        self._conn = conn
+        self._cursor = cursor
+        self._format_row = format_row
+        self._batch_size = batch_size
+        super().__init__(self._lignes(), media_type=NDJSON_MEDIA_TYPE)
+
+    def _lignes(self) -> Iterator[str]:
+        # Générateur synchrone: Starlette appelle next() dans le threadpool
+        while True:
+            rows = self._cursor.fetchmany(self._batch_size)
+            if not rows:
+                break
+            yield "".join(
+                json.dumps(self._format_row(row), ensure_ascii=False, default=str) + "\n"
+                for row in rows
+            )
+
+    def _fermer(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            if not conn.closed:
+                self._cursor.close()
+        except Exception as e:
+            logger.warning(f"Fermeture du curseur de streaming: {e}")
+        finally:
+            conn.close()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await asyncio.to_thread(self._fermer)
+
+
+def stream_rows(
+    query: str,
+    params: Optional[Sequence[Any]],
+    format_row: Callable[[Sequence[Any]], Dict[str, Any]],
+    batch_size: Optional[int] = None
+) -> RowStream:
+    """
+    Exécute une requête sur un curseur côté serveur et renvoie les lignes en NDJSON
+
+    À appeler depuis un handler synchrone: la connexion est empruntée et la
+    requête déclarée avant l'envoi des en-têtes, si bien qu'une base saturée
+    (503) ou une requête invalide (500) donnent encore un vrai code d'erreur.
+
+    Args:
+        query: Requête SQL
+        params: Paramètres de la requête
+        format_row: Conversion d'une ligne en dictionnaire
+        batch_size: Lignes lues par aller-retour (défaut: configuration)
+
+    Returns:
+        Réponse en streaming (application/x-ndjson)
+    """
+    conn = pool.acquire(scoped=False)
+    try:
+        cur = conn.cursor(name=f"stream_{next(_cursor_ids)}")
+        cur.itersize = batch_size or settings.db_stream_batch_size
+        cur.execute(query, params)
+    except Exception as e:
+        conn.close()
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la lecture: {str(e)}")
+    return RowStream(conn, cur, format_row, cur.itersize)
@@ -0,0 +1,3 @@
+"""
+Benchmarks des stratégies d'optimisation de tournées
+"""
@@ -0,0 +1,250 @@
+"""
+Chargement des instances de benchmark
+Formats Solomon (VRPTW) et CVRPLIB/TSPLIB (CVRP), plus des instances
+synthétiques de district scolaire générées à graine fixe
+
+Une instance est un dictionnaire:
+    - name, family: Identification ("solomon", "cvrplib", "school")
+    - locations: Coordonnées des points (dépôt en premier)
+    - constraints: Contraintes passées à OptimizationStrategy.solve
+    - num_vehicles, vehicle_capacity: Flotte
+    - has_time_windows: Instance réservée aux stratégies horaires
+    - scale: Facteur entre l'objectif solveur et le coût de l'instance
+    - best_known: Meilleur coût connu (None si inconnu)
+"""
+
+import json
+import math
+import re
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from api.services.optimization.distance import create_distance_matrix, create_time_matrix
+
+INSTANCES_DIR = Path(__file__).parent / "instances"
+
+# Les coûts Solomon sont des distances euclidiennes réelles: le solveur
+# travaille sur des entiers, au dixième près
+SOLOMON_SCALE = 10
+
+
+def _load_best_known(directory: Path) -> Dict[str, float]:
+    """Meilleurs coûts connus déclarés dans best_known.json (nom -> coût)"""
+    path = directory / "best_known.json"
+    if not path.exists():
+        return {}
+    return {
+        name: entry["cost"] if isinstance(entry, dict) else entry
+        for name, entry in json.loads(path.read_text()).items()
+    }
+
+
+def _euclidean_matrix(points: np.ndarray, scale: float, rounding) -> List[List[int]]:
+    """Matrice euclidienne entière (distances multipliées par scale)"""
+    diff = points[:, None, :] - points[None, :, :]
+    return rounding(np.sqrt((diff ** 2).sum(axis=2)) * scale).astype(int).tolist()
+
+
+def load_solomon(path: Path, best_known: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Charge une instance au format Solomon
+
+    Sections VEHICLE (nombre, capacité) et CUSTOMER (numéro, x, y, demande,
+    début et fin de fenêtre, temps de service). Le client 0 est le dépôt;
+    sa fin de fenêtre est l'horizon de retour.
+    """
+    lines = [line.split() for line in path.read_text().splitlines() if line.strip()]
+    name = lines[0][0]
+
+    vehicle_header = next(i for i, line in enumerate(lines) if line[0].upper() == "VEHICLE")
+    num_vehicles, capacity = int(lines[vehicle_header + 2][0]), int(lines[vehicle_header + 2][1])
+
+    customer_header = next(i for i, line in enumerate(lines) if line[0].upper() == "CUSTOMER")
+    rows = np.array(
+        [[float(v) for v in line] for line in lines[customer_header + 2:]
+         if len(line) == 7 and line[0].isdigit()]
+    )
+
+    points = rows[:, 1:3]
+    matrix = _euclidean_matrix(points, SOLOMON_SCALE, np.round)
+    windows = (rows[:, 4:6] * SOLOMON_SCALE).astype(int)
+
+    return {
+        "name": name,
+        "family": "solomon",
+        "locations": [tuple(p) for p in points.tolist()],
+        "constraints": {
+            "depot_index": 0,
+            "distance_matrix": matrix,
+            "time_matrix": matrix,
+            "time_windows": [tuple(w) for w in windows.tolist()],
+            "service_times": (rows[:, 6] * SOLOMON_SCALE).astype(int).tolist(),
+            "route_deadline": int(windows[0][1]),
+            "demands": rows[:, 3].astype(int).tolist(),
+            "vehicle_capacity": capacity,
+            "max_distance": None,
+            "max_duration": None
+        },
+        "num_vehicles": num_vehicles,
+        "vehicle_capacity": capacity,
+        "has_time_windows": True,
+        "scale": SOLOMON_SCALE,
+        "best_known": best_known
+    }
+
+
+def load_cvrplib(path: Path, best_known: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Charge une instance CVRPLIB (format TSPLIB, EDGE_WEIGHT_TYPE EUC_2D)
+
+    Le nombre de véhicules vient du nom (ex: A-n32-k5) ou du commentaire
+    "No of trucks"; à défaut, la borne inférieure ceil(demande / capacité).
+    Le coût de référence d'un fichier .sol voisin ("Cost N") est utilisé
+    si best_known n'est pas fourni.
+    """
+    text = path.read_text()
+    header = dict(
+        (key.strip().upper(), value.strip())
+        for key, value in re.findall(r"^\s*([A-Z_]+)\s*:\s*(.+)$", text, re.MULTILINE)
+    )
+    if header.get("EDGE_WEIGHT_TYPE", "EUC_2D") != "EUC_2D":
+        raise ValueError(f"{path.name}: seul EDGE_WEIGHT_TYPE EUC_2D est supporté")
+
+    def section(title: str) -> List[List[float]]:
+        match = re.search(rf"{title}\s*\n(.*?)(?=\n[A-Z_]+\s*\n|\nEOF|\Z)", text, re.S)
+        return [[float(v) for v in line.split()] for line in match.group(1).strip().splitlines()]
+
+    coords = np.array(section("NODE_COORD_SECTION"))
+    demands = np.array(section("DEMAND_SECTION"))
+    coords = coords[np.argsort(coords[:, 0])]
+    demands = demands[np.argsort(demands[:, 0])]
+
+    # Le dépôt doit être en tête (DEPOT_SECTION, 1 par défaut)
+    depot_id = int(section("DEPOT_SECTION")[0][0]) if "DEPOT_SECTION" in text else 1
+    depot_row = int(np.flatnonzero(coords[:, 0] == depot_id)[0])
+    order = [depot_row] + [i for i in range(len(coords)) if i != depot_row]
+    points, demand = coords[order, 1:3], demands[order, 1].astype(int)
+
+    capacity = int(header["CAPACITY"])
+    trucks = re.search(r"-k(\d+)", header.get("NAME", path.stem)) or re.search(
+        r"trucks:\s*(\d+)", header.get("COMMENT", ""), re.I
+    )
+    num_vehicles = int(trucks.group(1)) if trucks else math.ceil(demand.sum() / capacity)
+
+    if best_known is None:
+        solution = path.with_suffix(".sol")
+        if solution.exists():
+            cost = re.search(r"^Cost\s+([\d.]+)", solution.read_text(), re.MULTILINE | re.I)
+            best_known = float(cost.group(1)) if cost else None
+
+    # Convention TSPLIB: distances arrondies à l'entier le plus proche
+    matrix = _euclidean_matrix(points, 1, lambda m: np.floor(m + 0.5))
+
+    return {
+        "name": header.get("NAME", path.stem),
+        "family": "cvrplib",
+        "locations": [tuple(p) for p in points.tolist()],
+        "constraints": {
+            "depot_index": 0,
+            "distance_matrix": matrix,
+            "time_matrix": matrix,
+            "service_times": [0] * len(points),
+            "demands": demand.tolist(),
+            "vehicle_capacity": capacity,
+            "max_distance": None,
+            "max_duration": None
+        },
+        "num_vehicles": num_vehicles,
+        "vehicle_capacity": capacity,
+        "has_time_windows": False,
+        "scale": 1,
+        "best_known": best_known
+    }
+
+
+def generate_school_instance(
+    seed: int,
+    num_students: int = 60,
+    num_neighborhoods: int = 5,
+    bus_capacity: int = 50,
+    center: tuple = (48.85, 2.35),
+    radius_km: float = 8.0,
+    speed_kmh: float = 30.0,
+    service_seconds: int = 60,
+    deadline_minutes: int = 90
+) -> Dict[str, Any]:
+    """
+    Génère une instance synthétique de district scolaire
+
+    Élèves regroupés en quartiers autour de l'école, départ du garage,
+    arrivée à l'école avant l'heure limite. Même graine = même instance.
+    """
+    rng = np.random.default_rng(seed)
+    km_lat = 1 / 111.32
+    km_lon = 1 / (111.32 * math.cos(math.radians(center[0])))
+
+    def offset(dx_km, dy_km):
+        return (center[0] + dy_km * km_lat, center[1] + dx_km * km_lon)
+
+    neighborhoods = rng.uniform(-radius_km, radius_km, size=(num_neighborhoods, 2))
+    members = rng.integers(0, num_neighborhoods, size=num_students)
+    students = neighborhoods[members] + rng.normal(0, 0.6, size=(num_students, 2))
+    garage = rng.uniform(-radius_km, radius_km, size=2)
+
+    locations = [offset(*garage)] + [offset(*s) for s in students] + [center]
+    distance_matrix = create_distance_matrix(locations)
+    deadline = deadline_minutes * 60
+
+    return {
+        "name": f"school-{num_students}-s{seed}",
+        "family": "school",
+        "locations": locations,
+        "constraints": {
+            "depot_index": 0,
+            "end_index": len(locations) - 1,
+            "distance_matrix": distance_matrix,
+            "time_matrix": create_time_matrix(distance_matrix, speed_kmh),
+            "time_windows": [(0, deadline)] * len(locations),
+            "service_times": [0] + [service_seconds] * num_students + [0],
+            "route_deadline": deadline,
+            "demands": [0] + [1] * num_students + [0],
+            "vehicle_capacity": bus_capacity,
+            "max_distance": None,
+            "max_duration": None
+        },
+        "num_vehicles": math.ceil(num_students / bus_capacity) + 1,
+        "vehicle_capacity": bus_capacity,
+        "has_time_windows": True,
+        "scale": 1000,  # Objectif en mètres, coût rapporté en km
+        "best_known": None,
+        "seed": seed
+    }
+
+
+def load_directory(directory: Path = INSTANCES_DIR) -> List[Dict[str, Any]]:
+    """
+    Charge toutes les instances d'un répertoire
+
+    - solomon/*.txt: format Solomon
+    - cvrplib/*.vrp: format CVRPLIB (avec .sol optionnel)
+    - best_known.json dans chaque sous-répertoire: {nom: coût}
+    """
+    instances = []
+
+    solomon_dir = directory / "solomon"
+    if solomon_dir.is_dir():
+        best = _load_best_known(solomon_dir)
+        for path in sorted(solomon_dir.glob("*.txt")):
+            instance = load_solomon(path)
+            instance["best_known"] = best.get(instance["name"])
+            instances.append(instance)
+
+    cvrplib_dir = directory / "cvrplib"
+    if cvrplib_dir.is_dir():
+        best = _load_best_known(cvrplib_dir)
+        for path in sorted(cvrplib_dir.glob("*.vrp")):
+            instances.append(load_cvrplib(path, best.get(path.stem)))
+
+    return instances
@@ -0,0 +1,241 @@
+"""
+Banc d'essai des stratégies d'optimisation
+
+Exécute chaque OptimizationStrategy enregistrée sur les instances de
+référence (Solomon, CVRPLIB) et sur des instances scolaires synthétiques,
+puis rapporte la courbe temps/qualité, l'écart final au meilleur coût connu
+et la mémoire maximale.
+
+Usage (depuis modules/transport):
+    python -m benchmarks.runner --time-limit 10 --seeds 0 1 2
+    python -m benchmarks.runner --instances /chemin/vers/instances --output rapport.json
+"""
+
+import argparse
+import inspect
+import json
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Type
+
+import numpy as np
+
+from api.services.optimization.strategies import OptimizationStrategy
+
+from .instances import INSTANCES_DIR, load_directory, generate_school_instance
+
+# Seuils de la courbe temps/qualité (écart au meilleur coût, en %)
+QUALITY_THRESHOLDS = (10.0, 5.0, 2.0, 1.0, 0.0)
+
+
+def registered_strategies() -> List[Type[OptimizationStrategy]]:
+    """Toutes les sous-classes concrètes d'OptimizationStrategy"""
+    found, pending = [], list(OptimizationStrategy.__subclasses__())
+    while pending:
+        cls = pending.pop(0)
+        pending.extend(cls.__subclasses__())
+        if not inspect.isabstract(cls) and cls not in found:
+            found.append(cls)
+    return found
+
+
+def _build_strategy(
+    cls: Type[OptimizationStrategy],
+    instance: Dict[str, Any],
+    time_limit: int
+) -> OptimizationStrategy:
+    """Instancie une stratégie avec les paramètres qu'elle accepte"""
+    available = {
+        "timeout_seconds": time_limit,
+        "num_vehicles": instance["num_vehicles"],
+        "vehicle_capacity": instance["vehicle_capacity"],
+        # Temps de service et vitesse déjà intégrés aux matrices de l'instance
+        "service_time_seconds": 0
+    }
+    accepted = inspect.signature(cls.__init__).parameters
+    return cls(**{key: value for key, value in available.items() if key in accepted})
+
+
+def _gap(cost: Optional[float], reference: Optional[float]) -> Optional[float]:
+    """Écart relatif en pourcentage"""
+    if cost is None or not reference:
+        return None
+    return round((cost - reference) / reference * 100, 2)
+
+
+def _run_once(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Exécute une stratégie sur une instance (dans un processus dédié)
+
+    Le processus est neuf pour chaque exécution: ru_maxrss mesure donc la
+    mémoire maximale de cette seule résolution, allocations OR-Tools (C++)
+    comprises; tracemalloc ne mesure que la part Python.
+    """
+    instance, cls, time_limit, seed = job["instance"], job["strategy"], job["time_limit"], job["seed"]
+    random.seed(seed)
+    np.random.seed(seed)
+
+    strategy = _build_strategy(cls, instance, time_limit)
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = strategy.solve(instance["locations"], dict(instance["constraints"]))
+    wall_seconds = time.perf_counter() - started
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    diagnostics = result.get("diagnostics", {})
+    scale = instance["scale"]
+    best = diagnostics.get("best_objective")
+
+    return {
+        "instance": instance["name"],
+        "family": instance["family"],
+        "strategy": cls.__name__,
+        "seed": seed,
+        "time_limit_seconds": time_limit,
+        "success": bool(result.get("success")),
+        "cost": round(best / scale, 2) if best is not None else None,
+        "wall_seconds": round(wall_seconds, 3),
+        "termination_reason": diagnostics.get("termination_reason"),
+        "solutions_found": diagnostics.get("solutions_found"),
+        "phases_ms": diagnostics.get("phases_ms"),
+        "trajectory": [
+            (point["elapsed_seconds"], round(point["objective"] / scale, 2))
+            for point in diagnostics.get("objective_trajectory", [])
+        ],
+        # Linux: ru_maxrss en kilo-octets
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "python_peak_mb": round(python_peak / 1024 / 1024, 2)
+    }
+
+
+def _time_to_quality(trajectory: List[tuple], reference: float) -> Dict[str, Optional[float]]:
+    """Premier instant où l'écart au coût de référence passe sous chaque seuil"""
+    curve = {}
+    for threshold in QUALITY_THRESHOLDS:
+        reached = next(
+            (elapsed for elapsed, cost in trajectory
+             if _gap(cost, reference) <= threshold + 1e-9),
+            None
+        )
+        curve[f"within_{threshold:g}pct_s"] = reached
+    return curve
+
+
+def run_benchmark(
+    instances: List[Dict[str, Any]],
+    seeds: List[int],
+    time_limit: int,
+    strategies: Optional[List[Type[OptimizationStrategy]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Exécute toutes les combinaisons instance x stratégie x graine
+
+    Les stratégies sans fenêtres temporelles sont ignorées sur les instances
+    qui en comportent (leur coût ne serait pas comparable). Sans meilleur
+    coût connu, la référence est le meilleur coût obtenu par l'ensemble des
+    exécutions sur l'instance.
+    """
+    strategies = strategies or registered_strategies()
+    jobs = [
+        {"instance": instance, "strategy": cls, "time_limit": time_limit, "seed": seed}
+        for instance in instances
+        for cls in strategies
+        if cls.supports_time_windows or not instance["has_time_windows"]
+        # Une instance synthétique n'est exécutée qu'avec sa propre graine
+        for seed in ([instance["seed"]] if "seed" in instance else seeds)
+    ]
+
+    results = []
+    # Un processus neuf par exécution pour isoler la mesure mémoire
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as pool:
+        for job, run in zip(jobs, pool.map(_run_once, jobs)):
+            run["best_known"] = job["instance"]["best_known"]
+            results.append(run)
+            print(
+                f"{run['instance']:<22} {run['strategy']:<24} seed={run['seed']} "
+                f"cost={run['cost']} ({run['termination_reason']})",
+                file=sys.stderr
+            )
+
+    for instance in instances:
+        runs = [r for r in results if r["instance"] == instance["name"]]
+        found = [r["cost"] for r in runs if r["cost"] is not None]
+        reference = instance["best_known"] or (min(found) if found else None)
+        for run in runs:
+            run["reference_cost"] = reference
+            run["reference_source"] = "best_known" if instance["best_known"] else "best_found"
+            run["gap_percent"] = _gap(run["cost"], reference)
+            run["time_to_quality"] = (
+                _time_to_quality(run["trajectory"], reference) if reference else {}
+            )
+
+    return results
+
+
+def summarize(results: List[Dict[str, Any]]) -> str:
+    """Tableau texte: une ligne par instance x stratégie (médiane sur les graines)"""
+    lines = [
+        f"{'instance':<22} {'strategy':<24} {'cost':>10} {'ref':>10} {'gap%':>7} "
+        f"{'t<=5%':>7} {'t<=1%':>7} {'rss MB':>7}"
+    ]
+    keys = sorted({(r["instance"], r["strategy"]) for r in results})
+    for instance, strategy in keys:
+        runs = [r for r in results if r["instance"] == instance and r["strategy"] == strategy]
+
+        def median(values):
+            values = [v for v in values if v is not None]
+            return round(float(np.median(values)), 2) if values else "-"
+
+        lines.append(
+            f"{instance:<22} {strategy:<24} "
+            f"{median(r['cost'] for r in runs):>10} "
+            f"{runs[0]['reference_cost'] or '-':>10} "
+            f"{median(r['gap_percent'] for r in runs):>7} "
+            f"{median(r['time_to_quality'].get('within_5pct_s') for r in runs):>7} "
+            f"{median(r['time_to_quality'].get('within_1pct_s') for r in runs):>7} "
+            f"{median(r['peak_rss_mb'] for r in runs):>7}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark des stratégies d'optimisation")
+    parser.add_argument("--instances", type=Path, default=INSTANCES_DIR,
+                        help="Répertoire contenant solomon/ et cvrplib/")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0],
+                        help="Graines (instances synthétiques et exécutions)")
+    parser.add_argument("--time-limit", type=int, default=10,
+                        help="Limite de temps par exécution (secondes)")
+    parser.add_argument("--school-students", type=int, nargs="*", default=[60, 150],
+                        help="Tailles des instances scolaires synthétiques")
+    parser.add_argument("--strategy", action="append",
+                        help="Restreindre à une stratégie (nom de classe, répétable)")
+    parser.add_argument("--output", type=Path, help="Fichier JSON de résultats")
+    args = parser.parse_args(argv)
+
+    instances = load_directory(args.instances) + [
+        generate_school_instance(seed, num_students=size)
+        for size in args.school_students
+        for seed in args.seeds
+    ]
+
+    strategies = registered_strategies()
+    if args.strategy:
+        strategies = [cls for cls in strategies if cls.__name__ in args.strategy]
+
+    results = run_benchmark(instances, args.seeds, args.time_limit, strategies)
+    print(summarize(results))
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -29,6 +29,8 @@ CREATE TABLE IF NOT EXISTS public.bus (
   type_bus VARCHAR(50) DEFAULT 'standard',
   statut VARCHAR(50) DEFAULT 'disponible',
   equipements JSONB DEFAULT '[]'::jsonb,
+  depot_latitude DECIMAL(10, 8),
+  depot_longitude DECIMAL(11, 8),
   created_at TIMESTAMPTZ DEFAULT now(),
   updated_at TIMESTAMPTZ DEFAULT now()
 );
@@ -46,6 +48,7 @@ CREATE TABLE IF NOT EXISTS public.tournees (
   statut VARCHAR(50) DEFAULT 'planifiee',
   nombre_passagers INTEGER DEFAULT 0,
   sequence_arrets JSONB DEFAULT '[]'::jsonb,
+  empreinte_arrets VARCHAR(64),
   created_at TIMESTAMPTZ DEFAULT now(),
   updated_at TIMESTAMPTZ DEFAULT now()
 );
@@ -128,6 +131,7 @@ CREATE INDEX IF NOT EXISTS idx_passagers_email ON public.passagers(email);
 CREATE INDEX IF NOT EXISTS idx_passagers_geoloc ON public.passagers(latitude, longitude);
 CREATE INDEX IF NOT EXISTS idx_tournees_date ON public.tournees(date_tournee);
 CREATE INDEX IF NOT EXISTS idx_tournees_statut ON public.tournees(statut);
+CREATE INDEX IF NOT EXISTS idx_tournees_date_statut ON public.tournees(date_tournee, statut);
 CREATE INDEX IF NOT EXISTS idx_arrets_tournee ON public.arrets(tournee_id);
 CREATE INDEX IF NOT EXISTS idx_arrets_ordre ON public.arrets(tournee_id, ordre_sequence);
 CREATE INDEX IF NOT EXISTS idx_inscriptions_passager ON public.inscriptions(passager_id);
@@ -136,6 +140,35 @@ CREATE INDEX IF NOT EXISTS idx_positions_gps_bus ON public.positions_gps(bus_id,
 CREATE INDEX IF NOT EXISTS idx_positions_gps_tournee ON public.positions_gps(tournee_id, timestamp_gps DESC);
 CREATE INDEX IF NOT EXISTS idx_evenements_tournee ON public.evenements(tournee_id, created_at DESC);
 
+-- Recherche des passagers (/api/passagers/recherche): trigrammes sans accents
+-- sur search_normalize(champ); GIN pour la similarité et les sous-chaînes,
+-- B-tree text_pattern_ops pour les préfixes
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public;
+CREATE EXTENSION IF NOT EXISTS unaccent WITH SCHEMA public;
+
+-- unaccent() est STABLE: un index ne peut l'utiliser qu'à travers une
+-- fonction IMMUTABLE qui fixe le dictionnaire
+CREATE OR REPLACE FUNCTION public.search_normalize(value TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+STRICT
+PARALLEL SAFE
+AS $$
+  SELECT lower(public.unaccent('public.unaccent'::regdictionary, value))
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_passagers_nom_trgm ON public.passagers USING gin (public.search_normalize(nom) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_passagers_nom_prefix ON public.passagers (public.search_normalize(nom) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_passagers_prenom_trgm ON public.passagers USING gin (public.search_normalize(prenom) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_passagers_prenom_prefix ON public.passagers (public.search_normalize(prenom) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_passagers_email_trgm ON public.passagers USING gin (public.search_normalize(email) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_passagers_email_prefix ON public.passagers (public.search_normalize(email) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_passagers_adresse_complete_trgm ON public.passagers USING gin (public.search_normalize(adresse_complete) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_passagers_adresse_complete_prefix ON public.passagers (public.search_normalize(adresse_complete) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_passagers_ville_trgm ON public.passagers USING gin (public.search_normalize(ville) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_passagers_ville_prefix ON public.passagers (public.search_normalize(ville) text_pattern_ops);
+
 -- Fonction de mise à jour automatique du timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -164,6 +197,335 @@ CREATE TRIGGER update_inscriptions_updated_at BEFORE UPDATE ON public.inscriptio
 CREATE TRIGGER update_contraintes_updated_at BEFORE UPDATE ON public.contraintes_optimisation
   FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- Compteurs du tableau de bord (GET /summary), tenus à jour par triggers;
+-- même définition que la migration Supabase create_dashboard_counters.
+-- Les lignes sont lues en JSONB (to_jsonb) pour suivre les colonnes
+-- alternatives des tournées (date/date_tournee, distance_km/
+-- distance_totale_km...) qu'elles existent ou non.
+
+-- ==========================================
+-- 1. Tables
+-- ==========================================
+
+-- Compteurs par jour et par organisation; jour = '-infinity' porte les
+-- compteurs d'état (tournées par statut, bus, passagers) et les cumuls de
+-- toutes les tournées terminées. Les lignes sans organisation (données
+-- antérieures au multi-tenant) sont rangées sous l'UUID nul.
+CREATE TABLE IF NOT EXISTS public.dashboard_compteurs (
+  jour DATE NOT NULL,
+  organization_id UUID NOT NULL,
+  indicateur VARCHAR(50) NOT NULL,
+  valeur NUMERIC NOT NULL DEFAULT 0,
+  PRIMARY KEY (jour, organization_id, indicateur)
+);
+
+COMMENT ON TABLE public.dashboard_compteurs IS
+'Agrégats du tableau de bord maintenus par triggers. Reconstruction: SELECT public.dashboard_recalculer();';
+
+-- Contribution de chaque tournée terminée, figée à la fin de la tournée
+-- (le taux d'occupation dépend de la capacité du bus à ce moment): c'est
+-- elle qui est retranchée quand la tournée change ou disparaît.
+-- Pas de clé étrangère: la ligne doit survivre à la suppression de la
+-- tournée le temps que le trigger la retranche.
+CREATE TABLE IF NOT EXISTS public.dashboard_tournees_terminees (
+  tournee_id UUID PRIMARY KEY,
+  organization_id UUID NOT NULL,
+  jour DATE,
+  ponctualite NUMERIC NOT NULL,
+  distance_km NUMERIC NOT NULL,
+  duree_minutes NUMERIC,
+  occupation NUMERIC
+);
+
+-- ==========================================
+-- 2. Contributions
+-- ==========================================
+
+-- Champs d'une ligne qui influent sur les compteurs (les autres mises à
+-- jour, comme la progression GPS, ne touchent pas aux compteurs)
+CREATE OR REPLACE FUNCTION public.dashboard_champs(source TEXT, r JSONB)
+RETURNS JSONB
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT jsonb_object_agg(cle, r -> cle)
+  FROM unnest(CASE source
+    WHEN 'tournees' THEN ARRAY[
+      'organization_id', 'statut', 'date', 'date_tournee', 'heure_depart',
+      'heure_arrivee_estimee', 'heure_arrivee_reelle', 'distance_km',
+      'distance_totale_km', 'nombre_passagers', 'bus_id', 'capacite_max'
+    ]
+    WHEN 'bus' THEN ARRAY['organization_id', 'statut']
+    ELSE ARRAY['organization_id']
+  END) AS cle
+$$;
+
+-- Compteurs d'état auxquels contribue une ligne
+CREATE OR REPLACE FUNCTION public.dashboard_contributions(source TEXT, r JSONB)
+RETURNS TABLE (jour DATE, organization_id UUID, indicateur VARCHAR, valeur NUMERIC)
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT '-infinity'::date,
+         COALESCE((r ->> 'organization_id')::uuid, '00000000-0000-0000-0000-000000000000'),
+         c.indicateur,
+         1::numeric
+  FROM (VALUES
+    ('tournees', 'tournees:' || (r ->> 'statut')),
+    ('bus', 'bus'),
+    ('bus', 'bus:' || (r ->> 'statut')),
+    ('passagers', 'passagers')
+  ) AS c (source, indicateur)
+  WHERE r IS NOT NULL AND c.source = dashboard_contributions.source AND c.indicateur IS NOT NULL
+$$;
+
+-- Contribution d'une tournée terminée (mêmes règles que le calcul direct
+-- des performances de GET /summary)
+CREATE OR REPLACE FUNCTION public.dashboard_terminee(r JSONB)
+RETURNS public.dashboard_tournees_terminees
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT
+    (r ->> 'id')::uuid,
+    COALESCE((r ->> 'organization_id')::uuid, '00000000-0000-0000-0000-000000000000'),
+    COALESCE((r ->> 'date')::date, (r ->> 'date_tournee')::date),
+    CASE WHEN (r ->> 'heure_arrivee_reelle')::time <= (r ->> 'heure_arrivee_estimee')::time
+         THEN 100 ELSE 0 END::numeric,
+    COALESCE((r ->> 'distance_km')::numeric, (r ->> 'distance_totale_km')::numeric, 0),
+    (EXTRACT(EPOCH FROM ((r ->> 'heure_arrivee_reelle')::time - (r ->> 'heure_depart')::time)) / 60)::numeric,
+    CASE WHEN COALESCE((r ->> 'nombre_passagers')::integer, 0) > 0
+         THEN (r ->> 'nombre_passagers')::integer * 100.0 / NULLIF(COALESCE(
+           (r ->> 'capacite_max')::numeric,
+           (b.bus ->> 'capacite_max')::numeric,
+           (b.bus ->> 'capacite')::numeric
+         ), 0)
+         ELSE 0 END::numeric
+  FROM (
+    SELECT (SELECT to_jsonb(bus) FROM public.bus bus WHERE bus.id = (r ->> 'bus_id')::uuid) AS bus
+  ) b
+$$;
+
+-- Compteurs auxquels contribue une tournée terminée: cumul ('-infinity')
+-- et jour de la tournée
+CREATE OR REPLACE FUNCTION public.dashboard_contributions_terminee(l public.dashboard_tournees_terminees)
+RETURNS TABLE (jour DATE, organization_id UUID, indicateur VARCHAR, valeur NUMERIC)
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT j.jour, l.organization_id, v.indicateur, v.valeur
+  FROM unnest(ARRAY['-infinity'::date, l.jour]) AS j (jour),
+       (VALUES
+         ('terminees', 1::numeric),
+         ('ponctualite', l.ponctualite),
+         ('distance_km', l.distance_km),
+         ('duree_minutes', l.duree_minutes),
+         ('duree_nombre', CASE WHEN l.duree_minutes IS NOT NULL THEN 1 END),
+         ('occupation', l.occupation),
+         ('occupation_nombre', CASE WHEN l.occupation IS NOT NULL THEN 1 END)
+       ) AS v (indicateur, valeur)
+  WHERE l.tournee_id IS NOT NULL AND j.jour IS NOT NULL AND v.valeur IS NOT NULL
+$$;
+
+-- ==========================================
+-- 3. Triggers
+-- ==========================================
+
+-- Déclencheurs par instruction: les lignes modifiées arrivent par les
+-- tables de transition (anciennes_lignes, nouvelles_lignes) et les
+-- variations sont sommées par (jour, organisation, indicateur) avant un
+-- seul upsert trié. Une insertion en masse (INSERT multi-lignes, COPY) ne
+-- touche donc chaque compteur qu'une fois, et les verrous sont pris dans
+-- le même ordre par toutes les transactions.
+CREATE OR REPLACE FUNCTION public.dashboard_maj_compteurs()
+RETURNS TRIGGER AS $$
+DECLARE
+  anciennes JSONB := '[]';
+  nouvelles JSONB := '[]';
+  inchangees TEXT[];
+  terminees_anciennes JSONB := '[]';
+  terminees_nouvelles JSONB := '[]';
+BEGIN
+  -- Une table de transition n'existe que pour les opérations qui la
+  -- déclarent: chaque requête n'est préparée que si sa branche s'exécute
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    SELECT COALESCE(jsonb_agg(to_jsonb(o)), '[]') INTO anciennes FROM anciennes_lignes o;
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    SELECT COALESCE(jsonb_agg(to_jsonb(n)), '[]') INTO nouvelles FROM nouvelles_lignes n;
+  END IF;
+
+  -- Mises à jour sans effet sur les compteurs (progression GPS...): ignorées
+  IF TG_OP = 'UPDATE' THEN
+    SELECT COALESCE(array_agg(o.value ->> 'id'), '{}') INTO inchangees
+    FROM jsonb_array_elements(anciennes) o
+    JOIN jsonb_array_elements(nouvelles) n ON n.value ->> 'id' = o.value ->> 'id'
+    WHERE public.dashboard_champs(TG_TABLE_NAME, o.value)
+        = public.dashboard_champs(TG_TABLE_NAME, n.value);
+
+    IF cardinality(inchangees) > 0 THEN
+      SELECT COALESCE(jsonb_agg(o.value), '[]') INTO anciennes
+      FROM jsonb_array_elements(anciennes) o
+      WHERE o.value ->> 'id' NOT IN (SELECT unnest(inchangees));
+      SELECT COALESCE(jsonb_agg(n.value), '[]') INTO nouvelles
+      FROM jsonb_array_elements(nouvelles) n
+      WHERE n.value ->> 'id' NOT IN (SELECT unnest(inchangees));
+    END IF;
+  END IF;
+
+  IF anciennes = '[]' AND nouvelles = '[]' THEN
+    RETURN NULL;
+  END IF;
+
+  IF TG_TABLE_NAME = 'tournees' THEN
+    WITH supprimees AS (
+      DELETE FROM public.dashboard_tournees_terminees
+      WHERE tournee_id IN (
+        SELECT (o.value ->> 'id')::uuid FROM jsonb_array_elements(anciennes) o
+      )
+      RETURNING *
+    )
+    SELECT COALESCE(jsonb_agg(to_jsonb(s)), '[]') INTO terminees_anciennes FROM supprimees s;
+
+    WITH ajoutees AS (
+      INSERT INTO public.dashboard_tournees_terminees
+      SELECT l.*
+      FROM jsonb_array_elements(nouvelles) n,
+           LATERAL public.dashboard_terminee(n.value) l
+      WHERE n.value ->> 'statut' = 'terminee'
+      RETURNING *
+    )
+    SELECT COALESCE(jsonb_agg(to_jsonb(a)), '[]') INTO terminees_nouvelles FROM ajoutees a;
+  END IF;
+
+  INSERT INTO public.dashboard_compteurs AS c (jour, organization_id, indicateur, valeur)
+  SELECT d.jour, d.organization_id, d.indicateur, SUM(d.signe * d.valeur)
+  FROM (
+    SELECT -1 AS signe, x.*
+    FROM jsonb_array_elements(anciennes) o,
+         LATERAL public.dashboard_contributions(TG_TABLE_NAME, o.value) x
+    UNION ALL
+    SELECT 1, x.*
+    FROM jsonb_array_elements(nouvelles) n,
+         LATERAL public.dashboard_contributions(TG_TABLE_NAME, n.value) x
+    UNION ALL
+    SELECT -1, x.*
+    FROM jsonb_array_elements(terminees_anciennes) o,
+         LATERAL public.dashboard_contributions_terminee(
+           jsonb_populate_record(NULL::public.dashboard_tournees_terminees, o.value)
+         ) x
+    UNION ALL
+    SELECT 1, x.*
+    FROM jsonb_array_elements(terminees_nouvelles) n,
+         LATERAL public.dashboard_contributions_terminee(
+           jsonb_populate_record(NULL::public.dashboard_tournees_terminees, n.value)
+         ) x
+  ) d
+  GROUP BY d.jour, d.organization_id, d.indicateur
+  HAVING SUM(d.signe * d.valeur) <> 0
+  ORDER BY d.jour, d.organization_id, d.indicateur
+  ON CONFLICT (jour, organization_id, indicateur)
+  DO UPDATE SET valeur = c.valeur + EXCLUDED.valeur;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER
+SET search_path = 'public';
+
+-- Un déclencheur par opération: une table de transition ne peut être
+-- déclarée que pour un déclencheur à un seul événement
+DROP TRIGGER IF EXISTS trg_dashboard_tournees ON public.tournees;
+DROP TRIGGER IF EXISTS trg_dashboard_tournees_insert ON public.tournees;
+CREATE TRIGGER trg_dashboard_tournees_insert
+AFTER INSERT ON public.tournees
+REFERENCING NEW TABLE AS nouvelles_lignes
+FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_maj_compteurs();
+
+DROP TRIGGER IF EXISTS trg_dashboard_tournees_update ON public.tournees;
+CREATE TRIGGER trg_dashboard_tournees_update
+AFTER UPDATE ON public.tournees
+REFERENCING OLD TABLE AS anciennes_lignes NEW TABLE AS nouvelles_lignes
+FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_maj_compteurs();
+
+DROP TRIGGER IF EXISTS trg_dashboard_tournees_delete ON public.tournees;
+CREATE TRIGGER trg_dashboard_tournees_delete
+AFTER DELETE ON public.tournees
+REFERENCING OLD TABLE AS anciennes_lignes
+FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_maj_compteurs();
+
+DROP TRIGGER IF EXISTS trg_dashboard_bus ON public.bus;
+DROP TRIGGER IF EXISTS trg_dashboard_bus_insert ON public.bus;
+CREATE TRIGGER trg_dashboard_bus_insert
+AFTER INSERT ON public.bus
+REFERENCING NEW TABLE AS nouvelles_lignes
+FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_maj_compteurs();
+
+DROP TRIGGER IF EXISTS trg_dashboard_bus_update ON public.bus;
+CREATE TRIGGER trg_dashboard_bus_update
+AFTER UPDATE ON public.bus
+REFERENCING OLD TABLE AS anciennes_lignes NEW TABLE AS nouvelles_lignes
+FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_maj_compteurs();
+
+DROP TRIGGER IF EXISTS trg_dashboard_bus_delete ON public.bus;
+CREATE TRIGGER trg_dashboard_bus_delete
+AFTER DELETE ON public.bus
+REFERENCING OLD TABLE AS anciennes_lignes
+FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_maj_compteurs();
+
+DROP TRIGGER IF EXISTS trg_dashboard_passagers ON public.passagers;
+DROP TRIGGER IF EXISTS trg_dashboard_passagers_insert ON public.passagers;
+CREATE TRIGGER trg_dashboard_passagers_insert
+AFTER INSERT ON public.passagers
+REFERENCING NEW TABLE AS nouvelles_lignes
+FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_maj_compteurs();
+
+DROP TRIGGER IF EXISTS trg_dashboard_passagers_update ON public.passagers;
+CREATE TRIGGER trg_dashboard_passagers_update
+AFTER UPDATE ON public.passagers
+REFERENCING OLD TABLE AS anciennes_lignes NEW TABLE AS nouvelles_lignes
+FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_maj_compteurs();
+
+DROP TRIGGER IF EXISTS trg_dashboard_passagers_delete ON public.passagers;
+CREATE TRIGGER trg_dashboard_passagers_delete
+AFTER DELETE ON public.passagers
+REFERENCING OLD TABLE AS anciennes_lignes
+FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_maj_compteurs();
+
+-- ==========================================
+-- 4. Reconstruction
+-- ==========================================
+
+-- Recalcule tous les compteurs depuis les tables (initialisation, réparation)
+CREATE OR REPLACE FUNCTION public.dashboard_recalculer()
+RETURNS VOID AS $$
+BEGIN
+  -- Les écritures attendent la fin du recalcul
+  LOCK TABLE public.tournees, public.bus, public.passagers IN SHARE MODE;
+  TRUNCATE public.dashboard_compteurs, public.dashboard_tournees_terminees;
+
+  INSERT INTO public.dashboard_tournees_terminees
+  SELECT l.*
+  FROM public.tournees t, LATERAL public.dashboard_terminee(to_jsonb(t)) l
+  WHERE t.statut = 'terminee';
+
+  INSERT INTO public.dashboard_compteurs (jour, organization_id, indicateur, valeur)
+  SELECT d.jour, d.organization_id, d.indicateur, SUM(d.valeur)
+  FROM (
+    SELECT c.* FROM public.tournees t, LATERAL public.dashboard_contributions('tournees', to_jsonb(t)) c
+    UNION ALL
+    SELECT c.* FROM public.bus b, LATERAL public.dashboard_contributions('bus', to_jsonb(b)) c
+    UNION ALL
+    SELECT c.* FROM public.passagers p, LATERAL public.dashboard_contributions('passagers', to_jsonb(p)) c
+    UNION ALL
+    SELECT c.* FROM public.dashboard_tournees_terminees l, LATERAL public.dashboard_contributions_terminee(l) c
+  ) d
+  GROUP BY d.jour, d.organization_id, d.indicateur;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER
+SET search_path = 'public';
+
+SELECT public.dashboard_recalculer();
+
 -- Données de test initiales
 INSERT INTO public.contraintes_optimisation (nom_contrainte, type_contrainte, valeur) VALUES
   ('Capacité maximale bus', 'capacite', '{"max": 50}'::jsonb),
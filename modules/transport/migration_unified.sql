@@ -118,6 +118,45 @@ CREATE INDEX IF NOT EXISTS idx_sites_depot ON public.sites(is_depot) WHERE is_de
 CREATE INDEX IF NOT EXISTS idx_sites_location ON public.sites(latitude, longitude);
 CREATE INDEX IF NOT EXISTS idx_sites_active ON public.sites(is_active) WHERE is_active = true;
 
+-- Dépôt d'attache des véhicules (sites est créée après vehicles)
+ALTER TABLE public.vehicles
+    ADD COLUMN IF NOT EXISTS depot_site_id UUID REFERENCES public.sites(id) ON DELETE SET NULL;
+CREATE INDEX IF NOT EXISTS idx_vehicles_depot ON public.vehicles(depot_site_id);
+
+-- ===========================================
+-- RECHERCHE: trigrammes sans accents (véhicules, sites)
+-- ===========================================
+-- Les champs sont comparés sous la forme search_normalize(champ): GIN
+-- gin_trgm_ops pour la similarité et les sous-chaînes, B-tree
+-- text_pattern_ops pour les préfixes
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public;
+CREATE EXTENSION IF NOT EXISTS unaccent WITH SCHEMA public;
+
+-- unaccent() est STABLE: un index ne peut l'utiliser qu'à travers une
+-- fonction IMMUTABLE qui fixe le dictionnaire
+CREATE OR REPLACE FUNCTION public.search_normalize(value TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+STRICT
+PARALLEL SAFE
+AS $$
+  SELECT lower(public.unaccent('public.unaccent'::regdictionary, value))
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_vehicles_name_trgm ON public.vehicles USING gin (public.search_normalize(name) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_vehicles_name_prefix ON public.vehicles (public.search_normalize(name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_vehicles_registration_trgm ON public.vehicles USING gin (public.search_normalize(registration) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_vehicles_registration_prefix ON public.vehicles (public.search_normalize(registration) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_sites_name_trgm ON public.sites USING gin (public.search_normalize(name) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_sites_name_prefix ON public.sites (public.search_normalize(name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_sites_code_trgm ON public.sites USING gin (public.search_normalize(code) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_sites_code_prefix ON public.sites (public.search_normalize(code) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_sites_address_trgm ON public.sites USING gin (public.search_normalize(address) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_sites_address_prefix ON public.sites (public.search_normalize(address) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_sites_city_trgm ON public.sites USING gin (public.search_normalize(city) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_sites_city_prefix ON public.sites (public.search_normalize(city) text_pattern_ops);
+
 
 -- ===========================================
 -- 3. TABLE: items (Éléments à transporter)
@@ -1,7 +1,13 @@
 """
 Script de test rapide pour vérifier que l'API fonctionne
 Usage: python test_api.py
+
+Avec API_V2_TOKEN et API_V2_ORG_ID définis, importe aussi deux fois le même
+site dans l'API v2 (API_V2_BASE_URL) pour vérifier l'upsert sur le schéma réel.
 """
+import os
+import uuid
+
 import httpx
 import sys
 from rich.console import Console
@@ -28,6 +34,35 @@ def test_endpoint(endpoint: str, name: str):
         console.print(f"❌ {name} - Erreur: {e}", style="bold red")
         return False
 
+def test_site_import():
+    """Importe deux fois le même site: création puis mise à jour (upsert sur organisation + code)"""
+    base_url = os.getenv("API_V2_BASE_URL", API_BASE_URL)
+    headers = {
+        "Authorization": f"Bearer {os.environ['API_V2_TOKEN']}",
+        "X-Organization-ID": os.environ["API_V2_ORG_ID"]
+    }
+    code = f"TEST-{uuid.uuid4().hex[:8]}"
+    expected = [("importees", 1), ("mises_a_jour", 1)]
+    try:
+        for run, (counter, value) in enumerate(expected, start=1):
+            csv = f"name,code,latitude,longitude\nSite de test {run},{code},48.8566,2.3522\n"
+            response = httpx.post(
+                f"{base_url}/api/v1/sites/import",
+                headers=headers,
+                files={"file": ("sites.csv", csv.encode(), "text/csv")},
+                timeout=30
+            )
+            report = response.json() if response.status_code == 200 else {}
+            if report.get(counter) != value or report.get("rejetees"):
+                console.print(f"❌ Import de sites ({run}/2) - Status {response.status_code}: {response.text[:200]}", style="bold red")
+                return False
+        console.print(f"✅ Import de sites (code {code})", style="bold green")
+        return True
+    except httpx.ConnectError:
+        console.print("❌ Import de sites - Impossible de se connecter", style="bold red")
+        return False
+
+
 def main():
     console.print("\n[bold blue]🧪 Test de l'API Transport[/bold blue]\n")
 
@@ -41,6 +76,8 @@ def main():
     results.append(test_endpoint("/health/live", "Liveness check"))
     results.append(test_endpoint("/summary", "Summary endpoint"))
     results.append(test_endpoint("/summary/tournees", "Tournées endpoint"))
+    if os.getenv("API_V2_TOKEN") and os.getenv("API_V2_ORG_ID"):
+        results.append(test_site_import())
 
     # Résumé
     console.print(f"\n[bold]Résumé:[/bold]")